@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Runtime of service runs with each output policy
+
+Runs, with an HVAC fleet, the ReserveService request loop of the 7th of June
+2017 (1-minute steps, a figure of the day and one per event: 8 figures), and
+PeakManagementService.request_loop over the drive cycle (one time step at a
+time, one figure), with:
+- full output: every time step logged, the figures drawn during the run
+- background: every time step logged, the figures drawn in the background process
+- deferred: progress logged, the figures drawn in the background process at finish()
+- silent: warnings only, no figures
+The time of the run is measured up to the return of request_loop, and the
+time of finish() (waiting for the figures) separately. The log goes to
+os.devnull, so the times do not include the terminal.
+
+Usage: python benchmark.py
+(run from the src folder, the fleet reads its inputs with paths relative to it)
+"""
+import sys
+import os
+import glob
+from os.path import dirname, abspath, join
+sys.path.insert(0, dirname(abspath(__file__)))
+
+import time
+import logging
+from datetime import timedelta
+from dateutil import parser
+
+import output_policy
+from output_policy import OutputPolicy
+from fleet_factory import create_fleet
+from services.reserve_service.reserve_service import ReserveService
+from services.peak_managment_service.peak_management_service import PeakManagementService
+
+POLICIES = [
+    ('full output', OutputPolicy(level=logging.DEBUG)),
+    ('background', OutputPolicy(background=True, level=logging.DEBUG)),
+    ('deferred', OutputPolicy(plots=output_policy.DEFERRED, background=True, level=logging.INFO)),
+    ('silent', output_policy.silent()),
+]
+
+
+def run_reserve(policy):
+    output_policy.set_policy(policy)
+    service = ReserveService()
+    start_time = parser.parse('2017-06-07 00:00:00')
+    service.fleet = create_fleet('HVAC', 1, start_time=start_time, sim_step=timedelta(minutes=1), service_weight=1.0)
+    start = time.time()
+    service.request_loop(start_time=start_time, end_time=parser.parse('2017-06-07 23:59:59'),
+                         sim_step=timedelta(minutes=1), clearing_price_filename='201706.csv',
+                         four_scenario_testing=False, fleet_name=service.fleet.__class__.__name__)
+    t_run = time.time() - start
+    start = time.time()
+    output_policy.finish()
+    return t_run, time.time() - start
+
+
+def run_peak_management(policy):
+    output_policy.set_policy(policy)
+    sim_step = timedelta(minutes=5)
+    service = PeakManagementService(sim_step=sim_step)
+    start_time = service.drive_cycle["dt"][0]
+    service.fleet = create_fleet('HVAC', 1, start_time=start_time, sim_step=sim_step, service_weight=1.0)
+    start = time.time()
+    service.request_loop(start_time, 'PeakManagementService', fleet_name=service.fleet.__class__.__name__)
+    t_run = time.time() - start
+    start = time.time()
+    output_policy.finish()
+    return t_run, time.time() - start
+
+
+if __name__ == '__main__':
+    output_policy.logger.handlers[0].setStream(open(os.devnull, 'w'))
+    result_dirs = [join(dirname(abspath(__file__)), 'integration_test', name)
+                   for name in ('reserve_service', 'PeakManagementService')]
+    existing = set(filename for result_dir in result_dirs for filename in glob.glob(join(result_dir, '*')))
+
+    for title, run in (('ReserveService, 2017-06-07', run_reserve),
+                       ('PeakManagementService, drive cycle at 5 minutes', run_peak_management)):
+        print(title)
+        print('%12s %18s %12s %10s' % ('output', 'request_loop (s)', 'finish (s)', 'total (s)'))
+        for name, policy in POLICIES:
+            t_run, t_finish = run(policy)
+            print('%12s %18.3f %12.3f %10.3f' % (name, t_run, t_finish, t_run + t_finish))
+        print()
+
+    # Remove the results and figures written by the runs
+    for result_dir in result_dirs:
+        for filename in set(glob.glob(join(result_dir, '*'))) - existing:
+            os.remove(filename)
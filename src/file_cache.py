@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*- {{{
+#
+# Your license here
+# }}}
+"""
+Binary copies of slow input files (workbooks, csv and weather files)
+
+An input file is parsed once, and its content saved in binary files in a
+cache directory, read instead of the input file as long as they are newer
+than it:
+
+    def parse(path): ...                      # slow, e.g. pd.read_excel
+    def write(base, value): np.save(base + '.npy', value)
+    def read(base): return np.load(base + '.npy')
+
+    value = file_cache.load(path, ('.npy',), parse, write, read)
+
+The cache directory is the .cache folder at the root of the repository, the
+FLEET_CACHE_DIR environment variable or set_cache_dir(). When the copies
+cannot be written (e.g. a read-only tree), the input file is parsed at each
+load instead.
+"""
+
+import os
+import hashlib
+import logging
+from os.path import dirname, abspath, basename, splitext, join, exists, getmtime
+
+logger = logging.getLogger('file_cache')
+
+_cache_dir = os.environ.get('FLEET_CACHE_DIR', join(dirname(dirname(abspath(__file__))), '.cache'))
+
+
+def get_cache_dir():
+    return _cache_dir
+
+
+def set_cache_dir(directory):
+    """
+    Directory of the binary copies of the next loads
+    """
+    global _cache_dir
+    _cache_dir = directory
+
+
+def is_fresh(target, source):
+    """
+    :return: True if target exists and was written after source was
+    """
+    return exists(target) and getmtime(target) >= getmtime(source)
+
+
+def cache_base(path):
+    """
+    :return: path, without suffix, of the binary copies of the input file path
+        (its name and a hash of its absolute path, so files of the same name do not collide)
+    """
+    name = splitext(basename(path))[0]
+    digest = hashlib.sha1(abspath(path).encode('utf-8')).hexdigest()[:12]
+    return join(_cache_dir, '%s-%s' % (name, digest))
+
+
+def load(path, suffixes, parse, write, read):
+    """
+    Content of the input file path, from its binary copy if it is up to date
+
+    :param suffixes: suffixes of the files of the copy. write(base, value) writes them
+        as base + suffix, and the last one tells if the copy is up to date
+    :param parse: parse(path) returns the content of the input file
+    :param write: write(base, value) saves the content
+    :param read: read(base) returns the content from the copy
+    """
+    base = cache_base(path)
+    if is_fresh(base + suffixes[-1], path):
+        try:
+            return read(base)
+        except OSError:
+            pass
+    value = parse(path)
+    # The files are written under another name and renamed, the last one last, so that
+    # another process never reads a partial copy
+    partial = '%s.%i' % (base, os.getpid())
+    try:
+        os.makedirs(_cache_dir, exist_ok=True)
+        write(partial, value)
+        for suffix in suffixes:
+            os.replace(partial + suffix, base + suffix)
+    except OSError as e:
+        logger.warning('%s is not cached: %s', path, e)
+        for suffix in suffixes:
+            if exists(partial + suffix):
+                os.remove(partial + suffix)
+        return value
+    return read(base)
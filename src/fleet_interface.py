@@ -34,6 +34,15 @@ class FleetInterface:
 
         return fleet_response
 
+    def process_requests(self, fleet_requests):
+        """
+        Requests for consecutive timesteps, e.g. a service's plan for a day
+
+        :param fleet_requests: list of FleetRequest instances, in time order
+        :return fleet_responses: list of FleetResponse instances
+        """
+        return [self.process_request(fleet_request) for fleet_request in fleet_requests]
+
     def forecast(self, fleet_requests):
         """
         Request for current time step
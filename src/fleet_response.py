@@ -82,3 +82,20 @@ class FleetResponse:
 
         # State-of-charge cost:  Incentive requirement for device to be at SoC other than 100% ($/hr)
         self.SOC_cost       = None
+
+
+def responses_from_frame(frame):
+    """
+    FleetResponse of each row of a columnar forecast
+
+    :param frame: DataFrame with a column per FleetResponse attribute
+    :return res: list of FleetResponse instances
+    """
+    columns = {name: frame[name].tolist() for name in frame.columns}
+    responses = []
+    for k in range(len(frame)):
+        response = FleetResponse()
+        for name, values in columns.items():
+            setattr(response, name, values[k])
+        responses.append(response)
+    return responses
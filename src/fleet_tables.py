@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*- {{{
+#
+# Your license here
+# }}}
+"""
+Tables of the hydrogen fleets (fuel cell and electrolyzer), computed once
+in place of at each time step
+
+OperatingPoints interpolates the current of a cell, or of a stack of cells,
+vs. its power in a table of operating points, in place of solving the
+voltage-current equations with fsolve. BasePower evaluates the polynomial
+base power profile of a fleet for many time steps at a time.
+"""
+
+from bisect import bisect_right
+from warnings import warn
+from numpy import polyval, ndarray, linspace, diff, arange, array, full, nan, minimum, maximum, searchsorted, \
+    flatnonzero
+from scipy.interpolate import PchipInterpolator
+
+
+class OperatingPoints:
+    """
+    Voltage and current of a cell or a stack at a power, interpolated in a table of operating points
+    over the operating range of a fleet, solved with fsolve outside of the table
+    """
+
+    def __init__(self, volt, solve, p_min, p_max, tol, n_cells=1):
+        """
+        :param volt: volt(i) is the voltage of a cell at the current i (A), i an array
+        :param solve: solve(p) is the voltage (V) and current (A) at the power p (W), solved with fsolve
+        :param p_min: min. power of the operating range (W)
+        :param p_max: max. power of the operating range (W)
+        :param tol: max. relative error of the interpolated current, 0 for no table (fsolve at each power)
+        :param n_cells: number of cells at the current i, the power is n_cells * volt(i) * i
+        """
+        self.volt = volt
+        self.solve = solve
+        self.n_cells = n_cells
+        self.tol = tol
+        self.table = self.__table_calc(p_min, p_max) if tol > 0 else None
+
+    def __power(self, i):
+        return self.n_cells * self.volt(i) * i
+
+    def __table_calc(self, p_min, p_max):
+        # Power and current on a uniform current grid around the fsolve solutions at the min. and
+        # max. power, with the coefficients of the PCHIP interpolation of the current vs. power. The
+        # grid is refined until the interpolated current is within tol (relative) at the midpoints.
+        # None if the power is not increasing with the current on that range.
+        i_min = self.solve(p_min)[1] * 0.99
+        i_max = self.solve(p_max)[1] * 1.01
+        n = 17
+        while True:
+            i = linspace(i_min, i_max, n)
+            p = self.__power(i)
+            if not (i_min > 0 and all(diff(p) > 0)):
+                warn("Power is not increasing with the current in the operating range. "
+                     "The operating points will be computed with fsolve")
+                return None
+            i_p = PchipInterpolator(p, i)
+            i_mid = (i[1:] + i[:-1]) / 2
+            err = max(abs(i_p(self.__power(i_mid)) / i_mid - 1))
+            if err <= self.tol or n > 2 ** 16:
+                break
+            n = 2 * n - 1
+        if err > self.tol:
+            warn("Operating point table error %.2e is above table_tol in config.ini" % err)
+        return p.tolist(), i_p.c.T.tolist()
+
+    def __call__(self, Pr):
+        """
+        :param Pr: power (W)
+        :return V, Ir: voltage (V) and current (A)
+        """
+        if self.table is None:
+            return self.solve(Pr)
+        p, c = self.table
+        if not p[0] <= Pr <= p[-1]:
+            return self.solve(Pr)
+        k = min(bisect_right(p, Pr), len(c)) - 1
+        dp = Pr - p[k]
+        Ir = ((c[k][0] * dp + c[k][1]) * dp + c[k][2]) * dp + c[k][3]
+        return Pr / self.n_cells / Ir, Ir
+
+    def array(self, Pr):
+        """
+        :param Pr: array of powers (W)
+        :return V, Ir: arrays of voltages (V) and currents (A)
+        """
+        if self.table is None:
+            outside = flatnonzero(Pr == Pr)
+            V, Ir = full(len(Pr), nan), full(len(Pr), nan)
+        else:
+            p, c = array(self.table[0]), array(self.table[1])
+            k = minimum(searchsorted(p, Pr, side='right'), len(c)) - 1
+            k = minimum(maximum(k, 0), len(c) - 1)
+            dp = Pr - p[k]
+            Ir = ((c[k, 0] * dp + c[k, 1]) * dp + c[k, 2]) * dp + c[k, 3]
+            V = Pr / self.n_cells / Ir
+            outside = flatnonzero((Pr < p[0]) | (Pr > p[-1]))
+        for j in outside:
+            V[j], Ir[j] = self.solve(Pr[j])
+        return V, Ir
+
+
+class BasePower:
+    """
+    Base power of a fleet at the time steps inc: the polynomial p (fit_pdat) at inc + 1, or p if it is
+    a constant
+    """
+
+    def __init__(self, p, steps):
+        """
+        :param p: coefficients of the polynomial, highest power first, or a constant
+        :param steps: number of time steps evaluated at a time
+        """
+        self.p = p
+        self.steps = steps
+        self.__start = 0
+        self.__profile = []
+
+    def __call__(self, inc):
+        # The polynomial is evaluated (Horner's method) for steps time steps at a time, from the first
+        # time step outside of the last ones
+        if not isinstance(self.p, ndarray):
+            return self.p
+        if not 0 <= inc - self.__start < len(self.__profile):
+            self.__start = inc
+            self.__profile = polyval(self.p, arange(inc + 1.0, inc + 1.0 + self.steps)).tolist()
+        return self.__profile[inc - self.__start]
+
+    def array(self, inc):
+        """
+        :param inc: array of time steps
+        :return: array of base powers
+        """
+        if not isinstance(self.p, ndarray):
+            return full(len(inc), float(self.p))
+        return polyval(self.p, inc + 1.0)
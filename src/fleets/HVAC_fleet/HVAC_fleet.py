@@ -12,7 +12,8 @@ Version: 1.0
 
 # code needed for GLOBAL fleet_interface
 import sys
-from os.path import dirname, abspath, join
+import logging
+from os.path import dirname, abspath, join, exists
 sys.path.insert(0,dirname(dirname(dirname(abspath(__file__)))))
 ################################################################
 
@@ -25,17 +26,21 @@ from datetime import datetime, timedelta
 # This is the actual building thermal and HVAC models
 #import build_model as bm
 from fleets.HVAC_fleet.build_model import BuildingModel
+from fleets.HVAC_fleet.build_model import BuildingFleetModel
 from fleets.HVAC_fleet.build_model import AC
 from fleets.HVAC_fleet.build_model import c
 from fleets.HVAC_fleet.build_model import EIR
 from fleets.HVAC_fleet.build_model import Capacity
 from fleets.HVAC_fleet.build_model import SHR
+from fleets.HVAC_fleet.AC_Response import ACResponse
 # from fleets.HVAC_fleet.build_model import building
 
 from fleet_interface import FleetInterface
 from fleet_response import FleetResponse
 from fleets.HVAC_fleet.load_config import LoadConfig
 from frequency_droop import FrequencyDroop
+import output_policy
+import file_cache
 
 import matplotlib
 import matplotlib.pyplot as plt
@@ -45,8 +50,12 @@ import pandas as pd
 import scipy as sp
 import time
 import csv
+import hashlib
+from types import SimpleNamespace
 from utils import ensure_ddir
 
+logger = logging.getLogger('fleets.HVAC_fleet')
+
 class HVACFleet(FleetInterface):   #FleetInterface
     """
     This class implements FleetInterface so that it can communicate with a fleet
@@ -243,9 +252,9 @@ class HVACFleet(FleetInterface):   #FleetInterface
         self.TsetInitial=np.random.normal(self.TsetInitialMean, self.TsetInitialStddev,self.numHVAC)
         
         # sampling from houses with different envelope efficiencies
-        self.Rext = [random.choice(self.RextMasterList) for n in range(self.numHVAC)]
-        self.Rattic = [random.choice(self.RatticMasterList) for n in range(self.numHVAC)]
-        self.Cmass = [random.choice(self.CmassMasterList) for n in range(self.numHVAC)]
+        self.Rext = np.array([random.choice(self.RextMasterList) for n in range(self.numHVAC)])
+        self.Rattic = np.array([random.choice(self.RatticMasterList) for n in range(self.numHVAC)])
+        self.Cmass = np.array([random.choice(self.CmassMasterList) for n in range(self.numHVAC)])
         self.Location = [random.choice(self.ClimateMasterList) for n in range(self.numHVAC)]
         
         # self.MaxServiceCalls = [random.choice(self.MaxServiceCallMasterList) for n in range(self.numHVAC)]    
@@ -311,31 +320,21 @@ class HVACFleet(FleetInterface):   #FleetInterface
         (self.Qsolar_i, self.Qsolar_mass, temp_sol_W, temp_sol_R) = get_inputs(self.Qsolar_i10, self.Qsolar_mass10, self.temp_sol_W10, self.temp_sol_R10, self.sim_step, self.ts)  
 
         # Load the other disturbance signals by randomly sampling with different weather conditions     
-        Tamb = []
-        Tsol_W = []
-        Tsol_R = []
-        IHL = []
-
-        for a in range(self.numHVAC):             
-      
-            (tamb, IHL_s) = get_daily_conditions(self.Location[a], self.sim_step, self.ts)  # location, timestep_s, start_time
-            
-            tsol_W = tamb + temp_sol_W
-            tsol_R = tamb + temp_sol_R
+        # Conditions only depend on the location: they are stored once per location (rows)
+        # and self.location_index gives the row of each HVAC
+        locations, self.location_index = np.unique(self.Location, return_inverse=True)
+        conditions = [get_daily_conditions(l, self.sim_step, self.ts) for l in locations]  # location, timestep_s, start_time
+        Tamb = np.array([tamb for (tamb, IHL_s) in conditions])
+        IHL = np.array([IHL_s for (tamb, IHL_s) in conditions])
 
-            Tamb.append(tamb)
-            Tsol_W.append(tsol_W)
-            Tsol_R.append(tsol_R)
-            IHL.append(IHL_s)
-        
         self.QIHL_i = np.multiply(Sp1, IHL)
         self.QIHL_mass = np.multiply(1-Sp1, IHL)
-        self.Tsol_W = np.array(Tsol_W)
-        self.Tsol_R = np.array(Tsol_R)  
-        self.Tamb = np.array(Tamb)      
+        self.Tsol_W = Tamb + temp_sol_W
+        self.Tsol_R = Tamb + temp_sol_R
+        self.Tamb = Tamb
         
         # Just take forecast of IHL as an example, it can be easily extended to solar irradiation
-        self.IHL_fleet = sum(IHL)# this sums all rows, where each row is an HVAC, so gives the fleet sum of IHL at each step
+        self.IHL_fleet = np.bincount(self.location_index, minlength=len(locations)).dot(IHL)  # fleet sum of IHL at each step
         self.IHL_fleet_ave = self.IHL_fleet/self.numHVAC  # this averages all rows, where each row is an HVAC, so gives the fleet average of IHL at each step
 
         # Steps = 1
@@ -345,14 +344,14 @@ class HVACFleet(FleetInterface):   #FleetInterface
         # self.Tmass = [[0 for x in range(Steps)] for y in range(self.numHVAC)]
         # self.Tattic = [[0 for x in range(Steps)] for y in range(self.numHVAC)]
 
-        self.AvailableCapacityAdd = [0 for x in range(self.numHVAC)]
-        self.AvailableCapacityShed = [0 for x in range(self.numHVAC)]
+        self.AvailableCapacityAdd = np.zeros(self.numHVAC)
+        self.AvailableCapacityShed = np.zeros(self.numHVAC)
 
         # self.ServiceCallsAccepted = [0 for x in range(self.numHVAC)]
-        self.ServiceProvided = [0 for x in range(self.numHVAC)]
+        self.ServiceProvided = np.zeros(self.numHVAC)
 
-        self.IsAvailableAdd = np.random.randint(2, size=self.numHVAC+1)
-        self.IsAvailableShed = np.random.randint(2, size=self.numHVAC+1)
+        self.IsAvailableAdd = np.random.randint(2, size=self.numHVAC+1)[:self.numHVAC]
+        self.IsAvailableShed = np.random.randint(2, size=self.numHVAC+1)[:self.numHVAC]
 
         self.elementOnB = np.random.randint(2, size=self.numHVAC)
         self.elementOn = np.random.randint(2, size=self.numHVAC)
@@ -373,8 +372,8 @@ class HVACFleet(FleetInterface):   #FleetInterface
         self.TotalServiceCallsAcceptedPerHVAC = [0 for y in range(self.numHVAC)]    
    
         self.SoCInit = [0.8 for y in range(self.numHVAC)]
-        self.SOC = self.SoCInit
-        self.SOCb = self.SoCInit
+        self.SOC = np.array(self.SoCInit)
+        self.SOCb = np.array(self.SoCInit)
 
         self.AvailableCapacityAddInit = [0 for y in range(self.numHVAC)]
         self.AvailableCapacityShedInit = [0 for y in range(self.numHVAC)]
@@ -386,13 +385,26 @@ class HVACFleet(FleetInterface):   #FleetInterface
 
         ##############################################################################################################
  
-        #    Initializing the building HVAC models
+        #    Initializing the building HVAC models: all the houses are advanced at once
        
-        self.hvacs = [BuildingModel(self.Tamb[0], self.Tsol_W[0], self.QIHL_i[0], self.Qsolar_i[0], self.Tsol_R[0],
-                                    self.QIHL_mass[0], self.Qsolar_mass[0], self.Rext[number], 
-                                    self.Rattic[number], self.Cmass[number], self.dt, self.IHL_fleet_ave, self.elementOnB[number], self.elementOn[number], 
-                                    self.lockonB[number], self.lockoffB[number], self.lockon[number], self.lockoff[number], self.cycle_off_base[number], 
-                                    self.cycle_on_base[number], self.cycle_off_grid[number], self.cycle_on_grid[number]) for number in range(self.numHVAC)]
+        self.hvac_model = BuildingFleetModel(self.Rext, self.Rattic, self.Cmass,
+                                             self.TinInitialB, self.TwallInitialB, self.TmassInitialB, self.TatticInitialB,
+                                             self.TinInitial, self.TwallInitial, self.TmassInitial, self.TatticInitial,
+                                             self.TsetInitial, self.elementOnB, self.elementOn,
+                                             self.lockonB, self.lockoffB, self.lockon, self.lockoff)
+
+        # The fleet state variables are views of the state arrays of the model
+        state = self.hvac_model.state
+        self.TinInitialB, self.TwallInitialB = state['TinB'], state['TwallB']
+        self.TmassInitialB, self.TatticInitialB = state['TmassB'], state['TatticB']
+        self.TinInitial, self.TwallInitial = state['Tin'], state['Twall']
+        self.TmassInitial, self.TatticInitial = state['Tmass'], state['Tattic']
+        self.TsetInitial = state['Tset']
+        self.elementOnB, self.elementOn = state['ElementOnB'], state['ElementOn']
+        self.lockonB, self.lockoffB = state['lockonB'], state['lockoffB']
+        self.lockon, self.lockoff = state['lockon'], state['lockoff']
+        self.cycle_off_base, self.cycle_on_base = state['cycle_off_base'], state['cycle_on_base']
+        self.cycle_off_grid, self.cycle_on_grid = state['cycle_off_grid'], state['cycle_on_grid']
     
     def get_time_of_the_day(self, ts):
         """ Method to calculate the time of the day in seconds to for the simulation of the feets """
@@ -474,14 +486,6 @@ class HVACFleet(FleetInterface):   #FleetInterface
         if Q_req == None:
             Q_req = 0      
 
-        p_togrid = 0
-        p_service = 0
-        p_base = 0
-
-        service_max = 0
-        service_min = 0
-
-        P_request_perHVAC = P_req / self.numHVAC # this is only for the first step
         #        print(P_request_perWH)
         # run through fleet once as a forecast just to get initial conditions
         # number = 0
@@ -493,123 +497,138 @@ class HVACFleet(FleetInterface):   #FleetInterface
         #                self.lockon[number][0], self.lockoff[number][0], self.cycle_off_base[number][0], self.cycle_on_base[number][0], self.cycle_off_grid[number][0], self.cycle_on_grid[number][0]) #forecast = 1
         #     number += 1
 
-        number = 0 # run through all the devices
+        response = self.dispatch_step(P_req, dt, self.step, self.hvac_model.state, self.IsAvailableAdd, self.IsAvailableShed)
+        self.hvac_model.update(response)
 
-        servsum = 0
-        servmax = 0
-        servmax2 = 0
-        NumDevicesToCall = 0
-        # laststep = step - 1
+        # assign returned parameters to associated arrays to be recorded
+        self.SOC[:] = response.SOC
+        self.SOCb[:] = response.SOC_b
+        self.IsAvailableAdd[:] = response.IsAvailableAdd
+        self.IsAvailableShed[:] = response.IsAvailableShed
 
-    #  decision making about which HVAC to call on for service, check if available at last step, if so then 
-    #  check for SoC > self.minSOC and Soc < self.maxSOC
+        self.AvailableCapacityAdd[:] = response.AvailableCapacityAdd
+        self.AvailableCapacityShed[:] = response.AvailableCapacityShed
 
-        for n in range(self.numHVAC):
-            if P_request_perHVAC < 0 and self.IsAvailableAdd[n] > 0:
-                NumDevicesToCall += 1
-            elif P_request_perHVAC > 0 and self.IsAvailableShed[n] > 0:
-                NumDevicesToCall += 1          
+        self.ServiceProvided[:] = response.Eservice
+
+        self.step += 1 # To advance the step by step in the disturbance file
+
+        # Output Fleet Response
+        resp = self.fleet_response(ts, dt, response)
+
+        # TotalServiceProvidedPerTimeStep[step] = -1.0*self.P_service   # per time step for all hvacs  -1.0*        
+        """
+        Modify the power and SOC of the different subfeets according 
+        to the frequency droop regulation according to IEEE standard
+        """
     
-        P_request_perHVAC =  P_req/max(NumDevicesToCall,1) #divide the fleet request by the number of devices that can be called upon
-
-        #################################      
-        for hvac in self.hvacs: #loop through all HVACs
-            TsetLast = self.TsetInitial[number]
-
-            TinLastB = self.TinInitialB[number]    
-            TwallLastB = self.TwallInitialB[number]
-            TmassLastB = self.TmassInitialB[number]
-            TatticLastB = self.TatticInitialB[number] 
-
-            TinLast = self.TinInitial[number]    
-            TwallLast = self.TwallInitial[number]
-            TmassLast = self.TmassInitial[number]
-            TatticLast = self.TatticInitial[number] 
-
-            if P_req<=0 and self.IsAvailableAdd[number] > 0 :  # Increase load
-            # For step >=1, can use last step temperature...     execute   
-                response = hvac.HVAC(TinLastB, TwallLastB, TmassLastB, TatticLastB, TinLast, TwallLast, TmassLast, TatticLast, TsetLast, self.Tamb[number][self.step], self.Tsol_W[number][self.step], 
-                                        self.QIHL_i[number][self.step], self.Qsolar_i[self.step], self.Tsol_R[number][self.step], self.QIHL_mass[number][self.step], self.Qsolar_mass[self.step], 
-                                        self.Rext[number], self.Rattic[number], self.Cmass[number], P_request_perHVAC, dt, self.IHL_fleet_ave[self.step], 
-                                        self.elementOnB[number], self.elementOn[number], self.lockonB[number], self.lockoffB[number], self.lockon[number], self.lockoff[number], 
-                                        self.cycle_off_base[number], self.cycle_on_base[number], self.cycle_off_grid[number], self.cycle_on_grid[number])
-                P_req =  P_req - response.Eservice
-
-            elif P_req>0 and self.IsAvailableShed[number] > 0 : # Decrease load
-            # For step >=1, can use last step temperature...                                
-                response = hvac.HVAC(TinLastB, TwallLastB, TmassLastB, TatticLastB, TinLast, TwallLast, TmassLast, TatticLast, TsetLast, self.Tamb[number][self.step], self.Tsol_W[number][self.step], 
-                                        self.QIHL_i[number][self.step], self.Qsolar_i[self.step], self.Tsol_R[number][self.step], self.QIHL_mass[number][self.step], self.Qsolar_mass[self.step], 
-                                        self.Rext[number], self.Rattic[number], self.Cmass[number], P_request_perHVAC, dt, self.IHL_fleet_ave[self.step], 
-                                        self.elementOnB[number], self.elementOn[number], self.lockonB[number], self.lockoffB[number], self.lockon[number], self.lockoff[number], 
-                                        self.cycle_off_base[number], self.cycle_on_base[number], self.cycle_off_grid[number], self.cycle_on_grid[number])
-                P_req =  P_req - response.Eservice    
-            # break
-
-            else:        
-                response = hvac.HVAC(TinLastB, TwallLastB, TmassLastB, TatticLastB, TinLast, TwallLast, TmassLast, TatticLast, TsetLast, self.Tamb[number][self.step], self.Tsol_W[number][self.step], 
-                                        self.QIHL_i[number][self.step], self.Qsolar_i[self.step], self.Tsol_R[number][self.step], self.QIHL_mass[number][self.step], self.Qsolar_mass[self.step], 
-                                        self.Rext[number], self.Rattic[number], self.Cmass[number], 0, dt, self.IHL_fleet_ave[self.step], 
-                                        self.elementOnB[number], self.elementOn[number], self.lockonB[number], self.lockoffB[number], self.lockon[number], self.lockoff[number], 
-                                        self.cycle_off_base[number], self.cycle_on_base[number], self.cycle_off_grid[number], self.cycle_on_grid[number])
-
-            # assign returned parameters to associated lists to be recorded
-            self.TsetInitial[number] = response.Tset
-
-            self.TinInitialB[number] = response.TinB
-            self.TwallInitialB[number] = response.TwallB
-            self.TmassInitialB[number] = response.TmassB
-            self.TatticInitialB[number] = response.TatticB
-
-            self.elementOnB[number] = response.ElementOnB
-            
-            self.TinInitial[number] = response.Tin
-            self.TwallInitial[number] = response.Twall
-            self.TmassInitial[number] = response.Tmass
-            self.TatticInitial[number] = response.Tattic
-
-            self.elementOn[number] = response.ElementOn
-            self.lockonB[number] = response.lockonB
-            self.lockoffB[number]  = response.lockoffB
-            self.lockon[number] = response.lockon
-            self.lockoff[number]  = response.lockoff
-
-            self.cycle_off_base[number] = response.cycle_off_base
-            self.cycle_on_base[number] = response.cycle_on_base
-            self.cycle_off_grid[number] = response.cycle_off_grid
-            self.cycle_on_grid[number] = response.cycle_on_grid
-            
-            self.SOC[number] = response.SOC
-            self.SOCb[number] = response.SOC_b
-            self.IsAvailableAdd[number] = response.IsAvailableAdd
-            self.IsAvailableShed[number] = response.IsAvailableShed
-            
-            self.AvailableCapacityAdd[number] = response.AvailableCapacityAdd 
-            self.AvailableCapacityShed[number] = response.AvailableCapacityShed 
-            # self.ServiceCallsAccepted[number] = response.ServiceCallsAccepted
+        if self.FW21_Enabled and self.is_autonomous:
+            power_ac = resp.P_service_max
+            p_prev = resp.P_togrid
+            power_fleet = self.frequency_watt(power_ac, p_prev, self.ts, self.location, self.db_UF_subfleet, self.db_OF_subfleet)
+            power_fleet, SOC_step = self.update_soc_due_to_frequency_droop(initSOC, power_fleet, dt)
 
-            self.ServiceProvided[number] = response.Eservice
-            
-            p_togrid += response.Eused
+        self.time = t + dt
+        self.ts = self.ts + timedelta(seconds = dt)
+        # Restart time if it surpasses 24 hours
+        if self.time > 24*3600:
+            self.time = self.time - 24*3600
+
+        # Impact Metrics
+        # Update the metrics
+        self.cycle_basee = np.sum(self.cycle_off_base)
+        self.cycle_basee += np.sum(self.cycle_on_base)
+
+        self.cycle_grid = np.sum(self.cycle_off_grid)
+        self.cycle_grid += np.sum(self.cycle_on_grid)
+
+        unmet = np.count_nonzero(self.TinInitial >= self.TsetInitial + 2)  #assume 2F, self.deadband
+        self.unmet_hours += unmet*self.sim_step/3600.0
+
+        self.ave_TinB = np.average(self.TinInitialB)
+        self.ave_Tin = np.average(self.TinInitial)
+        self.SOCb_metric = np.average(self.SOCb)
+        self.SOC_metric = np.average(self.SOC)
+        self.unmet_hours = self.unmet_hours/self.numHVAC
 
-            # resp.P_togrid_max += response.PusedMax
-            # resp.P_togrid_min += response.PusedMin 
+        self.ratio_P_togrid_P_base = resp.P_togrid/(resp.P_base)
+        self.energy_impacts += abs(resp.P_service)*(self.sim_step/3600)
 
-            p_service += response.Eservice    
+        return resp 
+      
+    def dispatch_step(self, P_req, dt, step, state, IsAvailableAdd, IsAvailableShed):
+        """
+        Allocate the request among the HVACs and advance them by one time step.
+        It does not modify the fleet: the new states are reported in the returned ACResponse (array fields).
+        :param P_req: real power request (kW); an array of requests runs one trajectory per request
+        :param step: index of the time step in the disturbance arrays
+        :param state: state arrays of the HVACs (see BuildingFleetModel), with a leading dimension per
+                      trajectory when P_req is an array
+        :param IsAvailableAdd, IsAvailableShed: availability of the HVACs at the last step, shaped as the state
+        """
+        P_req = np.asarray(P_req, dtype=float)
+        sign = np.sign(P_req)[..., None]
 
-            p_base += response.Pbase   
+        #  decision making about which HVAC to call on for service: check if available at last step
+        available = np.where(sign > 0, IsAvailableShed > 0, (sign < 0) & (IsAvailableAdd > 0))
+        NumDevicesToCall = np.count_nonzero(available, axis=-1)
+        P_request_perHVAC = (P_req/np.maximum(NumDevicesToCall, 1))[..., None] #divide the fleet request by the number of devices that can be called upon
 
-            # resp.sim_step = response.sim_step       
-            number += 1  # go to next device            
+        # Disturbances of all the HVACs at this step
+        loc = self.location_index
+        disturbances = (self.Tamb[loc, step], self.Tsol_W[loc, step], self.QIHL_i[loc, step], self.Qsolar_i[step],
+                        self.Tsol_R[loc, step], self.QIHL_mass[loc, step], self.Qsolar_mass[step])
 
-            if P_req>=0:
-                service_max += response.AvailableCapacityShed # NOTE THIS ASSUMES THE MAX SERVICE IS LOAD SHED
-            else:
-                service_min += response.AvailableCapacityAdd
-                # P_service_max = P_service_max0
+        # Service each HVAC would provide if it is called upon
+        response = self.hvac_model.HVAC(*disturbances, P_request_perHVAC, dt, self.IHL_fleet_ave[step], state=state)
 
-        self.step += 1 # To advance the step by step in the disturbance file
+        called = self.allocate_request(P_req, available, response.Eservice, state)
+        control_signal = np.where(called, P_request_perHVAC, 0.0)
 
-        # Output Fleet Response
+        return self.hvac_model.HVAC(*disturbances, control_signal, dt, self.IHL_fleet_ave[step], state=state)
+
+    def allocate_request(self, P_req, available, Eservice, state=None):
+        """
+        Select in one pass the HVACs that are called upon to provide the request P_req
+        :param available: boolean array, HVACs available for the sign of the request
+        :param Eservice: service each HVAC would provide if called upon (kW)
+        :param state: state arrays of the HVACs (the live states by default)
+        :return called: boolean array
+        HVACs whose power would not change (e.g. short cycle lockout) are not called.
+        The others are ranked by their thermal headroom, i.e. how far the indoor temperature is
+        from the edge of the dead band the service pushes it to, and called in that order until
+        the cumulative service meets the request.
+        All arguments can carry a leading dimension to allocate several requests at once.
+        """
+        if state is None:
+            state = self.hvac_model.state
+        P_req = np.asarray(P_req, dtype=float)[..., None]
+        Tin, Tset, db = state['Tin'], state['Tset'], self.hvac_model.Tdeadband
+
+        service = np.sign(P_req)*Eservice
+        eligible = available & (service > 0)
+
+        # Decrease load: the indoor temperature rises; increase load: the indoor temperature drops
+        headroom = np.where(P_req > 0, Tset + db - Tin, Tin - (Tset - db))
+
+        order = np.argsort(np.where(eligible, -headroom, np.inf), axis=-1, kind='stable')
+        service = np.take_along_axis(np.where(eligible, service, 0.0), order, axis=-1)
+        provided = np.cumsum(service, axis=-1)
+
+        called = np.zeros(np.shape(eligible), dtype=bool)
+        np.put_along_axis(called, order, (service > 0) & (provided - service < np.abs(P_req)), axis=-1)
+        return called
+
+    def fleet_response(self, ts, dt, response):
+        """
+        Aggregate the array response of the HVACs into a FleetResponse
+        """
+        p_togrid = np.sum(response.Eused)
+        p_service = np.sum(response.Eservice)
+        p_base = np.sum(response.Pbase)
+
+        service_max = np.sum(response.AvailableCapacityShed) # NOTE THIS ASSUMES THE MAX SERVICE IS LOAD SHED
+        service_min = np.sum(response.AvailableCapacityAdd)
 
         resp = FleetResponse()
 
@@ -618,18 +637,7 @@ class HVACFleet(FleetInterface):   #FleetInterface
         resp.ts = ts
         resp.sim_step  = timedelta(seconds=dt)
 
-        resp.P_service = []
-        resp.P_service_max = []  # positive only?
-        resp.P_service_min = []
-        resp.P_togrid = []
-        resp.P_togrid_max = []
-        resp.P_togrid_min = []
         resp.P_forecast = []
-        resp.P_base = []
-        resp.E = []
-        resp.C = []        
-           
-        # resp.P_dot_up = resp.P_togrid_max / ServiceRequest.Timestep.seconds
 
         resp.P_service = p_service
         resp.P_service_max = service_max  # positive decrease loads
@@ -660,122 +668,48 @@ class HVACFleet(FleetInterface):   #FleetInterface
         resp.Strike_price   = 'NA'
         resp.SOC_cost       = 'NA'
 
-        # TotalServiceProvidedPerTimeStep[step] = -1.0*self.P_service   # per time step for all hvacs  -1.0*        
-        """
-        Modify the power and SOC of the different subfeets according 
-        to the frequency droop regulation according to IEEE standard
-        """
-    
-        if self.FW21_Enabled and self.is_autonomous:
-            power_ac = resp.P_service_max
-            p_prev = resp.P_togrid
-            power_fleet = self.frequency_watt(power_ac, p_prev, self.ts, self.location, self.db_UF_subfleet, self.db_OF_subfleet)
-            power_fleet, SOC_step = self.update_soc_due_to_frequency_droop(initSOC, power_fleet, dt)
-
-        self.time = t + dt
-        self.ts = self.ts + timedelta(seconds = dt)
-        # Restart time if it surpasses 24 hours
-        if self.time > 24*3600:
-            self.time = self.time - 24*3600
-
-        # Impact Metrics
-        # Update the metrics
-        Ttotal = 0
-        SOCTotal = 0
-     
-        self.cycle_basee = np.sum(self.cycle_off_base)
-        self.cycle_basee += np.sum(self.cycle_on_base)
-
-        self.cycle_grid = np.sum(self.cycle_off_grid)
-        self.cycle_grid += np.sum(self.cycle_on_grid)
-
-        for numberr in range(self.numHVAC-1):    
-            if self.TinInitial[numberr]>=self.TsetInitial[numberr] + 2:  #assume 2F, self.deadband
-                self.unmet_hours += 1*self.sim_step/3600.0
-
-        self.ave_TinB = np.average(self.TinInitialB)
-        self.ave_Tin = np.average(self.TinInitial)
-        self.SOCb_metric = np.average(self.SOCb)
-        self.SOC_metric = np.average(self.SOC)
-        self.unmet_hours = self.unmet_hours/self.numHVAC
-
-        self.ratio_P_togrid_P_base = resp.P_togrid/(resp.P_base)
-        self.energy_impacts += abs(resp.P_service)*(self.sim_step/3600)
+        return resp
 
-        return resp 
-      
     #################################################   
     def forecast(self, requests):
         """
-        This function repackages the list of fleet requests passed to it into the interal run function.
-        Inorder for this to be a forecast, and therfore not change the state variables of the fleet, the 
-        fleets state variables are saved before calling the run function and then the states are restored
-        to their initial values after the forecast simulation is complete.
-        :param fleet_requests: list of fleet requests
-        :return res: list of service responses
+        Simulate the response of the fleet to a horizon of requests without changing the state of the fleet.
+        All the states of the HVACs (temperatures, thermostat, lockout timers, cycle counters and availability)
+        are copied as arrays and the requests are run on the copies.
+        :param requests: list of fleet requests, or a list of lists of fleet requests (of the same length)
+                         to evaluate several request trajectories at once
+        :return res: list of fleet responses, or a list of lists with one list per trajectory
         """
-        responses = []
-        SOC = self.SOC 
-
-        for number in range(self.numHVAC): #loop through all HVACs
-            TinRB = self.TinInitialB[number]
-            TwallRB = self.TwallInitialB[number]
-            TmassRB = self.TmassInitialB[number]
-            TatticRB = self.TatticInitialB[number]
-            elementOnRB = self.elementOnB[number]
-
-            TinR = self.TinInitial[number]
-            TwallR = self.TwallInitial[number]
-            TmassR = self.TmassInitial[number]
-            TatticR = self.TatticInitial[number]
-
-            SOC_bR = self.SOCb[number]
-            SOCR = self.SOC[number]
-
-            elementOnR = self.elementOn[number]
-            lockonR = self.lockon[number]
-            lockoffR = self.lockoff[number]
-            cycle_offR = self.cycle_off_base[number]
-            cycle_on_baseR = self.cycle_on_base[number]
-            cycle_off_gridR = self.cycle_off_grid[number]
-            cycle_on_gridR = self.cycle_on_grid[number]
-
-        # Iterate and process each request in fleet_requests
-        for req in requests:
-            ts = req.ts_req
-            dt = int(req.sim_step.total_seconds())
-            p_req = req.P_req
-            q_req = req.Q_req
-            res = self.run(p_req, q_req, self.SOC, self.time, dt, ts)
-
-            return res
-                    
-        # reset the model
-        for number in range(self.numHVAC): #loop through all HVACs
-            self.SOC = SOCR 
-            self.SOCb = SOC_bR 
-
-            self.TinInitialB[number] = TinRB
-            self.TwallInitialB[number] = TwallRB
-            self.TmassInitialB[number] = TmassRB
-            self.TatticInitialB[number] = TatticRB
-
-            self.TinInitial[number] = TinR
-            self.TwallInitial[number] = TwallR
-            self.TmassInitial[number] = TmassR
-            self.TatticInitial[number] = TatticR
-
-            self.elementOn[number] = elementOnR
-            self.elementOnB[number] = elementOnRB
-
-            self.lockon[number] = lockonR
-            self.lockoff[number] = lockoffR
-            self.cycle_off_base[number] = cycle_offR
-            self.cycle_on_base[number] = cycle_on_baseR
-            self.cycle_off_grid[number] = cycle_off_gridR
-            self.cycle_on_grid[number] = cycle_on_gridR
-
-        return responses
+        several = len(requests) > 0 and isinstance(requests[0], (list, tuple))
+        trajectories = requests if several else [requests]
+        horizon = len(trajectories[0])
+        if any(len(trajectory) != horizon for trajectory in trajectories):
+            raise ValueError('All the request trajectories must have the same length')
+
+        # Snapshot of the fleet: one copy of the states per trajectory
+        n = len(trajectories)
+        state = {name: np.repeat(value[None], n, axis=0) for name, value in self.hvac_model.state.items()}
+        IsAvailableAdd = np.repeat(self.IsAvailableAdd[None], n, axis=0)
+        IsAvailableShed = np.repeat(self.IsAvailableShed[None], n, axis=0)
+
+        responses = [[] for trajectory in trajectories]
+        for h in range(horizon):
+            reqs = [trajectory[h] for trajectory in trajectories]
+            P_req = [0 if req.P_req is None else req.P_req for req in reqs]
+            dt = int(reqs[0].sim_step.total_seconds())
+
+            response = self.dispatch_step(P_req, dt, self.step + h, state, IsAvailableAdd, IsAvailableShed)
+            state = {name: getattr(response, name) for name in BuildingFleetModel.STATES}
+            IsAvailableAdd = response.IsAvailableAdd
+            IsAvailableShed = response.IsAvailableShed
+
+            for k, req in enumerate(reqs):
+                trajectory_response = ACResponse()
+                for name in ('Eused', 'Eservice', 'Pbase', 'AvailableCapacityShed', 'AvailableCapacityAdd'):
+                    setattr(trajectory_response, name, getattr(response, name)[k])
+                responses[k].append(self.fleet_response(req.ts_req, dt, trajectory_response))
+
+        return responses if several else responses[0]
  
     def run_baseline_simulation(self):
         """ 
@@ -785,11 +719,11 @@ class HVACFleet(FleetInterface):   #FleetInterface
         n_days_base = 1  # Only consider 1 day simulation, self.n_days_base
         sim_time = 24*3600 # one day in seconds
         
-        print("Running day-ahead baseline simulation ...")       
-        print("Running baseline right away charging strategy ...")
+        logger.info("Running day-ahead baseline simulation ...")       
+        logger.info("Running baseline right away charging strategy ...")
         baseline_soc, baseline_std_soc, baseline_power, baseline_cycles, baseline_Tin, baseline_std_Tin, baseline_Tin_max, baseline_Tin_min = self.run_baseline_right_away(n_days_base, sim_time)
                        
-        print("Exported baseline soc, Temperatures, power and HVAC cycles ...")
+        logger.info("Exported baseline soc, Temperatures, power and HVAC cycles ...")
         
         base_path = dirname(abspath(__file__))
         path = join(base_path,'data')
@@ -800,7 +734,7 @@ class HVACFleet(FleetInterface):   #FleetInterface
         # baseline_Tin.to_csv(join(path, r'Tin_baseline.csv'), index = False)
         # baseline_Tin_max.to_csv(join(path, r'Tin_max_baseline.csv'), index = False)
         # baseline_Tin_min.to_csv(join(path, r'Tin_min_baseline.csv'), index = False)
-        print("Exported")
+        logger.info("Exported")
 
     def run_baseline_right_away(self, n_days_base, sim_time):
         """ Method to run baseline with 1-day ahead simulation strategy """
@@ -813,139 +747,155 @@ class HVACFleet(FleetInterface):   #FleetInterface
         baseline_soc = np.zeros([sim_time, ])   
         baseline_std_soc = np.zeros([sim_time, ]) 
 
-        EIRrated = 0.31019
-        Qrated=14600
-
-        # inputs and outputs path
-        inputs_file='./fleets/HVAC_fleet/data_file/LasVegas_HighCDD.csv'
-        bldg_file='./fleets/HVAC_fleet/data_file/normal_building_para.xlsx'
-        save_dir='./fleets/HVAC_fleet/data_file/baseline'
-
+        # inputs and outputs path: the results are written in the cache directory of the input files
+        base_path = dirname(abspath(__file__))
+        inputs_file = join(base_path, 'data_file', 'LasVegas_HighCDD.csv')
+        bldg_file = join(base_path, 'data_file', 'normal_building_para.xlsx')
+        save_dir = join(file_cache.get_cache_dir(), 'HVAC_baseline')
+        ensure_ddir(save_dir)
+
+        num_homes = self.numHVAC
+        num_steps = int(1440*60/self.sim_step)
+        names = ('power', 'cycles', 'soc', 'std_soc', 'Tin', 'std_Tin', 'Tin_max', 'Tin_min')
+
+        # The baseline only depends on the configuration and on the input files:
+        # reuse the last simulation when none of them changed
+        key = hashlib.sha1(repr((num_homes, self.sim_step, self.Tset, self.deadband, self.shortcycle_ts)).encode())
+        for file in (inputs_file, bldg_file):
+            with open(file, 'rb') as f:
+                key.update(f.read())
+        key = key.hexdigest()[:12]
+        cache_file = join(save_dir, 'baseline_%s.npz' % key)
+        if exists(cache_file):
+            cache = np.load(cache_file)
+            return tuple(cache[name] for name in ('soc', 'std_soc', 'power', 'cycles', 'Tin', 'std_Tin', 'Tin_max', 'Tin_min'))
 
         #read in weather data and increase resolution to match time step of simulation
-        inputs=pd.read_csv(inputs_file, sep=',',skipfooter=48,engine='python')
-        inputs[c.COL_DATETIME]=pd.to_datetime(inputs[c.COL_DATETIME])
+        inputs=pd.read_csv(inputs_file, sep=',')[:-48]
+        inputs[c.COL_DATETIME]=pd.to_datetime(inputs[c.COL_DATETIME], format='%m/%d/%y %H:%M')
         inputs=inputs.set_index(c.COL_DATETIME)
-        inputs_ts=inputs.resample(str(self.sim_step)+'T').interpolate()
-       
+        inputs_ts=inputs.resample('%is' % self.sim_step).interpolate()
+
+        # calculate T solar for walls and roofs
+        Tout = inputs_ts[c.COL_TOUT].values
+        QIHL = inputs_ts[c.COL_QIHL].values
+        Radwin = inputs_ts[c.COL_RADWIN].values
+        Tsolw = Tout + inputs_ts[c.COL_RADW].values*0.3/inputs_ts[c.COL_H].values
+        Tsolr = Tout + inputs_ts[c.COL_RADR].values*0.8/inputs_ts[c.COL_H].values
+
+        #Load building characteristics from file, one array per parameter.
+        #Parameters that are not in the file take the default building values
+        df_bldg = pd.read_excel(bldg_file)[:num_homes]
+        defaults = dict(Rwall=0.00852, Rattic=0.03441, Rwin=0.00702, SHGC=0.4, Cwall=6719515.27, Cin=8666569.0, C1=0.73244,
+                        C2=0.49534, C3=0.05, Cattic=501508.7, Rroof=0.002, Cmass=29999128.0, Rmass=.00661, Sp1=0.93,
+                        Sp2=0.10006, Sp3=0.92997, Qrated=14600, EIRrated=0.31019, TinWB=16.666667, Initial_On=0)
+        b = SimpleNamespace(**{name: df_bldg[name].values if name in df_bldg else np.full(num_homes, value, dtype=float)
+                               for name, value in defaults.items()})
+        ac = type(AC)(b.Qrated, b.EIRrated)
+
+        progress = output_policy.Progress(logger)
         for day in range(n_days_base):
-            print("Day %i" %(day+1))
-            
-            #initialize dataframes
-            timeB = np.array(np.arange(0,60*60*24,self.sim_step))
+            progress.step("Day %i", day+1)
+
             plot_timeB = np.array(np.arange(0,24,self.sim_step/3600))
 
-            Tin=pd.DataFrame(data=0,index=timeB,columns=range(0,self.numHVAC))
-            Tmass=pd.DataFrame(data=0,index=timeB,columns=range(0,self.numHVAC))
-            Twall=pd.DataFrame(data=0,index=timeB,columns=range(0,self.numHVAC))
-            Tattic=pd.DataFrame(data=0,index=timeB,columns=range(0,self.numHVAC))
-            ACstatus=pd.DataFrame(data=0,index=timeB,columns=range(0,self.numHVAC))
-            dTin=pd.DataFrame(data=0,index=timeB,columns=range(0,self.numHVAC))
-            dTmass=pd.DataFrame(data=0,index=timeB,columns=range(0,self.numHVAC))
-            dTwall=pd.DataFrame(data=0,index=timeB,columns=range(0,self.numHVAC))
-            dTattic=pd.DataFrame(data=0,index=timeB,columns=range(0,self.numHVAC))
-            Power=pd.DataFrame(data=0,index=timeB,columns=range(0,self.numHVAC))
-            cycles=pd.DataFrame(data=0,index=timeB,columns=range(0,self.numHVAC))
-            SOC=pd.DataFrame(data=0,index=timeB,columns=range(0,self.numHVAC))
-            
-            num_homes = self.numHVAC            
-            
-            #Load building characteristics from file
-            df_bldg=pd.DataFrame.from_csv(bldg_file,sep=',')
-            
-            #Initialize Temperatures and assign building and AC characteristics
-            b=[0]*num_homes
-            ac=[0]*num_homes
-
-            for i in range(0,num_homes):
-                b[i]=building(df_bldg.T_in[i],df_bldg.T_mass[i],df_bldg.T_wall[i],df_bldg.T_attic[i],df_bldg.Rwall[i],df_bldg.Rattic[i],df_bldg.Rwin[i],df_bldg.SHGC[i],df_bldg.Cwall[i],df_bldg.Cin[i],df_bldg.C1[i],df_bldg.C2[i],df_bldg.C3[i],df_bldg.Cattic[i],df_bldg.Rroof[i],df_bldg.Cmass[i],df_bldg.Rmass[i],df_bldg.Sp1[i],df_bldg.Sp2[i],df_bldg.Sp3[i],df_bldg.Qrated[i],df_bldg.EIRrated[i],df_bldg.TinWB[i],df_bldg.Initial_On[i])
-                Tin.iloc[0,i]=b[i].T_in
-                Tmass.iloc[0,i]=b[i].T_mass
-                Twall.iloc[0,i]=b[i].T_wall
-                Tattic.iloc[0,i]=b[i].T_attic
-
-                ac[i]=AC(df_bldg.Qrated[i],df_bldg.EIRrated[i])
-            
-            #Main simulation loop    
-            for i in range(0,int(1440*60/self.sim_step)):
-                for j in range(0,num_homes):                    
-                    
-                    if i>0:   #initialize AC status for each timestep to prior state
-                        ACstatus.iloc[i,j]=ACstatus.iloc[i-1,j]
-                    else:     #Set AC status based on file input for first timestep
-                        ACstatus.iloc[i,j]=b[j].Initial_On
-                    if Tin.iloc[i,j]>=self.Tset+self.deadband and ACstatus.iloc[max(i-self.shortcycle_ts,0):i,j].sum()==0:  #if temp is above deadband and unit has not run in past duration corresponding to short cycle timer turn on unit
-                        ACstatus.iloc[i,j]=1.0
-                    if Tin.iloc[i,j]<=self.Tset-self.deadband:    #if temperature is below bottom deadband, turn off unit
-                        ACstatus.iloc[i,j]=0.0
-                    #count cycles
-                    if i>0 and ACstatus.iloc[i-1,j]==1.0 and ACstatus.iloc[i,j]==0.0:
-                        cycles.iloc[i,j]=1.0
-                        
-                    #calculate power use for each AC based on status
-                    Power.iloc[i,j]=ACstatus.iloc[i,j]*Capacity(ac[j],inputs_ts[c.COL_TOUT][i],b[j].TinWB)*EIR(ac[j],inputs_ts[c.COL_TOUT][i],b[j].TinWB)
-                    
-                    # calculate SOC for each AC
-                    SOC.iloc[i,j] = (self.Tset+self.deadband - Tin.iloc[i,j])/(2*self.deadband)
-
-                    #building model dT calculations
-                    ts = self.sim_step
-                    dTin.iloc[i,j]=ts*1.0/b[j].Cin*((Twall.iloc[i,j]-Tin.iloc[i,j])*2.0/b[j].Rwall
-                            +(Tattic.iloc[i,j]-Tin.iloc[i,j])/b[j].Rattic
-                            +(Tmass.iloc[i,j]-Tin.iloc[i,j])/b[j].Rmass+inputs_ts[c.COL_QIHL][i]*b[j].C1*b[j].Sp1
-                            +inputs_ts[c.COL_RADWIN][i]*b[j].SHGC*25.76*b[j].C3*b[j].Sp3
-                            -ACstatus.iloc[i,j]*Capacity(ac[j],inputs_ts[c.COL_TOUT][i],b[j].TinWB)*SHR(inputs_ts[c.COL_TOUT][i],Tin.iloc[i,j],b[j].TinWB)*b[j].C2*b[j].Sp2
-                            +(inputs_ts[c.COL_TOUT][i]-Tin.iloc[i,j])/b[j].Rwin)
-                    dTmass.iloc[i,j]=ts*1.0/b[j].Cmass*((Tin.iloc[i,j]-Tmass.iloc[i,j])/b[j].Rmass
-                            +inputs_ts[c.COL_QIHL][i]*b[j].C1*(1-b[j].Sp1)
-                            +inputs_ts[c.COL_RADWIN][i]*b[j].SHGC*25.76*b[j].C3*(1-b[j].Sp3)
-                            -ACstatus.iloc[i,j]*Capacity(ac[j],inputs_ts[c.COL_TOUT][i],b[j].TinWB)*SHR(inputs_ts[c.COL_TOUT][i],Tin.iloc[i,j],b[j].TinWB)*b[j].C2*(1-b[j].Sp2))
-                    dTwall.iloc[i,j]=ts*1.0/b[j].Cwall*((inputs_ts['Tsolw'].iloc[i]-Twall.iloc[i,j])*2.0/b[j].Rwall
-                            +(Tin.iloc[i,j]-Twall.iloc[i,j])*2.0/b[j].Rwall)
-                    dTattic.iloc[i,j]=ts*1.0/b[j].Cattic*((inputs_ts['Tsolr'].iloc[i]-Tattic.iloc[i,j])/b[j].Rroof
-                                +(Tin.iloc[i,j]-Tattic.iloc[i,j])/b[j].Rattic)
-                    
-                    #calculate temperatures for next time step
-                    if i<(1440*60/ts-1):
-                        Tin.iloc[i+1,j]=Tin.iloc[i,j]+dTin.iloc[i,j]
-                        Tmass.iloc[i+1,j]=Tmass.iloc[i,j]+dTmass.iloc[i,j]
-                        Tattic.iloc[i+1,j]=Tattic.iloc[i,j]+dTattic.iloc[i,j]
-                        Twall.iloc[i+1,j]=Twall.iloc[i,j]+dTwall.iloc[i,j]
+            # Per-home traces are streamed to binary files (numpy .npy, one row per time step)
+            traces = {name: np.lib.format.open_memmap(join(save_dir, '%s_base_%s.npy' % (name, key)), mode='w+',
+                                                      shape=(num_steps, num_homes))
+                      for name in ('Power', 'Tin', 'SOC', 'Cycles')}
+            fleet = {name: np.zeros(num_steps) for name in names}
+
+            #Initialize Temperatures and AC status
+            Tin = df_bldg.T_in.values.astype(float)
+            Tmass = df_bldg.T_mass.values.astype(float)
+            Twall = df_bldg.T_wall.values.astype(float)
+            Tattic = df_bldg.T_attic.values.astype(float)
+            ACstatus = b.Initial_On.astype(float)
+            last_on = np.full(num_homes, -num_steps)  # last time step each unit was running
+
+            #Main simulation loop
+            ts = self.sim_step
+            for i in range(0,num_steps):
+                ACstatus_last = ACstatus
+                #if temp is above deadband and unit has not run in past duration corresponding to short cycle timer turn on unit
+                ACstatus = np.where((Tin >= self.Tset+self.deadband) & (i - last_on > self.shortcycle_ts), 1.0, ACstatus)
+                #if temperature is below bottom deadband, turn off unit
+                ACstatus = np.where(Tin <= self.Tset-self.deadband, 0.0, ACstatus)
+                last_on = np.where(ACstatus == 1.0, i, last_on)
+                #count cycles
+                cycles = (ACstatus_last == 1.0) & (ACstatus == 0.0) if i > 0 else np.zeros(num_homes)
+
+                #calculate power use for each AC based on status
+                capacity = Capacity(ac, Tout[i], b.TinWB)
+                Power = ACstatus*capacity*EIR(ac, Tout[i], b.TinWB)
+
+                # calculate SOC for each AC
+                SOC = (self.Tset+self.deadband - Tin)/(2*self.deadband)
+
+                traces['Power'][i] = Power
+                traces['Tin'][i] = Tin
+                traces['SOC'][i] = SOC
+                traces['Cycles'][i] = cycles
+                fleet['power'][i] = np.sum(Power)
+                fleet['cycles'][i] = np.sum(cycles)
+                fleet['soc'][i] = np.mean(SOC)
+                fleet['std_soc'][i] = np.std(SOC, ddof=1)
+                fleet['Tin'][i] = np.mean(Tin)
+                fleet['std_Tin'][i] = np.std(Tin, ddof=1)
+                fleet['Tin_max'][i] = np.max(Tin)
+                fleet['Tin_min'][i] = np.min(Tin)
+
+                #building model dT calculations, temperatures for next time step
+                Qac = ACstatus*capacity*SHR(Tout[i], Tin, b.TinWB)*b.C2
+                dTin=ts*1.0/b.Cin*((Twall-Tin)*2.0/b.Rwall
+                        +(Tattic-Tin)/b.Rattic
+                        +(Tmass-Tin)/b.Rmass+QIHL[i]*b.C1*b.Sp1
+                        +Radwin[i]*b.SHGC*25.76*b.C3*b.Sp3
+                        -Qac*b.Sp2
+                        +(Tout[i]-Tin)/b.Rwin)
+                dTmass=ts*1.0/b.Cmass*((Tin-Tmass)/b.Rmass
+                        +QIHL[i]*b.C1*(1-b.Sp1)
+                        +Radwin[i]*b.SHGC*25.76*b.C3*(1-b.Sp3)
+                        -Qac*(1-b.Sp2))
+                dTwall=ts*1.0/b.Cwall*((Tsolw[i]-Twall)*2.0/b.Rwall
+                        +(Tin-Twall)*2.0/b.Rwall)
+                dTattic=ts*1.0/b.Cattic*((Tsolr[i]-Tattic)/b.Rroof
+                            +(Tin-Tattic)/b.Rattic)
+                Tin, Tmass, Twall, Tattic = Tin+dTin, Tmass+dTmass, Twall+dTwall, Tattic+dTattic
+
+            for trace in traces.values():
+                trace.flush()
 
             # calculate peak power and plot data
-            PeakPower=Power.sum(axis=1).max()*1.0 # plot out the peak power in kW
+            PeakPower=fleet['power'].max()*1.0 # plot out the peak power in kW
             Plot_Power=np.full(len(plot_timeB),PeakPower/1000.0)
             fig,ax = plt.subplots(2,1,figsize=(6,8),sharey='row')
-            p1=ax[0].plot(plot_timeB,Power.sum(axis=1)/1000.0,color='blue',linestyle='solid',label='Baseline')
+            p1=ax[0].plot(plot_timeB,fleet['power']/1000.0,color='blue',linestyle='solid',label='Baseline')
             ax[0].plot(plot_timeB,Plot_Power,color='black',linestyle='--',label='Targeted Power')
             ax[0].set_ylabel('Total Power (kW)')
             ax[1].set_ylabel('Indoor Temperature ($^\circ$C)')
             ax[1].set_xlabel('Hour of Day')
-            p2=ax[1].plot(plot_timeB,Tin.mean(axis=1),color='blue',linestyle='solid',label='Baseline Avg')
-            p3=ax[1].plot(plot_timeB,Tin.max(axis=1),color='blue',linestyle='dotted',label='Baseline Min/Max')
-            p4=ax[1].plot(plot_timeB,Tin.min(axis=1),color='blue',linestyle='dotted',label='_nolegend_')
-            
-            # Saves baseline data to csv
+            p2=ax[1].plot(plot_timeB,fleet['Tin'],color='blue',linestyle='solid',label='Baseline Avg')
+            p3=ax[1].plot(plot_timeB,fleet['Tin_max'],color='blue',linestyle='dotted',label='Baseline Min/Max')
+            p4=ax[1].plot(plot_timeB,fleet['Tin_min'],color='blue',linestyle='dotted',label='_nolegend_')
+
             #ToDo: needs cut the whole day simulation to compare only segment with providing grid services
             # But, that requires the simulation steps information.
 
-            Power.to_csv(str(save_dir)+'\\Power_base'+'.csv')
-            Tin.to_csv(str(save_dir)+'\\Tin_base'+'.csv')
-            SOC.to_csv(str(save_dir)+'\\SOC_base'+'.csv')
-            cycles.to_csv(str(save_dir)+'\\Cycles_base'+'.csv')
-            
             # return values
-            baseline_power = Power.sum(axis = 1)
-            baseline_cycles = cycles.sum(axis = 1)
+            baseline_power = fleet['power']
+            baseline_cycles = fleet['cycles']
+
+            baseline_soc = fleet['soc']
+            baseline_std_soc = fleet['std_soc']
+
+            baseline_Tin = fleet['Tin']
+            baseline_std_Tin = fleet['std_Tin']
+            baseline_Tin_max = fleet['Tin_max']
+            baseline_Tin_min = fleet['Tin_min']
 
-            baseline_soc = SOC.mean(axis = 1)
-            baseline_std_soc = SOC.std(axis = 1)
+        np.savez(cache_file, **fleet)
 
-            baseline_Tin = Tin.mean(axis = 1)
-            baseline_std_Tin = Tin.std(axis = 1)
-            baseline_Tin_max = Tin.max(axis=1)
-            baseline_Tin_min = Tin.min(axis=1)
-                    
         return baseline_soc, baseline_std_soc, baseline_power, baseline_cycles, baseline_Tin, baseline_std_Tin, baseline_Tin_max, baseline_Tin_min
     
     
@@ -1006,7 +956,7 @@ class HVACFleet(FleetInterface):   #FleetInterface
     # TODO extend the weather profile for peak management
 
 def get_inputs(Qsolar_i10, Qsolar_mass10, temp_sol_W10, temp_sol_R10, timestep_s, ts):
-        num_steps = 10*3600*24.0/timestep_s  
+        num_steps = int(10*3600*24.0/timestep_s)  
         dt = datetime.strptime(str(ts), '%Y-%m-%d %H:%M:%S')  # datetime.   .%f
         start_time_dec = dt.hour + dt.minute/60.0 + dt.second/3600.0
 
@@ -1069,7 +1019,7 @@ def get_daily_conditions(climate_location,  timestep_s, start_time):
         loc["Denver"] = 4
         loc["Minneapolis"] = 5
 
-        num_steps = 10*3600*24.0/timestep_s   
+        num_steps = int(10*3600*24.0/timestep_s)   
 
         try:
             amb_temp_column = loc[climate_location]
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Throughput of the HVAC building models
+
+Compares the per-house BuildingModel with the array BuildingFleetModel
+for a large fleet at a 10-second step, times one HVACFleet.run step
+(dispatch of the request, model step and fleet totals) at the same size,
+and times HVACFleet.forecast over a 24-hour horizon at a 1-minute step
+on 10,000 homes, for one and for several request trajectories.
+
+Usage: python benchmark.py [number of homes] [number of steps]
+"""
+import sys
+from os.path import dirname, abspath
+sys.path.insert(0, dirname(dirname(dirname(abspath(__file__)))))
+
+import time
+from datetime import datetime, timedelta
+import numpy as np
+
+from fleets.HVAC_fleet.build_model import BuildingModel, BuildingFleetModel
+from fleets.HVAC_fleet.HVAC_fleet import HVACFleet
+from fleet_request import FleetRequest
+
+
+def random_fleet(num_homes, seed=0):
+    rng = np.random.RandomState(seed)
+    Rwall = rng.choice([0.00852, 0.00639, 0.01065], num_homes)
+    Rattic = rng.choice([0.03441, 0.0258075, 0.0430125], num_homes)
+    Cmass = rng.choice([29999127.91, 37498909.89, 44998691.87], num_homes)
+    temperatures = [rng.normal(23.67, 0.3, num_homes) for x in range(8)]
+    Tset = rng.normal(23.0, 1, num_homes)
+    on = rng.randint(2, size=num_homes)
+    return BuildingFleetModel(Rwall, Rattic, Cmass, *temperatures, Tset, on, on.copy(),
+                              [61]*num_homes, [181]*num_homes, [61]*num_homes, [181]*num_homes)
+
+
+def disturbances(step):
+    # Hot afternoon, same conditions for all the homes
+    Tamb = 35 + np.sin(step/360.0)
+    return Tamb, Tamb + 3, 350.0, 200.0, Tamb + 15, 26.0, 15.0
+
+
+def bench_array(num_homes, steps, timestep=10):
+    model = random_fleet(num_homes)
+    signal = np.where(np.arange(num_homes) % 2, 1.0, -1.0)
+    start = time.time()
+    for k in range(steps):
+        response = model.HVAC(*disturbances(k), signal, timestep, 350.0)
+        model.update(response)
+    return (time.time() - start)/steps
+
+
+def bench_objects(num_homes, steps, timestep=10):
+    model = random_fleet(num_homes)
+    houses = [BuildingModel() for x in range(num_homes)]
+    s = model.state
+    start = time.time()
+    for k in range(steps):
+        d = disturbances(k)
+        for i, house in enumerate(houses):
+            house.HVAC(s['TinB'][i], s['TwallB'][i], s['TmassB'][i], s['TatticB'][i], s['Tin'][i], s['Twall'][i],
+                       s['Tmass'][i], s['Tattic'][i], s['Tset'][i], *d, model.Rwall[i], model.Rattic[i],
+                       model.Cmass[i], 1.0, timestep, 350.0, s['ElementOnB'][i], s['ElementOn'][i], s['lockonB'][i],
+                       s['lockoffB'][i], s['lockon'][i], s['lockoff'][i], s['cycle_off_base'][i],
+                       s['cycle_on_base'][i], s['cycle_off_grid'][i], s['cycle_on_grid'][i])
+    return (time.time() - start)/steps
+
+
+def synthetic_fleet(num_homes, steps):
+    # HVACFleet with the arrays used by run and forecast, without reading the weather files
+    fleet = HVACFleet.__new__(HVACFleet)
+    fleet.numHVAC = num_homes
+    fleet.hvac_model = random_fleet(num_homes)
+    fleet.location_index = np.zeros(num_homes, dtype=int)
+    fleet.IsAvailableAdd = np.ones(num_homes)
+    fleet.IsAvailableShed = np.ones(num_homes)
+    fleet.step = 0
+    Tamb, Tsol_W, QIHL_i, Qsolar_i, Tsol_R, QIHL_mass, Qsolar_mass = disturbances(np.arange(steps))
+    fleet.Tamb, fleet.Tsol_W, fleet.Tsol_R = Tamb[None], Tsol_W[None], Tsol_R[None]
+    fleet.QIHL_i, fleet.QIHL_mass = np.full((1, steps), QIHL_i), np.full((1, steps), QIHL_mass)
+    fleet.Qsolar_i, fleet.Qsolar_mass = np.full(steps, Qsolar_i), np.full(steps, Qsolar_mass)
+    fleet.IHL_fleet_ave = np.full(steps, 350.0)
+    return fleet
+
+
+def bench_dispatch(num_homes, steps, timestep=10):
+    fleet = synthetic_fleet(num_homes, steps)
+    P_req = 0.05*num_homes  # kW
+    start = time.time()
+    for k in range(steps):
+        P_req = -P_req
+        response = fleet.dispatch_step(P_req, timestep, k, fleet.hvac_model.state, fleet.IsAvailableAdd, fleet.IsAvailableShed)
+        fleet.hvac_model.update(response)
+        fleet.IsAvailableAdd, fleet.IsAvailableShed = response.IsAvailableAdd, response.IsAvailableShed
+        totals = (fleet.fleet_response(None, timestep, response), np.mean(response.SOC))
+    return (time.time() - start)/steps
+
+
+def bench_forecast(num_homes, num_trajectories, horizon=1440, timestep=60):
+    fleet = synthetic_fleet(num_homes, horizon)
+    t0 = datetime(2017, 8, 1)
+    trajectories = [[FleetRequest(t0 + timedelta(seconds=timestep*k), timedelta(seconds=timestep), t0,
+                                  0.05*num_homes*np.sin(k/60.0 + j))
+                     for k in range(horizon)] for j in range(num_trajectories)]
+    start = time.time()
+    fleet.forecast(trajectories)
+    return time.time() - start
+
+
+if __name__ == '__main__':
+    num_homes = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+
+    # The object model is timed on a sample of the fleet and scaled up
+    sample = min(num_homes, 2000)
+    t_objects = bench_objects(sample, 5)*num_homes/sample
+    t_array = bench_array(num_homes, steps)
+
+    print('Homes: %i, time step: 10 s' % num_homes)
+    print('BuildingModel (per house):   %10.4f s/step  %12.0f home-steps/s' % (t_objects, num_homes/t_objects))
+    print('BuildingFleetModel (arrays): %10.4f s/step  %12.0f home-steps/s' % (t_array, num_homes/t_array))
+    print('Speedup: %.0fx, one simulated day takes %.1f s' % (t_objects/t_array, t_array*8640))
+
+    t_run = bench_dispatch(num_homes, steps)
+    print('HVACFleet.run step (dispatch, 2 model steps, totals): %.4f s/step' % t_run)
+
+    for num_trajectories in (1, 4):
+        t_forecast = bench_forecast(10000, num_trajectories)
+        print('HVACFleet.forecast, 10,000 homes, 24 h at 1 min, %i trajectories: %.2f s' % (num_trajectories, t_forecast))
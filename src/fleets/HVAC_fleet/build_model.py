@@ -442,7 +442,231 @@ class BuildingModel():
         response.IsAvailableShed = isAvailable_shed_ts          
 
         # Report grid services response
-        return response    
+        return response
+
+
+class BuildingFleetModel():
+    """
+    Array version of BuildingModel for a whole fleet of houses.
+
+    The 4R4C temperatures (baseline and grid paths), thermostat states, lockout
+    timers and cycle counters of all the units are held in arrays and advanced
+    together by HVAC(), which follows BuildingModel.HVAC() term by term.
+    Envelope parameters are also held per unit, so houses can differ in any of them.
+    """
+    # Names of the state arrays advanced by HVAC()
+    STATES = ('TinB', 'TwallB', 'TmassB', 'TatticB', 'Tin', 'Twall', 'Tmass', 'Tattic', 'Tset',
+              'ElementOnB', 'ElementOn', 'lockonB', 'lockoffB', 'lockon', 'lockoff',
+              'cycle_off_base', 'cycle_on_base', 'cycle_off_grid', 'cycle_on_grid')
+
+    def __init__(self, Rwall, Rattic, Cmass, TinB, TwallB, TmassB, TatticB, Tin, Twall, Tmass, Tattic, Tset,
+                 Element_onB, Element_on, lockonB, lockoffB, lockon, lockoff):
+        # Default envelope of the validated house (CC1), see BuildingModel
+        bm = BuildingModel()
+        self.numHVAC = len(Rwall)
+        n = self.numHVAC
+
+        # Envelope types: vary from house to house
+        self.Rwall = np.asarray(Rwall, dtype=float)
+        self.Rattic = np.asarray(Rattic, dtype=float)
+        self.Cmass = np.asarray(Cmass, dtype=float)
+        # Envelope parameters shared by the validated model, stored per house
+        self.Cwall = np.full(n, bm.Cwall)
+        self.Cin = np.full(n, bm.Cin)
+        self.Cattic = np.full(n, bm.Cattic)
+        self.Rroof = np.full(n, bm.Rroof)
+        self.Rmass = np.full(n, bm.Rmass)
+
+        self.C1 = bm.C1
+        self.C2 = bm.C2
+        self.C3 = bm.C3
+        self.Sp1 = bm.Sp1
+        self.Sp2 = bm.Sp2
+        self.Sp3 = bm.Sp3
+        self.Tdeadband = bm.Tdeadband
+
+        self.state = dict()
+        for name, value in zip(self.STATES[:9], (TinB, TwallB, TmassB, TatticB, Tin, Twall, Tmass, Tattic, Tset)):
+            self.state[name] = np.array(value[:n], dtype=float)
+        for name, value in zip(self.STATES[9:11], (Element_onB, Element_on)):
+            self.state[name] = np.array(value[:n], dtype=int)
+        for name, value in zip(self.STATES[11:15], (lockonB, lockoffB, lockon, lockoff)):
+            self.state[name] = np.array(value[:n], dtype=float)
+        for name in self.STATES[15:]:
+            self.state[name] = np.zeros(n, dtype=int)
+
+    def get_state(self):
+        """ Return a copy of all the state arrays """
+        return {name: value.copy() for name, value in self.state.items()}
+
+    def set_state(self, state):
+        """ Overwrite the state arrays in place with the values of state """
+        for name in self.STATES:
+            self.state[name][...] = state[name]
+
+    def update(self, response):
+        """ Store the states reported by an array response of HVAC() """
+        for name in self.STATES:
+            self.state[name][...] = getattr(response, name)
+
+    def HVAC(self, Tamb_ts, Tsol_w_ts, QIHL_i_ts, Qsolar_i_ts, Tsol_r_ts, QIHL_mass_ts, Qsolar_mass_ts,
+             control_signal_ts, timestep, forecast_IHL, state=None):
+        """
+        Advance all the units by one time step without modifying the model.
+
+        Disturbances and control_signal_ts are scalars or arrays with one value per unit.
+        state is a dictionary with the arrays listed in STATES (self.state by default);
+        the arrays may carry leading dimensions to run several cases at once.
+        Returns an ACResponse whose fields are arrays; call update() to keep the new states.
+        """
+        if state is None:
+            state = self.state
+        ts = timestep
+        Tset = state['Tset']
+        TlastB = state['TinB']
+        Twall_lastB = state['TwallB']
+        Tmass_lastB = state['TmassB']
+        Tattic_lastB = state['TatticB']
+        Tlast = state['Tin']
+        Twall_last = state['Twall']
+        Tmass_last = state['Tmass']
+        Tattic_last = state['Tattic']
+        Element_on_tsB = state['ElementOnB']
+        Element_on_ts = state['ElementOn']
+        lockoffB = state['lockoffB']
+        lockoff = state['lockoff']
+
+        Rwall = self.Rwall
+        Rattic = self.Rattic
+        Cmass = self.Cmass
+
+        # estimate on what the maximum power usage could be
+        cap = Capacity(AC, Tamb_ts)
+        E_cool = 1e-3*cap*EIR(AC, Tamb_ts)     # power consumpstion in kW
+
+        #############################################################################
+        #        Baseline operation - Base Loads
+        #############################################################################
+        switch_onB = (TlastB > (Tset + self.Tdeadband)) & (Element_on_tsB == 0) & (lockoffB >= 2*60.0)
+        switch_offB = ~switch_onB & (TlastB <= (Tset - self.Tdeadband)) & (Element_on_tsB == 1)
+
+        Element_on_tsB = np.where(switch_onB, 1, np.where(switch_offB, 0, Element_on_tsB))
+        Eused_baseline_ts = Element_on_tsB * E_cool
+        cycle_on_base = state['cycle_on_base'] + switch_onB
+        cycle_off_base = state['cycle_off_base'] + switch_offB
+        lockoffB = np.where(switch_offB, 1.0*ts, lockoffB + 1*ts)
+
+        # Evolution of 4 states, ts in seconds
+        dTin_baseline = ts/self.Cin*((Twall_lastB-TlastB)*2.0/Rwall+(Tattic_lastB-TlastB)/Rattic+
+                 (Tmass_lastB-TlastB)/self.Rmass + QIHL_i_ts * self.C1 + Qsolar_i_ts*self.C3 -
+                 Element_on_tsB*cap*self.C2)
+
+        dTmass_baseline = ts/Cmass*((TlastB-Tmass_lastB)/self.Rmass + QIHL_mass_ts*self.C1+
+                   Qsolar_mass_ts*self.C3 - Element_on_tsB*cap*self.C2)
+
+        dTwall_baseline = ts/self.Cwall*((Tsol_w_ts - Twall_lastB)*2.0/Rwall+(TlastB -Twall_lastB)*2.0/Rwall)
+
+        dTattic_baseline = ts/self.Cattic*((Tsol_r_ts-Tattic_lastB)/self.Rroof + (TlastB - Tattic_lastB)/Rattic)
+
+        Tin__bas = TlastB + dTin_baseline
+        Twall_bas = Twall_lastB + dTwall_baseline
+        Tmass_bas = Tmass_lastB + dTmass_baseline
+        Tattic_bas = Tattic_lastB + dTattic_baseline
+
+        SOC_b = np.clip((Tset + self.Tdeadband - Tin__bas)/(Tset + self.Tdeadband - (Tset - self.Tdeadband)), 0, 1)
+
+        ###########################################################################
+        # modify operation based on control signal
+        # Assumed to work in Summer Cooling Only!
+        shed = (control_signal_ts > 0) & (Tlast < (Tset + self.Tdeadband)) & (Element_on_tsB == 1)
+        add = (~shed & (control_signal_ts < 0) & (Tlast >= (Tset - self.Tdeadband)) &
+               (Element_on_tsB == 0) & (lockoff >= 2*60.0))
+
+        # Without a change the power follows the baseline but the unit keeps its last grid state
+        Eused_ts = np.where(shed, 0.0, np.where(add, E_cool*1.000, Eused_baseline_ts))
+        Element_on_ts = np.where(shed, 0, np.where(add, 1, Element_on_ts))
+        service_calls_accepted_ts = (shed | add).astype(int)
+        cycle_off_grid = state['cycle_off_grid'] + shed
+        cycle_on_grid = state['cycle_on_grid'] + add
+        lockoff = np.where(shed, 1.0*ts, lockoff + 1*ts)
+
+        Eservice_ts = Eused_baseline_ts - Eused_ts # positive means reducing power consumption
+
+        # Evolution of 4 states under grid services
+        dTin = ts/self.Cin*((Twall_last-Tlast)*2.0/Rwall+(Tattic_last-Tlast)/Rattic+
+                    (Tmass_last-Tlast)/self.Rmass + QIHL_i_ts * self.C1 + Qsolar_i_ts*self.C3 -
+                    Element_on_ts*cap*self.C2)
+
+        dTmass = ts/Cmass*((Tlast-Tmass_last)/self.Rmass + QIHL_mass_ts*self.C1+
+                    Qsolar_mass_ts*self.C3 - Element_on_ts*cap*self.C2)
+
+        dTwall = ts/self.Cwall*((Tsol_w_ts - Twall_last)*2.0/Rwall+(Tlast -Twall_last)*2.0/Rwall)
+
+        dTattic = ts/self.Cattic*((Tsol_r_ts-Tattic_last)/self.Rroof + (Tlast - Tattic_last)/Rattic)
+
+        Tin_ts = Tlast + dTin
+        Twall_ts = Twall_last + dTwall
+        Tmass_ts = Tmass_last + dTmass
+        Tattic_ts = Tattic_last + dTattic
+
+        SOC = np.clip((Tset + self.Tdeadband - Tin_ts)/(Tset + self.Tdeadband - (Tset - self.Tdeadband)), 0, 1)
+
+        # Availability for the next time step from the fleet average IHL forecast
+        QIHL_i_fcst = np.multiply(self.Sp1, forecast_IHL)
+
+        dTinCf = ts/self.Cin*((Twall_ts-Tin_ts)*2.0/Rwall+(Tattic_ts-Tin_ts)/Rattic+
+                        (Tmass_ts-Tin_ts)/self.Rmass + QIHL_i_fcst * self.C1*self.Sp1 + Qsolar_i_ts*0.56*25.76*self.C3*self.Sp2-
+                        cap*self.C2*self.Sp3)
+
+        Tin_forecast = Tin_ts + dTinCf
+
+        isAvailable_add_ts = ((Tin_forecast >= (Tset - self.Tdeadband)-1) & (Element_on_tsB == 0)).astype(int)
+        isAvailable_shed_ts = ((Tin_forecast <= (Tset + self.Tdeadband)+1) & (Element_on_tsB > 0)).astype(int)
+
+        response = ACResponse()
+
+        # Report baseline response
+        response.TinB = Tin__bas
+        response.TwallB = Twall_bas
+        response.TmassB = Tmass_bas
+        response.TatticB = Tattic_bas
+
+        response.ElementOnB = Element_on_tsB
+        response.SOC_b = SOC_b
+        response.Pbase = Eused_baseline_ts
+
+        # Report grid service response
+        response.Tin = Tin_ts
+        response.Twall = Twall_ts
+        response.Tmass = Tmass_ts
+        response.Tattic = Tattic_ts
+        response.Tset = np.array(Tset)
+
+        response.Eused = Eused_ts
+        response.lockoffB = lockoffB
+        response.lockonB = np.array(state['lockonB'])
+        response.lockoff = lockoff
+        response.lockon = np.array(state['lockon'])
+        response.sim_step = timestep
+
+        response.cycle_off_grid = cycle_off_grid
+        response.cycle_on_grid = cycle_on_grid
+
+        response.cycle_off_base = cycle_off_base
+        response.cycle_on_base = cycle_on_base
+
+        response.ElementOn = Element_on_ts
+        response.Eservice = Eservice_ts
+        response.SOC = SOC
+
+        response.AvailableCapacityAdd = isAvailable_add_ts * E_cool
+        response.AvailableCapacityShed = isAvailable_shed_ts * E_cool
+        response.ServiceCallsAccepted = service_calls_accepted_ts
+        response.IsAvailableAdd = isAvailable_add_ts
+        response.IsAvailableShed = isAvailable_shed_ts
+
+        return response
+
 
 if __name__ == '__main__':
    main()
@@ -6,6 +6,7 @@ Created on Wed Aug 29 11:07:32 2018
 """
 
 import sys
+import logging
 from os.path import dirname, abspath, join
 sys.path.insert(0,dirname(dirname(dirname(abspath(__file__)))))
 
@@ -21,6 +22,7 @@ from utils import ensure_ddir
 from fleet_interface import FleetInterface
 from fleet_response import FleetResponse
 
+logger = logging.getLogger('fleets.PV')
 
 class PVInverterFleet(FleetInterface):
     """
@@ -163,7 +165,7 @@ class PVInverterFleet(FleetInterface):
             elif self.VV11_Enabled==True:
                 fleet_response=self.Volt_Var(ts=ts)
             else:
-                print('Please select either Volt-Var or Frequency-Watt as autonomous mode of operation')
+                logger.error('Please select either Volt-Var or Frequency-Watt as autonomous mode of operation')
                 fleet_response=[]
         else:
             # converter kW and kVar to watt and Var
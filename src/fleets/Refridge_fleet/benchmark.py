@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Throughput of the refrigerated case models
+
+Compares the per-case CaseModel with the array CaseFleetModel at a 10-second
+step, and times the construction of RFFleet (input loading, sampling of the
+cases and model set up) with the workbook read from Excel and from its binary
+cache, at 1,000 and 100,000 cases.
+
+Usage: python benchmark.py [number of steps]
+(run from the src folder, the fleet reads its inputs with paths relative to it)
+"""
+import sys
+from os import remove
+from os.path import dirname, abspath, exists
+sys.path.insert(0, dirname(dirname(dirname(abspath(__file__)))))
+
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+import file_cache
+from fleets.Refridge_fleet.case_model import CaseModel, CaseFleetModel
+from fleets.Refridge_fleet import fridge_Fleet
+from fleets.Refridge_fleet.load_config import LoadConfig
+from grid_info import GridInfo
+
+WORKBOOK = './fleets/Refridge_fleet/data_file/Cities_Tout_July_10mins.xlsx'
+
+
+def random_fleet(num_cases, seed=0):
+    rng = np.random.RandomState(seed)
+    R_case = rng.choice([0.044077, 0.035262, 0.052892], num_cases)
+    R_food = rng.choice([0.004614, 0.003691, 0.005538], num_cases)
+    R_infil = rng.choice([0.008341, 0.006673, 0.010009], num_cases)
+    C_case = rng.choice([10200510, 8160408, 12240162], num_cases)
+    C_food = rng.choice([2844769, 2275815, 3413722], num_cases)
+    C_air = rng.choice([111053, 88842, 133263], num_cases)
+    temperatures = [rng.normal(mean, 0.3, num_cases) for mean in (5.5, 6.11, 3.5)*2]
+    Tset = rng.normal(6, 1, num_cases)
+    on = rng.randint(2, size=num_cases)
+    return CaseFleetModel(R_case, R_food, R_infil, C_case, C_food, C_air, *temperatures, Tset, on, on.copy(),
+                          [61]*num_cases, [181]*num_cases, [61]*num_cases, [181]*num_cases)
+
+
+def bench_array(num_cases, steps, timestep=10):
+    model = random_fleet(num_cases)
+    signal = np.where(np.arange(num_cases) % 2, 1.0, -1.0)
+    start = time.time()
+    for k in range(steps):
+        response = model.FRIDGE(25 + np.sin(k/360.0), signal, timestep)
+        model.update(response)
+    return (time.time() - start)/steps
+
+
+def bench_objects(num_cases, steps, timestep=10):
+    model = random_fleet(num_cases)
+    cases = [CaseModel() for x in range(num_cases)]
+    s = model.state
+    start = time.time()
+    for k in range(steps):
+        for i, case in enumerate(cases):
+            case.FRIDGE(s['TairB'][i], s['TfoodB'][i], s['TcaseB'][i], s['Tair'][i], s['Tfood'][i], s['Tcase'][i],
+                        s['Tset'][i], 25 + np.sin(k/360.0), model.R_case[i], model.R_food[i], model.R_infil[i],
+                        model.C_case[i], model.C_food[i], model.C_air[i], 1.0, timestep, s['ElementOnB'][i],
+                        s['ElementOn'][i], s['lockonB'][i], s['lockoffB'][i], s['lockon'][i], s['lockoff'][i],
+                        s['cycle_off_base'][i], s['cycle_on_base'][i], s['cycle_off_grid'][i], s['cycle_on_grid'][i])
+    return (time.time() - start)/steps
+
+
+class SizedLoadConfig(LoadConfig):
+    # Fleet configuration with the number of cases of the benchmark
+    num_cases = 0
+
+    def get_config_models(self):
+        df = LoadConfig.get_config_models(self)
+        df['Total_RFs'] = [self.num_cases]
+        return df
+
+
+def bench_construction(num_cases, cached):
+    fridge_Fleet._workbooks.clear()
+    cache_file = file_cache.cache_base(WORKBOOK) + '.npy'
+    if not cached and exists(cache_file):
+        remove(cache_file)
+    SizedLoadConfig.num_cases = num_cases
+    fridge_Fleet.LoadConfig = SizedLoadConfig
+    grid = GridInfo('Grid_Info_DATA_2.csv')
+    start = time.time()
+    fridge_Fleet.RFFleet(grid, datetime(2017, 8, 1, 15), timedelta(seconds=10))
+    return time.time() - start
+
+
+if __name__ == '__main__':
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+
+    start = time.time()
+    pd.read_excel(WORKBOOK)
+    t_read = time.time() - start
+
+    for num_cases in (1000, 100000):
+        # The object model is timed on a sample of the fleet and scaled up
+        sample = min(num_cases, 2000)
+        t_objects = bench_objects(sample, 5)*num_cases/sample
+        t_array = bench_array(num_cases, steps)
+
+        print('Cases: %i, time step: 10 s' % num_cases)
+        print('  CaseModel (per case):    %10.4f s/step  %12.0f case-steps/s' % (t_objects, num_cases/t_objects))
+        print('  CaseFleetModel (arrays): %10.4f s/step  %12.0f case-steps/s' % (t_array, num_cases/t_array))
+        print('  RFFleet construction: %.2f s from the workbook, %.2f s from the binary cache'
+              % (bench_construction(num_cases, False), bench_construction(num_cases, True)))
+        print('  (reading the workbook once per case took about %.0f s)' % (t_read*num_cases))
@@ -55,27 +55,21 @@ class AC_RF: # compressor model for MT CO2 refrigerator!
     k2=-0.000042
     k3=0.0000039
 
+def SDT_MT(TambientF):
+    # Saturated discharge temperature (F), Tambient can be a scalar or an array
+    return np.where(TambientF < 41, 46.791-0.0214*TambientF, np.where(TambientF >= 72, 77, TambientF+5))
+
 def WMT(self, Tambient, SMT=13.36):
 
     TambientF = Tambient *9.0/5.0 + 32
-    if TambientF<41:
-        self.SDT=46.791-0.0214*TambientF
-    elif TambientF>=72:
-        self.SDT=77
-    else:
-        self.SDT=TambientF+5
+    self.SDT=SDT_MT(TambientF)
     self.CFMT=AC_RF.k0+AC_RF.k1*SMT+AC_RF.k2*self.SDT+AC_RF.k3*SMT*self.SDT
     return(self.CFMT*(AC_RF.b0+AC_RF.b1*SMT+AC_RF.b2*SMT*SMT+AC_RF.b3*self.SDT+AC_RF.b4*self.SDT*self.SDT+AC_RF.b5*SMT*self.SDT))
 
 def QMT(self, Tambient, SMT=13.36):
 
     TambientF = Tambient *9.0/5.0 + 32
-    if TambientF<41:
-        self.SDT=46.791-0.0214*TambientF
-    elif TambientF>=72:
-        self.SDT=77
-    else:
-        self.SDT=TambientF+5
+    self.SDT=SDT_MT(TambientF)
     self.CFMT=AC_RF.k0+AC_RF.k1*SMT+AC_RF.k2*self.SDT+AC_RF.k3*SMT*self.SDT
     return(self.CFMT*(AC_RF.b6+AC_RF.b7*SMT+AC_RF.b8*SMT*SMT+AC_RF.b9*self.SDT+AC_RF.b10*self.SDT*self.SDT+AC_RF.b11*SMT*self.SDT))
 
@@ -372,6 +366,196 @@ class CaseModel():
         # Report grid services response
         return response    
 
+class CaseFleetModel():
+    """
+    Array version of CaseModel for a whole fleet of refrigerated cases.
+
+    The 3R3C temperatures (baseline and grid paths), compressor states, lockout
+    timers and cycle counters of all the cases are held in arrays and advanced
+    together by FRIDGE(), which follows CaseModel.FRIDGE() term by term.
+    """
+    # Names of the state arrays advanced by FRIDGE()
+    STATES = ('TairB', 'TfoodB', 'TcaseB', 'Tair', 'Tfood', 'Tcase', 'Tset',
+              'ElementOnB', 'ElementOn', 'lockonB', 'lockoffB', 'lockon', 'lockoff',
+              'cycle_off_base', 'cycle_on_base', 'cycle_off_grid', 'cycle_on_grid')
+
+    def __init__(self, R_case, R_food, R_infil, C_case, C_food, C_air, TairB, TfoodB, TcaseB, Tair, Tfood, Tcase, Tset,
+                 Element_onB, Element_on, lockonB, lockoffB, lockon, lockoff):
+        # Coefficients of the validated case, see CaseModel
+        cm = CaseModel()
+        self.numRF = len(R_case)
+        n = self.numRF
+
+        # Case types: vary from case to case
+        self.R_case = np.asarray(R_case, dtype=float)
+        self.R_food = np.asarray(R_food, dtype=float)
+        self.R_infil = np.asarray(R_infil, dtype=float)
+        self.C_case = np.asarray(C_case, dtype=float)
+        self.C_food = np.asarray(C_food, dtype=float)
+        self.C_air = np.asarray(C_air, dtype=float)
+
+        self.C1 = cm.C1
+        self.Sp1 = cm.Sp1
+        self.Tdeadband = cm.Tdeadband
+
+        self.state = dict()
+        for name, value in zip(self.STATES[:7], (TairB, TfoodB, TcaseB, Tair, Tfood, Tcase, Tset)):
+            self.state[name] = np.array(value[:n], dtype=float)
+        for name, value in zip(self.STATES[7:9], (Element_onB, Element_on)):
+            self.state[name] = np.array(value[:n], dtype=int)
+        for name, value in zip(self.STATES[9:13], (lockonB, lockoffB, lockon, lockoff)):
+            self.state[name] = np.array(value[:n], dtype=float)
+        for name in self.STATES[13:]:
+            self.state[name] = np.zeros(n, dtype=int)
+
+    def get_state(self):
+        """ Return a copy of all the state arrays """
+        return {name: value.copy() for name, value in self.state.items()}
+
+    def set_state(self, state):
+        """ Overwrite the state arrays in place with the values of state """
+        for name in self.STATES:
+            self.state[name][...] = state[name]
+
+    def update(self, response):
+        """ Store the states reported by an array response of FRIDGE() """
+        for name in self.STATES:
+            self.state[name][...] = getattr(response, name)
+
+    def FRIDGE(self, Tamb_ts, control_signal_ts, timestep, state=None):
+        """
+        Advance all the cases by one time step without modifying the model.
+
+        Tamb_ts and control_signal_ts are scalars or arrays with one value per case.
+        state is a dictionary with the arrays listed in STATES (self.state by default).
+        Returns an RFResponse whose fields are arrays; call update() to keep the new states.
+        """
+        if state is None:
+            state = self.state
+        ts = timestep
+        Tset = state['Tset']
+        Tair_lastB = state['TairB']
+        Tfood_lastB = state['TfoodB']
+        Tcase_lastB = state['TcaseB']
+        Tair_last = state['Tair']
+        Tfood_last = state['Tfood']
+        Tcase_last = state['Tcase']
+        Element_on_tsB = state['ElementOnB']
+        Element_on_ts = state['ElementOn']
+        lockoffB = state['lockoffB']
+        lockoff = state['lockoff']
+
+        R_case = self.R_case
+        R_food = self.R_food
+        R_infil = self.R_infil
+        C_case = self.C_case
+        C_food = self.C_food
+        C_air = self.C_air
+
+        # estimate on what the maximum power usage could be
+        E_cool = 1e-3*WMT(AC_RF, Tamb_ts)     # power consumpstion in kW
+        Q_cool = self.C1*QMT(AC_RF, Tamb_ts)
+
+        #############################################################################
+        #        Baseline operation - Base Loads
+        #############################################################################
+        switch_onB = (Tair_lastB > Tset + self.Tdeadband) & (lockoffB >= 2*60.0) & (Element_on_tsB == 0)
+        switch_offB = ~switch_onB & (Tair_lastB <= (Tset - self.Tdeadband)) & (Element_on_tsB == 1)
+
+        Element_on_tsB = np.where(switch_onB, 1, np.where(switch_offB, 0, Element_on_tsB))
+        Eused_baseline_ts = Element_on_tsB * E_cool
+        cycle_on_base = state['cycle_on_base'] + switch_onB
+        cycle_off_base = state['cycle_off_base'] + switch_offB
+        lockoffB = np.where(switch_offB, 1.0*ts, lockoffB + 1*ts)
+
+        # Evolution of 3 states
+        dTair_baseline=((Tamb_ts - Tair_lastB)/R_infil + (Tfood_lastB-Tair_lastB)/R_food + (Tcase_lastB-Tair_lastB)/R_case - Element_on_tsB*Q_cool*self.Sp1)/C_air/ts #x1 is Tair
+        dTfood_baseline=((Tair_lastB - Tfood_lastB)/R_food)/C_food/ts #x2 is Tfood
+        dTcase_baseline=((Tair_lastB - Tcase_lastB)/R_case - Element_on_tsB*Q_cool*(1-self.Sp1))/C_case/ts
+
+        Tair_bas = Tair_lastB + dTair_baseline
+        Tfood_bas = Tfood_lastB + dTfood_baseline
+        Tcase_bas = Tcase_lastB + dTcase_baseline
+
+        SOC_b = np.clip((Tset + self.Tdeadband - Tair_bas)/(Tset + self.Tdeadband - (Tset - self.Tdeadband)), 0, 1)
+
+        ###########################################################################
+        # modify operation based on control signal
+        shed = (control_signal_ts > 0) & (Element_on_tsB == 1) & (Tair_last < (Tset + self.Tdeadband))
+        add = (~shed & (control_signal_ts < 0) & (Tair_last >= (Tset - self.Tdeadband)) &
+               (Element_on_tsB == 0) & (lockoff >= 2*60.0))
+
+        # Without a change the power follows the baseline but the case keeps its last grid state
+        Eused_ts = np.where(shed, 0.0, np.where(add, E_cool*1.000, Eused_baseline_ts))
+        Element_on_ts = np.where(shed, 0, np.where(add, 1, Element_on_ts))
+        service_calls_accepted_ts = (shed | add).astype(int)
+        cycle_off_grid = state['cycle_off_grid'] + shed
+        cycle_on_grid = state['cycle_on_grid'] + add
+        lockoff = np.where(shed, 1.0*ts, lockoff + 1*ts)
+
+        Eservice_ts = Eused_baseline_ts - Eused_ts
+
+        # Evolution of 3 states
+        dTair=((Tamb_ts-Tair_last)/R_infil + (Tfood_last-Tair_last)/R_food + (Tcase_last-Tair_last)/R_case - Element_on_ts*Q_cool*self.Sp1)/C_air/ts #x1 is Tair
+        dTfood=((Tair_last-Tfood_last)/R_food)/C_food/ts #x2 is Tfood
+        dTcase=((Tair_last-Tcase_last)/R_case - Element_on_ts*Q_cool*(1-self.Sp1))/C_case/ts #x3 is Tcase
+
+        Tair_ts = Tair_last + dTair
+        Tfood_ts = Tfood_last + dTfood
+        Tcase_ts = Tcase_last + dTcase
+
+        SOC = np.clip((Tset + self.Tdeadband - Tair_ts)/(Tset + self.Tdeadband - (Tset - self.Tdeadband)), 0, 1)
+
+        # simple method to forecast availability for providing a service during next timestep
+        dTairCf=((Tamb_ts-Tair_ts)/R_infil + (Tfood_ts-Tair_ts)/R_food + (Tcase_ts-Tair_ts)/R_case - Element_on_ts*Q_cool*self.Sp1)/C_air/ts #x1 is Tair
+        Tair_forecast = Tair_ts + dTairCf
+
+        isAvailable_add_ts = ((Tair_forecast >= (Tset - self.Tdeadband)-1) & (Element_on_tsB == 0)).astype(int)
+        isAvailable_shed_ts = ((Tair_forecast <= (Tset + self.Tdeadband)+1) & (Element_on_tsB > 0)).astype(int)
+
+        response = RFResponse()
+
+        # Report baseline response
+        response.TairB = Tair_bas
+        response.TfoodB = Tfood_bas
+        response.TcaseB = Tcase_bas
+
+        response.ElementOnB = Element_on_tsB
+        response.SOC_b = SOC_b
+        response.Pbase = Eused_baseline_ts
+
+        response.Tair = Tair_ts
+        response.Tfood = Tfood_ts
+        response.Tcase = Tcase_ts
+
+        response.Tset = np.array(Tset)
+        response.Eused = Eused_ts
+
+        response.lockoffB = lockoffB
+        response.lockonB = np.array(state['lockonB'])
+        response.lockoff = lockoff
+        response.lockon = np.array(state['lockon'])
+        response.sim_step = timestep
+
+        response.cycle_off_grid = cycle_off_grid
+        response.cycle_on_grid = cycle_on_grid
+
+        response.cycle_off_base = cycle_off_base
+        response.cycle_on_base = cycle_on_base
+
+        response.ElementOn = Element_on_ts
+        response.Eservice = Eservice_ts
+        response.SOC = SOC
+
+        response.AvailableCapacityAdd = isAvailable_add_ts * E_cool
+        response.AvailableCapacityShed = isAvailable_shed_ts * E_cool
+        response.ServiceCallsAccepted = service_calls_accepted_ts
+        response.IsAvailableAdd = isAvailable_add_ts
+        response.IsAvailableShed = isAvailable_shed_ts
+
+        return response
+
+
 if __name__ == '__main__':
    main()
         
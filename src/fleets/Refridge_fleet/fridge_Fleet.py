@@ -12,6 +12,7 @@ Version: 1.0
 
 # code needed for GLOBAL fleet_interface
 import sys
+import logging
 from os.path import dirname, abspath, join
 sys.path.insert(0,dirname(dirname(dirname(abspath(__file__)))))
 ################################################################
@@ -21,6 +22,7 @@ from datetime import datetime, timedelta
 
 from fleets.Refridge_fleet.case_model import CaseModel
 from fleets.Refridge_fleet.case_model import AC_RF
+from fleets.Refridge_fleet.case_model import CaseFleetModel
 
 from fleet_interface import FleetInterface
 from fleet_response import FleetResponse
@@ -36,6 +38,10 @@ import scipy as sp
 import time
 import csv
 from utils import ensure_ddir
+import output_policy
+import file_cache
+
+logger = logging.getLogger('fleets.Refridge_fleet')
 
 class RFFleet(FleetInterface):   #FleetInterface
     """
@@ -262,22 +268,18 @@ class RFFleet(FleetInterface):   #FleetInterface
         
         ###########################################################################       
                 
-        Tamb = []
-        for a in range(self.numRF):             
-      
-            (tamb) = get_daily_conditions(self.Location[a], self.sim_step, self.ts)  # location, timestep_s, start_time            
-
-            Tamb.append(tamb)
-
-        self.Tamb = np.array(Tamb)              
-
-        self.AvailableCapacityAdd = [0 for x in range(self.numRF)]
-        self.AvailableCapacityShed = [0 for x in range(self.numRF)]
-        self.ServiceCallsAccepted = [0 for x in range(self.numRF)]
-        self.ServiceProvided = [0 for x in range(self.numRF)]
+        # Ambient conditions only depend on the location: they are stored once per location (rows)
+        # and self.location_index gives the row of each RF
+        locations, self.location_index = np.unique(self.Location, return_inverse=True)
+        self.Tamb = np.array([get_daily_conditions(l, self.sim_step, self.ts) for l in locations])  # location, timestep_s, start_time
+
+        self.AvailableCapacityAdd = np.zeros(self.numRF)
+        self.AvailableCapacityShed = np.zeros(self.numRF)
+        self.ServiceCallsAccepted = np.zeros(self.numRF, dtype=int)
+        self.ServiceProvided = np.zeros(self.numRF)
  	
-        self.IsAvailableAdd = np.random.randint(2, size=self.numRF+1)
-        self.IsAvailableShed = np.random.randint(2, size=self.numRF+1)
+        self.IsAvailableAdd = np.random.randint(2, size=self.numRF+1)[:self.numRF]
+        self.IsAvailableShed = np.random.randint(2, size=self.numRF+1)[:self.numRF]
 
         self.elementOnB = np.random.randint(2, size=self.numRF)
         self.elementOn = np.random.randint(2, size=self.numRF)
@@ -298,8 +300,8 @@ class RFFleet(FleetInterface):   #FleetInterface
         self.TotalServiceCallsAcceptedperRF = [0 for y in range(self.numRF)]    
    
         self.SoCInit = [0.8 for y in range(self.numRF)]
-        self.SOC = self.SoCInit
-        self.SOCb = self.SoCInit
+        self.SOC = np.array(self.SoCInit)
+        self.SOCb = np.array(self.SoCInit)
 
         self.AvailableCapacityAddInit = [0 for y in range(self.numRF)]
         self.AvailableCapacityShedInit = [0 for y in range(self.numRF)]
@@ -311,12 +313,23 @@ class RFFleet(FleetInterface):   #FleetInterface
 
         ##############################################################################################################
  
-        #    Initializing the Refridge models
-        #    Get the baseline power
-        self.RFs = [CaseModel(self.Tamb[0], self.TsetInitial[number], self.R_case[number], self.R_food[number], self.R_infil[number],
-                                    self.C_case[number], self.C_food[number], self.C_air[number], self.dt, 
-									self.elementOnB[number], self.elementOn[number], self.lockonB[number], self.lockoffB[number], self.lockon[number], self.lockoff[number], self.cycle_off_base[number], 
-                                    self.cycle_on_base[number], self.cycle_off_grid[number], self.cycle_on_grid[number]) for number in range(self.numRF)]
+        #    Initializing the Refridge models: all the cases are advanced at once
+        self.rf_model = CaseFleetModel(self.R_case, self.R_food, self.R_infil, self.C_case, self.C_food, self.C_air,
+                                       self.TairInitialB, self.TfoodInitialB, self.TcaseInitialB,
+                                       self.TairInitial, self.TfoodInitial, self.TcaseInitial,
+                                       self.TsetInitial, self.elementOnB, self.elementOn,
+                                       self.lockonB, self.lockoffB, self.lockon, self.lockoff)
+
+        # The fleet state variables are views of the state arrays of the model
+        state = self.rf_model.state
+        self.TairInitialB, self.TfoodInitialB, self.TcaseInitialB = state['TairB'], state['TfoodB'], state['TcaseB']
+        self.TairInitial, self.TfoodInitial, self.TcaseInitial = state['Tair'], state['Tfood'], state['Tcase']
+        self.TsetInitial = state['Tset']
+        self.elementOnB, self.elementOn = state['ElementOnB'], state['ElementOn']
+        self.lockonB, self.lockoffB = state['lockonB'], state['lockoffB']
+        self.lockon, self.lockoff = state['lockon'], state['lockoff']
+        self.cycle_off_base, self.cycle_on_base = state['cycle_off_base'], state['cycle_on_base']
+        self.cycle_off_grid, self.cycle_on_grid = state['cycle_off_grid'], state['cycle_on_grid']
 
     # Baseline simulations
     # Todo: Only need run baseline in the first call of the grid service
@@ -407,128 +420,55 @@ class RFFleet(FleetInterface):   #FleetInterface
         if Q_req == None:
             Q_req = 0      
           
-        # run through fleet once as a forecast just to get initial conditions
-        
-        number = 0 # run through all the devices
-        servsum = 0
-        servmax = 0
-        servmax2 = 0
-        NumDevicesToCall = 0
+    #  decision making about which RF to call on for service, check if available at last step
+        if P_req < 0:
+            available = self.IsAvailableAdd > 0
+        elif P_req > 0:
+            available = self.IsAvailableShed > 0
+        else:
+            available = np.zeros(self.numRF, dtype=bool)
+        NumDevicesToCall = np.count_nonzero(available)
 
-        p_togrid = 0
-        p_service = 0
-        p_base = 0
-        service_max = 0
-        service_min = 0
+        P_request_perRF =  P_req/max(NumDevicesToCall,1) #divide the fleet request by the number of devices that can be called upon
 
-        # laststep = step - 1
+        #################################
+        Tamb = self.Tamb[self.location_index, self.step]
 
-    #  decision making about which RF to call on for service, check if available at last step, if so then 
-    #  check for SoC > self.minSOC and Soc < self.maxSOC
+        # Service each RF would provide if it is called upon
+        response = self.rf_model.FRIDGE(Tamb, np.where(available, P_request_perRF, 0.0), dt)
 
-        P_request_perRF =  P_req/max(NumDevicesToCall,1) #divide the fleet request by the number of devices that can be called upon
+        # The RFs are called in order until the request is met: an available RF is called
+        # while the request left by the RFs before it is not met
+        service = np.where(available, response.Eservice, 0.0)
+        P_left = P_req - np.cumsum(service)
+        P_left = np.where(P_left*np.sign(P_req) > 0, P_left, 0.0)
+        P_left_before = np.concatenate(([P_req], P_left[:-1]))
+        called = available & (P_left_before != 0)
 
-        for n in range(self.numRF):
-            if P_request_perRF < 0 and self.IsAvailableAdd[n] > 0:
-                NumDevicesToCall += 1
-            elif P_request_perRF > 0 and self.IsAvailableShed[n] > 0:
-                NumDevicesToCall += 1          
-    
-        P_request_perRF =  P_req/max(NumDevicesToCall,1) #divide the fleet request by the number of devices that can be called upon
+        response = self.rf_model.FRIDGE(Tamb, np.where(called, P_request_perRF, 0.0), dt)
+        self.rf_model.update(response)
+
+        # assign returned parameters to associated arrays to be recorded
+        self.SOC[:] = response.SOC
+        self.SOCb[:] = response.SOC_b
+        self.IsAvailableAdd[:] = response.IsAvailableAdd
+        self.IsAvailableShed[:] = response.IsAvailableShed
+
+        self.AvailableCapacityAdd[:] = response.AvailableCapacityAdd
+        self.AvailableCapacityShed[:] = response.AvailableCapacityShed
+        self.ServiceCallsAccepted[:] = response.ServiceCallsAccepted
+
+        self.ServiceProvided[:] = response.Eservice
+
+        p_togrid = np.sum(response.Eused)
+        p_service = np.sum(response.Eservice)
+        p_base = np.sum(response.Pbase)
+
+        # Request left after each RF
+        P_left = np.where(called, P_left, P_left_before)
+        service_max = np.sum(response.AvailableCapacityShed[P_left >= 0]) # NOTE THIS ASSUMES THE MAX SERVICE IS LOAD SHED
+        service_min = np.sum(response.AvailableCapacityAdd[P_left < 0])  # NOTE THIS ASSUMES THE MIN SERVICE IS LOAD ADD
 
-        #################################      
-        for rfdg in self.RFs: #loop through all RFs
-            TsetLast = self.TsetInitial[number]
-
-            TairLastB = self.TairInitialB[number]    
-            TfoodLastB = self.TfoodInitialB[number]
-            TcaseLastB = self.TcaseInitialB[number]
-			
-            TairLast = self.TairInitial[number]    
-            TfoodLast = self.TfoodInitial[number]
-            TcaseLast = self.TcaseInitial[number]
-
-
-            if P_req<0 and self.IsAvailableAdd[number] > 0 :
-            # For step >=1, can use last step temperature...        
-                response = rfdg.FRIDGE(TairLastB, TfoodLastB, TcaseLastB, TairLast, TfoodLast, TcaseLast, TsetLast, self.Tamb[number][self.step], self.R_case[number], self.R_food[number], self.R_infil[number],
-                                        self.C_case[number], self.C_food[number], self.C_air[number], P_request_perRF, dt,  
-                                        self.elementOnB[number], self.elementOn[number], self.lockonB[number], self.lockoffB[number], self.lockon[number], self.lockoff[number], 
-                                        self.cycle_off_base[number], self.cycle_on_base[number], self.cycle_off_grid[number], self.cycle_on_grid[number])
-                P_req =  P_req - response.Eservice
-
-                if P_req >= 0:   # all the service request has been met
-                    P_req = 0
-
-            elif P_req>0 and self.IsAvailableShed[number] > 0 :
-            # For step >=1, can use last step temperature...                                
-                response = rfdg.FRIDGE(TairLastB, TfoodLastB, TcaseLastB, TairLast, TfoodLast, TcaseLast, TsetLast, self.Tamb[number][self.step], self.R_case[number], self.R_food[number], self.R_infil[number],
-                                        self.C_case[number], self.C_food[number], self.C_air[number], P_request_perRF, dt,  
-                                        self.elementOnB[number], self.elementOn[number], self.lockonB[number], self.lockoffB[number], self.lockon[number], self.lockoff[number], 
-                                        self.cycle_off_base[number], self.cycle_on_base[number], self.cycle_off_grid[number], self.cycle_on_grid[number])
-                P_req =  P_req - response.Eservice    
-
-                if P_req <= 0:      # all the service request has been met
-                    P_req = 0
-            # break
-
-            else:        
-                response = rfdg.FRIDGE(TairLastB, TfoodLastB, TcaseLastB, TairLast, TfoodLast, TcaseLast, TsetLast, self.Tamb[number][self.step], self.R_case[number], self.R_food[number], self.R_infil[number],
-                                        self.C_case[number], self.C_food[number], self.C_air[number], 0, dt,  
-                                        self.elementOnB[number], self.elementOn[number], self.lockonB[number], self.lockoffB[number], self.lockon[number], self.lockoff[number], 
-                                        self.cycle_off_base[number], self.cycle_on_base[number], self.cycle_off_grid[number], self.cycle_on_grid[number])
-
-            # assign returned parameters to associated lists to be recorded
-            self.TsetInitial[number] = response.Tset
-			
-            self.TairInitialB[number] = response.TairB
-            self.TfoodInitialB[number] = response.TfoodB
-            self.TcaseInitialB[number] = response.TcaseB 
-			
-            self.elementOnB[number] = response.ElementOnB
-
-            self.TairInitial[number] = response.Tair
-            self.TfoodInitial[number] = response.Tfood
-            self.TcaseInitial[number] = response.Tcase            
-
-            self.elementOn[number] = response.ElementOn
-            self.lockonB[number] = response.lockonB
-            self.lockoffB[number]  = response.lockoffB
-            self.lockon[number] = response.lockon
-            self.lockoff[number]  = response.lockoff
-            self.cycle_off_base[number] = response.cycle_off_base
-            self.cycle_on_base[number] = response.cycle_on_base
-            self.cycle_off_grid[number] = response.cycle_off_grid
-            self.cycle_on_grid[number] = response.cycle_on_grid
-
-            self.SOC[number] = response.SOC
-            self.SOCb[number] = response.SOC_b
-            self.IsAvailableAdd[number] = response.IsAvailableAdd
-            self.IsAvailableShed[number] = response.IsAvailableShed
-
-            self.AvailableCapacityAdd[number] = response.AvailableCapacityAdd 
-            self.AvailableCapacityShed[number] = response.AvailableCapacityShed 
-            self.ServiceCallsAccepted[number] = response.ServiceCallsAccepted
-
-            self.ServiceProvided[number] = response.Eservice
-
-            p_togrid += response.Eused
-
-            # resp.P_togrid_max += response.PusedMax
-            # resp.P_togrid_min += response.PusedMin 
-
-            p_service += response.Eservice   #Eused/10  #Eservice    
-
-            p_base += response.Pbase
-
-            # FleetResponse.sim_step = response.sim_step       
-            number += 1  # go to next device
-
-            if P_req>=0:
-                service_max += response.AvailableCapacityShed # NOTE THIS ASSUMES THE MAX SERVICE IS LOAD SHED
-            else:
-                service_min += response.AvailableCapacityAdd  # NOTE THIS ASSUMES THE MIN SERVICE IS LOAD ADD
-            
         self.step += 1
 		
 		# Output Fleet Response
@@ -601,17 +541,13 @@ class RFFleet(FleetInterface):   #FleetInterface
 
         # Impact Metrics
         # Update the metrics
-        Ttotal = 0
-        SOCTotal = 0
-
         self.cycle_basee = np.sum(self.cycle_off_base)
         self.cycle_basee += np.sum(self.cycle_on_base)
         self.cycle_grid = np.sum(self.cycle_off_grid)
         self.cycle_grid += np.sum(self.cycle_on_grid)
 
-        for numberr in range(self.numRF-1):    
-            if self.TairInitial[numberr]>=self.TsetInitial[numberr] + 3:  #assume 2F, self.deadband
-                self.unmet_hours += 1*self.sim_step/3600.0
+        unmet = np.count_nonzero(self.TairInitial[:-1] >= self.TsetInitial[:-1] + 3)  #assume 2F, self.deadband
+        self.unmet_hours += unmet*self.sim_step/3600.0
 
         self.ave_TairB = np.average(self.TairInitialB)
         self.ave_Tair = np.average(self.TairInitial)
@@ -635,22 +571,11 @@ class RFFleet(FleetInterface):   #FleetInterface
         :return res: list of service responses
         """
         responses = []
-        SOC = self.SOC 
-
-        for number in range(self.numRF): #loop through all RFs
-            TairR = self.TairInitial[number]
-            TfoodR = self.TfoodInitial[number]
-            TcaseR = self.TcaseInitial[number]
-           
-            SOCR = self.SOC[number]
-
-            elementOnR = self.elementOn[number]
-            lockonR = self.lockon[number]
-            lockoffR = self.lockoff[number]
-            cycle_offR = self.cycle_off_base[number]
-            cycle_on_baseR = self.cycle_on_base[number]
-            cycle_off_gridR = self.cycle_off_grid[number]
-            cycle_on_gridR = self.cycle_on_grid[number]
+
+        # Save the states of the fleet
+        state = self.rf_model.get_state()
+        records = {name: getattr(self, name).copy() for name in ('SOC', 'SOCb', 'IsAvailableAdd', 'IsAvailableShed')}
+        fleet_time = (self.step, self.time, self.ts)
 
         # Iterate and process each request in fleet_requests
         for req in requests:
@@ -663,20 +588,10 @@ class RFFleet(FleetInterface):   #FleetInterface
             responses.append(res)
                     
         # reset the model
-        for number in range(self.numRF): #loop through all RFs
-            self.soc = SOCR 
-            self.TairInitial[number] = TairR
-            self.TfoodInitial[number] = TfoodR
-            self.TcaseInitial[number] = TcaseR
-            
-
-            self.elementOn[number] = elementOnR
-            self.lockon[number] = lockonR
-            self.lockoff[number] = lockoffR
-            self.cycle_off_base[number] = cycle_offR
-            self.cycle_on_base[number] = cycle_on_baseR
-            self.cycle_off_grid[number] = cycle_off_gridR
-            self.cycle_on_grid[number] = cycle_on_gridR
+        self.rf_model.set_state(state)
+        for name, value in records.items():
+            getattr(self, name)[:] = value
+        self.step, self.time, self.ts = fleet_time
   
         return responses
  
@@ -689,11 +604,11 @@ class RFFleet(FleetInterface):   #FleetInterface
         n_days_base = 1  # Only consider 1 day simulation, self.n_days_base
         sim_time = 24*3600 # one day in seconds
         
-        print("Running day-ahead baseline simulation ...")       
-        print("Running baseline right away charging strategy ...")
+        logger.info("Running day-ahead baseline simulation ...")       
+        logger.info("Running baseline right away charging strategy ...")
         baseline_soc, baseline_std_soc, baseline_power, baseline_cycles, baseline_Tin, baseline_std_Tin, baseline_Tin_max, baseline_Tin_min = self.run_baseline_right_away(n_days_base, sim_time)
                        
-        print("Exported baseline soc, Temperatures, power and RF cycles ...")
+        logger.info("Exported baseline soc, Temperatures, power and RF cycles ...")
         
         base_path = dirname(abspath(__file__))
         path = join(base_path,'data')
@@ -704,7 +619,7 @@ class RFFleet(FleetInterface):   #FleetInterface
         # baseline_Tin.to_csv(join(path, r'Tin_baseline.csv'), index = False)
         # baseline_Tin_max.to_csv(join(path, r'Tin_max_baseline.csv'), index = False)
         # baseline_Tin_min.to_csv(join(path, r'Tin_min_baseline.csv'), index = False)
-        print("Exported")
+        logger.info("Exported")
 
     def run_baseline_right_away(self, n_days_base, sim_time):
         """ Method to run baseline with 1-day ahead simulation strategy """
@@ -732,8 +647,9 @@ class RFFleet(FleetInterface):   #FleetInterface
         inputs=inputs.set_index(c.COL_DATETIME)
         inputs_ts=inputs.resample(str(self.sim_step)+'T').interpolate()
        
+        progress = output_policy.Progress(logger)
         for day in range(n_days_base):
-            print("Day %i" %(day+1))
+            progress.step("Day %i", day+1)
             
             #initialize dataframes
             timeB = np.array(np.arange(0,60*60*24,self.sim_step))
@@ -920,7 +836,7 @@ def get_daily_conditions(climate_location,  timestep_s, start_time):
         loc["Denver"] = 4
         loc["Minneapolis"] = 5
 
-        num_steps = 10*3600*24.0/timestep_s   
+        num_steps = int(10*3600*24.0/timestep_s)
 
         try:
             amb_temp_column = loc[climate_location]
@@ -933,14 +849,10 @@ def get_daily_conditions(climate_location,  timestep_s, start_time):
 
         new_time_list = np.linspace(start_time_dec, start_time_dec+timestep_s*num_steps/3600.0, num_steps)
 
-        Tamb = []
-        IHG = []
-
-        # Tout and IHG profiles preprocessed for 10 mins,
+        # Tout profiles preprocessed for 10 mins,
         # if other time step, better to do preprocess outside the main function here
         # or use timestep_min below (we set timestep_min = 10 by default)
-        ambient_cond_file = pd.read_excel(r'./fleets/Refridge_fleet/data_file/Cities_Tout_July_10mins.xlsx') #load steply ambient air temperature file
-        ambient_cond_file = np.matrix(ambient_cond_file)
+        ambient_cond_file = load_workbook(join(dirname(abspath(__file__)), 'data_file', 'Cities_Tout_July_10mins.xlsx')) #load steply ambient air temperature file
         Tamb = ambient_cond_file[:,amb_temp_column]
         Tamb = np.squeeze(np.asarray(Tamb))
 
@@ -956,10 +868,16 @@ def get_daily_conditions(climate_location,  timestep_s, start_time):
         return new_Tamb
 
 
+_workbooks = dict()
 
-
-
-
-
-
-
+def load_workbook(file):
+    """
+    Load the numeric content of a workbook as an array.
+    The array is kept in memory and cached as a binary .npy file (see file_cache),
+    which is read instead of the workbook as long as it is newer than the workbook.
+    """
+    if file not in _workbooks:
+        _workbooks[file] = file_cache.load(file, ('.npy',), lambda path: pd.read_excel(path).values.astype(float),
+                                           lambda base, values: np.save(base + '.npy', values),
+                                           lambda base: np.load(base + '.npy'))
+    return _workbooks[file]
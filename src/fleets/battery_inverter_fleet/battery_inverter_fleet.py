@@ -3,6 +3,7 @@
 # Your license here
 # }}}
 import sys
+import logging
 from os.path import dirname, abspath, join
 sys.path.insert(0,dirname(dirname(dirname(abspath(__file__)))))
 
@@ -17,7 +18,7 @@ from fleet_interface import FleetInterface
 from fleet_response import FleetResponse
 from frequency_droop import FrequencyDroop
 
-
+logger = logging.getLogger('fleets.battery_inverter_fleet')
 
 class BatteryInverterFleet(FleetInterface):
     """
@@ -203,8 +204,8 @@ class BatteryInverterFleet(FleetInterface):
             self.P_service = numpy.repeat(self.P_service,self.num_of_devices)
             self.Q_service = numpy.repeat(self.Q_service,self.num_of_devices)
         else: 
-            print('Error: ModelType not selected as either energy reservoir model (self), or charge reservoir model (self)')
-            print('Battery-Inverter model config unable to continue. In config.ini, set ModelType to self or self')
+            logger.error('Error: ModelType not selected as either energy reservoir model (self), or charge reservoir model (self)')
+            logger.error('Battery-Inverter model config unable to continue. In config.ini, set ModelType to self or self')
 
         # frequency regulation variables
         self.freq_reg_weight = float(self.config.get('freq_reg_config', 'Freq_Reg_Weight', fallback=1.0))
@@ -564,8 +565,8 @@ class BatteryInverterFleet(FleetInterface):
                             + self.voc_model_c[j-1]*(s[i]-self.voc_model_SoC_list[j-1]) \
                             + self.voc_model_d[j-1]
             else:
-                print('Error: open circuit voltage (voc) model type (voc_model_type) is not defined properly')
-                print('in config_self.ini set VocModelType=Linear or =CubicSpline')
+                logger.error('Error: open circuit voltage (voc) model type (voc_model_type) is not defined properly')
+                logger.error('in config_self.ini set VocModelType=Linear or =CubicSpline')
             pass
 
     def voc_query(self,SOC):
@@ -595,8 +596,8 @@ class BatteryInverterFleet(FleetInterface):
                         + self.voc_model_c[j-1]*(SOC-self.voc_model_SoC_list[j-1]) \
                         + self.voc_model_d[j-1]
         else:
-            print('Error: open circuit voltage (voc) model type (voc_model_type) is not defined properly')
-            print('in config_self.ini set VocModelType=Linear or =CubicSpline')
+            logger.error('Error: open circuit voltage (voc) model type (voc_model_type) is not defined properly')
+            logger.error('in config_self.ini set VocModelType=Linear or =CubicSpline')
         return VOC
 
     def cost(self, initSoC = 50,finSoC = 50,del_t=timedelta(hours=1)):
@@ -743,8 +744,8 @@ class BatteryInverterFleet(FleetInterface):
             self.voc = VOC
             self.es = ES
         else: 
-            print('Error: ModelType not selected as either energy reservoir model (self), or charge reservoir model (self)')
-            print('Battery-Inverter model forecast is unable to continue. In config.ini, set ModelType to self or self')
+            logger.error('Error: ModelType not selected as either energy reservoir model (self), or charge reservoir model (self)')
+            logger.error('Battery-Inverter model forecast is unable to continue. In config.ini, set ModelType to self or self')
 
         return responses
 
@@ -8,6 +8,7 @@ Version: 1.01
 Author: afernandezcanosa@anl.gov
 """
 import sys
+import logging
 from os.path import dirname, abspath, join
 sys.path.insert(0,dirname(dirname(dirname(abspath(__file__)))))
 
@@ -23,6 +24,9 @@ from fleet_response  import FleetResponse
 from frequency_droop import FrequencyDroop
 from fleets.electric_vehicles_fleet.load_config import LoadConfig
 from utils import ensure_ddir
+import output_policy
+
+logger = logging.getLogger('fleets.electric_vehicles_fleet')
 
 class ElectricVehiclesFleet(FleetInterface):
     
@@ -318,7 +322,7 @@ class ElectricVehiclesFleet(FleetInterface):
             p_total = self.p_baseline_ref_2 - P_req
 
         if any(initSOC) > 1 or any(initSOC) < 0:
-            print('ERROR: initial SOC out of range')
+            logger.error('ERROR: initial SOC out of range')
             return [[], []]
         else:
             # SOC at the next time step
@@ -836,17 +840,17 @@ class ElectricVehiclesFleet(FleetInterface):
         n_days_base = self.n_days_base
         sim_time = 24*3600
         
-        print("Running baseline simulation ...")       
-        print("Running baseline right away charging strategy ...")
+        logger.info("Running baseline simulation ...")       
+        logger.info("Running baseline right away charging strategy ...")
         soc_1, power_base_1, soc_std_1 = self.run_baseline_right_away(n_days_base, sim_time)
         
-        print("Running baseline midnight charging strategy ...")
+        logger.info("Running baseline midnight charging strategy ...")
         soc_2, power_base_2, soc_std_2 = self.run_baseline_midnight(n_days_base, sim_time)
         
-        print("Running baseline tcin charging strategy ... ")
+        logger.info("Running baseline tcin charging strategy ... ")
         soc_3, power_base_3, soc_std_3 = self.run_baseline_tcin(n_days_base, sim_time)
        
-        print("Exporting baseline soc and power ...")
+        logger.info("Exporting baseline soc and power ...")
         # Dataframe to import the initial soc of the sub fleets with the aim to initialize the class
         data_soc = {'time': np.linspace(0,sim_time-1,sim_time),
                     'SOC_mean_RightAway': soc_1, 'SOC_std_RightAway': soc_std_1,
@@ -874,7 +878,7 @@ class ElectricVehiclesFleet(FleetInterface):
         
         df_soc.to_csv(join(path, r'SOC_curves_charging_modes.csv'), index = False)
         df_power.to_csv(join(path, r'power_baseline_charging_modes.csv'), index = False)
-        print("Exported")
+        logger.info("Exported")
         
     def discharge_baseline(self, StartTime_secs, EndTime_secs, Miles, Purpose, MilesSubfleet, SOC, SOC_sf, sim_time, power_ac, v):
         """ Method to compute discharging for the baseline case """
@@ -958,8 +962,9 @@ class ElectricVehiclesFleet(FleetInterface):
         power_ac = self.df_VehicleModels['Max_Charger_AC_Watts'][self.SubFleetId]
         power_dc = np.zeros([self.N_SubFleets,])
         
+        progress = output_policy.Progress(logger)
         for day in range(n_days_base):
-            print("Day %i" %(day+1))
+            progress.step("Day %i", day+1)
             
             v = self.voltage_battery(self.df_VehicleModels['V_SOC_0'][self.SubFleetId],
                                  self.df_VehicleModels['V_SOC_1'][self.SubFleetId],
@@ -1022,8 +1027,9 @@ class ElectricVehiclesFleet(FleetInterface):
         power_ac = self.df_VehicleModels['Max_Charger_AC_Watts'][self.SubFleetId]
         power_dc = np.zeros([self.N_SubFleets,])
         
+        progress = output_policy.Progress(logger)
         for day in range(n_days_base):
-            print("Day %i" %(day+1))
+            progress.step("Day %i", day+1)
             
             v = self.voltage_battery(self.df_VehicleModels['V_SOC_0'][self.SubFleetId],
                                  self.df_VehicleModels['V_SOC_1'][self.SubFleetId],
@@ -1099,11 +1105,12 @@ class ElectricVehiclesFleet(FleetInterface):
         time_charge_morning = np.zeros([self.N_SubFleets,], dtype = int)
         power_ac = self.df_VehicleModels['Max_Charger_AC_Watts'][self.SubFleetId]
         
+        progress = output_policy.Progress(logger)
         for day in range(n_days_base+1):
             if day == 0:
-                print("Burn-in day")
+                progress.step("Burn-in day")
             else:
-                print("Day %i" %(day))
+                progress.step("Day %i", day)
             
             SOC_time_morning = np.zeros([self.N_SubFleets, sim_time])
             power_ac_demanded = np.zeros([self.N_SubFleets, sim_time])
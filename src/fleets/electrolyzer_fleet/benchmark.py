@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Runtime of the Electrolyzer fleet operating points and base power
+
+Times, over the operating range of the fleet, the cell voltage and current of
+a stack solved with fsolve (vi_solve, as every time step did before) and
+interpolated in the operating point table (vi_calc), with the largest
+relative deviation of the table from fsolve. Times the base power of a day
+of 1 s time steps with the sum of powers run_ey_fleet used before and with
+the precomputed profile (Horner's method). Then times process_request over
+3600 random requests of 1 s with table_tol = 0 (fsolve at every time step)
+and with the table_tol of config.ini, and gives the time of a year at 1 s
+at that rate.
+
+Usage: python benchmark.py
+"""
+import sys
+import tempfile
+import configparser
+from os.path import dirname, abspath, join
+sys.path.insert(0, dirname(dirname(dirname(abspath(__file__)))))
+
+import time
+from datetime import datetime, timedelta
+import numpy as np
+
+from fleet_request import FleetRequest
+from grid_info_artificial_inertia import GridInfo
+from fleets.electrolyzer_fleet.ey_fleet import ElectrolyzerFleet
+
+
+def run(fleet, requests):
+    start = time.time()
+    responses = [fleet.process_request(request) for request in requests]
+    return time.time() - start, np.array([response.P_togrid for response in responses])
+
+
+if __name__ == '__main__':
+    fleet = ElectrolyzerFleet(GridInfo())
+    p_stack = np.linspace(fleet.ey_Pmin_fleet, fleet.ey_Pmax_fleet, 2001) * 1e3 / fleet.ey_Ne
+
+    start = time.time()
+    solved = np.array([fleet.vi_solve(p) for p in p_stack])
+    t_solve = time.time() - start
+    start = time.time()
+    table = np.array([fleet.vi_calc(p) for p in p_stack])
+    t_table = time.time() - start
+    deviation = np.max(np.abs(table / solved - 1), axis=0)
+
+    steps = 86400
+    start = time.time()
+    p_sum = np.array([sum([fleet.p[j] * (inc + 1) ** (21 - j) for j in range(22)]) for inc in range(steps)])
+    t_sum = time.time() - start
+    start = time.time()
+    p_horner = np.array([fleet._ElectrolyzerFleet__p_base_calc(inc) for inc in range(steps)])
+    t_horner = time.time() - start
+    p_deviation = np.max(np.abs(p_horner / p_sum - 1))
+
+    # Same fleet without the table
+    config = configparser.ConfigParser()
+    config.read(join(dirname(abspath(__file__)), 'config.ini'))
+    config.set('Electrolyzer', 'table_tol', '0')
+    with tempfile.TemporaryDirectory() as directory:
+        config_file = join(directory, 'config.ini')
+        with open(config_file, 'w') as out:
+            config.write(out)
+        fsolve_fleet = ElectrolyzerFleet(GridInfo(), mdl_config=config_file)
+
+    ts = datetime(2019, 1, 1)
+    dt = timedelta(seconds=1)
+    requests = [FleetRequest(ts=ts + i * dt, sim_step=dt, start_time=ts, p=p, q=0.)
+                for i, p in enumerate(np.random.RandomState(0).uniform(-60, 60, 3600))]
+    fleet = ElectrolyzerFleet(GridInfo())
+    t_fsolve_run, p_fsolve = run(fsolve_fleet, requests)
+    t_table_run, p_table = run(fleet, requests)
+
+    print('%24s %14s %14s' % ('', 'fsolve', 'table'))
+    print('%24s %14.2f %14.2f' % ('operating point (us)', t_solve / len(p_stack) * 1e6, t_table / len(p_stack) * 1e6))
+    print('%24s %14s %14s' % ('', 'sum of powers', 'profile'))
+    print('%24s %14.2f %14.2f' % ('base power (us)', t_sum / steps * 1e6, t_horner / steps * 1e6))
+    print('%24s %14s %14s' % ('', 'fsolve', 'table'))
+    print('%24s %14.2f %14.2f' % ('process_request (us)', t_fsolve_run / len(requests) * 1e6,
+                                  t_table_run / len(requests) * 1e6))
+    print('%24s %14.1f %14.1f' % ('a year at 1 s (min)', t_fsolve_run / len(requests) * 365 * 86400 / 60,
+                                  t_table_run / len(requests) * 365 * 86400 / 60))
+    print('max. deviation: voltage %.2e, current %.2e, P_togrid %.2e, base power %.2e'
+          % (deviation[0], deviation[1], np.max(np.abs(p_table / p_fsolve - 1)), p_deviation))
@@ -7,27 +7,42 @@ Electrolyzers
 """
 
 import sys
+import logging
 from os.path import dirname, abspath, join
 from datetime import datetime
 from warnings import simplefilter, filterwarnings, warn
 import configparser
-from numpy import polyfit, RankWarning, trapz, log10, exp, ndarray
+from numpy import polyfit, log10, exp, arange, array, nan, isnan, where, minimum, maximum, flatnonzero, \
+    concatenate, add
+from numpy import round as round_
+try:
+    from numpy import RankWarning, trapz
+except ImportError:
+    # numpy >= 2.0
+    from numpy.exceptions import RankWarning
+    from numpy import trapezoid as trapz
 from scipy.optimize import fsolve
-from pandas import read_csv
+from pandas import read_csv, DataFrame
 from matplotlib.pyplot import figure, subplot2grid
 sys.path.insert(0, dirname(dirname(dirname(abspath(__file__)))))
 from fleet_interface import FleetInterface
-from fleet_response import FleetResponse
-from csv import writer
-import csv
+from fleet_response import FleetResponse, responses_from_frame
 from grid_info_artificial_inertia import GridInfo
 from utils import ensure_ddir
+from impact_metrics import ImpactMetrics
+from fleet_tables import OperatingPoints, BasePower
+import output_policy
 simplefilter('ignore', RankWarning)
 filterwarnings("ignore", category=RuntimeWarning)
 if sys.version_info >= (3,6,7):
     from pandas.plotting import register_matplotlib_converters
     register_matplotlib_converters()
     
+logger = logging.getLogger('fleets.electrolyzer_fleet')
+
+# Voltage rise of a cell with aging (V) per time step
+AGING = 3.88888888888887e-08
+
 
 class ElectrolyzerFleet(FleetInterface):
     """
@@ -89,6 +104,8 @@ class ElectrolyzerFleet(FleetInterface):
         self.ey_cpH2 = float(self.config.get(mdl_type, "cpH2", fallback=14.31))
         self.ey_x01 = float(self.config.get(mdl_type, "x0_1", fallback=1.6))
         self.ey_x02 = float(self.config.get(mdl_type, "x0_2", fallback=80))
+        self.ey_table_tol = float(self.config.get(mdl_type, "table_tol", fallback=1e-6))
+        self.ey_p_base_steps = int(self.config.get(mdl_type, "p_base_steps", fallback=86400))
         self.ey_Pmin_fleet = float(self.config.get(mdl_type, "Pmin_fleet", fallback=30))
         self.ey_Pmax_fleet = float(self.config.get(mdl_type, "Pmax_fleet", fallback=130))
         self.ey_At = float(self.config.get(mdl_type, "At", fallback=47))
@@ -123,22 +140,23 @@ class ElectrolyzerFleet(FleetInterface):
         self.ey_pbase = join(self.base_path, self.config.get(mdl_type, "power_data", fallback="Pbase.txt"))
 
         if self.config.sections()[0] != mdl_type:
-            print("Error reading config.ini file for model:"+"\t"*3+"%s [FAIL]!!" % mdl_type)
-            print("Model found in config.ini file:"+"\t"*5+"%s!!\n"
-                  "Default modelling parameters will be used!!\n" % self.config.sections()[0])
+            logger.warning("Error reading config.ini file for model:"+"\t"*3+"%s [FAIL]!!", mdl_type)
+            logger.warning("Model found in config.ini file:"+"\t"*5+"%s!!\n"
+                           "Default modelling parameters will be used!!\n", self.config.sections()[0])
         else:
-            print("Model parameters found for:"+"\t"*5+"%s [OKAY]\n" % self.config.sections()[0])
+            logger.info("Model parameters found for:"+"\t"*5+"%s [OKAY]\n", self.config.sections()[0])
 
         # Initialize state parameters for the Electrolyzer fleet model
         self.f = None
         self.__V = self.__Ir = self.__V_age = self.__Ir_age = self.__p_base = 0.0
         self.__nf = self.__nf_age = self.__ne = self.__ne_age = 0.0
-        self.__Tout = self.__W_c = self.__p_tot = self.__pe_out = 0.0
+        self.__W_c = self.__p_tot = self.__pe_out = 0.0
         self.__Qh2_V = self.__Qh2_m = self.__Qh2_m_age = 0.0
         self.__m_dotH2 = self.__m_dotH2_age = 0.0
         self.lka_h2 = self.__Phi = self.__dmdot_dt = 0.0
         self.__eta_ch = self.__Qh2_out = 0.0
         self.__inc = 0
+        self.__progress = output_policy.Progress(logger)
 
         # THIS NEEDS TO BE MODFIED BASED ON FLEET P OUTPUT
         self.fleet_rating = self.ey_Ne*self.ey_E_size
@@ -170,13 +188,22 @@ class ElectrolyzerFleet(FleetInterface):
         # Leakage variables
         self.ey_At *= self.ey_Nt
         self.ey_len /= 1e3
+        # Permeability of the tanks to H2 (mol s^-1 m^-1 MPa^-0.5)
+        self.__Phi = self.ey_Phi_0 * exp(-self.ey_E_phi / (self.ey_R * 1e-3) / (self.ey_T + 273.15))
 
         # Fit the base power profile for Electrolyzer
         self.p = self.fit_pdat(self.ey_pbase, 5*60)
+        self.__base_power = BasePower(self.p, self.ey_p_base_steps)
+
+        # Operating points of a stack over the operating range of the fleet, used in place of fsolve
+        self.__operating_points = OperatingPoints(self.__vi_volt, self.vi_solve,
+                                                  self.ey_Pmin_fleet * 1e3 / self.ey_Ne,
+                                                  self.ey_Pmax_fleet * 1e3 / self.ey_Ne,
+                                                  self.ey_table_tol, self.ey_Nc)
 
         # Output metrics dataframe -- TO BE CHANGED TO PANDAS DF
-        self.metrics = [['ts', 'V_ideal', 'V_age', 'ne_ideal', 'ne_age', 'Soc_ideal', 'Soc_age',
-                         'Lka_H2', 'nch', 'P_togrid', 'P_service', 'f']]
+        self.metrics = ImpactMetrics(['ts', 'V_ideal', 'V_age', 'ne_ideal', 'ne_age', 'Soc_ideal', 'Soc_age',
+                                      'Lka_H2', 'nch', 'P_togrid', 'P_service', 'f'])
 
     def process_request(self, fleet_request):
         resp = self.run_ey_fleet(fleet_request.ts_req, fleet_request.sim_step,
@@ -184,10 +211,86 @@ class ElectrolyzerFleet(FleetInterface):
         return resp
 
     def forecast(self, requests):
-        soc_state, soc_state_age, state = self.soc, self.soc_age, self.__inc
-        resp = [self.run_ey_fleet(req.ts_req, req.sim_step, req.P_req, True, req.start_time) for req in requests]
-        self.soc, self.soc_age, self.__inc = soc_state, soc_state_age, state
-        return resp
+        """
+        Responses of the fleet to a horizon of requests, without changing the state of the fleet
+        :param requests: list of fleet requests
+        :return resp: list of fleet responses
+        """
+        return responses_from_frame(self.forecast_frame(requests))
+
+    def forecast_frame(self, requests):
+        """
+        Responses of the fleet to a horizon of requests, without changing the state of the fleet.
+        The time steps of run_ey_fleet are computed as arrays over the horizon: the moles of H2 in
+        the tanks and the leakage are accumulated from copies of their current values.
+        :param requests: list of fleet requests
+        :return frame: DataFrame with a column per FleetResponse attribute and a row per request
+        """
+        n = len(requests)
+        inc = arange(self.__inc, self.__inc + n)
+
+        # Base power profile and power requested
+        p_base = self.__base_power.array(inc)
+        p_req = array([nan if req.P_req is None else req.P_req for req in requests], dtype=float)
+        p_req = where(isnan(p_req) | (p_req == 0.0), p_base, p_req - p_base)
+
+        # Power consumed by the fleet, as __ey_p_calc
+        Preq = minimum(maximum(abs(p_req), self.ey_Pmin_fleet), self.ey_Pmax_fleet)
+        Pr = abs(Preq) * 1e3 / self.ey_Ne  # Watts
+        V, Ir = self.__operating_points.array(Pr)
+        pe_out = self.ey_Ne * self.ey_Nc * V * Ir
+        V_age, Ir_age = self.__aging(V, p_base, inc)
+        ne_age = self.Vtn / V_age
+        Qh2_m = self.__h2_flow(Ir, self.__faraday_efficiency(Ir))  # (mol/s)
+        Qh2_m_age = self.__h2_flow(Ir_age, ne_age)  # (mol/s)
+        m_dotH2 = Qh2_m * 2 * 1e-3  # (kg/s)
+
+        # Compressor, with the moles in the tanks at the start of each time step
+        dmdot_dt = Qh2_m - self.__Qh2_out
+        moles = add.accumulate(concatenate([[self.moles], dmdot_dt * 1]))
+        P_tank = self.__tank_pressure(moles[:-1])
+        moles = moles[1:]
+        p_tot = self.__compressor_power(m_dotH2, P_tank) * 1e3 + pe_out
+
+        if self.FW21_Enabled and self.is_autonomous:
+            # frequency_watt, all in kW
+            start_times = [req.start_time for req in requests]
+            f = self.grid.get_frequencies([req.ts_req for req in requests], 0,
+                                          None if None in start_times else start_times)
+            P_pre = -(pe_out * 1e-3) / self.ey_Pmax_fleet
+            P_min = -self.ey_Pmin_fleet / self.ey_Pmax_fleet
+            pe_out = where(f < 60 - self.ey_db_UF,
+                           minimum(P_min, P_pre + (60 - self.ey_db_UF - f) / (60 * self.ey_k_UF)),
+                           where(f > 60 + self.ey_db_OF,
+                                 maximum(-1.0, P_pre + (60 + self.ey_db_OF - f) / (60 * self.ey_k_OF)),
+                                 P_pre)) * -self.ey_Pmax_fleet * 1e3
+
+        # Tanks, as __soc_calc
+        lka_h2 = add.accumulate(concatenate([[self.lka_h2], self.__leakage(P_tank) * 1]))[1:]
+        moles_age = add.accumulate(concatenate([[self.moles_age], Qh2_m_age * 1 - lka_h2 / 2 * 1]))[1:]
+        eta_ch = self.ey_LHV_H2 * m_dotH2 * 1e3 / p_tot  # (W/W)
+        soc = round_(P_tank / self.max_charge, 3)
+
+        # Once the tanks are full, the fleet keeps its last response
+        running = concatenate([[self.P_tank], P_tank[:-1]]) < self.max_charge
+        if not running.all():
+            k = flatnonzero(~running)[0]
+            for values, last in ((p_base, self.__p_base), (pe_out, self.__pe_out), (eta_ch, self.__eta_ch),
+                                 (soc, self.soc), (dmdot_dt, self.__dmdot_dt), (moles, self.moles),
+                                 (P_tank, self.P_tank)):
+                values[k:] = values[k - 1] if k > 0 else last
+
+        return DataFrame({
+            'ts': [req.ts_req for req in requests], 'sim_step': [req.sim_step for req in requests],
+            'C': 0, 'dT_hold_limit': 0, 'E': soc, 'Eff_charge': eta_ch, 'Eff_discharge': 1.0,
+            'P_dot_down': 0, 'P_dot_up': 0,
+            'P_togrid': -pe_out * 1e-3, 'P_togrid_max': -self.ey_Pmax_fleet, 'P_togrid_min': -self.ey_Pmin_fleet,
+            'P_service': -pe_out * 1e-3 + p_base, 'P_service_max': self.ey_Pmax_fleet - p_base,
+            'P_service_min': p_base - self.ey_Pmin_fleet,
+            'Q_dot_down': 0, 'Q_dot_up': 0, 'Q_service': 0, 'Q_service_max': 0, 'Q_service_min': 0,
+            'Q_togrid': 0, 'Q_togrid_max': 0, 'Q_togrid_min': 0, 'T_restore': 0,
+            'P_base': -p_base, 'Q_base': 0, 'Strike_price': 0, 'SOC_cost': 0,
+            'dmdot': dmdot_dt, 'moles': moles, 'P_tank': P_tank}, index=range(n))
 
     def run_ey_fleet(self, ts, sim_step, Preq, forecast=False, start_time=None):
         """
@@ -202,10 +305,7 @@ class ElectrolyzerFleet(FleetInterface):
             self.lka_h2 = self.lka_h2/2*1
         else:
             # Create base power profile
-            if isinstance(self.p, ndarray):
-                self.__p_base = sum([self.p[j]*(self.__inc+1)**(21-j) for j in range(22)])
-            else:
-                self.__p_base = self.p
+            self.__p_base = self.__base_power(self.__inc)
             # Ptogrid: -Pbase for None or zero requests since Ey is a load
             if Preq is None or float(Preq) == 0.0:
                 Preq = self.__p_base
@@ -262,14 +362,11 @@ class ElectrolyzerFleet(FleetInterface):
 
         # Impact metrics
         if not forecast:
-            self.metrics.append([str(ts), str(self.__V), str(self.__V_age), str(self.__ne),
-                                 str(self.__ne_age), str(resp.E), str(self.soc_age*1e2),
-                                 str(self.lka_h2), str(resp.Eff_charge), str(resp.P_togrid),
-                                 str(resp.P_service), str(self.f)])
+            self.metrics.append(ts, self.__V, self.__V_age, self.__ne, self.__ne_age, resp.E, self.soc_age*1e2,
+                                self.lka_h2, resp.Eff_charge, resp.P_togrid, resp.P_service, self.f)
 
-        # Print SoC status every 5 secs.
-        if self.__inc % 5000 == 0:
-            print("Soc:%4.2f%%" % (resp.E*1e2))
+        # SoC status of each step, see output_policy.Progress
+        self.__progress.step("Soc:%4.2f%%", resp.E*1e2)
 
         return resp
 
@@ -280,6 +377,66 @@ class ElectrolyzerFleet(FleetInterface):
         fa.append((Nc * x[0]) * x[1] - Pri)
         return fa
 
+    def __vi_volt(self, i):
+        # Voltage of a cell at the current i (first equation of __vi_calc), i can be an array
+        T = self.ey_T
+        return self.V_rev + (self.ey_r1 + self.ey_r2 * T) * i / self.ey_A + \
+            (self.ey_s1 + self.ey_s2 * T + self.ey_s3 * T ** 2) * log10(
+                (self.ey_t1 + self.ey_t2 / T + self.ey_t3 / T ** 2) * i / self.ey_A + 1)
+
+    def vi_solve(self, Pr):
+        """
+        Cell voltage and current of a stack solved with fsolve
+        :param Pr: Power of a stack (W)
+        :return V, Ir: Voltage (V) and current (A)
+        """
+        V, Ir = fsolve(self.__vi_calc, [self.ey_x01, self.ey_x02],
+                       args=(Pr, self.ey_Nc, self.V_rev, self.ey_T,
+                             self.ey_r1, self.ey_r2, self.ey_s1, self.ey_s2,
+                             self.ey_s3, self.ey_t1, self.ey_t2, self.ey_t3,
+                             self.ey_A))
+        return V, Ir
+
+    def vi_calc(self, Pr):
+        """
+        Cell voltage and current of a stack interpolated in the operating point table, solved with
+        fsolve outside of the table or if table_tol is 0
+        :param Pr: Power of a stack (W)
+        :return V, Ir: Voltage (V) and current (A)
+        """
+        return self.__operating_points(Pr)
+
+    def __aging(self, V, p_base, inc):
+        # Cell voltage and current of a stack w/ aging at the time steps inc, for the cell voltage V and
+        # the base power p_base. Scalars or arrays.
+        V_age = V + (inc + 1) * AGING
+        return V_age, p_base / (V_age * self.ey_Nc)
+
+    def __faraday_efficiency(self, Ir):
+        T = self.ey_T
+        return self.ey_a1 * exp((self.ey_a2 + self.ey_a3 * T + self.ey_a4 * T ** 2) / (Ir / self.ey_A) +
+                                (self.ey_a5 + self.ey_a6 * T + self.ey_a7 * T ** 2) / (Ir / self.ey_A) ** 2)
+
+    def __h2_flow(self, Ir, eta):
+        # Flow of H2 produced by the fleet (mol/s) at the current of a stack Ir and the efficiency eta
+        return self.ey_Ne * self.ey_Nc * Ir * eta / 2 / self.ey_F
+
+    def __tank_pressure(self, moles):
+        # Pressure in a tank (Pa) with moles of H2 in the tanks
+        return moles / self.ey_Nt * self.ey_R * (self.ey_T + 273.15) / self.ey_V_tank
+
+    def __compressor_power(self, m_dotH2, P_tank):
+        # Power of the compressor (kW) for the flow of H2 m_dotH2 (kg/s) into the tanks at the pressure P_tank
+        Tout = (self.ey_T + 273.15) * (P_tank / self.ey_Pe) ** ((self.ey_gamma - 1) / self.ey_gamma)
+        return (m_dotH2 / self.ey_eta_c) * self.ey_cpH2 * (Tout - (self.ey_T + 273.15))
+
+    def __leakage(self, P_tank):
+        # Hydrogen leakage from the tanks (g/s) at the pressure P_tank
+        # fugacity
+        f = P_tank * 1e-6 * exp(P_tank * 1e-6 * self.ey_b / (self.ey_R * 1e-3) / (self.ey_T + 273.15))
+        J = self.__Phi / self.ey_len * 2 * f ** 0.5  # (g m^-2 s^-1)
+        return J * self.ey_At
+
     def __ey_p_calc(self, p_req):
         # Check for operating range of the fleet
 
@@ -288,26 +445,17 @@ class ElectrolyzerFleet(FleetInterface):
         Pr = abs(Preq) * 1e3 / self.ey_Ne  # Watts
 
         # Compute voltage and current for 1 Electrolyzer stack
-        self.__V, self.__Ir = fsolve(self.__vi_calc, [self.ey_x01, self.ey_x02],
-                                     args=(Pr, self.ey_Nc, self.V_rev, self.ey_T,
-                                           self.ey_r1, self.ey_r2, self.ey_s1, self.ey_s2,
-                                           self.ey_s3, self.ey_t1, self.ey_t2, self.ey_t3,
-                                           self.ey_A))
+        self.__V, self.__Ir = self.vi_calc(Pr)
 
         # Total power for the Ne number of Electrolyzers or fleet
         self.__pe_out = self.ey_Ne * self.ey_Nc * self.__V * self.__Ir
 
         # Ageing
-        self.__V_age = self.__V + ((self.__inc + 1) * 3.88888888888887e-08)
-        self.__Ir_age = self.__p_base / (self.__V_age * self.ey_Nc)
+        self.__V_age, self.__Ir_age = self.__aging(self.__V, self.__p_base, self.__inc)
 
         # Compute Faraday Efficiency
-        self.__nf = self.ey_a1 * exp((self.ey_a2 + self.ey_a3 * self.ey_T + self.ey_a4 * self.ey_T ** 2) /
-                                     (self.__Ir / self.ey_A) + (self.ey_a5 + self.ey_a6 * self.ey_T + self.ey_a7 * self.ey_T ** 2) /
-                                     (self.__Ir / self.ey_A) ** 2)
-        self.__nf_age = self.ey_a1 * exp((self.ey_a2 + self.ey_a3 * self.ey_T + self.ey_a4 * self.ey_T ** 2) /
-                                         (self.__Ir_age / self.ey_A) + (self.ey_a5 + self.ey_a6 * self.ey_T + self.ey_a7 * self.ey_T ** 2) /
-                                         (self.__Ir_age / self.ey_A) ** 2)
+        self.__nf = self.__faraday_efficiency(self.__Ir)
+        self.__nf_age = self.__faraday_efficiency(self.__Ir_age)
 
         # Energy (or voltaje) efficiency of a cell
         self.__ne = self.Vtn / self.__V
@@ -315,15 +463,14 @@ class ElectrolyzerFleet(FleetInterface):
 
         # Flow of H2 produced
         self.__Qh2_V = 80.69 * self.ey_Nc * self.__Ir * self.__nf / 2 / self.ey_F  # (Nm^3/h)
-        self.__Qh2_m = self.ey_Ne * self.ey_Nc * self.__Ir * self.__nf / 2 / self.ey_F  # (mol/s)
-        self.__Qh2_m_age = self.ey_Ne * self.ey_Nc * self.__Ir_age * self.__ne_age / 2 / self.ey_F  # (mol/s)
+        self.__Qh2_m = self.__h2_flow(self.__Ir, self.__nf)  # (mol/s)
+        self.__Qh2_m_age = self.__h2_flow(self.__Ir_age, self.__ne_age)  # (mol/s)
         self.__m_dotH2 = self.__Qh2_m * 2 * 1e-3  # 1mol = 2grams (kg/s)
         self.__m_dotH2_age = self.__Qh2_m_age * 2 * 1e-3  # 1mol = 2grams (kg/s)
 
         # Compressor model
-        self.P_tank = self.moles / self.ey_Nt * self.ey_R * (self.ey_T + 273.15) / self.ey_V_tank
-        self.__Tout = (self.ey_T + 273.15) * (self.P_tank / self.ey_Pe) ** ((self.ey_gamma - 1) / self.ey_gamma)
-        self.__W_c = (self.__m_dotH2 / self.ey_eta_c) * self.ey_cpH2 * (self.__Tout - (self.ey_T + 273.15))  # (kW)
+        self.P_tank = self.__tank_pressure(self.moles)
+        self.__W_c = self.__compressor_power(self.__m_dotH2, self.P_tank)  # (kW)
 
         # Total power demanded from the grid in Watts
         self.__p_tot = self.__W_c * 1e3 + self.__pe_out
@@ -331,16 +478,8 @@ class ElectrolyzerFleet(FleetInterface):
     def __soc_calc(self):
         # Storage Tank
 
-        # Compute hydrogen leakage from tank
-        self.__Phi = self.ey_Phi_0 * exp(
-            -self.ey_E_phi / (self.ey_R * 1e-3) / (self.ey_T + 273.15))  # (mol s^-1 m^-1 MPa^-0.5)
-        
-        # fugacity
-        f = self.P_tank * 1e-6 * exp(self.P_tank * 1e-6 * self.ey_b / (self.ey_R * 1e-3) / (self.ey_T + 273.15))
-        J = self.__Phi / self.ey_len * 2 * f ** 0.5  # (g m^-2 s^-1)
-
         # total hydrogen lost in time t (g)
-        self.lka_h2 += J * self.ey_At * 1
+        self.lka_h2 += self.__leakage(self.P_tank) * 1
         self.__dmdot_dt = self.__Qh2_m - self.__Qh2_out
         
         # Number of moles in at given instant in the system of tanks
@@ -352,10 +491,10 @@ class ElectrolyzerFleet(FleetInterface):
         # Charging efficiency
         self.__eta_ch = self.ey_LHV_H2 * self.__m_dotH2 * 1e3 / self.__p_tot  # (W/W)
         self.soc = round(self.P_tank / self.max_charge, 3)
-        self.soc_age = round(
-            self.moles_age / self.ey_Nt * self.ey_R * (self.ey_T + 273.15) / self.ey_V_tank / self.max_charge, 3)
+        self.soc_age = round(self.__tank_pressure(self.moles_age) / self.max_charge, 3)
         if self.soc > 1.0 or self.soc < 0.0:
-            sys.exit(print("SOC limit violation!!" + "\t" * 6 + " [!!]\n"))
+            logger.error("SOC limit violation!!" + "\t" * 6 + " [!!]\n")
+            sys.exit()
 
     @staticmethod
     def bool_check(b_in):
@@ -369,22 +508,30 @@ class ElectrolyzerFleet(FleetInterface):
     def output_metrics2(self, filename):
         base_path = dirname(abspath(__file__))
         self.__metrics.to_csv(join(base_path, str(filename)+'.csv'), sep=',', encoding='utf-8')
-        print("Impact metrics file has been created" + "\t" * 5 + " [OKAY]\n")
+        logger.info("Impact metrics file has been created" + "\t" * 5 + " [OKAY]\n")
 
-    def output_metrics(self, filename):
+    def output_metrics(self, filename, binary=False):
+        """
+        :param filename: Name of the impact metrics file, without extension
+        :param binary: Write a .npz file instead of a .csv file
+        """
         base_path = dirname(abspath(__file__))
-        with open(join(base_path, str(filename)+'.csv'), 'w', newline='') as out:
-            write = writer(out)
-            write.writerows(self.metrics)
-            print("Impact metrics file has been created"+"\t"*5+" [OKAY]\n")
+        if binary:
+            self.metrics.save(join(base_path, str(filename)+'.npz'))
+        else:
+            with open(join(base_path, str(filename)+'.csv'), 'w', newline='') as out:
+                self.metrics.write_csv(out)
+        logger.info("Impact metrics file has been created"+"\t"*5+" [OKAY]\n")
 
-    def output_impact_metrics(self, service_name):        
+    def output_impact_metrics(self, service_name, binary=False):
         metrics_dir = join(dirname(dirname(dirname(abspath(__file__)))), 'integration_test', service_name)
         ensure_ddir(metrics_dir)
-        metrics_filename = 'ImpactMetrics_' + service_name + '_Electrolyzer' + '_' + datetime.now().strftime('%Y%m%dT%H%M')  + '.csv'
-        with open(join(metrics_dir, metrics_filename), 'w') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerows(self.metrics)     
+        metrics_filename = 'ImpactMetrics_' + service_name + '_Electrolyzer' + '_' + datetime.now().strftime('%Y%m%dT%H%M')
+        if binary:
+            self.metrics.save(join(metrics_dir, metrics_filename + '.npz'))
+        else:
+            with open(join(metrics_dir, metrics_filename + '.csv'), 'w') as csvfile:
+                self.metrics.write_csv(csvfile)
         
     def frequency_watt(self, p_pre=1.0, p_avl=1.0, p_min=0.1, ts=datetime.utcnow(), location=0, start_time=None):
         f = self.grid.get_frequency(ts, location, start_time)
@@ -414,8 +561,8 @@ class ElectrolyzerFleet(FleetInterface):
         df = read_csv(filename, header=None, parse_dates=[0], names=['datetime', 'Pval'])
         opt_ne = int(round(trapz(df['Pval']) / len(df) / e_size))
         if int(ne) != opt_ne:
-            print("Number of Electrolyzers does not fit the power curve:\t\t[%d]" % int(ne))
-            print("Optimum Electrolyzers used for this simulation run:\t\t[%d]" % opt_ne)
+            logger.warning("Number of Electrolyzers does not fit the power curve:\t\t[%d]", int(ne))
+            logger.warning("Optimum Electrolyzers used for this simulation run:\t\t[%d]", opt_ne)
             return opt_ne
         return ne
 
@@ -436,7 +583,7 @@ class ElectrolyzerFleet(FleetInterface):
                 raise Exception("\tUnable to infer time interval from input data\n"
                                 "\tPlease specify the time_interval parameter in seconds!!\n")
             if any(i in interval for i in ('L', 'ms', 'U', 'us', 'N')) is False:
-                print("Power data time-interval is at least in seconds:\t\t[OKAY]")
+                logger.info("Power data time-interval is at least in seconds:\t\t[OKAY]")
                 df = read_csv(filename, header=None, parse_dates=[0], names=['datetime', 'Pval'])
                 df['sec'] = df['datetime'].sub(df['datetime'].iloc[0]).dt.total_seconds()
             else:
@@ -456,7 +603,7 @@ class ElectrolyzerFleet(FleetInterface):
                 # Set Pbase as an average of Pmin and Pmax operating range of a single Electrolyzer fleet
                 p_val = sum([self.ey_Pmax_fleet + self.ey_Pmin_fleet]) / 2.0
                 warn("File not found. Please ensure path or file name is correct for power_data in config.ini!!")
-                print("Pbase is set as a constant to %4.2fkW" % p_val)
+                logger.info("Pbase is set as a constant to %4.2fkW", p_val)
         return p_val
 
     @staticmethod
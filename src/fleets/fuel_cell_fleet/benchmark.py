@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Runtime of the FuelCell fleet operating points
+
+Times the voltage and current of a cell solved with fsolve (vi_solve, as
+every time step did before) and interpolated in the operating point table
+(vi_calc) over the operating range of the fleet, with the largest relative
+deviation of the table from fsolve. Then times process_request over 3600
+random requests of 1 s with table_tol = 0 (fsolve at every time step) and
+with the table_tol of config.ini.
+
+Then runs the fleet for a week of 1 s requests, and records the impact
+metrics of the week again as fc_model did before (a list of str per time
+step) and in ImpactMetrics, with the time of the recording and of the
+export (.csv, and .npz for ImpactMetrics), and the memory of the recorded
+metrics (tracemalloc).
+
+Usage: python benchmark.py
+"""
+import sys
+import os
+import csv
+import tempfile
+import tracemalloc
+import configparser
+from os.path import dirname, abspath, join
+sys.path.insert(0, dirname(dirname(dirname(abspath(__file__)))))
+
+import time
+from datetime import datetime, timedelta
+import numpy as np
+
+from fleet_request import FleetRequest
+from grid_info_artificial_inertia import GridInfo
+from impact_metrics import ImpactMetrics
+from fleets.fuel_cell_fleet.fuelcell_fleet import FuelCellFleet
+
+
+def record_str(ts, values):
+    metrics = [['ts', 'Vr_ideal', 'Vr_age', 'ne_ideal', 'ne_age', 'Soc_ideal', 'Soc_age', 'Lka_H2', 'nds']]
+    for t, row in zip(ts, values):
+        metrics.append([str(t), str(row[0]), str(row[1]), str(row[2]), str(row[3]), str(row[4]), str(row[5]),
+                        str(row[6]), str(row[7])])
+    return metrics
+
+
+def record_arrays(ts, values, columns):
+    metrics = ImpactMetrics(columns)
+    for t, row in zip(ts, values):
+        metrics.append(t, row[0], row[1], row[2], row[3], row[4], row[5], row[6], row[7])
+    return metrics
+
+
+def traced(record, *args):
+    tracemalloc.start()
+    metrics = record(*args)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return metrics, memory
+
+
+def timed(f, *args):
+    start = time.time()
+    result = f(*args)
+    return time.time() - start, result
+
+
+def run(fleet, requests):
+    start = time.time()
+    responses = [fleet.process_request(request) for request in requests]
+    return time.time() - start, np.array([response.P_togrid for response in responses])
+
+
+if __name__ == '__main__':
+    fleet = FuelCellFleet(GridInfo())
+    p_cell = np.linspace(fleet.fc_Pmin_fleet, fleet.fc_Pmax_fleet, 2001) * 1e3 / fleet.fc_Nfc / fleet.fc_Nc
+
+    start = time.time()
+    solved = np.array([fleet.vi_solve(p) for p in p_cell])
+    t_solve = time.time() - start
+    start = time.time()
+    table = np.array([fleet.vi_calc(p) for p in p_cell])
+    t_table = time.time() - start
+    deviation = np.max(np.abs(table / solved - 1), axis=0)
+
+    # Same fleet without the table
+    config = configparser.ConfigParser()
+    config.read(join(dirname(abspath(__file__)), 'config.ini'))
+    config.set('FuelCell', 'table_tol', '0')
+    with tempfile.TemporaryDirectory() as directory:
+        config_file = join(directory, 'config.ini')
+        with open(config_file, 'w') as out:
+            config.write(out)
+        fsolve_fleet = FuelCellFleet(GridInfo(), mdl_config=config_file)
+
+    ts = datetime(2019, 1, 1)
+    dt = timedelta(seconds=1)
+    requests = [FleetRequest(ts=ts + i * dt, sim_step=dt, start_time=ts, p=p, q=0.)
+                for i, p in enumerate(np.random.RandomState(0).uniform(-150, 150, 3600))]
+    fleet = FuelCellFleet(GridInfo())
+    t_fsolve_run, p_fsolve = run(fsolve_fleet, requests)
+    t_table_run, p_table = run(fleet, requests)
+
+    print('%24s %14s %14s' % ('', 'fsolve', 'table'))
+    print('%24s %14.2f %14.2f' % ('operating point (us)', t_solve / len(p_cell) * 1e6, t_table / len(p_cell) * 1e6))
+    print('%24s %14.2f %14.2f' % ('process_request (us)', t_fsolve_run / len(requests) * 1e6,
+                                  t_table_run / len(requests) * 1e6))
+    print('max. deviation from fsolve: voltage %.2e, current %.2e, P_togrid %.2e'
+          % (deviation[0], deviation[1], np.max(np.abs(p_table / p_fsolve - 1))))
+
+    # A week at 1 s
+    fleet = FuelCellFleet(GridInfo())
+    week = 7 * 86400
+    p_week = np.random.RandomState(1).uniform(-150, 150, week)
+    start = time.time()
+    for i in range(week):
+        fleet.process_request(FleetRequest(ts=ts + i * dt, sim_step=dt, start_time=ts, p=p_week[i], q=0.))
+    t_week = time.time() - start
+    ts_week, values_week = fleet.metrics.arrays()
+    ts_week = ts_week.astype(object).tolist()
+    values_week = list(values_week)
+
+    t_str, metrics_str = timed(record_str, ts_week, values_week)
+    t_arrays, metrics_arrays = timed(record_arrays, ts_week, values_week, fleet.metrics.columns)
+    memory_str = traced(record_str, ts_week, values_week)[1]
+    memory_arrays = traced(record_arrays, ts_week, values_week, fleet.metrics.columns)[1]
+    with tempfile.TemporaryDirectory() as directory:
+        filename = join(directory, 'metrics')
+        with open(filename + '.csv', 'w', newline='') as out:
+            t_csv_str = timed(csv.writer(out).writerows, metrics_str)[0]
+        with open(filename + '.csv', 'w', newline='') as out:
+            t_csv_arrays = timed(metrics_arrays.write_csv, out)[0]
+        size_csv = os.path.getsize(filename + '.csv')
+        t_npz = timed(metrics_arrays.save, filename + '.npz')[0]
+        size_npz = os.path.getsize(filename + '.npz')
+
+    print()
+    print('a week at 1 s: %i time steps in %.1f s' % (week, t_week))
+    print('%24s %14s %14s' % ('impact metrics', 'list of str', 'ImpactMetrics'))
+    print('%24s %14.2f %14.2f' % ('recording (s)', t_str, t_arrays))
+    print('%24s %14.1f %14.1f' % ('memory (MB)', memory_str / 1e6, memory_arrays / 1e6))
+    print('%24s %14.2f %14.2f' % ('.csv export (s)', t_csv_str, t_csv_arrays))
+    print('%24s %14s %14.2f' % ('.npz export (s)', '', t_npz))
+    print('.csv %.1f MB, .npz %.1f MB' % (size_csv / 1e6, size_npz / 1e6))
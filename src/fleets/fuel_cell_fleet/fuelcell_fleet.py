@@ -7,27 +7,41 @@ FuelCells
 """
 
 import sys
+import logging
 from os.path import dirname, abspath, join
 from warnings import simplefilter, filterwarnings, warn
 import configparser
 from datetime import datetime
-from numpy import polyfit, convolve, RankWarning, log, exp, ndarray
-from pandas import read_csv
+from numpy import polyfit, log, exp, ndarray, arange, array, nan, isnan, where, minimum, maximum, flatnonzero, \
+    concatenate, subtract, add
+try:
+    from numpy import RankWarning
+except ImportError:
+    # numpy >= 2.0
+    from numpy.exceptions import RankWarning
+from pandas import read_csv, DataFrame
 from scipy.optimize import fsolve
 from matplotlib.pyplot import figure, subplot2grid
 sys.path.insert(0, dirname(dirname(dirname(abspath(__file__)))))
 from fleet_interface import FleetInterface
-from fleet_response  import FleetResponse
-from csv import writer
-import csv
+from fleet_response  import FleetResponse, responses_from_frame
 from grid_info_artificial_inertia import GridInfo
 from utils import ensure_ddir
+from impact_metrics import ImpactMetrics
+from fleet_tables import OperatingPoints, BasePower
+import output_policy
 simplefilter('ignore', RankWarning)
 filterwarnings("ignore", category=RuntimeWarning)
 if sys.version_info >= (3,6,7):
     from pandas.plotting import register_matplotlib_converters
     register_matplotlib_converters()
 
+logger = logging.getLogger('fleets.fuel_cell_fleet')
+
+# Voltage drop of a cell with aging (V) after n time steps: AGING_2 * n ** 2 + AGING_1 * n
+AGING_2 = 5.28489722540435e-15
+AGING_1 = 5.36476231386010e-08
+
 
 class FuelCellFleet(FleetInterface):
     """
@@ -84,6 +98,8 @@ class FuelCellFleet(FleetInterface):
         self.fc_pO2 = float(self.config.get(mdl_type, "pO2", fallback=0.8))
         self.fc_x01 = float(self.config.get(mdl_type, "x0_1", fallback=0.7))
         self.fc_x02 = float(self.config.get(mdl_type, "x0_2", fallback=80))
+        self.fc_table_tol = float(self.config.get(mdl_type, "table_tol", fallback=1e-6))
+        self.fc_p_base_steps = int(self.config.get(mdl_type, "p_base_steps", fallback=86400))
         self.fc_Pmin_fleet = float(self.config.get(mdl_type, "Pmin_fleet", fallback=30))
         self.fc_Pmax_fleet = float(self.config.get(mdl_type, "Pmax_fleet", fallback=130))
         self.fc_At = float(self.config.get(mdl_type, "At", fallback=47))
@@ -118,23 +134,22 @@ class FuelCellFleet(FleetInterface):
         self.fc_pbase = join(self.base_path, self.config.get(mdl_type, "power_data", fallback="Pbase.txt"))
 
         if self.config.sections()[0] != mdl_type:
-            print("Error reading config.ini file for model:"+"\t"*3+"%s [FAIL]!!" % mdl_type)
-            print("Model found in config.ini file:"+"\t"*5+"%s!!\n"
-                  "Default modelling parameters will be used!!\n" % self.config.sections()[0])
+            logger.warning("Error reading config.ini file for model:"+"\t"*3+"%s [FAIL]!!", mdl_type)
+            logger.warning("Model found in config.ini file:"+"\t"*5+"%s!!\n"
+                           "Default modelling parameters will be used!!\n", self.config.sections()[0])
         else:
-            print("Model parameters found for:"+"\t"*5+"%s [OKAY]\n" % self.config.sections()[0])
+            logger.info("Model parameters found for:"+"\t"*5+"%s [OKAY]\n", self.config.sections()[0])
 
         # Compute state parameters for the FuelCell fleet model
         self.f = None
         self.__Vi = self.__Ir = self.__Vr_age = self.__Ir_age = self.__p_base = 0.0
-        self.__V_act = self.__Ii = self.__Vr = self.__Ir_age = self.__id0 = 0.0
-        self.__expo = self.__conv = self.__ne = self.__ne_age = 0.0
-        self.__ed_cell = self.__e_cell = self.__p_tot_ideal = self.__p_tot_age = 0.0
+        self.__Vr = self.__ne = self.__ne_age = self.__p_tot_ideal = self.__p_tot_age = 0.0
         self.__Qh2_m = self.__Qh2_m_age = 0.0
         self.__m_dotH2 = self.__m_dotH2_age = 0.0
         self.lka_h2 = self.__Phi = 0.0
         self.__eta_ds = 0.0
         self.__inc = 0
+        self.__progress = output_policy.Progress(logger)
 
         self.fleet_rating = self.fc_Nfc*self.fc_size
 
@@ -174,12 +189,24 @@ class FuelCellFleet(FleetInterface):
         self.R_tot1 = self.fc_R_tot/self.fc_A
         self.fc_At *= self.fc_Nt
         self.fc_len /= 1e3
+        # Open circuit voltage of a cell (V)
+        self.E_rev = self.V_rev + self.fc_R * self.fc_T / 2 / self.fc_F * log(self.fc_pH2 * self.fc_pO2 ** 0.5)
+        # Permeability of the tank to H2 (mol s^-1 m^-1 MPa^-0.5)
+        self.__Phi = self.fc_Phi_0 * exp(-self.fc_E_phi / (self.fc_R * 1e-3) / (self.fc_Ts + 273.15))
+
+        # Operating points of a cell over the operating range of the fleet, used in place of fsolve
+        self.__operating_points = OperatingPoints(self.__vifc_volt, self.vi_solve,
+                                                  self.fc_Pmin_fleet * 1e3 / self.fc_Nfc / self.fc_Nc,
+                                                  self.fc_Pmax_fleet * 1e3 / self.fc_Nfc / self.fc_Nc,
+                                                  self.fc_table_tol)
 
         # Fit the base power profile for FuelCell
         self.p = self.fit_pdat(self.fc_pbase, 5 * 60)
+        self.__base_power = BasePower(self.p, self.fc_p_base_steps)
 
         # Output metrics dataframe
-        self.metrics = [['ts', 'Vr_ideal', 'Vr_age', 'ne_ideal', 'ne_age', 'Soc_ideal', 'Soc_age', 'Lka_H2', 'nds']]
+        self.metrics = ImpactMetrics(['ts', 'Vr_ideal', 'Vr_age', 'ne_ideal', 'ne_age', 'Soc_ideal', 'Soc_age',
+                                      'Lka_H2', 'nds'])
 
     def process_request(self, fleet_request):
         resp = self.fc_model(fleet_request.ts_req, fleet_request.sim_step,
@@ -187,10 +214,79 @@ class FuelCellFleet(FleetInterface):
         return resp
 
     def forecast(self, requests):
-        soc_state, soc_state_age, state = self.soc_ideal, self.soc_age, self.__inc
-        resp = [self.fc_model(req.ts_req, req.sim_step, req.P_req, True, req.start_time) for req in requests]
-        self.soc_ideal, self.soc_age, self.__inc = soc_state, soc_state_age, state
-        return resp
+        """
+        Responses of the fleet to a horizon of requests, without changing the state of the fleet
+        :param requests: list of fleet requests
+        :return resp: list of fleet responses
+        """
+        return responses_from_frame(self.forecast_frame(requests))
+
+    def forecast_frame(self, requests):
+        """
+        Responses of the fleet to a horizon of requests, without changing the state of the fleet.
+        The time steps of fc_model are computed as arrays over the horizon: the moles of H2 in the
+        tank and the leakage are accumulated from copies of their current values.
+        :param requests: list of fleet requests
+        :return frame: DataFrame with a column per FleetResponse attribute and a row per request
+        """
+        n = len(requests)
+        inc = arange(self.__inc, self.__inc + n)
+
+        # Base power profile and power requested
+        p_base = self.__base_power.array(inc)
+        p_req = array([nan if req.P_req is None else req.P_req for req in requests], dtype=float)
+        p_req = where(isnan(p_req) | (p_req == 0.0), p_base, p_req + p_base)
+
+        # Power generated by the fleet, as __fc_p_calc
+        Preq = minimum(maximum(abs(p_req), self.fc_Pmin_fleet), self.fc_Pmax_fleet)
+        Pr = abs(Preq) * 1e3 / self.fc_Nfc / self.fc_Nc  # Watts
+        Vi, Ir = self.__operating_points.array(Pr)
+        Vr, Vr_age, Ir_age = self.__cell_calc(Pr, Vi, Ir, inc)
+        p_tot_ideal = Vr * Ir * self.fc_Nfc * self.fc_Nc * 1e-3
+
+        if self.FW21_Enabled and self.is_autonomous:
+            # frequency_watt, all in kW
+            start_times = [req.start_time for req in requests]
+            f = self.grid.get_frequencies([req.ts_req for req in requests], 0,
+                                          None if None in start_times else start_times)
+            P_pre = p_tot_ideal / self.fc_Pmax_fleet
+            P_min = self.fc_Pmin_fleet / self.fc_Pmax_fleet
+            p_tot_ideal = where(f < 60 - self.fc_db_UF,
+                                minimum(P_pre + ((60 - self.fc_db_UF) - f) / (60 * self.fc_k_UF), 1.0),
+                                where(f > 60 + self.fc_db_OF,
+                                      maximum(P_pre - (f - (60 + self.fc_db_OF)) / (60 * self.fc_k_OF), P_min),
+                                      1.0)) * self.fc_Pmax_fleet
+
+        # Tank, as __soc_calc
+        Qh2_m = self.__h2_flow(Ir)  # (mol/s)
+        m_dotH2 = Qh2_m * 2 / 1e3  # (kg/s)
+        moles_ideal = subtract.accumulate(concatenate([[self.moles_ideal], Qh2_m * 1]))[1:]
+        P_tank_ideal = self.__tank_pressure(moles_ideal)
+        soc_ideal = P_tank_ideal / self.max_charge
+        lka_h2 = add.accumulate(concatenate([[self.lka_h2], self.__leakage(P_tank_ideal) * 1]))[1:]
+        Qh2_m_age = self.__h2_flow(Ir_age)  # (mol/s)
+        moles_age = subtract.accumulate(concatenate([[self.moles_age], Qh2_m_age * 1 - lka_h2 / 2 * 1]))[1:]
+        soc_age = self.__tank_pressure(moles_age) / self.max_charge
+        eta_ds = p_tot_ideal * 1e3 / self.fc_LHV_H2 / (m_dotH2 * 1e3)  # (W/W)
+
+        # Once the tank is at its min. charge, the fleet keeps its last response
+        running = concatenate([[self.P_tank_ideal], P_tank_ideal[:-1]]) > self.min_charge
+        if not running.all():
+            k = flatnonzero(~running)[0]
+            for values, last in ((p_base, self.__p_base), (p_tot_ideal, self.__p_tot_ideal),
+                                 (eta_ds, self.__eta_ds), (soc_ideal, self.soc_ideal)):
+                values[k:] = values[k - 1] if k > 0 else last
+
+        return DataFrame({
+            'ts': [req.ts_req for req in requests], 'sim_step': [req.sim_step for req in requests],
+            'C': 0, 'dT_hold_limit': 0, 'E': soc_ideal, 'Eff_charge': 1.0, 'Eff_discharge': eta_ds,
+            'P_dot_down': 0, 'P_dot_up': 0,
+            'P_togrid': p_tot_ideal, 'P_togrid_max': self.fc_Pmax_fleet, 'P_togrid_min': self.fc_Pmin_fleet,
+            'P_service': p_tot_ideal - p_base, 'P_service_max': self.fc_Pmax_fleet - p_base,
+            'P_service_min': p_base - self.fc_Pmin_fleet,
+            'Q_dot_down': 0, 'Q_dot_up': 0, 'Q_service': 0, 'Q_service_max': 0, 'Q_service_min': 0,
+            'Q_togrid': 0, 'Q_togrid_max': 0, 'Q_togrid_min': 0, 'T_restore': 0,
+            'P_base': p_base, 'Q_base': 0, 'Strike_price': 0, 'SOC_cost': 0}, index=range(n))
 
     def fc_model(self, ts, sim_step, Preq, forecast=False, start_time=None):
         """
@@ -207,10 +303,7 @@ class FuelCellFleet(FleetInterface):
         else:
 
             # Create base power profile
-            if isinstance(self.p, ndarray):
-                self.__p_base = sum([self.p[j] * (self.__inc + 1) ** (21 - j) for j in range(22)])
-            else:
-                self.__p_base = self.p
+            self.__p_base = self.__base_power(self.__inc)
             # Ptogrid: Pbase for None or zero requests since FC is a source
             if Preq is None or float(Preq) == 0.0:
                 Preq = self.__p_base
@@ -265,30 +358,36 @@ class FuelCellFleet(FleetInterface):
 
         # Impact metrics
         if not forecast:
-            self.metrics.append([str(ts), str(self.__Vr), str(self.__Vr_age), str(self.__ne),
-                                 str(self.__ne_age), str(self.soc_ideal * 1e2), str(self.soc_age * 1e2),
-                                 str(self.lka_h2), str(self.__eta_ds * 1e2)])
+            self.metrics.append(ts, self.__Vr, self.__Vr_age, self.__ne, self.__ne_age, self.soc_ideal * 1e2,
+                                self.soc_age * 1e2, self.lka_h2, self.__eta_ds * 1e2)
 
-        # Print Soc every 5 secs.
-        if self.__inc % 5000 == 0:
-            print("Soc:%4.2f%%" % (resp.E*1e2))
+        # Soc of each step, see output_policy.Progress
+        self.__progress.step("Soc:%4.2f%%", resp.E*1e2)
 
         return resp
 
-    def output_metrics(self, filename):
+    def output_metrics(self, filename, binary=False):
+        """
+        :param filename: Name of the impact metrics file, without extension
+        :param binary: Write a .npz file instead of a .csv file
+        """
         base_path = dirname(abspath(__file__))
-        with open(join(base_path, str(filename)+'.csv'), 'w', newline='') as out:
-            write = writer(out)
-            write.writerows(self.metrics)
-            print("Impact metrics created has been created"+"\t"*5+" [OKAY]\n")
+        if binary:
+            self.metrics.save(join(base_path, str(filename)+'.npz'))
+        else:
+            with open(join(base_path, str(filename)+'.csv'), 'w', newline='') as out:
+                self.metrics.write_csv(out)
+        logger.info("Impact metrics created has been created"+"\t"*5+" [OKAY]\n")
 
-    def output_impact_metrics(self, service_name):        
+    def output_impact_metrics(self, service_name, binary=False):
         metrics_dir = join(dirname(dirname(dirname(abspath(__file__)))), 'integration_test', service_name)
         ensure_ddir(metrics_dir)
-        metrics_filename = 'ImpactMetrics_' + service_name + '_FuelCell' + '_' + datetime.now().strftime('%Y%m%dT%H%M')  + '.csv'
-        with open(join(metrics_dir, metrics_filename), 'w') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerows(self.metrics)     
+        metrics_filename = 'ImpactMetrics_' + service_name + '_FuelCell' + '_' + datetime.now().strftime('%Y%m%dT%H%M')
+        if binary:
+            self.metrics.save(join(metrics_dir, metrics_filename + '.npz'))
+        else:
+            with open(join(metrics_dir, metrics_filename + '.csv'), 'w') as csvfile:
+                self.metrics.write_csv(csvfile)
 
     def assigned_service_kW(self):
         return self.fc_ser_wght*self.fleet_rating
@@ -303,33 +402,74 @@ class FuelCellFleet(FleetInterface):
         fb.append(x[0]*x[1]-Pri)
         return fb
 
+    def __vifc_volt(self, i):
+        # Voltage of a cell at the current i (first equation of __vifc_calc), i can be an array
+        E_cell = self.E_rev
+        Vact = (self.fc_R * self.fc_T / self.fc_alpha / self.fc_F) * log((i + self.i_n1) / self.i_01)
+        Vohm = (i + self.i_n1) * self.R_tot1
+        Vcon = self.fc_a * exp(self.b1 * i)
+        return E_cell - Vact - Vohm + Vcon
+
+    def vi_solve(self, Pr):
+        """
+        Voltage and current of a cell solved with fsolve
+        :param Pr: Power of a cell (W)
+        :return Vi, Ir: Voltage (V) and current (A)
+        """
+        Vi, Ir = fsolve(self.__vifc_calc, [self.fc_x01, self.fc_x02],
+                        args=(Pr, self.V_rev, self.fc_T,
+                              self.fc_R, self.fc_alpha, self.fc_F, self.i_n1,
+                              self.i_01, self.R_tot1, self.fc_a, self.b1,
+                              self.fc_pH2, self.fc_pO2))
+        return Vi, Ir
+
+    def vi_calc(self, Pr):
+        """
+        Voltage and current of a cell interpolated in the operating point table, solved with fsolve
+        outside of the table or if table_tol is 0
+        :param Pr: Power of a cell (W)
+        :return Vi, Ir: Voltage (V) and current (A)
+        """
+        return self.__operating_points(Pr)
+
+    def __cell_calc(self, Pr, Vi, Ir, inc):
+        # Voltage of a cell w/o and w/ aging, and current w/ aging, at the time steps inc, for the power
+        # of a cell Pr and its operating point Vi, Ir. Scalars or arrays.
+        Vact = (self.fc_R * self.fc_T / self.fc_alpha / self.fc_F) * log((Ir + self.i_n1) / self.i_01)
+        Vohm = (Ir + self.i_n1) * self.R_tot1
+        Vcon = self.fc_a * exp(self.b1 * Ir)
+        id0 = Ir / self.fc_A
+        Ed_cell = self.fc_Lambda * (id0 - id0 * exp(inc / self.fc_Tau_e))
+        E_cell = self.E_rev - Ed_cell
+        Vr = E_cell - Vact - Vohm + Vcon
+        # if Vr > Vi:   Vr = Vi, with min() for a time step (much faster than minimum() on scalars)
+        Vr = minimum(Vr, Vi) if isinstance(Vr, ndarray) else min(Vr, Vi)
+        Vr_age = Vr - AGING_2 * (inc + 1) ** 2 - AGING_1 * (inc + 1)
+        return Vr, Vr_age, Pr / Vr_age
+
+    def __h2_flow(self, Ir):
+        # Flow of H2 consumed by the fleet (mol/s) at the current of a cell Ir
+        return self.fc_Nfc * self.fc_Nc * Ir / 2 / self.fc_F
+
+    def __tank_pressure(self, moles):
+        # Pressure in a tank (Pa) with moles of H2 in the tanks
+        return moles / self.fc_Nt * self.fc_R * (self.fc_Ts + 273.15) / self.fc_V_tank
+
+    def __leakage(self, P_tank):
+        # Hydrogen leakage from the tanks (g/s) at the pressure P_tank
+        # fugacity
+        f = P_tank * 1e-6 * exp(P_tank * 1e-6 * self.fc_b1 / (self.fc_R * 1e-3) / (self.fc_Ts + 273.15))
+        J = self.__Phi / self.fc_len * 2 * f ** 0.5  # (g m^-2 s^-1)
+        return J * self.fc_At
+
     def __fc_p_calc(self, p_req):
         # Check for operating range of the fleet
         Preq = float(self.P_opt(abs(p_req), self.fc_Pmin_fleet, self.fc_Pmax_fleet))
 
         Pr = abs(Preq) * 1e3 / self.fc_Nfc / self.fc_Nc  # Watts
         # Compute voltage and current for 1 FuelCell stack
-        self.__Vi, self.__Ir = fsolve(self.__vifc_calc, [self.fc_x01, self.fc_x02],
-                                      args=(Pr, self.V_rev, self.fc_T,
-                                            self.fc_R, self.fc_alpha, self.fc_F, self.i_n1,
-                                            self.i_01, self.R_tot1, self.fc_a, self.b1,
-                                            self.fc_pH2, self.fc_pO2))
-
-        self.__Vact = (self.fc_R * self.fc_T / self.fc_alpha / self.fc_F) * log((self.__Ir + self.i_n1) / self.i_01)
-        self.__Vohm = (self.__Ir + self.i_n1) * self.R_tot1
-        self.__Vcon = self.fc_a * exp(self.b1 * self.__Ir)
-        self.__Ii = self.__Ir * 1e3 / self.fc_A
-        self.__id0 = self.__Ir / self.fc_A
-        self.__expo = exp(self.__inc / self.fc_Tau_e)
-        self.__conv = convolve(self.__id0, self.__expo)[0]
-        self.__Ed_cell = self.fc_Lambda * (self.__id0 - self.__conv)
-        self.__E_cell = self.V_rev + self.fc_R * self.fc_T / 2 / self.fc_F * log(self.fc_pH2 * self.fc_pO2 ** 0.5) - self.__Ed_cell
-
-        self.__Vr = self.__E_cell - self.__Vact - self.__Vohm + self.__Vcon
-        # if Vr > Vi:   Vr = Vi
-        self.__Vr = min(self.__Vr, self.__Vi)
-        self.__Vr_age = self.__Vr - 5.28489722540435e-15 * (self.__inc + 1) ** 2 - 5.36476231386010e-08 * (self.__inc + 1)
-        self.__Ir_age = Pr / self.__Vr_age
+        self.__Vi, self.__Ir = self.vi_calc(Pr)
+        self.__Vr, self.__Vr_age, self.__Ir_age = self.__cell_calc(Pr, self.__Vi, self.__Ir, self.__inc)
         self.__ne = self.__Vr / 1.48
         self.__ne_age = self.__Vr_age / 1.48
         # (kW)
@@ -339,36 +479,29 @@ class FuelCellFleet(FleetInterface):
     def __soc_calc(self):
 
         # Flow of H2 consumed
-        self.__Qh2_m = self.fc_Nfc * self.fc_Nc * self.__Ir / 2 / self.fc_F  # (mol/s)
-        self.__Qh2_m_age = self.fc_Nfc * self.fc_Nc * self.__Ir_age / 2 / self.fc_F  # (mol/s)
+        self.__Qh2_m = self.__h2_flow(self.__Ir)  # (mol/s)
+        self.__Qh2_m_age = self.__h2_flow(self.__Ir_age)  # (mol/s)
         self.__m_dotH2 = self.__Qh2_m * 2 / 1e3  # (kg/s)
         self.__m_dotH2_age = self.__Qh2_m_age * 2 / 1e3  # (kg/s)
 
         # Storage Tank
         # Number of moles in time i in the tank
         self.moles_ideal -= self.__Qh2_m * 1
-        self.P_tank_ideal = self.moles_ideal / self.fc_Nt * self.fc_R * (self.fc_Ts + 273.15) / self.fc_V_tank
+        self.P_tank_ideal = self.__tank_pressure(self.moles_ideal)
         self.soc_ideal = self.P_tank_ideal / self.max_charge
 
-        # Compute hydrogen leakage from tank
-        self.__Phi = self.fc_Phi_0 * exp(
-            -self.fc_E_phi / (self.fc_R * 1e-3) / (self.fc_Ts + 273.15))  # (mol s^-1 m^-1 MPa^-0.5)
-        # fugacity
-        f = self.P_tank_ideal * 1e-6 * exp(
-            self.P_tank_ideal * 1e-6 * self.fc_b1 / (self.fc_R * 1e-3) / (self.fc_Ts + 273.15))
-        J = self.__Phi / self.fc_len * 2 * f ** 0.5  # (g m^-2 s^-1)
-        lk_H2 = J * self.fc_At  # (g/s)
         # total hydrogen lost in time t (g)
-        self.lka_h2 += J * self.fc_At * 1
+        self.lka_h2 += self.__leakage(self.P_tank_ideal) * 1
         self.moles_age -= self.__Qh2_m_age * 1 - self.lka_h2 / 2 * 1
-        self.P_tank_age = self.moles_age / self.fc_Nt * self.fc_R * (self.fc_Ts + 273.15) / self.fc_V_tank
+        self.P_tank_age = self.__tank_pressure(self.moles_age)
         self.soc_age = self.P_tank_age / self.max_charge
 
         # Discharging efficiency
         self.__eta_ds = self.__p_tot_ideal * 1e3 / self.fc_LHV_H2 / (self.__m_dotH2 * 1e3)  # (W/W)
 
         if self.soc_ideal > 1.0 or self.soc_ideal < 0.0:
-            sys.exit(print("Soc limit violation!!" + "\t" * 6 + " [!!]\n"))
+            logger.error("Soc limit violation!!" + "\t" * 6 + " [!!]\n")
+            sys.exit()
 
     @staticmethod
     def bool_check(b_in):
@@ -410,7 +543,7 @@ class FuelCellFleet(FleetInterface):
                 raise Exception("\tUnable to infer time interval from input data\n"
                                 "\tPlease specify the time_interval parameter in seconds!!\n")
             if any(i in interval for i in ('L', 'ms', 'U', 'us', 'N')) is False:
-                print("Power data time-interval is at least in seconds:\t\t[OKAY]")
+                logger.info("Power data time-interval is at least in seconds:\t\t[OKAY]")
                 df = read_csv(filename, header=None, parse_dates=[0], names=['datetime', 'Pval'])
                 df['sec'] = df['datetime'].sub(df['datetime'].iloc[0]).dt.total_seconds()
             else:
@@ -430,7 +563,7 @@ class FuelCellFleet(FleetInterface):
                 # Set Pbase as an average of Pmin and Pmax operating range of a single FuelCell fleet
                 p_val = sum([self.fc_Pmax_fleet + self.fc_Pmin_fleet]) / 2.0
                 warn("File not found. Please ensure path or file name is correct for power_data in config.ini!!")
-                print("Pbase is set as a constant to %4.2fkW" % p_val)
+                logger.info("Pbase is set as a constant to %4.2fkW", p_val)
         return p_val
 
     @staticmethod
@@ -7,6 +7,7 @@ creating and controlling a fleet of water heaters
 
 # code needed for GLOBAL fleet_interface
 import sys
+import logging
 from os.path import dirname, abspath, join
 
 sys.path.insert(0, dirname(dirname(dirname(abspath(__file__)))))
@@ -34,6 +35,7 @@ import time
 import csv
 import os
 
+logger = logging.getLogger('fleets.water_heater_fleet')
 
 class WaterHeaterFleet(FleetInterface):  # FleetInterface
     """
@@ -633,12 +635,12 @@ class WaterHeaterFleet(FleetInterface):  # FleetInterface
         self.n_days_base = 1  # Only consider 1 day simulation, self.n_days_base
         sim_time = self.n_days_base * self.sim_step
 
-        print("Running day-ahead baseline simulation ...")
-        print("Running baseline right away charging strategy ...")
+        logger.info("Running day-ahead baseline simulation ...")
+        logger.info("Running baseline right away charging strategy ...")
         baseline_soc, baseline_power, baseline_cycles, baseline_Ttank = self.run_baseline_right_away(self.n_days_base,
                                                                                                      sim_time)
 
-        print("Exported baseline soc, Temperatures, power and HVAC cycles ...")
+        logger.info("Exported baseline soc, Temperatures, power and HVAC cycles ...")
 
         # Already saved inside the right away function
         # baseline_soc.to_csv(join(path, r'SOC_baseline.csv'), index = False)
@@ -646,7 +648,7 @@ class WaterHeaterFleet(FleetInterface):  # FleetInterface
         # baseline_Tin.to_csv(join(path, r'Tin_baseline.csv'), index = False)
         # baseline_Tin_max.to_csv(join(path, r'Tin_max_baseline.csv'), index = False)
         # baseline_Tin_min.to_csv(join(path, r'Tin_min_baseline.csv'), index = False)
-        print("Exported")
+        logger.info("Exported")
 
     def run_baseline_right_away(self, n_days_base, sim_time):
         # Run a baseline simulation with (P_request = None)
@@ -58,6 +58,19 @@ class GridInfo:
         idx = np.searchsorted(self.time, Trelative, side="left")
         return self.frequency[idx - 1, location]
 
+    def get_frequencies(self, tcur, location=0, tstart=None):
+        # Frequencies at the times in the sequence tcur, as get_frequency returns them one at a time.
+        tcur = np.asarray(tcur, dtype='datetime64[us]')
+        if tstart is None:
+            tstart = tcur.astype('datetime64[D]')
+        Trelative = (tcur - np.asarray(tstart, dtype='datetime64[us]')) / np.timedelta64(1, 's')
+
+        if np.any(Trelative > self.time[-1]):
+            raise ValueError('Exceeded the end of time for artificial inertia service.')
+
+        idx = np.searchsorted(self.time, Trelative, side="left")
+        return self.frequency[idx - 1, location]
+
     def get_voltage(self, tcur=datetime.utcnow(), location=0, tstart=None):
         # Tst indicates the service start time.
         # Tcur is current time.
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*- {{{
+#
+# Your license here
+# }}}
+"""
+Impact metrics of a fleet, recorded as numbers
+
+A fleet appends one row per time step: the time step and a float per metric.
+The rows are kept in arrays of CHUNK rows, a new one is allocated when the
+last one is full, and the metrics are only converted to text when they are
+written to a .csv file. save() writes them as a .npz file instead.
+"""
+
+from datetime import datetime, timedelta
+import numpy as np
+
+CHUNK = 86400
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+
+class ImpactMetrics:
+    """
+    Impact metrics of a fleet, one row per time step
+    """
+
+    def __init__(self, columns, chunk=CHUNK):
+        """
+        :param columns: names of the columns, the time step first
+        :param chunk: number of rows allocated at a time
+        """
+        self.columns = list(columns)
+        self.chunk = chunk
+        self.__ts = []
+        self.__values = []
+        self.__n = self.chunk
+
+    def __len__(self):
+        return (len(self.__ts) - 1) * self.chunk + self.__n if self.__ts else 0
+
+    def append(self, ts, *values):
+        """
+        Record the metrics of a time step, None is kept as nan
+
+        :param ts: time step (datetime)
+        :param values: a value per metric
+        """
+        if self.__n == self.chunk:
+            self.__ts.append(np.empty(self.chunk, dtype='int64'))
+            self.__values.append(np.empty((self.chunk, len(self.columns) - 1)))
+            self.__n = 0
+        # Microseconds since the epoch, much faster to store than a datetime64
+        self.__ts[-1][self.__n] = (ts - EPOCH) // MICROSECOND
+        self.__values[-1][self.__n] = values
+        self.__n += 1
+
+    def arrays(self):
+        """
+        :return ts, values: time steps (datetime64) and an array with a row per time step
+        """
+        if not self.__ts:
+            return np.empty(0, dtype='datetime64[us]'), np.empty((0, len(self.columns) - 1))
+        n = len(self)
+        return np.concatenate(self.__ts)[:n].view('datetime64[us]'), np.concatenate(self.__values)[:n]
+
+    def write_csv(self, out):
+        """
+        Write the metrics as text, with a header row, nan as None
+
+        :param out: file opened for writing
+        """
+        ts, values = self.arrays()
+        # Times as str(datetime) writes them: without the microseconds on whole seconds
+        text = np.datetime_as_string(ts, unit='us')
+        seconds = ts == ts.astype('datetime64[s]')
+        text[seconds] = np.datetime_as_string(ts[seconds], unit='s')
+        columns = [[t.replace('T', ' ') for t in text.tolist()]]
+        for column in values.T:
+            text = list(map(str, column.tolist()))
+            for k in np.flatnonzero(np.isnan(column)):
+                text[k] = 'None'
+            columns.append(text)
+        # The rows as csv.writer writes them, none of the values need quotes
+        out.write(','.join(self.columns) + '\r\n')
+        out.writelines(','.join(row) + '\r\n' for row in zip(*columns))
+
+    def save(self, filename):
+        """
+        Write the metrics to a .npz file: an array per column, the time steps as datetime64
+        """
+        ts, values = self.arrays()
+        np.savez(filename, **dict(zip(self.columns, [ts] + list(values.T))))
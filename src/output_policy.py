@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*- {{{
+#
+# Your license here
+# }}}
+"""
+Run-wide output policy of the services
+
+The services report their progress through loggers under 'services', the
+fleets through loggers under 'fleets', and the services draw their figures with plot(draw, *args), where draw is a module-level
+function that draws one figure and saves it (save) or shows it (show).
+The policy decides for the whole run:
+
+- plots: NOW draws each figure when the service asks for it, DEFERRED keeps
+  the figures until finish() is called at the end of the run, OFF skips them
+- background: the figures are drawn in a background process with the Agg
+  backend, so the run does not wait for matplotlib. The process is spawned,
+  so the script of the run needs the usual if __name__ == '__main__': guard
+- show: figures meant to be looked at (e.g. the dispatch heat maps of the
+  EnergyMarketService) are also shown with plt.show(), which waits for the
+  window to be closed. They are only saved in the background process
+- level: logging level of the services and fleets, DEBUG prints every time
+  step, INFO the progress of the run, WARNING only problems
+- levels: levels of single components, by logger name, over level, e.g.
+  {'fleets': logging.WARNING, 'services.reg_service': logging.DEBUG}
+- progress: seconds between two progress messages of a loop at INFO (see
+  Progress)
+
+Batch runs on servers use e.g.
+
+    output_policy.set_policy(output_policy.silent())
+    ... run the services ...
+    output_policy.finish()
+"""
+
+import sys
+import time
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib.pyplot as plt
+
+NOW = 'now'
+DEFERRED = 'deferred'
+OFF = 'off'
+
+logger = logging.getLogger('services')
+fleet_logger = logging.getLogger('fleets')
+
+
+class OutputPolicy:
+    """
+    Plotting and logging settings of a run, see the module docstring
+    """
+
+    def __init__(self, plots=NOW, background=False, show=True, level=logging.INFO, levels=None, progress=10.):
+        if plots not in [NOW, DEFERRED, OFF]:
+            raise ValueError("plots has to be one of '%s', '%s' or '%s'" % (NOW, DEFERRED, OFF))
+        self.plots = plots
+        self.background = background
+        self.show = show
+        self.level = level
+        self.levels = dict(levels or {})
+        self.progress = progress
+
+
+def silent():
+    """
+    Policy of batch runs: no figures, only warnings and errors are logged
+    """
+    return OutputPolicy(plots=OFF, show=False, level=logging.WARNING)
+
+
+def verbose():
+    """
+    Policy of debugging runs: every time step of the services and fleets is logged
+    """
+    return OutputPolicy(level=logging.DEBUG)
+
+
+class Progress:
+    """
+    Progress of a loop, logged by step(msg, *args) at each of its steps:
+
+    - every step at DEBUG, when the logger is enabled for DEBUG
+    - at most every policy.progress seconds at INFO (the first step, then the
+      first step after each interval)
+    - nothing otherwise: the message is not formatted and the clock is not read
+
+        progress = output_policy.Progress(logger)
+        for ts in times:
+            progress.step('Processing request at timestep %s', ts)
+
+    The arguments are formatted only when the message is logged, so they
+    should be values, not formatted strings.
+    """
+
+    def __init__(self, logger, interval=None):
+        """
+        :param logger: logger of the component
+        :param interval: seconds between two messages at INFO, policy.progress by default
+        """
+        self.logger = logger
+        self.interval = interval
+        self.steps = 0
+        self.__next = None
+
+    def step(self, msg, *args):
+        self.steps += 1
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(msg, *args)
+            return
+        now = time.monotonic()
+        if self.__next is None or now >= self.__next:
+            self.__next = now + (_policy.progress if self.interval is None else self.interval)
+            self.logger.info(msg, *args)
+
+
+_policy = OutputPolicy()
+_deferred = []
+_futures = []
+_executor = None
+
+
+def get_policy():
+    return _policy
+
+
+def set_policy(policy):
+    """
+    Set the output policy of the run, and the levels of the services' and fleets' loggers
+
+    :param policy: an instance of OutputPolicy
+    """
+    global _policy
+    for name in _policy.levels:
+        if name not in [logger.name, fleet_logger.name]:
+            logging.getLogger(name).setLevel(logging.NOTSET)
+    _policy = policy
+    for root in [logger, fleet_logger]:
+        if not root.handlers:
+            # Messages are printed as they were before the services and fleets used logging
+            handler = logging.StreamHandler(sys.stdout)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            root.addHandler(handler)
+            root.propagate = False
+        root.setLevel(policy.level)
+    for name, level in policy.levels.items():
+        logging.getLogger(name).setLevel(level)
+
+
+def plot(draw, *args, **kwargs):
+    """
+    Draw a figure with draw(*args, **kwargs) as the policy says
+
+    :param draw: module-level function (it is sent to the background process by name)
+    """
+    if _policy.plots == OFF:
+        return
+    if _policy.plots == DEFERRED:
+        _deferred.append((draw, args, kwargs))
+        return
+    _render(draw, args, kwargs)
+
+
+def finish():
+    """
+    Draw the deferred figures and wait for the background process to finish drawing
+    """
+    global _executor
+    while _deferred:
+        draw, args, kwargs = _deferred.pop(0)
+        _render(draw, args, kwargs)
+    try:
+        while _futures:
+            # Re-raise the errors of the background process
+            _futures.pop(0).result()
+    finally:
+        if _executor is not None:
+            _executor.shutdown()
+            _executor = None
+
+
+def save(filename):
+    """
+    Save the current figure to filename and close it
+    """
+    plt.savefig(filename, bbox_inches='tight')
+    plt.close()
+
+
+def show(filename):
+    """
+    Save the current figure to filename, show it if the policy allows it and close it
+    """
+    plt.savefig(filename, bbox_inches='tight')
+    if _policy.show:
+        plt.show()
+    plt.close()
+
+
+def _render(draw, args, kwargs):
+    if _policy.background:
+        _futures.append(_background().submit(draw, *args, **kwargs))
+    else:
+        draw(*args, **kwargs)
+
+
+def _background():
+    # One background process, started at the first figure and stopped by finish()
+    global _executor
+    if _executor is None:
+        # A new interpreter rather than a fork: the run may already have an interactive backend loaded
+        _executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=_init_background, initargs=(_policy.level, _policy.levels))
+    return _executor
+
+
+def _init_background(level, levels):
+    plt.switch_backend('Agg')
+    set_policy(OutputPolicy(show=False, level=level, levels=levels))
+
+
+set_policy(_policy)
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*- {{{
+#
+# Your license here
+# }}}
+"""
+Results of a service written to a file in blocks
+
+A ResultWriter keeps the file open and the rows in memory, and writes them
+every BLOCK rows, and at close(). Used as a context manager, the rows kept
+are written even when the run fails:
+
+    with ResultWriter(filename) as results:
+        results.write_row('Time', 'service efficacy (%)')
+        results.write_rows(ts, service_efficacy)
+
+The rows are written as csv.writer writes them, or, with binary=True, as
+records of a time (datetime64) and a float per column, which read_results()
+reads back as a structured array.
+"""
+
+import csv
+import numpy as np
+import pandas as pd
+
+BLOCK = 10000
+
+
+def result_dtype(columns):
+    """
+    Records of the binary files: the time step first, then a float per column
+    """
+    return np.dtype([(columns[0], 'datetime64[us]')] + [(column, 'float64') for column in columns[1:]])
+
+
+def read_results(filename, columns):
+    """
+    :return: the records of a binary file written by ResultWriter, a structured array
+    """
+    return np.fromfile(filename, dtype=result_dtype(columns))
+
+
+class ResultWriter:
+    """
+    Rows of results written through one open file, in blocks of rows
+    """
+
+    def __init__(self, filename, columns=None, block=BLOCK, binary=False, mode='a'):
+        """
+        :param filename: file of the results, appended to by default, as the services do
+        :param columns: names of the columns, the time step first (needed by the binary files)
+        :param block: number of rows kept before they are written
+        :param binary: write records instead of text
+        """
+        if binary and columns is None:
+            raise ValueError('The columns of a binary file have to be given')
+        self.columns = columns
+        self.block = block
+        self.binary = binary
+        self.__rows = []
+        self.__file = open(filename, mode + 'b' if binary else mode, **({} if binary else {'newline': ''}))
+        if not binary:
+            self.__writer = csv.writer(self.__file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write_row(self, *values):
+        """
+        Keep a row, and write the rows kept once there is a block of them
+        """
+        self.__rows.append(values)
+        if len(self.__rows) >= self.block:
+            self.flush()
+
+    def write_rows(self, *columns):
+        """
+        Write the rows of columns of values (e.g. arrays of the values of all the time steps)
+        """
+        if self.binary:
+            # The records are filled a column at a time
+            self.flush()
+            records = np.empty(len(columns[0]), dtype=result_dtype(self.columns))
+            records[self.columns[0]] = pd.to_datetime(columns[0]).to_numpy(dtype='datetime64[us]')
+            for name, column in zip(records.dtype.names[1:], columns[1:]):
+                records[name] = column
+            for start in range(0, len(records), self.block):
+                records[start:start + self.block].tofile(self.__file)
+            self.__file.flush()
+            return
+        columns = [column.tolist() if isinstance(column, np.ndarray) else column for column in columns]
+        for start in range(0, len(columns[0]), self.block):
+            self.__rows.extend(zip(*[column[start:start + self.block] for column in columns]))
+            self.flush()
+
+    def flush(self):
+        """
+        Write the rows kept
+        """
+        if self.binary:
+            np.array(self.__rows, dtype=result_dtype(self.columns)).tofile(self.__file)
+        else:
+            self.__writer.writerows(self.__rows)
+        self.__rows = []
+        self.__file.flush()
+
+    def close(self):
+        if not self.__file.closed:
+            try:
+                self.flush()
+            finally:
+                self.__file.close()
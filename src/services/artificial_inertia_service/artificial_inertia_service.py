@@ -11,17 +11,27 @@ from os.path import dirname, abspath, join
 from grid_info_artificial_inertia import GridInfo
 import matplotlib.pyplot as plt
 import csv
+import logging
 import numpy as np
+import pandas as pd
 
 sys.path.insert(0, dirname(dirname(dirname(abspath(__file__)))))
 
+import output_policy
 from fleet_request import FleetRequest
 from fleet_config import FleetConfig
+from utils import ensure_ddir
+
+logger = logging.getLogger('services.artificial_inertia_service')
 
 
 class ArtificialInertiaService():
+    # Period of the artificial inertia event from the service start time
+    duration = timedelta(seconds=149)
+
     def __init__(self, fleet_device=None):
         self.fleet_device = fleet_device
+        self._grid = None
 
     @property
     def fleet(self):
@@ -30,6 +40,7 @@ class ArtificialInertiaService():
     @fleet.setter
     def fleet(self, value):
         self.fleet_device = value
+        self._grid = None
 
     def request_loop(self, start_time, sim_step):
         responses = []
@@ -38,7 +49,8 @@ class ArtificialInertiaService():
         #delt = timedelta(seconds=2 / 60)
         delt = sim_step
         cur_time = start_time
-        end_time = cur_time + timedelta(seconds=149)
+        end_time = cur_time + self.duration
+        progress = output_policy.Progress(logger)
         while cur_time < end_time:
             fleet_request = FleetRequest(cur_time, delt, start_time)
             fleet_response = self.fleet_device.process_request(fleet_request)
@@ -46,70 +58,34 @@ class ArtificialInertiaService():
 
             responses.append(fleet_response)
             cur_time += delt
-            print("{}".format(cur_time))
+            progress.step("%s", cur_time)
 
         return responses
 
     def calculation(self, fleetname, responses, start_time, **kwargs):
         # Do calculation with responses
         # responses []
-        p_service = []
-        p_togrid = []
-        t = []
-        f = []
-
-        sum = 0
-        grid = GridInfo('Grid_Info_data_artificial_inertia.csv')
-
         # extract time, frequency and power responses data
-        for response in responses:
-
-            f.append(grid.get_frequency(response.ts, 0, start_time))
-            p_service.append(response.P_service)
-            p_togrid.append(response.P_togrid)
-            t.append(response.ts)
+        t = [response.ts for response in responses]
+        p_service = [response.P_service for response in responses]
+        p_togrid = [response.P_togrid for response in responses]
+        times = pd.DatetimeIndex(t).values
+        f = self.grid.get_frequencies(times, 0, start_time).tolist()
 
         integration_test_result_dir = join( dirname(dirname(dirname(abspath(__file__))) ), 'integration_test', 'artificial_inertia')
+        ensure_ddir(integration_test_result_dir)
 
         # plot extracted data
         # time versus Pservice
-        fig, ax1 = plt.subplots()
-        ax1.set_title('Pservice and Ptogrid Responses')
-        l1, = ax1.plot(t, p_service, 'b-', label='service power')
-        l2, = ax1.plot(t, p_togrid, 'k-', label='power to grid')
-        ax1.set_ylabel('Power (kW)', color='b')
-        ax1.tick_params('y', colors='b')
-        ax1.set_xlabel('Time')
-
-        ax2 = ax1.twinx()
-        l3, = ax2.plot(t,  f, 'r-', label='frequency')
-        ax2.set_ylabel('f (Hz)', color='r')
-        ax2.tick_params('y', colors='r')
-
-        plt.legend(handles=[l1, l2, l3])
-
         plot_filename = datetime.now().strftime('%Y%m%d') + '_ArtificialInertia_' + fleetname + '.png'
-        plot_dir = integration_test_result_dir
-
-        plt.savefig(join(plot_dir, plot_filename), bbox_inches='tight')
+        output_policy.plot(plot_power, t, p_service, p_togrid, f, join(integration_test_result_dir, plot_filename))
 
         # frequency versus Pservice
-        fig2, ax2 = plt.subplots()
-        ax2.set_title('Frequency versus Pservice')
-        ax2.plot(f, p_service, 'b-', label='service power')
-        ax2.set_ylabel('Power (kW)', color='b')
-        ax2.tick_params('y', colors='b')
-        ax2.set_xlabel('frequency (Hz)')
-
         plot_filename = datetime.now().strftime('%Y%m%d') + '_ArtificialInertia_' + fleetname + '_f_Pservice.png'
-        plot_dir = integration_test_result_dir
-
-        plt.savefig(join(plot_dir, plot_filename), bbox_inches='tight')
+        output_policy.plot(plot_frequency_power, f, p_service, join(integration_test_result_dir, plot_filename))
 
         # calculate performance metrics
-        p_base = (np.array(p_service) - np.array(p_togrid)).tolist()
-        service_energy = 0.0
-        base_energy = 0.0
+        p_base = np.array(p_service, dtype=float) - np.array(p_togrid, dtype=float)
 
         if kwargs != {}:
             if len(kwargs) != 2:
@@ -119,54 +95,97 @@ class ArtificialInertiaService():
 
             if metrics_calc_start_time < start_time:
                 raise ValueError('Start time for metrics calculation cannot be smaller than service start time.')
-            elif metrics_calc_end_time > start_time + timedelta(seconds=149):
+            elif metrics_calc_end_time > start_time + self.duration:
                 raise ValueError('End time for metrics calculation cannot exceed total period of artificial inertia grid service.')
 
-            for tstart_idx in range(1, len(t)+1):
-                if t[tstart_idx-1] < metrics_calc_start_time and metrics_calc_start_time <= t[tstart_idx]:
-                    break
-
-            for tend_idx in range(1, len(t)+1):
-                if t[tend_idx-1] < metrics_calc_end_time and metrics_calc_end_time <= t[tend_idx]:
-                    break
-
-            for t_idx in range(tstart_idx+1, tend_idx):
-                service_energy += ( t[t_idx] - t[t_idx-1] ).total_seconds() * ( p_service[t_idx-1] + p_service[t_idx] ) * 0.5
-                base_energy += ( t[t_idx] - t[t_idx-1] ).total_seconds() * ( p_base[t_idx-1] + p_base[t_idx] ) * 0.5
-
-            try:
-                service_efficacy = service_energy / base_energy
-            except ZeroDivisionError:
-                print('Base energy is zero.')
-
-            # print(service_efficacy)
-
+            service_energy, base_energy = self.energies(times, p_service, p_base, metrics_calc_start_time,
+                                                        metrics_calc_end_time)
         else:
-            for t_idx in range(1, len(t)):
-                service_energy += ( t[t_idx] - t[t_idx - 1] ).total_seconds() * ( p_service[t_idx - 1] + p_service[t_idx]) * 0.5
-                base_energy += ( t[t_idx] - t[t_idx - 1] ).total_seconds() * ( p_base[t_idx - 1] + p_base[t_idx] ) * 0.5
+            service_energy, base_energy = self.energies(times, p_service, p_base)
 
-            try:
-                service_efficacy = service_energy / base_energy
-            except ZeroDivisionError:
-                print('Base energy is zero.')
+        try:
+            service_efficacy = service_energy / base_energy
+        except ZeroDivisionError:
+            logger.warning('Base energy is zero.')
 
         # write results into .csv file
         csv_file_name = datetime.now().strftime('%Y%m%d') + '_ArtificialInertia_' + fleetname + '.csv'
+        # The time of each row is formatted once per second
+        seconds, second_index = np.unique(times.astype('datetime64[s]'), return_inverse=True)
+        time_labels = np.asarray(pd.DatetimeIndex(seconds).strftime('%m/%d/%Y, %H:%M:%S'), dtype=object)[second_index]
 
         with open(join(integration_test_result_dir, csv_file_name), 'w', newline='') as csvfile:
             csvwriter = csv.writer(csvfile, delimiter=',')
-            # csvwriter = csv.writer(csvfile, delimiter=' ', quotechar='|', quoting=csv.QUOTE_MINIMAL)
             csvwriter.writerow(['time', 'frequency', 'service power', 'power to grid'])
-            for tidx in range(len(t)):
-                csvwriter.writerow([t[tidx].strftime('%m/%d/%Y, %H:%M:%S'), str(f[tidx]), str(p_service[tidx]), str(p_togrid[tidx])])
+            csvwriter.writerows(zip(time_labels, map(str, f), map(str, p_service), map(str, p_togrid)))
             csvwriter.writerow(['service efficacy=%06.4f' % service_efficacy])
-            # or csvwriter.writerow(['service efficacy={:06.4f}'.format(service_efficacy)])
-
-        csvfile.close()
 
         return service_efficacy, p_service, p_togrid, t, f
 
+    def energies(self, t, p_service, p_base, metrics_calc_start_time=None, metrics_calc_end_time=None):
+        """
+        Service and base energy (kW*s) of the responses, integrated with the trapezoid rule from the first
+        response at or after metrics_calc_start_time to the last response before metrics_calc_end_time
+        (all the responses by default)
+
+        :param t: times of the responses, in order
+        :param p_service: service power of the responses (kW)
+        :param p_base: base power of the responses (kW)
+        :return (service_energy, base_energy): floats
+        """
+        t = np.asarray(t, dtype='datetime64[us]')
+        first = 0
+        last = len(t)
+        if metrics_calc_start_time is not None:
+            first = np.searchsorted(t, np.datetime64(metrics_calc_start_time, 'us'), side='left')
+            last = np.searchsorted(t, np.datetime64(metrics_calc_end_time, 'us'), side='left')
+
+        # Trapezoids between consecutive responses, summed in time order
+        dt = np.diff(t[first:last]) / np.timedelta64(1, 's')
+        energies = []
+        for p in (np.asarray(p_service, dtype=float)[first:last], np.asarray(p_base, dtype=float)[first:last]):
+            areas = dt * (p[:-1] + p[1:]) * 0.5
+            energies.append(float(np.cumsum(areas)[-1]) if len(areas) > 0 else 0.0)
+        return tuple(energies)
+
+    @property
+    def grid(self):
+        # Grid data of the artificial inertia event: the fleet's, or read once if the fleet does not have it
+        if self._grid is None:
+            grid = getattr(self.fleet_device, 'grid', None)
+            self._grid = grid if isinstance(grid, GridInfo) else GridInfo('Grid_Info_data_artificial_inertia.csv')
+        return self._grid
+
+
+def plot_power(t, p_service, p_togrid, f, filename):
+    # Service power, power to grid and frequency versus time
+    fig, ax1 = plt.subplots()
+    ax1.set_title('Pservice and Ptogrid Responses')
+    l1, = ax1.plot(t, p_service, 'b-', label='service power')
+    l2, = ax1.plot(t, p_togrid, 'k-', label='power to grid')
+    ax1.set_ylabel('Power (kW)', color='b')
+    ax1.tick_params('y', colors='b')
+    ax1.set_xlabel('Time')
+
+    ax2 = ax1.twinx()
+    l3, = ax2.plot(t,  f, 'r-', label='frequency')
+    ax2.set_ylabel('f (Hz)', color='r')
+    ax2.tick_params('y', colors='r')
+
+    plt.legend(handles=[l1, l2, l3])
+    output_policy.save(filename)
+
+
+def plot_frequency_power(f, p_service, filename):
+    # Service power versus frequency
+    fig2, ax2 = plt.subplots()
+    ax2.set_title('Frequency versus Pservice')
+    ax2.plot(f, p_service, 'b-', label='service power')
+    ax2.set_ylabel('Power (kW)', color='b')
+    ax2.tick_params('y', colors='b')
+    ax2.set_xlabel('frequency (Hz)')
+    output_policy.save(filename)
+
 
 if __name__ == "__main__":
     #import numpy as np
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Runtime of ArtificialInertiaService.calculation
+
+Times the calculation of the frequency, energies and service efficacy of an
+artificial inertia event, and the writing of its .csv file, as calculation
+did it before (frequencies looked up and energies summed one response at a
+time, rows written one at a time, with a new GridInfo) and as it does now,
+for the 149 s event of the grid data at 1/30 s, and for events of 1 and 3
+hours at 0.1 s on synthetic grid data. The responses are synthetic and the
+figures are turned off (output_policy.silent()).
+
+Usage: python benchmark.py
+"""
+import sys
+import os
+import csv
+from os.path import dirname, abspath, join
+sys.path.insert(0, dirname(dirname(dirname(abspath(__file__)))))
+
+import time
+from datetime import datetime, timedelta
+import numpy as np
+
+import output_policy
+from fleet_response import FleetResponse
+from grid_info_artificial_inertia import GridInfo
+from services.artificial_inertia_service.artificial_inertia_service import ArtificialInertiaService
+
+
+def event(duration, step, seed=0):
+    # Responses of an event starting at midnight, and grid data covering it
+    rng = np.random.RandomState(seed)
+    start_time = datetime(2017, 8, 1)
+    n = int(duration.total_seconds() / step.total_seconds())
+    responses = []
+    for k in range(n):
+        response = FleetResponse()
+        response.ts = start_time + k * step
+        response.P_service = rng.uniform(-50, 50)
+        response.P_togrid = response.P_service + rng.uniform(100, 200)
+        responses.append(response)
+    grid = GridInfo()
+    if duration > timedelta(seconds=149):
+        grid.time = np.arange(0, duration.total_seconds() + 1, 1 / 30.)
+        grid.frequency = 60 + 0.05 * np.sin(grid.time[:, np.newaxis] / 60. + np.array([[0, 1]]))
+    return start_time, responses, grid
+
+
+def old_calculation(grid, responses, start_time, filename):
+    p_service = []
+    p_togrid = []
+    t = []
+    f = []
+    for response in responses:
+        f.append(grid.get_frequency(response.ts, 0, start_time))
+        p_service.append(response.P_service)
+        p_togrid.append(response.P_togrid)
+        t.append(response.ts)
+    p_base = (np.array(p_service) - np.array(p_togrid)).tolist()
+    service_energy = 0.0
+    base_energy = 0.0
+    for t_idx in range(1, len(t)):
+        service_energy += (t[t_idx] - t[t_idx - 1]).total_seconds() * (p_service[t_idx - 1] + p_service[t_idx]) * 0.5
+        base_energy += (t[t_idx] - t[t_idx - 1]).total_seconds() * (p_base[t_idx - 1] + p_base[t_idx]) * 0.5
+    service_efficacy = service_energy / base_energy
+    with open(filename, 'w', newline='') as csvfile:
+        csvwriter = csv.writer(csvfile, delimiter=',')
+        csvwriter.writerow(['time', 'frequency', 'service power', 'power to grid'])
+        for tidx in range(len(t)):
+            csvwriter.writerow([t[tidx].strftime('%m/%d/%Y, %H:%M:%S'), str(f[tidx]), str(p_service[tidx]),
+                                str(p_togrid[tidx])])
+        csvwriter.writerow(['service efficacy=%06.4f' % service_efficacy])
+    return service_efficacy
+
+
+if __name__ == '__main__':
+    output_policy.set_policy(output_policy.silent())
+    result_dir = join(dirname(dirname(dirname(abspath(__file__)))), 'integration_test', 'artificial_inertia')
+    csv_file = join(result_dir, datetime.now().strftime('%Y%m%d') + '_ArtificialInertia_Benchmark.csv')
+    old_csv_file = join(result_dir, 'old_calculation.csv')
+
+    print('%10s %10s %12s %18s %16s' % ('event', 'step (s)', 'responses', 'one at a time (s)', 'calculation (s)'))
+    for duration, step in ((timedelta(seconds=149), timedelta(seconds=1 / 30.)),
+                           (timedelta(hours=1), timedelta(seconds=0.1)),
+                           (timedelta(hours=3), timedelta(seconds=0.1))):
+        start_time, responses, grid = event(duration, step)
+        service = ArtificialInertiaService()
+        service.duration = duration
+        service._grid = grid
+
+        start = time.time()
+        old_calculation(grid, responses, start_time, old_csv_file)
+        t_old = time.time() - start
+        start = time.time()
+        service.calculation('Benchmark', responses, start_time)
+        t_new = time.time() - start
+
+        with open(old_csv_file) as old_rows, open(csv_file) as rows:
+            assert old_rows.read() == rows.read()
+        print('%10s %10.3f %12i %18.3f %16.3f' % (duration, step.total_seconds(), len(responses), t_old, t_new))
+
+    os.remove(csv_file)
+    os.remove(old_csv_file)
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Runtime of DistributionVoltageService.request_loop and of its results
+
+Runs the request loop at 30 s for an hour, a day and a week, finding the
+row of the drive cycle of each time step as request_loop did it before (a
+scan of the whole drive cycle with maya.parse at each time step, timed up to
+the requests) and as it does now (binary search in the times sorted once,
+the whole request_loop timed), and checks that the requests are the same.
+The fleet answers each request at once (90% of the active power, 80% of the
+reactive power), so the times are those of the service, and the figures are
+turned off (output_policy.silent()). The old way is only run up to a day, a
+week takes it about two minutes.
+
+Then, for a month of 30 s steps, times the service metrics and the writing
+of their file as request_loop did it before (calculation() and write_csv()
+row by row, the file opened for each row) and as it does now
+(calculation_arrays() and a ResultWriter, as .csv and as binary records),
+and checks that the .csv files are the same.
+
+Usage: python benchmark.py
+"""
+import sys
+import os
+import glob
+from os.path import dirname, abspath, join
+sys.path.insert(0, dirname(dirname(dirname(abspath(__file__)))))
+
+import time
+import tempfile
+from datetime import datetime, timedelta
+import numpy as np
+import maya
+
+import output_policy
+from fleet_response import FleetResponse
+from fleet_request import FleetRequest
+from result_writer import ResultWriter, read_results
+from services.distribution_voltage_regulation.distribution_regulation_service import DistributionVoltageService, \
+    RESULT_COLUMNS
+
+START_TIME = datetime(2017, 8, 1, 16)
+
+
+class Fleet:
+
+    def assigned_service_kW(self):
+        return 100.
+
+    def process_request(self, fleet_request):
+        response = FleetResponse()
+        response.ts = fleet_request.ts_req
+        response.P_togrid = response.P_service = 0.9 * fleet_request.P_req
+        response.Q_togrid = response.Q_service = 0.8 * fleet_request.Q_req
+        return response
+
+
+def old_request_loop(service, end_time, sensitivity_P=0.0001, sensitivity_Q=0.0005, start_time=START_TIME):
+    # request_loop up to the requests, with the drive cycle scanned at each time step
+    assigned_service_kW = service.fleet.assigned_service_kW()
+    assigned_service_kVar = service.fleet.assigned_service_kW()
+    cur_time = start_time
+    volt = service.drive_cycle["voltage"]
+    time = service.drive_cycle["time"]
+    List_Time = list(time.values)
+    dts = (maya.parse(start_time).datetime() - maya.parse(List_Time[0]).datetime()).total_seconds()
+    requests = []
+    while cur_time < end_time:
+        for n in range(len(list(time.values))):
+            dta = maya.parse(List_Time[n]).datetime()
+            dtb = maya.parse(cur_time).datetime() - timedelta(seconds=dts)
+            if dta == dtb:
+                index = n
+        cur_voltage = volt.values[index]
+        if service.Vlower <= cur_voltage <= service.Vupper:
+            Prequest = 0
+            Qrequest = 0
+        elif cur_voltage > service.Vupper:
+            dV = service.Vupper - cur_voltage
+            Qrequest = max(-dV / sensitivity_Q, -1 * assigned_service_kVar)
+            Prequest = max(-dV / sensitivity_P, -1 * assigned_service_kW)
+        else:
+            dV = service.Vlower - cur_voltage
+            Qrequest = dV / sensitivity_Q
+            if Qrequest < assigned_service_kVar:
+                Qrequest = -1 * assigned_service_kVar
+            Prequest = dV / sensitivity_P
+            if Prequest < assigned_service_kW:
+                Prequest = -assigned_service_kW
+        requests.append(FleetRequest(ts=cur_time, sim_step=service.sim_step, p=Prequest, q=Qrequest))
+        service.fleet.process_request(requests[-1])
+        cur_time += service.sim_step
+    return requests
+
+
+if __name__ == '__main__':
+    output_policy.set_policy(output_policy.silent())
+    # request_loop writes its .csv file in integration_test/Voltage_Regulation next to the script run
+    result_dir = join(dirname(abspath(sys.modules['__main__'].__file__)), 'integration_test', 'Voltage_Regulation')
+    created = not os.path.isdir(result_dir)
+    if created:
+        os.makedirs(result_dir)
+
+    print('%10s %8s %20s %18s' % ('run', 'steps', 'scan, maya (s)', 'request_loop (s)'))
+    for name, duration in (('hour', timedelta(hours=1)), ('day', timedelta(days=1)), ('week', timedelta(days=7))):
+        service = DistributionVoltageService()
+        service.sim_step = timedelta(seconds=30)
+        service.fleet = Fleet()
+        end_time = START_TIME + duration
+        for filename in glob.glob(join(result_dir, '*_Voltage_Regulation_Fleet.csv')):
+            os.remove(filename)
+
+        start = time.time()
+        requests, responses = service.request_loop(start_time=START_TIME, end_time=end_time)
+        t_new = time.time() - start
+
+        t_old = '-'
+        if duration <= timedelta(days=1):
+            start = time.time()
+            old_requests = old_request_loop(service, end_time)
+            t_old = '%.3f' % (time.time() - start)
+            assert ([(r.ts_req, r.P_req, r.Q_req) for r in old_requests] ==
+                    [(r.ts_req, r.P_req, r.Q_req) for r in requests])
+        print('%10s %8i %20s %18.3f' % (name, len(requests), t_old, t_new))
+
+    for filename in glob.glob(join(result_dir, '*_Voltage_Regulation_Fleet.csv')):
+        os.remove(filename)
+    if created:
+        os.removedirs(result_dir)
+
+    print()
+    rng = np.random.RandomState(0)
+    steps = 30 * 24 * 120
+    ts = [START_TIME + k * timedelta(seconds=30) for k in range(steps)]
+    Preq = rng.choice([0, 100., -100.], steps).tolist()
+    Qreq = rng.choice([0, 50., -50.], steps).tolist()
+    Pach = (0.9 * np.array(Preq)).tolist()
+    Qach = (0.8 * np.array(Qreq)).tolist()
+    service = DistributionVoltageService()
+    print('%18s %13s %12s' % ('month at 30 s', 'metrics (s)', 'write (s)'))
+    with tempfile.TemporaryDirectory() as directory:
+        old_file, csv_file, binary_file = [join(directory, name) for name in ('old.csv', 'new.csv', 'new.bin')]
+
+        start = time.time()
+        metrics = [service.calculation(Prequest=Preq[k], Qrequest=Qreq[k], P0=Pach[k], Q0=Qach[k], price_P=1,
+                                       price_Q=1) for k in range(steps)]
+        t_metrics = time.time() - start
+        start = time.time()
+        service.write_csv(old_file, *RESULT_COLUMNS)
+        for k in range(steps):
+            service.write_csv(old_file, ts[k], *metrics[k])
+        print('%18s %13.3f %12.3f' % ('row by row', t_metrics, time.time() - start))
+
+        start = time.time()
+        metrics = service.calculation_arrays(Prequest=Preq, Qrequest=Qreq, P0=Pach, Q0=Qach, price_P=1, price_Q=1)
+        t_metrics = time.time() - start
+        for filename, binary in ((csv_file, False), (binary_file, True)):
+            start = time.time()
+            with ResultWriter(filename, columns=RESULT_COLUMNS, binary=binary) as results:
+                if not binary:
+                    results.write_row(*RESULT_COLUMNS)
+                results.write_rows(ts, *metrics)
+            print('%18s %13.3f %12.3f' % ('binary' if binary else 'ResultWriter, csv', t_metrics,
+                                          time.time() - start))
+
+        with open(old_file) as old_rows, open(csv_file) as rows:
+            assert old_rows.read() == rows.read()
+        assert read_results(binary_file, RESULT_COLUMNS)[RESULT_COLUMNS[1]].tolist() == metrics[0].tolist()
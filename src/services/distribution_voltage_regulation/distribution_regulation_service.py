@@ -14,17 +14,23 @@ from datetime import datetime, timedelta
 import pandas as pd
 import configparser
 import numpy
-import maya
 import csv
+import logging
 from pathlib import Path
 
 import utils
+import output_policy
+from result_writer import ResultWriter
 from fleet_interface import FleetInterface
 from fleet_request import FleetRequest
 from fleet_response import FleetResponse
 from fleet_config import FleetConfig
 import matplotlib.pyplot as plt
 
+logger = logging.getLogger('services.distribution_voltage_service')
+
+RESULT_COLUMNS = ['Time', 'service efficacy (%)', 'value provided ($)', 'value efficacy (%)']
+
 
 class DistributionVoltageService:
     """
@@ -55,6 +61,8 @@ class DistributionVoltageService:
         self.Vupper = float(self.config.get(config_header, 'Vupper', fallback=1.05))
         self.Vlower = float(self.config.get(config_header, 'Vlower', fallback=0.95))
         self.operation_flag = self.config.get(config_header, 'operation_flag', fallback='0')
+        # Service metrics as records (see result_writer.read_results) instead of a .csv file
+        self.binary_output = self.config.getboolean(config_header, 'binary_output', fallback=False)
         #self.starttime = self.config.get(config_header, 'starttime')
         #self.endtime = self.config.get(config_header, 'endtime')
 
@@ -79,26 +87,29 @@ class DistributionVoltageService:
         delt = self.sim_step
         volt = self.drive_cycle["voltage"]
         time  = self.drive_cycle["time"]
-        List_Time = list(time.values)
-        dts = maya.parse(start_time).datetime() - maya.parse(List_Time[0]).datetime()
-        dts = (dts).total_seconds()
+        # The drive cycle is replayed from start_time: the voltage at cur_time is the one of the row
+        # at cur_time - dts. The times are sorted once, and each row found by binary search
+        List_Time = time.values.astype('datetime64[us]')
+        order = numpy.argsort(List_Time, kind='stable')
+        sorted_time = List_Time[order]
+        dts = numpy.datetime64(start_time, 'us') - List_Time[0]
         Vupper = self.Vupper
         Vlower = self.Vlower
         responses = []
         requests = []
+        index = None
+        progress = output_policy.Progress(logger)
         while cur_time < end_time:
             # normal operation
 
-            
-            for n in range(len(list(time.values))):
+            # Last row at cur_time - dts, the voltage of the previous row found is kept in between
+            dtb = numpy.datetime64(cur_time, 'us') - dts
+            n = numpy.searchsorted(sorted_time, dtb, side='right') - 1
+            if n >= 0 and sorted_time[n] == dtb:
+                index = order[n]
+            if index is None:
+                raise ValueError('No voltage in the drive cycle at %s' % cur_time)
 
-                dta = maya.parse(List_Time[n]).datetime()  
-                dtb = maya.parse(cur_time).datetime() - timedelta(seconds = dts)
-                if dta==dtb:
-                    index=n
-              
-            
-           # index  = list(time.values).index(cur_time)
             cur_voltage = volt.values[index]
             #cur_voltage = 1.055
             if cur_voltage >= self.Vlower and cur_voltage <= self.Vupper:
@@ -127,7 +138,7 @@ class DistributionVoltageService:
             responses.append(fleet_response)
             requests.append(fleet_request)
             cur_time += delt
-            print("{}".format(cur_time))
+            progress.step("%s", cur_time)
             
         Qach = numpy.zeros((len(responses)))
         Pach = numpy.zeros((len(responses)))
@@ -142,78 +153,29 @@ class DistributionVoltageService:
         Preq=[r.P_req for r in requests]
         Qreq=[r.Q_req for r in requests]
             
-        fig=plt.figure(1)
-        plt.subplot(211)
-        plt.plot(ts_request, Preq, label='Req.')
-        plt.plot(ts_request, Pach, label='Achieved')
-        plt.plot(ts_request, Pservice, label='Service')
-        plt.xlabel('Time')
-        plt.ylabel('kW')
-        plt.title('Fleet Active Power')
-        plt.legend(loc='lower right')
-
-        plt.subplot(212)
-        plt.plot(ts_request, Qreq, label='Req.')
-        plt.plot(ts_request, Qach, label='Achieved')
-        plt.plot(ts_request, Qservice, label='Service')
-        #plt.plot(t[0:n],100*S[0:n], label='Recorded SoC')
-        plt.xlabel('Time')
-        plt.ylabel('kVar')
-        plt.title('Fleet Reactive Power')
-        plt.legend(loc='lower right')
-        
         data_folder=os.path.dirname(sys.modules['__main__'].__file__)
         plot_filename = datetime.now().strftime('%Y%m%d') + '_VoltageRegulation_FleetResponse_' + self.fleet.__class__.__name__  + '.png'
         File_Path_fig = join(data_folder, 'integration_test','voltage_regulation',plot_filename)
+        output_policy.plot(plot_fleet_response, ts_request, Preq, Pach, Pservice, Qreq, Qach, Qservice, File_Path_fig)
+        # The metrics of all the time steps at once
+        ServiceEefficacy,ValueProvided,ValueEfficacy=self.calculation_arrays(Prequest=Preq,
+                                Qrequest=Qreq,P0=Pach,Q0=Qach,price_P=1,price_Q=1)
 
-        plt.savefig(File_Path_fig, bbox_inches='tight')
-#        File_Path_fig = os.path.join(self.base_path , 'VR_Fleet_Response.png')
-#        fig.savefig(File_Path_fig)
-        #plt.legend(loc='lower right')
-        plt.close
-        ServiceEefficacy=[]
-        ValueProvided=[]
-        ValueEfficacy=[]
- 
-        CSV_FileName=datetime.now().strftime('%Y%m%d') + '_Voltage_Regulation_' + self.fleet.__class__.__name__ + '.csv'
+        CSV_FileName=datetime.now().strftime('%Y%m%d') + '_Voltage_Regulation_' + self.fleet.__class__.__name__ + \
+                     ('.bin' if self.binary_output else '.csv')
 
         data_folder=os.path.dirname(sys.modules['__main__'].__file__)
         File_Path_CSV = join(data_folder, 'integration_test','Voltage_Regulation',CSV_FileName)
-        self.write_csv(File_Path_CSV,'Time','service efficacy (%)','value provided ($)','value efficacy (%)')
-       
-        for idd in range(len(Pach)):
-            service_efficacy,value_provided,value_efficacy=self.calculation(Prequest=Preq[idd],
-                                Qrequest=Qreq[idd],P0=Pach[idd],Q0=Qach[idd],price_P=1,price_Q=1)
-
-            ServiceEefficacy.append(service_efficacy)
-            ValueProvided.append(value_provided)
-            ValueEfficacy.append(value_efficacy)
-            
-            self.write_csv(File_Path_CSV,ts_request[idd],service_efficacy,value_provided,value_efficacy)
-
-        fig, axs = plt.subplots(3, 1)
-        axs[0].plot(ts_request, ServiceEefficacy)
-        axs[0].set_title('ServiceEefficacy')
-        #axs[0].set_xlabel('distance (m)')
-        axs[0].set_ylabel('%')
-        fig.suptitle('Service Metrics', fontsize=16)
-        
-        axs[1].plot(ts_request, ValueProvided)
-        #axs[1].set_xlabel('time (s)')
-        axs[1].set_title('ValueProvided')
-        axs[1].set_ylabel('$')
-        
-        axs[2].plot(ts_request, ValueEfficacy)
-        #axs[1].set_xlabel('time (s)')
-        axs[2].set_title('ValueEfficacy')
-        axs[2].set_ylabel('%')
+        # One open file, written in blocks (and when the run fails)
+        with ResultWriter(File_Path_CSV, columns=RESULT_COLUMNS, binary=self.binary_output) as results:
+            if not self.binary_output:
+                results.write_row(*RESULT_COLUMNS)
+            results.write_rows(ts_request, ServiceEefficacy, ValueProvided, ValueEfficacy)
+
         plot_filename = datetime.now().strftime('%Y%m%d') + '_VoltageRegulation_ServiceMetrics'  + '.png'
-        
         File_Path_fig = join(data_folder, 'integration_test','voltage_regulation',plot_filename)
-        plt.savefig(File_Path_fig, bbox_inches='tight')
-
-        
-        plt.show()    
+        output_policy.plot(plot_service_metrics, ts_request, ServiceEefficacy, ValueProvided, ValueEfficacy,
+                           File_Path_fig)
             
 
     
@@ -238,6 +200,22 @@ class DistributionVoltageService:
         
         
 
+        return [service_efficacy,value_provided,value_efficacy]
+
+    def calculation_arrays(self,Prequest,Qrequest,P0,Q0,price_P,price_Q):
+        # calculate generic metrics of all the time steps at once, same as calculation()
+        Prequest = numpy.array(Prequest, dtype=float)
+        Qrequest = numpy.array(Qrequest, dtype=float)
+        Prequest[Prequest==0] = 0.0000001
+        Qrequest[Qrequest==0] = 0.0000001
+        P0 = numpy.array(P0, dtype=float)
+        Q0 = numpy.array([0 if isinstance(q, str) or q is None else q for q in Q0], dtype=float)
+        service_efficacy = (P0/Prequest*100 + Q0/Qrequest*100)/2 # in %
+        value_provided = P0*price_P + Q0*price_Q
+        # inf or nan where the requested value is 0, where calculation() raises ZeroDivisionError
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            value_efficacy = value_provided*100/(Prequest*price_P+Qrequest*price_Q)
+
         return [service_efficacy,value_provided,value_efficacy]
 
     def voltage_regulation_metrics(self,voltage_measure):
@@ -261,3 +239,43 @@ class DistributionVoltageService:
         with open(File_Path, mode='a',newline='') as impact_metris:
             impact_metris_writer = csv.writer(impact_metris)
             impact_metris_writer.writerow([ts_request,service_efficacy,value_provided,value_efficacy])
+
+
+def plot_fleet_response(ts_request, Preq, Pach, Pservice, Qreq, Qach, Qservice, filename):
+    # Requested, achieved and service active and reactive power of the fleet
+    plt.figure()
+    plt.subplot(211)
+    plt.plot(ts_request, Preq, label='Req.')
+    plt.plot(ts_request, Pach, label='Achieved')
+    plt.plot(ts_request, Pservice, label='Service')
+    plt.xlabel('Time')
+    plt.ylabel('kW')
+    plt.title('Fleet Active Power')
+    plt.legend(loc='lower right')
+
+    plt.subplot(212)
+    plt.plot(ts_request, Qreq, label='Req.')
+    plt.plot(ts_request, Qach, label='Achieved')
+    plt.plot(ts_request, Qservice, label='Service')
+    plt.xlabel('Time')
+    plt.ylabel('kVar')
+    plt.title('Fleet Reactive Power')
+    plt.legend(loc='lower right')
+    output_policy.show(filename)
+
+
+def plot_service_metrics(ts_request, ServiceEefficacy, ValueProvided, ValueEfficacy, filename):
+    fig, axs = plt.subplots(3, 1)
+    axs[0].plot(ts_request, ServiceEefficacy)
+    axs[0].set_title('ServiceEefficacy')
+    axs[0].set_ylabel('%')
+    fig.suptitle('Service Metrics', fontsize=16)
+
+    axs[1].plot(ts_request, ValueProvided)
+    axs[1].set_title('ValueProvided')
+    axs[1].set_ylabel('$')
+
+    axs[2].plot(ts_request, ValueEfficacy)
+    axs[2].set_title('ValueEfficacy')
+    axs[2].set_ylabel('%')
+    output_policy.show(filename)
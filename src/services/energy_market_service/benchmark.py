@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Runtime of the EnergyMarketService cycle search
+
+Times the search for the best charge and discharge times of one cycle with
+the brute force loops dispatch_algorithm used before (cycle values filled
+pair by pair, then scanned) and with EnergyMarketService.best_cycles, for
+the hourly CAISO prices (24 timesteps, 2-hour charge) and for the same day
+at 5 minutes (288 timesteps, interpolated prices, 2-hour charge). Then times
+best_cycles with 2 and 3 cycles at 5 minutes, and the construction of the
+profit and value matrices with loops and with broadcasting.
+
+Usage: python benchmark.py
+"""
+import sys
+from os.path import dirname, abspath, join
+sys.path.insert(0, dirname(dirname(dirname(abspath(__file__)))))
+
+import time
+import numpy as np
+
+from services.energy_market_service.energy_market_service import EnergyMarketService
+
+
+def day_values(price, seed=0):
+    rng = np.random.RandomState(seed)
+    n = len(price)
+    e_in, e_out = rng.uniform(85, 95, n), rng.uniform(85, 95, n)
+    eff = np.multiply.outer(e_in*0.01, e_out*0.01)*100
+    np.fill_diagonal(eff, 0)
+    strike = (rng.uniform(0, 5, n)*np.ones([n, n])).T
+    return eff, strike
+
+
+def brute_force_cycle(value, nChg, startT, stopT, tFull, charged, INF=999999):
+    # Single cycle, as oneCycleNPer searched it before. None for the times if no cycle meets tFull.
+    nDim = stopT - startT
+    nValue = np.full([nDim, nDim], np.nan)
+    chargeMax = dischargeMax = None
+    maxValue = -INF
+    if charged == 0:     # Discharged at start of period
+        for i in range(nDim - 2*nChg + 2):
+            for j in range(i + nChg, nDim - nChg + 2):
+                nValue[i, j] = value[startT + i, startT + j]
+                for k in range(1, nChg):
+                    nValue[i, j] = nValue[i, j] + value[startT + i + k, startT + j + k]
+                if i > (tFull - nChg) or j > tFull - nChg:
+                    nValue[i, j] = -INF
+        for i in range(nDim):
+            for j in range(i + nChg, nDim - nChg + 1):
+                if nValue[i, j] > maxValue:
+                    maxValue = nValue[i, j]
+                    chargeMax = i + startT
+                    dischargeMax = j + startT
+    else:   # Charged at start of period
+        for j in range(nDim - 2*nChg + 2):
+            for i in range(j + nChg, nDim - nChg + 2):
+                nValue[i, j] = value[startT + i, startT + j]
+                for k in range(1, nChg):
+                    nValue[i, j] = nValue[i, j] + value[startT + i + k, startT + j + k]
+                if j > tFull and i > (tFull - nChg):
+                    nValue[i, j] = -INF
+        for j in range(nDim):
+            for i in range(j + nChg, nDim - nChg + 1):
+                if nValue[i, j] > maxValue:
+                    maxValue = nValue[i, j]
+                    chargeMax = i + startT
+                    dischargeMax = j + startT
+    return chargeMax, dischargeMax, maxValue
+
+
+def bench_matrices(price, eff, strike):
+    n = len(price)
+    start = time.time()
+    profit = np.full([n, n], np.nan)
+    for i in range(n):
+        for j in range(n):
+            profit[i, j] = -price[i] + eff[i, j]*price[j]
+    value = np.full([n, n], np.nan)
+    for i in range(n):
+        for j in range(n):
+            value[i, j] = profit[i, j] - strike[i, j]
+    t_loops = time.time() - start
+    start = time.time()
+    broadcast_value = (-price[:, np.newaxis] + eff*price[np.newaxis, :]) - strike
+    t_broadcast = time.time() - start
+    assert np.array_equal(value, broadcast_value)
+    return t_loops, t_broadcast, value
+
+
+if __name__ == '__main__':
+    service = EnergyMarketService()
+    hourly_price = np.genfromtxt(join(service.base_path, 'CAISOApr2016Hourly.csv'), delimiter=',')
+    five_min_price = np.interp(np.arange(288)/12., np.arange(24), hourly_price)
+
+    print('%10s %6s %20s %16s %16s' % ('timesteps', 'nChg', 'matrices loops (s)', 'broadcasting (s)',
+                                       'cycle found'))
+    results = []
+    for price, nChg in ((hourly_price, 2), (five_min_price, 24)):
+        eff, strike = day_values(price)
+        t_loops, t_broadcast, value = bench_matrices(price, eff, strike)
+        n = len(price)
+
+        start = time.time()
+        brute_force = brute_force_cycle(value, nChg, 0, n - 1, 500, 0)
+        t_brute_force = time.time() - start
+        start = time.time()
+        chargeMax, dischargeMax, maxValue = service.best_cycles(value, nChg, 0, n - 1, 500, 0)
+        t_best_cycles = time.time() - start
+        assert brute_force == (chargeMax[0], dischargeMax[0], maxValue)
+        print('%10i %6i %20.4f %16.5f %16s' % (n, nChg, t_loops, t_broadcast, (chargeMax[0], dischargeMax[0])))
+        results.append((n, t_brute_force, t_best_cycles))
+
+    print()
+    print('%10s %20s %16s' % ('timesteps', 'brute force (s)', 'best_cycles (s)'))
+    for n, t_brute_force, t_best_cycles in results:
+        print('%10i %20.4f %16.5f' % (n, t_brute_force, t_best_cycles))
+
+    print()
+    eff, strike = day_values(five_min_price)
+    value = bench_matrices(five_min_price, eff, strike)[2]
+    for nCycles in (2, 3):
+        start = time.time()
+        chargeMax, dischargeMax, maxValue = service.best_cycles(value, 24, 0, 287, 500, 0, nCycles=nCycles)
+        print('%i cycles at 5 minutes: %.4f s, charge at %s, discharge at %s, value %.2f'
+              % (nCycles, time.time() - start, chargeMax, dischargeMax, maxValue))
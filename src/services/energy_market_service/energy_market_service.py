@@ -4,6 +4,7 @@
 # }}}
 
 import sys
+import logging
 from dateutil import parser
 from datetime import datetime, timedelta
 import numpy as np
@@ -13,9 +14,12 @@ import matplotlib.pyplot as plt
 from os.path import dirname, abspath, join
 sys.path.insert(0,dirname(dirname(dirname(abspath(__file__)))))
 
+import output_policy
 from utils import ensure_ddir
 from fleet_request import FleetRequest
 
+logger = logging.getLogger('services.energy_market_service')
+
 
 class EnergyMarketService(object):
     
@@ -47,9 +51,9 @@ class EnergyMarketService(object):
         Method to run the forecast method of the fleet and return the API variables
         that the energy market service needs to run its dispatch algorithm
         """
-        print('Running fleet forecast for the %s ...' %self._fleet.__class__.__name__)
+        logger.info('Running fleet forecast for the %s ...', self._fleet.__class__.__name__)
         forecast_base = self._fleet.forecast(self.requests)
-        print('--Done--')
+        logger.info('--Done--')
         
         hrs = len(forecast_base)      
         e_in = np.array([forecast_base[i].Eff_charge for i in range(hrs)])
@@ -63,7 +67,7 @@ class EnergyMarketService(object):
         np.fill_diagonal(rt, 0)
         
         strike_price = (strike_price*np.ones([hrs,hrs])).T
-        print(strike_price)
+        logger.debug('%s', strike_price)
  
         return (rt, p_service_max, p_service_min, p_service, strike_price)
     
@@ -98,115 +102,41 @@ class EnergyMarketService(object):
         charged = np.genfromtxt(join(self.base_path, 'ChargeStateOffHourly.csv'), delimiter=',')
         
         # Construct profit table: profit = -price(charge) + eff(i,j)*price(discharge)
-        # Fill profit matrix with NaNs
-        profit = np.full([timesteps, timesteps], np.nan)
         """
         Profit depends upon order of charge and discharge 
         if charge period i < discharge period j it must be discharged at midnight 
         if charge period i > discharge period j it must be charged at midnight
         """      
-        for i in range(timesteps):
-            for j in range(timesteps):
-                profit[i,j] = -self.price[i] + eff[i,j]*self.price[j]
-                #print(i, j, profit[i,j], price[i], eff[i,j])
+        profit = -self.price[:timesteps, np.newaxis] + eff*self.price[np.newaxis, :timesteps]
         
         # Construct value table: value = profit - strike(i,j)
-        value = np.full([timesteps, timesteps], np.nan)
-        for i in range(timesteps):
-            for j in range(timesteps):
-                value[i,j] = profit[i,j] - strike[i,j]
-                #print(i, j, profit[i,j], strike[i,j], value[i,j])
-        
-        def plotCurve(curve, title, xLabel, yLabel): 
-            hour = range(timesteps)
-            plt.figure()
-            plt.plot(hour, curve, label = title)
-            plt.legend()
-            plt.xlabel(xLabel)
-            plt.ylabel(yLabel)
-            plt.grid(b=True, which='both')
-            plt.show()
-        
-        def plotHeatMap(matrix, xLabel, yLabel, scaleLabel):
-            import matplotlib.cm as cm
-            #cmap = cm.get_cmap('nipy_spectral_r')
-            #cmap = cm.get_cmap('plasma_r')
-            plt.figure()
-            cmap = cm.get_cmap('RdYlGn')
-            nx,ny = np.shape(matrix)
-            cs = plt.pcolor(matrix, cmap=cmap)
-            cb = plt.colorbar(cs,orientation = 'vertical')
-            cb.set_label(scaleLabel)
-            plt.xlim(0,nx)
-            plt.ylim(0,ny)
-            plt.xlabel(xLabel)
-            plt.ylabel(yLabel)
-            plt.grid(True)
-            plt.show()
-            return
+        value = profit - strike
         
         def oneCycleNPer(INF, nChg, value, startT, stopT, tFull):
         # One daily cycle with nChg period contiguous charge and discharge times
         # Array indexs first period of chorge or discharge event
             nDim = stopT - startT
-            print('nDim = ', nDim)
-            #Dimension matrices and fill with NANs
-            nProfit = np.full([nDim, nDim], np.nan)
-            nValue = np.full([nDim, nDim], np.nan)
-            # Compute profit array for charge period and discharge period lagged by nChg
-            # or more time periods
-            
+            logger.info('nDim = %s', nDim)
+            chargeMax, dischargeMax, maxValue = self.best_cycles(value, nChg, startT, stopT, tFull, charged[startT])
             if charged[startT] == 0:     # Discharged at start of period 
-                for i in range(nDim - 2*nChg + 2):
-                    for j in range (i + nChg, nDim - nChg + 2):
-                        nProfit[i, j] = profit[startT + i, startT + j]
-                        nValue[i, j] = value[startT + i, startT + j]
-                        for k in range(1, nChg): 
-                            nProfit[i, j] = nProfit[i , j] + profit[startT + i + k, startT + j + k] 
-                            nValue[i, j] = nValue[i, j] + value[startT + i + k, startT + j + k]
-                        #Test to see if charge too late, after time tFull
-                        if i > (tFull - nChg):
-                            nValue[i,j] = - INF
-                        #Test to see if charged then discharged before time tFull
-                        if j > tFull - nChg:
-                            nValue[i,j] = - INF
-                # Find charge-discharge hours with maximum value for single cycle
-                maxValue = -INF
-                for i in range(nDim):
-                    for j in range(i + nChg, nDim - nChg + 1):
-                        if nValue[i,j] > maxValue:
-                            maxValue = nValue[i,j]
-                            chargeMax = i
-                            dischargeMax = j
                 charged[stopT] = 0
-            else:   # Charged at start of period (just change i and j indices in loops)
-                for j in range(nDim - 2*nChg + 2):
-                    for i in range (j + nChg, nDim - nChg + 2):
-                        nProfit[i, j] = profit[startT + i, startT + j]
-                        nValue[i, j] = value[startT + i, startT + j]
-                        for k in range(1, nChg): 
-                            nProfit[i, j] = nProfit[i , j] + profit[startT + i + k, startT + j + k] 
-                            nValue[i, j] = nValue[i, j] + value[startT + i + k, startT + j + k]
-                        #Test to see if discharged before time tFull and charged after time tFull
-                        if j > tFull:
-                            if i > (tFull - nChg):
-                                nValue[i,j] = - INF
-                # Find charge-discharge hours with maximum value for single cycle
-                maxValue = -INF
-                for j in range(nDim):
-                    for i in range(j + nChg, nDim - nChg + 1):
-                        if nValue[i,j] > maxValue:
-                            maxValue = nValue[i,j]
-                            chargeMax = i
-                            dischargeMax = j
+            else:   # Charged at start of period
                 charged[stopT] = 1
-            return(chargeMax + startT, dischargeMax + startT, maxValue, charged[stopT])
+            return(chargeMax[0], dischargeMax[0], maxValue, charged[stopT])
             
-        plotCurve(self.price, 'CAISO Price Mar 2016', 'time', '$/MWh')
-        plotHeatMap(eff, 'Discharge time', 'Charge time', 'Round Trip efficiency (%)')
-        plotHeatMap(strike, 'Discharge time', 'Charge time', 'Strike price-elasticity ($/MWh)')
-        plotHeatMap(profit, 'Discharge time', 'Charge time', 'Energy arbitrage profit ($/MWh)')
-        plotHeatMap(value, 'Discharge time', 'Charge time', 'Value = Profit - Strike price ($/MWh)')
+        plot_dir = join(dirname(dirname(dirname(abspath(__file__)))), 'integration_test', 'energy_market_service')
+        ensure_ddir(plot_dir)
+        plot_prefix = join(plot_dir, datetime.now().strftime('%Y%m%d') + '_Dispatch_')
+        output_policy.plot(plotCurve, self.price, 'CAISO Price Mar 2016', 'time', '$/MWh',
+                           plot_prefix + 'Price.png')
+        output_policy.plot(plotHeatMap, eff, 'Discharge time', 'Charge time', 'Round Trip efficiency (%)',
+                           plot_prefix + 'Efficiency.png')
+        output_policy.plot(plotHeatMap, strike, 'Discharge time', 'Charge time', 'Strike price-elasticity ($/MWh)',
+                           plot_prefix + 'Strike.png')
+        output_policy.plot(plotHeatMap, profit, 'Discharge time', 'Charge time', 'Energy arbitrage profit ($/MWh)',
+                           plot_prefix + 'Profit.png')
+        output_policy.plot(plotHeatMap, value, 'Discharge time', 'Charge time',
+                           'Value = Profit - Strike price ($/MWh)', plot_prefix + 'Value.png')
         
         #Call oneCycleNPer for single daily cycle
         startT = 0
@@ -215,15 +145,15 @@ class EnergyMarketService(object):
         p_tcharge = abs(p_service_max[chargeMax]) - abs(p_service_min[chargeMax])
         p_tdischarge = abs(p_service_max[dischargeMax]) - abs(p_service_min[dischargeMax])
         Preq = min(p_tcharge, p_tdischarge) #request dispatch power
-        print('startT = ', startT, 'stopT = ', stopT)
-        print('Charge state at beginning of period = ', charged[startT] )
-        print('Charge state at end of period = ', charged[stopT] )
-        print('Solution for single daily cycle ', nChg, 'timesteps to charge')
-        print('Max value = ', maxValue, '$/MWh')
-        print('Charge time = ', chargeMax)
-        print('Discharge time = ', dischargeMax)
-        print('Dispatch Power Request = ', Preq)
-        print()
+        logger.info('startT = %s stopT = %s', startT, stopT)
+        logger.info('Charge state at beginning of period = %s', charged[startT])
+        logger.info('Charge state at end of period = %s', charged[stopT])
+        logger.info('Solution for single daily cycle %s timesteps to charge', nChg)
+        logger.info('Max value = %s $/MWh', maxValue)
+        logger.info('Charge time = %s', chargeMax)
+        logger.info('Discharge time = %s', dischargeMax)
+        logger.info('Dispatch Power Request = %s', Preq)
+        logger.info('')
         
         # Write dispatch orders for single daily cycle to file 
         dispatch = open(join(self.base_path, 'dispatchOrders.csv'), 'a')
@@ -241,15 +171,15 @@ class EnergyMarketService(object):
         p_tdischarge = abs(p_service_max[dischargeMax]) - abs(p_service_min[dischargeMax])
         Preq = min(p_tcharge, p_tdischarge) #request dispatch power
         chargeMax, dischargeMax, maxValue, charged[stopT] = oneCycleNPer(INF, nChg, value, startT, stopT, tFull)
-        print('startT = ', startT, 'stopT = ', stopT)
-        print('Charge state at beginning of period = ', charged[startT] )
-        print('Charge state at end of period = ', charged[stopT] )
-        print('Solution for single cycle ', nChg, 'timesteps to charge')
-        print('Max value = ', maxValue, '$/MWh')
-        print('Charge time = ', chargeMax)
-        print('Discharge time = ', dischargeMax)
-        print('Dispatch Power Request = ', Preq)
-        print()
+        logger.info('startT = %s stopT = %s', startT, stopT)
+        logger.info('Charge state at beginning of period = %s', charged[startT])
+        logger.info('Charge state at end of period = %s', charged[stopT])
+        logger.info('Solution for single cycle %s timesteps to charge', nChg)
+        logger.info('Max value = %s $/MWh', maxValue)
+        logger.info('Charge time = %s', chargeMax)
+        logger.info('Discharge time = %s', dischargeMax)
+        logger.info('Dispatch Power Request = %s', Preq)
+        logger.info('')
         
         # Write dispatch orders for first cycle to file 
         dispatch = open(join(self.base_path, 'dispatchOrders.csv'), 'a')
@@ -268,15 +198,15 @@ class EnergyMarketService(object):
         p_tdischarge = abs(p_service_max[dischargeMax]) - abs(p_service_min[dischargeMax])
         Preq = min(p_tcharge, p_tdischarge) #request dispatch power
         chargeMax, dischargeMax, maxValue, charged[stopT] = oneCycleNPer(INF, nChg, value, startT, stopT, tFull)
-        print('startT = ', startT, 'stopT = ', stopT)
-        print('Charge state at beginning of period = ', charged[startT] )
-        print('Charge state at end of period = ', charged[stopT] )
-        print('Solution for single cycle ', nChg, 'timesteps to charge')
-        print('Max value = ', maxValue, '$/MWh')
-        print('Charge time = ', chargeMax)
-        print('Discharge time = ', dischargeMax)
-        print('Dispatch Power Request = ', Preq)
-        print()
+        logger.info('startT = %s stopT = %s', startT, stopT)
+        logger.info('Charge state at beginning of period = %s', charged[startT])
+        logger.info('Charge state at end of period = %s', charged[stopT])
+        logger.info('Solution for single cycle %s timesteps to charge', nChg)
+        logger.info('Max value = %s $/MWh', maxValue)
+        logger.info('Charge time = %s', chargeMax)
+        logger.info('Discharge time = %s', dischargeMax)
+        logger.info('Dispatch Power Request = %s', Preq)
+        logger.info('')
         
         # Write dispatch orders for second cycle to file 
         dispatch = open(join(self.base_path, 'dispatchOrders.csv'), 'a')
@@ -290,6 +220,77 @@ class EnergyMarketService(object):
         # Return charge time (t1), discharge time (t2), and the request in kW
         return chargeMax, dischargeMax, Preq  
     
+    def cycle_values(self, value, nChg, startT, stopT):
+        """
+        Returns the value of charging during the nChg timesteps from startT + i and discharging during the
+        nChg timesteps from startT + j, as a matrix indexed by [i, j], for the blocks of timesteps ending
+        before stopT: the sum of value[startT + i + k, startT + j + k] for k = 0, ..., nChg - 1.
+        """
+        nBlocks = stopT - startT - nChg + 1
+        cycleValue = value[startT:startT + nBlocks, startT:startT + nBlocks].copy()
+        for k in range(1, nChg):
+            cycleValue += value[startT + k:startT + k + nBlocks, startT + k:startT + k + nBlocks]
+        return cycleValue
+
+    def best_cycles(self, value, nChg, startT, stopT, tFull, charged, nCycles=1):
+        """
+        Finds the charge and discharge times of the nCycles most valuable cycles between timesteps startT and
+        stopT (as in cycle_values()), each charge and discharge lasting nChg timesteps. If discharged at the
+        start of the period (charged = 0), each cycle charges then discharges, otherwise it discharges then
+        charges. The cycles follow each other without overlapping.
+        Returns the lists of charge times and discharge times of the cycles, in time order, and their total value.
+
+        Dynamic programming over the end of the last cycle: O(nCycles*n^2) for n timesteps, once the cycle values
+        are known. Among cycles of the same value, the earliest first event is chosen, then the earliest second
+        event (so a single cycle is the first one found by scanning the first event times, then the second ones).
+        """
+        nBlocks = stopT - startT - nChg + 1
+        if nBlocks <= nChg*(2*nCycles - 1):
+            raise ValueError('There is no room for %i cycle(s) of %i timesteps between timesteps %i and %i.'
+                             % (nCycles, nChg, startT, stopT))
+        cycleValue = self.cycle_values(value, nChg, startT, stopT)
+        # Value of each cycle indexed by [first event, second event]
+        first, second = np.indices(cycleValue.shape)
+        if charged == 0:
+            # Charge first. Test to see if charged after time tFull, or discharged after time tFull
+            allowed = (first <= tFull - nChg) & (second <= tFull - nChg)
+        else:
+            cycleValue = cycleValue.T
+            # Discharge first. Test to see if discharged after time tFull and charged after time tFull
+            allowed = (first <= tFull) | (second <= tFull - nChg)
+        allowed &= (second >= first + nChg) & ~np.isnan(cycleValue)
+        cycleValue = np.where(allowed, cycleValue, -np.inf)
+
+        # bestEnd[t] is the best value of the cycles found so far, all ending by timestep t (relative to startT)
+        bestEnd = np.zeros(nBlocks + nChg)
+        bestFirst, bestValue, bestEnds = [], [], []
+        for c in range(nCycles):
+            # Best value for each second event time, with the previous cycles ending by the first event time
+            totalValue = bestEnd[:nBlocks, np.newaxis] + cycleValue
+            bestFirst.append(np.argmax(totalValue, axis=0))
+            bestValue.append(totalValue[bestFirst[-1], np.arange(nBlocks)])
+            bestEnd = np.maximum.accumulate(np.concatenate([np.full(nChg, -np.inf), bestValue[-1]]))
+            bestEnds.append(bestEnd)
+
+        # Go back through the cycles, from the last one
+        end = nBlocks + nChg - 1
+        maxValue = bestEnds[-1][end]
+        if maxValue == -np.inf:
+            raise ValueError('No %i cycle(s) of %i timesteps between timesteps %i and %i meet time tFull = %i.'
+                             % (nCycles, nChg, startT, stopT, tFull))
+        cycles = []
+        for c in reversed(range(nCycles)):
+            candidates = np.flatnonzero(bestValue[c][:end - nChg + 1] == bestEnds[c][end])
+            secondEvent = candidates[np.argmin(bestFirst[c][candidates])]
+            firstEvent = bestFirst[c][secondEvent]
+            cycles.insert(0, (int(firstEvent) + startT, int(secondEvent) + startT))
+            end = firstEvent
+        if charged == 0:
+            chargeMax, dischargeMax = [list(times) for times in zip(*cycles)]
+        else:
+            dischargeMax, chargeMax = [list(times) for times in zip(*cycles)]
+        return chargeMax, dischargeMax, maxValue
+
     def request_loop(self, start_time = parser.parse("2016-04-01 00:00:00"),
                      sim_step = timedelta(minutes=5),
                      end_time = parser.parse("2016-04-01 23:59:59")):
@@ -320,12 +321,13 @@ class EnergyMarketService(object):
         p_request[disch_strt:disch_end] = p_req
 
         ts = start_time
+        progress = output_policy.Progress(logger)
         for k in range(sim_time):     
             request, response = self.request(ts, sim_step, start_time, p_request[k])
             requests.append(request)
             responses.append(response)  
             ts += sim_step
-            print('Processing dispatch request at time ts = %s' %ts)
+            progress.step('Processing dispatch request at time ts = %s', ts)
             
         request_list_1h = []
         for r in requests:
@@ -361,43 +363,7 @@ class EnergyMarketService(object):
         plot_dir = join(dirname(dirname(dirname(abspath(__file__)))), 'integration_test', 'energy_market_service')
         ensure_ddir(plot_dir)
         plot_filename = 'SimResults_EnergyMarket_' + fleet_name + '_' + datetime.now().strftime('%Y%m%dT%H%M')  + '.png'
-        plt.figure(1)
-        plt.figure(figsize=(15, 8))
-        ax1 = plt.subplot(311)
-        if not(all(pd.isnull(df_1h['Request']))):
-            l1, = ax1.plot(df_1h.Date_Time, df_1h.Request,
-                           label='P_Request', linestyle = '-')
-        if not(all(pd.isnull(df_1h['Response']))):
-            l2, = ax1.plot(df_1h.Date_Time, df_1h.Response,
-                           label='P_Response', linestyle = '--')
-        ax1.set_ylabel('Power (MW)')
-        ax2 = ax1.twinx()
-        l3, = ax2.plot(pd.date_range(start_time, periods=24, freq = 'H').tolist(), self.price,
-                       label = 'Price ($/MWh)', linestyle = '-.', color = 'red')
-        ax2.set_ylabel('Price ($/MWh)', color='r')
-        ax2.tick_params('y', colors='r')
-        plt.legend(handles=[l1, l2, l3])
-            
-        plt.subplot(312)
-        if not(all(pd.isnull(df_1h['P_base']))):
-            plt.plot(df_1h.Date_Time, df_1h.P_base + df_1h.Request, label='P_base + P_Request', linestyle = '-')       
-        if not(all(pd.isnull(df_1h['P_togrid']))):
-            plt.plot(df_1h.Date_Time, df_1h.P_togrid, label='P_togrid', linestyle = '--')
-        if not(all(pd.isnull(df_1h['P_base']))):
-            plt.plot(df_1h.Date_Time, df_1h.P_base, label='P_base', linestyle = '-.')
-        plt.ylabel('Power (MW)')
-        plt.legend()
-        if 'battery' is not fleet_name.lower():
-            plt.xlabel('Time')
-        
-        if 'battery' in fleet_name.lower():
-            if not(all(pd.isnull(df_1h['SoC']))):
-                plt.subplot(313)
-                plt.plot(df_1h.Date_Time, df_1h.SoC, label='SoC', linestyle = '-')
-                plt.ylabel('SoC (%)')
-                plt.xlabel('Time')
-        plt.savefig(join(plot_dir, plot_filename), bbox_inches='tight')
-        plt.close()
+        output_policy.plot(plot_results, df_1h, self.price, start_time, fleet_name, join(plot_dir, plot_filename))
     
         return requests, responses
   
@@ -414,7 +380,73 @@ class EnergyMarketService(object):
     @fleet.setter
     def fleet(self, value):
         self._fleet = value
-    
+
+
+def plotCurve(curve, title, xLabel, yLabel, filename):
+    hour = range(len(curve))
+    plt.figure()
+    plt.plot(hour, curve, label = title)
+    plt.legend()
+    plt.xlabel(xLabel)
+    plt.ylabel(yLabel)
+    plt.grid(True, which='both')
+    output_policy.show(filename)
+
+
+def plotHeatMap(matrix, xLabel, yLabel, scaleLabel, filename):
+    plt.figure()
+    cmap = plt.get_cmap('RdYlGn')
+    nx,ny = np.shape(matrix)
+    cs = plt.pcolor(matrix, cmap=cmap)
+    cb = plt.colorbar(cs,orientation = 'vertical')
+    cb.set_label(scaleLabel)
+    plt.xlim(0,nx)
+    plt.ylim(0,ny)
+    plt.xlabel(xLabel)
+    plt.ylabel(yLabel)
+    plt.grid(True)
+    output_policy.show(filename)
+
+
+def plot_results(df_1h, price, start_time, fleet_name, filename):
+    # Requests and responses of the day with the prices, and the SoC of battery fleets
+    plt.figure(figsize=(15, 8))
+    ax1 = plt.subplot(311)
+    if not(all(pd.isnull(df_1h['Request']))):
+        l1, = ax1.plot(df_1h.Date_Time, df_1h.Request,
+                       label='P_Request', linestyle = '-')
+    if not(all(pd.isnull(df_1h['Response']))):
+        l2, = ax1.plot(df_1h.Date_Time, df_1h.Response,
+                       label='P_Response', linestyle = '--')
+    ax1.set_ylabel('Power (MW)')
+    ax2 = ax1.twinx()
+    l3, = ax2.plot(pd.date_range(start_time, periods=24, freq = 'h').tolist(), price,
+                   label = 'Price ($/MWh)', linestyle = '-.', color = 'red')
+    ax2.set_ylabel('Price ($/MWh)', color='r')
+    ax2.tick_params('y', colors='r')
+    plt.legend(handles=[l1, l2, l3])
+
+    plt.subplot(312)
+    if not(all(pd.isnull(df_1h['P_base']))):
+        plt.plot(df_1h.Date_Time, df_1h.P_base + df_1h.Request, label='P_base + P_Request', linestyle = '-')
+    if not(all(pd.isnull(df_1h['P_togrid']))):
+        plt.plot(df_1h.Date_Time, df_1h.P_togrid, label='P_togrid', linestyle = '--')
+    if not(all(pd.isnull(df_1h['P_base']))):
+        plt.plot(df_1h.Date_Time, df_1h.P_base, label='P_base', linestyle = '-.')
+    plt.ylabel('Power (MW)')
+    plt.legend()
+    if 'battery' is not fleet_name.lower():
+        plt.xlabel('Time')
+
+    if 'battery' in fleet_name.lower():
+        if not(all(pd.isnull(df_1h['SoC']))):
+            plt.subplot(313)
+            plt.plot(df_1h.Date_Time, df_1h.SoC, label='SoC', linestyle = '-')
+            plt.ylabel('SoC (%)')
+            plt.xlabel('Time')
+    output_policy.save(filename)
+
+
 
 def main():
     from grid_info import GridInfo
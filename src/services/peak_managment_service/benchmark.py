@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Per-day runtime of the PeakManagementService dispatch
+
+Runs the days of the drive cycle with an HVAC fleet, sending the requests one
+time step at a time as request_loop does by default, and with the planning
+mode (peak_shaving_plan for the whole drive cycle, one fleet forecast per day
+with a need and the day's requests sent with process_requests). The results
+plotting and files of request_loop are left out. The per-step printing of the
+default loop goes to os.devnull.
+
+Usage: python benchmark.py [time step in minutes]
+(run from the src folder, the fleet reads its inputs with paths relative to it)
+"""
+import sys
+import os
+from os.path import dirname, abspath
+sys.path.insert(0, dirname(dirname(dirname(abspath(__file__)))))
+
+import time
+import contextlib
+from datetime import timedelta
+import numpy as np
+
+from fleet_factory import create_fleet
+from fleet_request import FleetRequest
+from services.peak_managment_service.peak_management_service import PeakManagementService
+
+
+def setup(sim_step):
+    service = PeakManagementService(sim_step=sim_step)
+    start_time = service.drive_cycle["dt"][0]
+    service.fleet = create_fleet('HVAC', 1, start_time=start_time, sim_step=sim_step, service_weight=1.0)
+    service.drive_cycle.load_forecast_mw *= service.fleet.assigned_service_kW()/max(service.drive_cycle.load_forecast_mw)
+    service.mw_target = max(service.drive_cycle.load_forecast_mw) * (1 - service.f_reduction)
+    return service, start_time
+
+
+def days(service):
+    for day in range(len(service.drive_cycle.dt) // 24):
+        dt_day = service.drive_cycle.dt[day*24:(day + 1)*24]
+        dt_day.reset_index(drop=True, inplace=True)
+        yield day, dt_day
+
+
+def bench_step_by_step(sim_step):
+    service, start_time = setup(sim_step)
+    times = []
+    for day, dt_day in days(service):
+        start = time.time()
+        mw_day = service.drive_cycle.load_forecast_mw[day*24:(day + 1)*24]
+        mw_day.reset_index(drop=True, inplace=True)
+        p_needed = [max(0, mw_day[i] - service.mw_target) for i in range(24)]
+        p_needed = [None if p == 0 else p for p in p_needed]
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            for i in range(24):
+                for j in range(int(3600/sim_step.seconds)):
+                    fleet_request = FleetRequest(ts=dt_day[i]+j*sim_step, sim_step=sim_step, start_time=start_time,
+                                                 p=p_needed[i])
+                    print(service.fleet.process_request(fleet_request).P_service)
+        times.append(time.time() - start)
+    return times
+
+
+def bench_planning(sim_step):
+    service, start_time = setup(sim_step)
+    times = []
+    start = time.time()
+    p_needed_days = service.peak_shaving_plan()
+    t_plan = time.time() - start
+    for day, dt_day in days(service):
+        start = time.time()
+        p_needed = [None if np.isnan(p) else p for p in p_needed_days[day]]
+        service.fleet.process_requests(service.plan_day(dt_day, p_needed, start_time))
+        times.append(time.time() - start)
+    return t_plan, times
+
+
+if __name__ == '__main__':
+    sim_step = timedelta(minutes=int(sys.argv[1]) if len(sys.argv) > 1 else 60)
+
+    t_step = bench_step_by_step(sim_step)
+    t_plan, t_planning = bench_planning(sim_step)
+
+    print('Time step: %s, %i steps per day' % (sim_step, 24*3600/sim_step.seconds))
+    print('peak_shaving_plan (whole drive cycle): %.5f s' % t_plan)
+    print('%5s %18s %14s' % ('day', 'step by step (s)', 'planning (s)'))
+    for day, (t1, t2) in enumerate(zip(t_step, t_planning)):
+        print('%5i %18.3f %14.3f' % (day, t1, t2))
@@ -14,8 +14,10 @@ from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
 import configparser
+import logging
 
 import utils
+import output_policy
 from fleet_interface import FleetInterface
 from fleet_request import FleetRequest
 from fleet_response import FleetResponse
@@ -23,6 +25,8 @@ from fleet_config import FleetConfig
 
 from utils import ensure_ddir
 
+logger = logging.getLogger('services.peak_management_service')
+
 class PeakManagementService:
     """
     The peak management service short summary
@@ -83,7 +87,10 @@ class PeakManagementService:
         '''
         # TODO:  Initialize something to hold stats
 
-    def request_loop(self, start_time, service_name, fleet_name="PVInverterFleet"):
+    def request_loop(self, start_time, service_name, fleet_name="PVInverterFleet", planning=False):
+        # With planning=True, the requests of each day are planned from the whole day of the drive cycle,
+        # checked against the fleet's forecast and sent to the fleet together (see plan_day()).
+        # Otherwise the requests are sent to the fleet one time step at a time.
         cycle = 24
         ndx_start = 0
         ndx_end = ndx_start + cycle
@@ -95,23 +102,26 @@ class PeakManagementService:
         #self.annual_peak = max(self.drive_cycle.load_forecast_mw)
         self.annual_peak = max(self.drive_cycle.load_forecast_mw)
         self.mw_target = self.annual_peak * (1 - self.f_reduction)
+        # Power needed from the fleet in each hour of each day
+        p_needed_days = self.peak_shaving_plan()
         requests = []
         responses = []
+        progress = output_policy.Progress(logger)
 #        while ndx_end < len(self.drive_cycle.dt):   # Loop over days...
         while ndx_end <= len(self.drive_cycle.dt):   # Loop over days...
             dt_day = self.drive_cycle.dt[ndx_start:ndx_end]
             dt_day.reset_index(drop=True, inplace=True)
-            mw_day = self.drive_cycle.load_forecast_mw[ndx_start:ndx_end]
-            mw_day.reset_index(drop=True, inplace=True)
-            p_needed = [max(0, mw_day[i] - self.mw_target) for i in range(cycle)]
-            
-            for index, item in enumerate(p_needed):
-                if item == 0:
-                    p_needed[index] = None
+            p_needed = [None if np.isnan(p) else p for p in p_needed_days[ndx_start // cycle]]
             
             ndx_start += 24
             ndx_end += 24
 
+            if planning:
+                day_requests = self.plan_day(dt_day, p_needed, start_time)
+                requests.extend(day_requests)
+                responses.extend(self.fleet.process_requests(day_requests))
+                continue
+
             # No need to work on days without high peaks
             #if max(mw_day) <= self.mw_target:
             for i in range(24):
@@ -121,30 +131,8 @@ class PeakManagementService:
             # store requests and responses
                     requests.append(fleet_request)
                     responses.append(fleet_response)
-                    print(responses[-1].P_service)
-            '''
-            else:
-                # Get a 24-hour forecast from fleet
-                forecast_requests = [FleetRequest(ts=dt_day[i], sim_step=self.sim_step, p=p_needed[i]) for i in range(cycle)]
-                forecast_response = self.fleet.forecast(forecast_requests)
-                
-                # See if the forecast can meet the desired load
-                deficit = [forecast_response[i].P_service - p_needed[i] for i in range(24)]
-                insufficient = [deficit[i] < 0 for i in range(cycle)]
-                if any(insufficient):
-                    # TODO:  NEED TO LOOP BACK AND REBUILD requests until we have a 24-hour request we know can be met
-                    pass
-                
-                # Now we know what the fleet can do, so ask it to do it
-                for i in range(24):
-                    fleet_request = FleetRequest(ts=dt_day[i], sim_step=self.sim_step, start_time=start_time, p=forecast_response[i].P_service)
-                    fleet_response = self.fleet.process_request(fleet_request)
-                    # TODO:  store performance stats
+                    progress.step('%s', responses[-1].P_service)
 
-                    requests.append(fleet_request)
-                    responses.append(fleet_response)
-                    print(responses[-1].P_service)
-            '''        
         request_list_1h = []
         for r in requests:
             if r.P_req is not None:
@@ -179,37 +167,7 @@ class PeakManagementService:
         plot_dir = join(dirname(dirname(dirname(abspath(__file__)))), 'integration_test', service_name)
         ensure_ddir(plot_dir)
         plot_filename = 'SimResults_PeakManagement_' + fleet_name + '_' + datetime.now().strftime('%Y%m%dT%H%M')  + '.png'
-        plt.figure(1)
-        plt.figure(figsize=(15, 8))
-        plt.subplot(311)
-        if not(all(pd.isnull(df_1h['Request']))):
-            plt.plot(df_1h.Date_Time, df_1h.Request, label='P_Request', linestyle = '-')
-        if not(all(pd.isnull(df_1h['Response']))):
-            plt.plot(df_1h.Date_Time, df_1h.Response, label='P_Response', linestyle = '--')
-        plt.ylabel('Power (MW)')
-        plt.legend()
-        
-        plt.subplot(312)
-        if not(all(pd.isnull(df_1h['P_base']))):
-            plt.plot(df_1h.Date_Time, df_1h.P_base + df_1h.Request, label='P_base + P_Request', linestyle = '-')       
-        if not(all(pd.isnull(df_1h['P_togrid']))):
-            plt.plot(df_1h.Date_Time, df_1h.P_togrid, label='P_togrid', linestyle = '--')
-        if not(all(pd.isnull(df_1h['P_base']))):
-            plt.plot(df_1h.Date_Time, df_1h.P_base, label='P_base', linestyle = '-.')
-        plt.ylabel('Power (MW)')
-        plt.legend()
-        
-        if 'battery' is not fleet_name.lower():
-            plt.xlabel('Time')
-        
-        if 'battery' in fleet_name.lower():
-            if not(all(pd.isnull(df_1h['SoC']))):
-                plt.subplot(313)
-                plt.plot(df_1h.Date_Time, df_1h.SoC, label='SoC', linestyle = '-')
-                plt.ylabel('SoC (%)')
-                plt.xlabel('Time')
-        plt.savefig(join(plot_dir, plot_filename), bbox_inches='tight')
-        plt.close()
+        output_policy.plot(plot_results, df_1h, fleet_name, join(plot_dir, plot_filename))
         
         # compute and report metrics to csv
         perf_metrics = pd.DataFrame(columns=['Service_efficacy'])
@@ -222,6 +180,77 @@ class PeakManagementService:
         results_filename = 'Results_PeakManagement_' + fleet_name + '_' + datetime.now().strftime('%Y%m%dT%H%M')  + '.csv'
         df_1h.to_csv(join(plot_dir, results_filename) )
 
+    def peak_shaving_plan(self):
+        """
+        Returns the power needed from the fleet to bring the drive-cycle load down to the target, as an array
+        with one row per whole day of the drive cycle and one column per hour. Hours without a need are NaN.
+        """
+        days = len(self.drive_cycle.load_forecast_mw) // 24
+        mw = self.drive_cycle.load_forecast_mw.values[:days*24].reshape(days, 24)
+        p_needed = mw - self.mw_target
+        return np.where(p_needed > 0, p_needed, np.nan)
+
+    def plan_day(self, dt_day, p_needed, start_time):
+        """
+        Returns the requests of a day, one per time step, from the power needed in each hour (None if nothing
+        is needed). The fleet's forecast of the day is asked once and the requests are reduced to what the fleet
+        can provide. Days without any need are not forecast.
+        """
+        steps = int(3600/self.sim_step.seconds)
+        day_requests = [FleetRequest(ts=dt_day[i]+j*self.sim_step, sim_step=self.sim_step, start_time=start_time,
+                                     p=p_needed[i]) for i in range(24) for j in range(steps)]
+        if all(p is None for p in p_needed):
+            return day_requests
+
+        # Get a 24-hour forecast from fleet
+        forecast_responses = self.fleet.forecast(day_requests)
+        p_forecast = np.array([np.nan if r.P_service is None else r.P_service for r in forecast_responses],
+                              dtype=float)
+
+        # See if the forecast can meet the desired load, otherwise only ask for what the fleet can do
+        p_requested = np.repeat(np.array([np.nan if p is None else p for p in p_needed], dtype=float), steps)
+        insufficient = p_forecast < p_requested
+        if not insufficient.any():
+            return day_requests
+        logger.info('%s: the fleet forecast falls short of the plan in %i of %i time steps',
+                    dt_day[0].date(), insufficient.sum(), len(day_requests))
+        p_feasible = np.where(insufficient, p_forecast, p_requested)
+        return [FleetRequest(ts=r.ts_req, sim_step=self.sim_step, start_time=start_time,
+                             p=None if np.isnan(p) else p) for r, p in zip(day_requests, p_feasible)]
+
     def process_stats(self, dh_1h):
         pass
         # TODO:  Aggregate up the fleet's performance stats and...do what?  Print them?  Write them to a file?
+
+
+def plot_results(df_1h, fleet_name, filename):
+    # Requests and responses of the whole drive cycle, and the SoC of battery fleets
+    plt.figure(figsize=(15, 8))
+    plt.subplot(311)
+    if not(all(pd.isnull(df_1h['Request']))):
+        plt.plot(df_1h.Date_Time, df_1h.Request, label='P_Request', linestyle = '-')
+    if not(all(pd.isnull(df_1h['Response']))):
+        plt.plot(df_1h.Date_Time, df_1h.Response, label='P_Response', linestyle = '--')
+    plt.ylabel('Power (MW)')
+    plt.legend()
+
+    plt.subplot(312)
+    if not(all(pd.isnull(df_1h['P_base']))):
+        plt.plot(df_1h.Date_Time, df_1h.P_base + df_1h.Request, label='P_base + P_Request', linestyle = '-')       
+    if not(all(pd.isnull(df_1h['P_togrid']))):
+        plt.plot(df_1h.Date_Time, df_1h.P_togrid, label='P_togrid', linestyle = '--')
+    if not(all(pd.isnull(df_1h['P_base']))):
+        plt.plot(df_1h.Date_Time, df_1h.P_base, label='P_base', linestyle = '-.')
+    plt.ylabel('Power (MW)')
+    plt.legend()
+
+    if 'battery' is not fleet_name.lower():
+        plt.xlabel('Time')
+
+    if 'battery' in fleet_name.lower():
+        if not(all(pd.isnull(df_1h['SoC']))):
+            plt.subplot(313)
+            plt.plot(df_1h.Date_Time, df_1h.SoC, label='SoC', linestyle = '-')
+            plt.ylabel('SoC (%)')
+            plt.xlabel('Time')
+    output_policy.save(filename)
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+Scaling of the hourly scoring of RegService.request_loop
+
+Builds synthetic 2-second request and response signals for one day, one week
+and one month, and times RegService.hourly_scores on them. The hourly 65-min
+windows are also cut with the list comprehensions request_loop used before
+(a filter of the complete lists on timestamps for each hour) to compare the
+cost of the slicing alone. Finally times perf_score over a month of hourly
+evaluations (743 hours of 10-second request and response arrays).
+
+Then times the output of a one-day run: the 43200 requests of a day at 2
+seconds sent with RegService.request to a fleet that answers at once (90% of
+the request), and the hourly scores of the day, with
+- print: a print per time step, as request did it before it used logging
+- verbose: output_policy.verbose(), a message per time step
+- progress: the default policy, a progress message every 10 seconds at most
+- silent: output_policy.silent(), warnings only
+The output goes to a pipe read by another process, line buffered as on a
+terminal, and to os.devnull (the formatting alone). Each time is the best of
+3 runs.
+
+Usage: python benchmark.py
+"""
+import sys
+import os
+import io
+import subprocess
+from contextlib import redirect_stdout
+from os.path import dirname, abspath
+sys.path.insert(0, dirname(dirname(dirname(abspath(__file__)))))
+
+import time
+from datetime import datetime, timedelta
+import numpy as np
+
+import output_policy
+from fleet_request import FleetRequest
+from fleet_response import FleetResponse
+from services.reg_service import reg_service
+from services.reg_service.reg_service import RegService
+
+OUTPUTS = [
+    ('print', None),
+    ('verbose', output_policy.verbose()),
+    ('progress', output_policy.OutputPolicy()),
+    ('silent', output_policy.silent()),
+]
+RUNS = 3
+
+
+def signal_lists(start_time, days, sim_step=timedelta(seconds=2)):
+    rng = np.random.RandomState(0)
+    n = int(days*24*3600/sim_step.total_seconds())
+    P_req = np.cumsum(rng.normal(0, 5, n))
+    requests, responses = [], []
+    for k in range(n):
+        ts = start_time + k*sim_step
+        requests.append(FleetRequest(ts=ts, sim_step=sim_step, p=P_req[k]))
+        response = FleetResponse()
+        response.ts = ts
+        response.P_service = P_req[max(k - 3, 0)]
+        responses.append(response)
+    return requests, responses
+
+
+def hour_starts(start_time, end_time):
+    cur_time = start_time
+    while cur_time < end_time - timedelta(minutes=65):
+        yield cur_time
+        cur_time += timedelta(hours=1)
+
+
+def bench_list_filter(requests, responses, start_time, end_time):
+    start = time.time()
+    for cur_time in hour_starts(start_time, end_time):
+        cur_end_time = cur_time + timedelta(minutes=65)
+        np.asarray([r.P_req for r in requests if cur_time <= r.ts_req <= cur_end_time])
+        np.asarray([r.P_service for r in responses if cur_time <= r.ts <= cur_end_time])
+    return time.time() - start
+
+
+def bench_window(service, requests, responses, start_time, end_time):
+    start = time.time()
+    request_ts, request_array = service.time_ordered([r.ts_req for r in requests], [r.P_req for r in requests])
+    response_ts, response_array = service.time_ordered([r.ts for r in responses], [r.P_service for r in responses])
+    for cur_time in hour_starts(start_time, end_time):
+        window_start = np.datetime64(cur_time, 'us')
+        window_end = window_start + np.timedelta64(65, 'm')
+        service.window(request_ts, request_array, window_start, window_end)
+        service.window(response_ts, response_array, window_start, window_end)
+    return time.time() - start
+
+
+class Fleet:
+
+    def assigned_service_kW(self):
+        return 100.
+
+    def process_request(self, fleet_request):
+        response = FleetResponse()
+        response.ts = fleet_request.ts_req
+        response.P_togrid = response.P_service = 0.9 * fleet_request.P_req
+        return response
+
+
+def old_request(service, ts, sim_step, p):
+    # request as it was before it used logging
+    fleet_request = FleetRequest(ts=ts, sim_step=sim_step, p=p, q=0.0)
+    print("Processing request at timestep %s" % ts)
+    fleet_response = service.fleet.process_request(fleet_request)
+    return fleet_request, fleet_response
+
+
+def run_day(service, start_time, policy, sim_step=timedelta(seconds=2)):
+    P_req = np.cumsum(np.random.RandomState(0).normal(0, 5, int(24*3600/sim_step.total_seconds()))).tolist()
+    if policy is not None:
+        output_policy.set_policy(policy)
+    # A new progress for each run, so that its first step is logged
+    service._progress = output_policy.Progress(reg_service.logger)
+    start = time.time()
+    if policy is None:
+        items = [old_request(service, start_time + k*sim_step, sim_step, p) for k, p in enumerate(P_req)]
+    else:
+        items = [service.request(start_time + k*sim_step, sim_step, p) for k, p in enumerate(P_req)]
+    service.hourly_scores('Traditional', start_time, start_time + timedelta(days=1), [x[0] for x in items],
+                          [x[1] for x in items])
+    return time.time() - start
+
+
+def bench_output(service, start_time):
+    reader = subprocess.Popen([sys.executable, '-c', 'import sys, shutil; shutil.copyfileobj(sys.stdin.buffer, '
+                                                     'open(%r, "wb"))' % os.devnull], stdin=subprocess.PIPE)
+    pipe = io.TextIOWrapper(reader.stdin, line_buffering=True)
+    devnull = open(os.devnull, 'w')
+    handler = output_policy.logger.handlers[0]
+    stdout = handler.stream
+    print('%10s %10s %13s' % ('output', 'pipe (s)', 'devnull (s)'))
+    try:
+        for name, policy in OUTPUTS:
+            times = []
+            for stream in (pipe, devnull):
+                handler.setStream(stream)
+                with redirect_stdout(stream):
+                    times.append(min(run_day(service, start_time, policy) for _ in range(RUNS)))
+            print('%10s %10.3f %13.3f' % (name, times[0], times[1]))
+    finally:
+        handler.setStream(stdout)
+        output_policy.set_policy(output_policy.OutputPolicy())
+        pipe.close()
+        reader.wait()
+        devnull.close()
+
+
+def bench_perf_score(service, hours=743):
+    rng = np.random.RandomState(0)
+    requests = np.cumsum(rng.normal(0, 1, (hours, 391)), axis=1)
+    responses = np.roll(requests, 2, axis=1) + rng.normal(0, 0.3, (hours, 391))
+    start = time.time()
+    for h in range(hours):
+        service.perf_score(requests[h], responses[h])
+    return time.time() - start
+
+
+if __name__ == '__main__':
+    start_time = datetime(2017, 8, 1)
+    service = RegService()
+    service._clearing_price_helper._clearing_prices = {start_time + timedelta(hours=h): (30.0, 10.0, 2.0)
+                                                       for h in range(31*24)}
+
+    print('%6s %10s %8s %16s %14s %16s' % ('days', 'samples', 'hours', 'list filter (s)', 'arrays+search (s)',
+                                              'hourly_scores (s)'))
+    for days in (1, 7, 31):
+        end_time = start_time + timedelta(days=days)
+        requests, responses = signal_lists(start_time, days)
+        hours = len(list(hour_starts(start_time, end_time)))
+
+        t_filter = bench_list_filter(requests, responses, start_time, end_time)
+        t_window = bench_window(service, requests, responses, start_time, end_time)
+        start = time.time()
+        results = service.hourly_scores('Traditional', start_time, end_time, requests, responses)
+        t_scores = time.time() - start
+        assert len(results) == hours
+
+        print('%6i %10i %8i %16.2f %14.4f %16.2f' % (days, len(requests), hours, t_filter, t_window, t_scores))
+
+    print('perf_score, one month of hourly evaluations: %.2f s' % bench_perf_score(service))
+
+    print()
+    service.fleet = Fleet()
+    bench_output(service, start_time)
@@ -1,40 +1,82 @@
 import pandas as pd
+import numpy as np
+import file_cache
 from dateutil import parser
 
 class ClearingPriceHelper(object):
 
+    # Regulation price components, in the order of the tuples of "clearing_prices".
+    components = ('MCP', 'REG_CCP', 'REG_PCP')
+
     # This method returns a Dictionary containing a month-worth of hourly regulation price data indexed by datetime.
     def read_and_store_clearing_prices(self, input_data_file_path, start_time):
+        self._start, self._prices = self._load_clearing_prices(input_data_file_path)
 
-        sheet_name = self._get_sheet_name(start_time)
-
-        excel_data = pd.read_excel(input_data_file_path, sheet_name = sheet_name)
-        # Get only the data whose 'SERVICE' is 'REG':
-        regulated_prices_data_frame = excel_data[excel_data['SERVICE'] == 'REG']
-        # Get only the columns we need:
-        regulated_prices_data_frame = regulated_prices_data_frame[['LOCALDAY', 'LOCALHOUR',
-                                                                'MCP', 'REG_CCP', 'REG_PCP']]
-        # Create a new column 'LOCAL_DAY_HOUR':
-        regulated_prices_data_frame['LOCAL_DAY_HOUR'] = regulated_prices_data_frame[
-            'LOCALDAY'] + " " + regulated_prices_data_frame['LOCALHOUR'].map(str) + ":00:00"
-        # Convert the type of column 'LOCAL_DAY_HOUR' to datetime.
-        # Inside apply, parser.parse() converts string to datetime:
-        regulated_prices_data_frame['LOCAL_DAY_HOUR'] = regulated_prices_data_frame[
-            'LOCAL_DAY_HOUR'].apply(lambda x: parser.parse(x))
-        # Get only the columns we need (i.e. We don't need 'LOCALDAY' and 'LOCALHOUR'):
-        regulated_prices_data_frame = regulated_prices_data_frame[['LOCAL_DAY_HOUR', 'MCP',
-                                                                'REG_CCP', 'REG_PCP']]
-        regulated_prices_data_frame = regulated_prices_data_frame.set_index('LOCAL_DAY_HOUR')
-        # Generate Dictionary. Index becomes key of Dictionary and the rest is put in tuple:
-        regulated_prices_dictionary = regulated_prices_data_frame.T.apply(tuple).to_dict()
-        self._clearing_prices = regulated_prices_dictionary
+        # Generate Dictionary for the month of start_time, keyed by the start of the hour.
+        # Each price is a tuple of the price components.
+        month = pd.Timestamp(start_time).to_period('M')
+        first = max(self.hour_index(month.start_time), 0)
+        last = min(self.hour_index(month.end_time) + 1, len(self._prices))
+        hours = pd.date_range(self._start + first * pd.Timedelta(hours=1), periods=max(last - first, 0), freq='h')
+        prices = self._prices[first:last]
+        available = ~np.isnan(prices).any(axis=1)
+        self._clearing_prices = dict(zip(hours[available].to_pydatetime(), map(tuple, prices[available].tolist())))
 
     # Allow method "clearing_prices" be used as an attribute.
     @property
     def clearing_prices(self):
         return self._clearing_prices
 
+    # Hourly prices of the whole workbook, an array with one row per hour (see hour_index())
+    # and one column per price component. Hours without prices are NaN.
+    @property
+    def prices(self):
+        return self._prices
+
+    # Returns the row of "prices" for the hour containing "time".
+    def hour_index(self, time):
+        return (pd.to_datetime(time).floor('h') - self._start) // pd.Timedelta(hours=1)
+
     # Get name of the tab in the Excel file holding price data for a whole year.
     def _get_sheet_name(self, local_day):
         timestamp = pd.Timestamp(local_day)
         return timestamp.strftime("%B_%Y")
+
+    def _load_clearing_prices(self, input_data_file_path):
+        # Returns the start of the first hour and the regulation prices of each hour, from all the monthly tabs.
+        # They are cached (see file_cache), and read from the cache as long as it is newer than the workbook.
+        return file_cache.load(input_data_file_path, ('.npz',), self._parse_clearing_prices,
+                               self._write_clearing_prices, self._read_clearing_prices)
+
+    def _write_clearing_prices(self, base, loaded):
+        start, prices = loaded
+        np.savez(base + '.npz', start=np.datetime64(start, 'h'), prices=prices)
+
+    def _read_clearing_prices(self, base):
+        with np.load(base + '.npz') as cache:
+            return pd.Timestamp(cache['start'][()]), cache['prices']
+
+    def _parse_clearing_prices(self, input_data_file_path):
+        sheets = pd.read_excel(input_data_file_path, sheet_name=None)
+        excel_data = pd.concat([sheet for sheet in sheets.values()
+                                if set(['SERVICE', 'LOCALDAY', 'LOCALHOUR']).issubset(sheet.columns)])
+        # Get only the data whose 'SERVICE' is 'REG':
+        regulated_prices_data_frame = excel_data[excel_data['SERVICE'] == 'REG']
+        local_hour = (self._parse_local_days(regulated_prices_data_frame['LOCALDAY']) +
+                      pd.to_timedelta(regulated_prices_data_frame['LOCALHOUR'].astype(int).values, unit='h'))
+
+        start = local_hour.min()
+        index = (local_hour - start) // pd.Timedelta(hours=1)
+        prices = np.full((index.max() + 1, len(self.components)), np.nan)
+        prices[index] = regulated_prices_data_frame[list(self.components)].to_numpy(dtype=float)
+
+        return start, prices
+
+    def _parse_local_days(self, local_days):
+        # 'LOCALDAY' is e.g. "01-AUG-2017". Other layouts are parsed once per distinct day.
+        try:
+            return pd.DatetimeIndex(pd.to_datetime(local_days.astype(str).values, format='%d-%b-%Y'))
+        except ValueError:
+            distinct_days = pd.unique(local_days.astype(str).values)
+            parsed_days = dict(zip(distinct_days, [parser.parse(day) for day in distinct_days]))
+            return pd.DatetimeIndex([parsed_days[day] for day in local_days.astype(str).values])
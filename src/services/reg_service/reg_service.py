@@ -6,6 +6,7 @@
 
 import os
 import sys
+import logging
 from dateutil import parser
 from datetime import datetime, timedelta
 import numpy as np
@@ -18,12 +19,15 @@ sys.path.insert(0, dirname(dirname(dirname(abspath(__file__)))))
 
 from fleet_request import FleetRequest
 from utils import ensure_ddir
+import output_policy
 
 from services.reg_service.helpers.historical_signal_helper import HistoricalSignalHelper
 from services.reg_service.helpers.clearing_price_helper import ClearingPriceHelper
 
 from pdb import set_trace as bp
 
+logger = logging.getLogger('services.reg_service')
+
 
 # Class for traditional regulation and dynamic regulation services.
 class RegService():
@@ -35,6 +39,7 @@ class RegService():
     def __init__(self, *args, **kwargs):
         self._historial_signal_helper = HistoricalSignalHelper()
         self._clearing_price_helper = ClearingPriceHelper()
+        self._progress = output_policy.Progress(logger)
 
     # The "request_loop" function is the workhorse that manages hourly loops and sending requests & retrieving responses.
     # It returns a 2-level dictionary; 1st level key is the starting time of each hour.
@@ -51,10 +56,10 @@ class RegService():
             raise ValueError("service_type has to be either 'Traditional' or 'Dynamic'!")
         # Generate lists of 2s request and response class objects based on regulation service type (i.e. traditional vs. dynamic).
 
-        print('     Generating traditional signal lists')
+        logger.info('     Generating traditional signal lists')
         request_list_2s_trad, response_list_2s_trad = self.get_signal_lists('Traditional', start_time, end_time, sim_step)
         if service_type == 'Dynamic':
-            print('     Generating dynamic signal lists')
+            logger.info('     Generating dynamic signal lists')
             request_list_2s_dynm, response_list_2s_dynm = self.get_signal_lists(service_type, start_time, end_time, sim_step)
 
             # Assign generic names to signal lists.
@@ -65,34 +70,97 @@ class RegService():
             response_list_2s_tot = response_list_2s_trad
 
         # Returns a Dictionary containing a month-worth of hourly regulation price data indexed by datetime.
-        print('     Getting price data')
+        logger.info('     Getting price data')
         clearing_price_filename = join(dirname(abspath(__file__)), clearing_price_filename)
         self._clearing_price_helper.read_and_store_clearing_prices(clearing_price_filename, start_time)
+        logger.info('     Starting hourly loop')
+        if service_type == 'Dynamic':
+            hourly_results = self.hourly_scores(service_type, start_time, end_time,
+                                                request_list_2s_trad, response_list_2s_trad,
+                                                request_list_2s_dynm, response_list_2s_dynm)
+        else:
+            hourly_results = self.hourly_scores(service_type, start_time, end_time,
+                                                request_list_2s_trad, response_list_2s_trad)
+        # Store request and response parameters in lists for plotting and printing to text files.
+        P_request = [r.P_req for r in request_list_2s_tot]
+        ts_request = [r.ts_req for r in request_list_2s_tot]
+        P_response = [r.P_service for r in response_list_2s_tot]
+        P_togrid = [r.P_togrid for r in response_list_2s_tot]
+
+        # Save the responses to a csv
+        results_df = pd.DataFrame({
+            'DateTime': ts_request,
+            'P_request': P_request,
+            'P_response': P_response,
+            'P_togrid': P_togrid
+        })
+        # Calculate P_base
+        results_df['P_base'] = results_df['P_togrid'] - results_df['P_response']
+        # Add SoC if battery fleet
+        if 'battery' in fleet_name.lower():
+            SOC = [r.soc for r in response_list_2s_tot]
+            results_df['SOC'] = SOC
+        results_df_dir = join(dirname(abspath(__file__)), 'results', '')
+        ensure_ddir(results_df_dir)
+        results_df_filename = datetime.now().strftime('%Y%m%d') + '_' + ts_request[0].strftime(
+            '%B') + '_2sec_results_' + service_type + '_' + fleet_name + '.csv'
+        results_df.to_csv(results_df_dir + results_df_filename)
+
+        # Generate and save plot of the normalized request and response signals for the month
+        logger.info('     Plotting monthly response signal')
+        plot_dir = join(dirname(abspath(__file__)), 'results', 'plots', '')
+        ensure_ddir(plot_dir)
+        plot_filename = datetime.now().strftime('%Y%m%d') + '_' + \
+                        ts_request[0].strftime('%B') + \
+                        '_2secnormsignals_' + \
+                        service_type + \
+                        '_' + \
+                        fleet_name + '.png'
+        output_policy.plot(plot_signals, results_df, fleet_name, plot_dir + plot_filename)
+
+        return hourly_results
+
+    # Score each hour between "start_time" and "end_time" and settle it at the clearing price.
+    # The requests and responses are kept in time-ordered arrays and the 65-min window of each hour
+    # is located by binary search, so each hour only touches its own slice of the signals.
+    # It returns a 2-level dictionary; 1st level key is the starting time of each hour.
+    def hourly_scores(self, service_type, start_time, end_time, request_list_2s_trad, response_list_2s_trad,
+                      request_list_2s_dynm=None, response_list_2s_dynm=None):
+        # Traditional regulation request and response signals are needed regardless of service type.
+        request_ts_trad, request_array_trad = self.time_ordered([r.ts_req for r in request_list_2s_trad],
+                                                                [r.P_req for r in request_list_2s_trad])
+        response_ts_trad, response_array_trad = self.time_ordered([r.ts for r in response_list_2s_trad],
+                                                                  [r.P_service for r in response_list_2s_trad])
+        if service_type == 'Dynamic':
+            request_ts_dynm, request_array_dynm = self.time_ordered([r.ts_req for r in request_list_2s_dynm],
+                                                                    [r.P_req for r in request_list_2s_dynm])
+            response_ts_dynm, response_array_dynm = self.time_ordered([r.ts for r in response_list_2s_dynm],
+                                                                      [r.P_service for r in response_list_2s_dynm])
+
         # Create a dictionary to store hourly results incl. performance score, clearing price credit, etc.
         hourly_results = {}
-        # Set time duration.
+        # Starting time of each hour between "start_time" and "end_time", and end of its 65-min window.
+        hour_starts = []
         cur_time = start_time
-        one_hour = timedelta(hours=1)
-        print('     Starting hourly loop')
-        # Loop through each hour between "start_time" and "end_time".
         while cur_time < end_time - timedelta(minutes=65):
+            hour_starts.append(cur_time)
+            cur_time += timedelta(hours=1)
+        window_starts = np.array(hour_starts, dtype='datetime64[us]')
+        window_ends = window_starts + np.timedelta64(65, 'm')
+        # Loop through each hour.
+        for h, cur_time in enumerate(hour_starts):
             # Generate 1-hour worth (65 min) of request and response arrays for calculating scores.
-            cur_end_time = cur_time + timedelta(minutes=65)
-            # Traditional regulation request and response signals are needed regardless of service type.
-            request_list_2s_65min_trad = [r.P_req for r in request_list_2s_trad if cur_time <= r.ts_req <= cur_end_time]
-            response_list_2s_65min_trad = [r.P_service for r in response_list_2s_trad if
-                                           cur_time <= r.ts <= cur_end_time]
-            request_array_2s_65min_trad = np.asarray(request_list_2s_65min_trad)
-            response_array_2s_65min_trad = np.asarray(response_list_2s_65min_trad)
+            request_array_2s_65min_trad = self.window(request_ts_trad, request_array_trad,
+                                                      window_starts[h], window_ends[h])
+            response_array_2s_65min_trad = self.window(response_ts_trad, response_array_trad,
+                                                       window_starts[h], window_ends[h])
             # For dynamic regulation, mileage ratio calculation is as below.
             if service_type == 'Dynamic':
                 # Chop total signals to 1 hour.
-                request_list_2s_65min_dynm = [r.P_req for r in request_list_2s_dynm if
-                                              cur_time <= r.ts_req <= cur_end_time]
-                response_list_2s_65min_dynm = [r.P_service for r in response_list_2s_dynm if
-                                               cur_time <= r.ts <= cur_end_time]
-                request_array_2s_65min_dynm = np.asarray(request_list_2s_65min_dynm)
-                response_array_2s_65min_dynm = np.asarray(response_list_2s_65min_dynm)
+                request_array_2s_65min_dynm = self.window(request_ts_dynm, request_array_dynm,
+                                                          window_starts[h], window_ends[h])
+                response_array_2s_65min_dynm = self.window(response_ts_dynm, response_array_dynm,
+                                                           window_starts[h], window_ends[h])
                 # The "mileage ratio" equals "1" for traditional regulation and is > 1 for dynamic regulation.
                 try:
                     Hourly_mileage_trad = self.Hourly_reg_mileage(request_array_2s_65min_trad)
@@ -105,16 +173,16 @@ class RegService():
                     # values, this function breaks.
                     mileage_ratio = np.nan
 
-                # Assign generic names to signal lists.
-                request_list_2s_65min = request_list_2s_65min_dynm
-                response_list_2s_65min = response_list_2s_65min_dynm
+                # Assign generic names to signal arrays.
+                request_array_2s_65min = request_array_2s_65min_dynm
+                response_array_2s_65min = response_array_2s_65min_dynm
             else:
-                request_list_2s_65min = request_list_2s_65min_trad
-                response_list_2s_65min = response_list_2s_65min_trad
+                request_array_2s_65min = request_array_2s_65min_trad
+                response_array_2s_65min = response_array_2s_65min_trad
                 mileage_ratio = 1
-            # Convert lists into arrays. convert units from kW to MW.
-            request_array_2s = np.asarray(request_list_2s_65min) / 1000
-            response_array_2s = np.asarray(response_list_2s_65min) / 1000
+            # Convert units from kW to MW.
+            request_array_2s = request_array_2s_65min / 1000
+            response_array_2s = response_array_2s_65min / 1000
             # Slice arrays at 10s intervals - resulted arrays have 390 data points.
             request_array_10s = request_array_2s[::5]
             response_array_10s = response_array_2s[::5]
@@ -139,66 +207,19 @@ class RegService():
                                                                                                mileage_ratio)
             else:  # There are no NaNs in request_array_10s
                 pass
-            # Move to the next hour.
-            cur_time += one_hour
-        # Store request and response parameters in lists for plotting and printing to text files.
-        P_request = [r.P_req for r in request_list_2s_tot]
-        ts_request = [r.ts_req for r in request_list_2s_tot]
-        P_response = [r.P_service for r in response_list_2s_tot]
-        P_togrid = [r.P_togrid for r in response_list_2s_tot]
 
-        # Save the responses to a csv
-        results_df = pd.DataFrame({
-            'DateTime': ts_request,
-            'P_request': P_request,
-            'P_response': P_response,
-            'P_togrid': P_togrid
-        })
-        # Calculate P_base
-        results_df['P_base'] = results_df['P_togrid'] - results_df['P_response']
-        # Add SoC if battery fleet
-        if 'battery' in fleet_name.lower():
-            SOC = [r.soc for r in response_list_2s_tot]
-            results_df['SOC'] = SOC
-        results_df_dir = join(dirname(abspath(__file__)), 'results', '')
-        ensure_ddir(results_df_dir)
-        results_df_filename = datetime.now().strftime('%Y%m%d') + '_' + ts_request[0].strftime(
-            '%B') + '_2sec_results_' + service_type + '_' + fleet_name + '.csv'
-        results_df.to_csv(results_df_dir + results_df_filename)
+        return hourly_results
 
-        # Generate and save plot of the normalized request and response signals for the month
-        print('     Plotting monthly response signal')
-        plot_dir = join(dirname(abspath(__file__)), 'results', 'plots', '')
-        ensure_ddir(plot_dir)
-        plot_filename = datetime.now().strftime('%Y%m%d') + '_' + \
-                        ts_request[0].strftime('%B') + \
-                        '_2secnormsignals_' + \
-                        service_type + \
-                        '_' + \
-                        fleet_name + '.png'
-        plt.figure(1)
-        plt.figure(figsize=(15, 8))
-        plt.subplot(211)
-        if (not (all(pd.isnull(results_df['P_request'])))):
-            plt.plot(ts_request, P_request, label='P_request')
-        if (not (all(pd.isnull(results_df['P_response'])))):
-            plt.plot(ts_request, P_response, label='P_response')
-        if (not (all(pd.isnull(results_df['P_togrid'])))):
-            plt.plot(ts_request, P_togrid, label='P_togrid')
-        if (not (all(pd.isnull(results_df['P_base'])))):
-            plt.plot(ts_request, results_df.P_base, label='P_base')
-        plt.legend(loc='best')
-        plt.ylabel('Power (MW)')
-        if 'battery' in fleet_name.lower():
-            if not (all(pd.isnull(results_df['SOC']))):
-                plt.subplot(212)
-                plt.plot(ts_request, SOC)
-                plt.ylabel('SoC (%)')
-                plt.xlabel('Date and Time')
-        plt.savefig(plot_dir + plot_filename, bbox_inches='tight')
-        plt.close()
+    # Returns the timestamps (as datetime64) and values of a signal sorted by time.
+    def time_ordered(self, times, values):
+        times = np.array(times, dtype='datetime64[us]')
+        values = np.asarray(values)
+        order = np.argsort(times, kind='stable')
+        return times[order], values[order]
 
-        return hourly_results
+    # Returns the values of a time-ordered signal with timestamps between start and end (both included).
+    def window(self, times, values, start, end):
+        return values[np.searchsorted(times, start, side='left'):np.searchsorted(times, end, side='right')]
 
     # Returns lists of requests and responses at 2s intervals.
     def get_signal_lists(self, service_type, start_time, end_time, sim_step):
@@ -228,7 +249,7 @@ class RegService():
     # Method for retrieving device fleet's response to each individual request.
     def request(self, ts, sim_step, p, q=0.0):  # added input variables; what's the purpose of sim_step??
         fleet_request = FleetRequest(ts=ts, sim_step=sim_step, p=p, q=0.0)
-        print("Processing request at timestep %s" % ts)
+        self._progress.step("Processing request at timestep %s", ts)
         fleet_response = self.fleet.process_request(fleet_request)
         # print(fleet_response.P_service)
         return fleet_request, fleet_response
@@ -236,121 +257,53 @@ class RegService():
     # Score the performance of device fleets for the hour (based on PJM Manual 12).
     # Take 65 min worth of 10s data (should contain 390 data values).
     def perf_score(self, request_array, response_array):
-        max_corr_array = []
-        max_index_array = []
-        prec_score_array = []
-        # In each 5-min of the hour, use max correlation to define "delay", "correlation" & "delay" scores.
-        # There are twelve (12) 5-min in each hour.
-        for i in range(12):
-            # Takes 5-min of the input signal data.
-            x = request_array[30 * i:30 * (i + 1)]
-            #         print('x:', x)
-            y = response_array[30 * i:30 * (i + 1)]
-            # plot for 5min+5min(response signal lag window) for visually verifying correlation and delay.
-            x_plot = request_array[30 * i:30 * (i + 2)]
-            y_plot = response_array[30 * i:30 * (i + 2)]
-            # Refresh the array in each 5-min run.
-            corr_score = []
-            # If the regulation signal is nearly constant, then correlation score is calculated as:
-            # Calculates "1 - absoluate of difference btw slope of request and response signals" (determined by linear regression).
-            std_dev_x = np.std(x)
-            if std_dev_x < 0.01:  # need to vet the threshold later, not specified in PJM manual.
-                axis = np.array(np.arange(30.))
-                coeff_x = np.polyfit(axis, x, 1)  # linear regression when degree = 1.
-                coeff_y = np.polyfit(axis, y, 1)
-                slope_x = coeff_x[0]
-                slope_y = coeff_y[0]
-                corr_score_val = max(0, 1 - abs(slope_x - slope_y))  # from PJM manual 12.
-                max_index_array = np.append(max_index_array, 0)
-                max_corr_array = np.append(max_corr_array,
-                                           corr_score_val)  # "r" cannot be calc'd for constant values in one or both arrays.
-            else:
-                # Calculate correlation btw the 5-min input signal and thirty different 5-min response signals,
-                # each is delayed at an additional 10s than the previous one; store results.
-                # There are thirty (30) 10s in each 5min.
-                for j in range(31):
-                    y_ = response_array[30 * i + j:30 * (i + 1) + j]
-                    #             # for debug use
-                    #             print('y:', y)
-                    #             x_axis_x = np.arange(x.size)
-                    #             plt.plot(x_axis_x, x, "b")
-                    #             plt.plot(x_axis_x, y, "r")
-                    #             plt.show()
-                    std_dev_y_ = np.std(y_)
-                    # When request signal varies but response signal is constant, correlation and delay scores will be zero.
-                    if std_dev_y_ < 0.00001:
-                        corr_r = 0
-                    else:
-                        # Calculate Pearson Correlation Coefficient btw input and response for the 10s step.
-                        corr_r = np.corrcoef(x, y_)[0, 1]
-                    # Correlation scores stored in an numpy array.
-                    corr_score = np.append(corr_score, corr_r)
-                    #         print('corr_score:', corr_score)
-                # Locate the 10s moment(step) at which correlation score was maximum among the thirty calculated; store it.
-                # If corr_r=0 for all 31 combinations, then both correlation and delay scores for that 5min should be 0.
-                if sum(corr_score) == 0:
-                    max_index = 30
-                else:
-                    max_index = np.where(corr_score == max(corr_score))[0][0]
-                max_index_array = np.append(max_index_array, max_index)  # array
-                # Find the maximum score in the 5-min; store it.
-                max_corr_array = np.append(max_corr_array, corr_score[max_index])  # this is the correlation score array
-            # Calculate the coincident delay score associated with max correlation in each 5min period.
-            delay_score_array = np.absolute((10 * max_index_array - 5 * 60) / (5 * 60))  # array
-            # Calculate error at 10s intervals and store in an array.
-            error = np.absolute(y - x) / (np.absolute(x).mean())
-            # Calculate 5-min average Precision Score as the average error.
-            prec_score = max(0, 1 - 1 / 30 * error.sum())
-            prec_score_array = np.append(prec_score_array, prec_score)
-
-            # for debug use
-            # x_axis_sig = np.arange(x_plot.size)
-            # plot_dir = join(dirname(abspath(__file__)), 'results', 'plots')
-            # plt.figure(1)
-            # plt.figure(figsize=(15,8))
-            # plt.plot(x_axis_sig, x_plot, "b")
-            # plt.plot(x_axis_sig, y_plot, "r")
-            # plt.legend(('RegA signal', 'CReg response'), loc='best')
-            # plt.savefig(plot_dir + 'test_trad5mins_minidx' + str(i) + '.png', bbox_inches='tight')
-            # plt.close()
-
-        # for debug use
-        # x_axis_score = np.arange(max_corr_array.size)
-
-        # plt.figure(1)
-        # plt.figure(figsize=(15,8))
-        # plt.plot(x_axis_score, max_corr_array, "g")
-        # plt.plot(x_axis_score, delay_score_array, "m")
-        # plt.plot(x_axis_score, prec_score_array, "b")
-        # plt.legend(('Correlation score', 'Delay score', 'Precision score'), loc='lower right')
-        # plt.savefig(plot_dir + 'test_tradhour_' + datetime.now().strftime('%H-%M-%S') + '.png', bbox_inches='tight')
-        # plt.close()
-
-        # for debug use
-        # print('delay_score:', delay_score_array)
-        # print('max_index_array:', max_index_array)
-        # print('max_corr_array:', max_corr_array)
-        # print('prec_score_array:', prec_score_array)
+        # The twelve (12) 5-min windows of the hour, thirty (30) 10s values each.
+        x = np.asarray(request_array[:360], dtype=float).reshape(12, 30)
+        y = np.asarray(response_array[:360], dtype=float).reshape(12, 30)
+        # Response windows delayed by an additional 10s each, thirty-one (31) delays per 5-min window:
+        # y_lag[i, j] is response_array[30 * i + j:30 * (i + 1) + j] (strided view, no copy).
+        response_windows = np.lib.stride_tricks.sliding_window_view(np.asarray(response_array, dtype=float), 30)
+        y_lag = response_windows[30 * np.arange(12)[:, None] + np.arange(31)[None, :]]
+
+        # Calculate Pearson Correlation Coefficient btw each 5-min input signal and its thirty-one delayed responses.
+        x_c = x - x.mean(axis=1, keepdims=True)
+        y_c = y_lag - y_lag.mean(axis=2, keepdims=True)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr_score = np.einsum('ik,ijk->ij', x_c, y_c) / np.sqrt(
+                np.einsum('ik,ik->i', x_c, x_c)[:, None] * np.einsum('ijk,ijk->ij', y_c, y_c))
+        # When request signal varies but response signal is constant, correlation and delay scores will be zero.
+        corr_score = np.where(np.std(y_lag, axis=2) < 0.00001, 0, corr_score)
+        # Locate the 10s moment(step) at which correlation score was maximum among the thirty-one calculated.
+        # If corr_r=0 for all 31 combinations, then both correlation and delay scores for that 5min should be 0.
+        max_index = np.where(corr_score.sum(axis=1) == 0, 30, np.argmax(corr_score, axis=1))
+        max_corr = corr_score[np.arange(12), max_index]
+
+        # If the regulation signal is nearly constant, then correlation score is calculated as:
+        # "1 - absoluate of difference btw slope of request and response signals" (determined by linear regression).
+        axis = np.arange(30.) - 14.5
+        slope_x = x_c.dot(axis) / axis.dot(axis)
+        slope_y = (y - y.mean(axis=1, keepdims=True)).dot(axis) / axis.dot(axis)
+        constant = np.std(x, axis=1) < 0.01  # need to vet the threshold later, not specified in PJM manual.
+        max_index_array = np.where(constant, 0, max_index)
+        max_corr_array = np.where(constant, np.maximum(0, 1 - np.absolute(slope_x - slope_y)), max_corr)  # from PJM manual 12.
+
+        # Calculate the coincident delay score associated with max correlation in each 5min period.
+        delay_score_array = np.absolute((10 * max_index_array - 5 * 60) / (5 * 60))
+        # Calculate error at 10s intervals, relative to the mean request of each 5-min window.
+        with np.errstate(divide='ignore', invalid='ignore'):
+            error = np.absolute(y - x) / (np.absolute(x).mean(axis=1, keepdims=True))
+        # Calculate 5-min average Precision Score as the average error.
+        # fmax, as max(0, ...) did: a window without request nor response (error 0/0) scores 0, not nan.
+        prec_score_array = np.fmax(0, 1 - 1 / 30 * error.sum(axis=1))
 
         # Calculate average "delay", "correlation" and "precision" scores for the hour.
         Delay_score = delay_score_array.mean()
         Corr_score = max_corr_array.mean()
         Prec_score = prec_score_array.mean()
 
-        # # for debug use
-        # x_axis_error = np.arange(error.size)
-        # plt.scatter(x_axis_error, error)
-        # plt.show()
-
         # Calculate the hourly overall Performance Score.
         Perf_score = (Delay_score + Corr_score + Prec_score) / 3
 
-        # for debug use
-        # print('Delay_score:', Delay_score)
-        # print('Corr_score:', Corr_score)
-        # print('Prec_score:', Prec_score)
-        # print('Perf_score:', Perf_score)
-
         return (Perf_score, Delay_score, Corr_score, Prec_score)
 
     # Based on PJM Manual 28 (need to verify definition, not found in manual).
@@ -427,3 +380,26 @@ class RegService():
     @fleet.setter
     def fleet(self, value):
         self._fleet = value
+
+
+def plot_signals(results_df, fleet_name, filename):
+    # Normalized request and response signals of the month, and the SoC of battery fleets
+    plt.figure(figsize=(15, 8))
+    plt.subplot(211)
+    if (not (all(pd.isnull(results_df['P_request'])))):
+        plt.plot(results_df.DateTime, results_df.P_request, label='P_request')
+    if (not (all(pd.isnull(results_df['P_response'])))):
+        plt.plot(results_df.DateTime, results_df.P_response, label='P_response')
+    if (not (all(pd.isnull(results_df['P_togrid'])))):
+        plt.plot(results_df.DateTime, results_df.P_togrid, label='P_togrid')
+    if (not (all(pd.isnull(results_df['P_base'])))):
+        plt.plot(results_df.DateTime, results_df.P_base, label='P_base')
+    plt.legend(loc='best')
+    plt.ylabel('Power (MW)')
+    if 'battery' in fleet_name.lower():
+        if not (all(pd.isnull(results_df['SOC']))):
+            plt.subplot(212)
+            plt.plot(results_df.DateTime, results_df.SOC)
+            plt.ylabel('SoC (%)')
+            plt.xlabel('Date and Time')
+    output_policy.save(filename)
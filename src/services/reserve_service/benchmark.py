@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Event scoring of ReserveService.request_loop over a year
+
+Builds a year of synthetic 1-minute requests and responses with about 100
+events, and times the event detection and scoring of request_loop
+(event_bounds, perf_metrics and event_value on the whole year) against the
+event-by-event processing it replaced: a data frame cut out for each event
+and a scan of the hourly prices for each event value. Plotting is left out.
+Also times the load of the historical events workbook from Excel and from
+its binary copy.
+
+Usage: python benchmark.py
+"""
+import sys
+from os import remove
+from os.path import dirname, abspath, join, exists
+sys.path.insert(0, dirname(dirname(dirname(abspath(__file__)))))
+
+import time
+import numpy as np
+import pandas as pd
+
+import file_cache
+from services.reserve_service.reserve_service import ReserveService
+from services.reserve_service.helpers.historical_signal_helper import HistoricalSignalHelper
+
+EVENTS_WORKBOOK = join(dirname(abspath(__file__)), 'gmlc_events_2017_1min.xlsx')
+
+
+def synthetic_year(num_events=100, seed=0):
+    rng = np.random.RandomState(seed)
+    date_time = pd.date_range('2017-01-01', '2017-12-31 23:59', freq='min')
+    request = np.zeros(len(date_time))
+    for start in np.sort(rng.choice(np.arange(1, len(date_time) - 60), num_events, replace=False)):
+        request[start:start + rng.randint(2, 40)] = rng.uniform(0.5, 2.)
+    response = np.where(request > 0, request*rng.uniform(0.6, 1.2, len(date_time)), rng.normal(0, 0.05, len(date_time)))
+    return pd.DataFrame({'Date_Time': date_time, 'Request': request, 'Response': response})
+
+
+def set_prices(service, seed=0):
+    rng = np.random.RandomState(seed)
+    helper = service._clearing_price_helper
+    helper._start = pd.Timestamp('2017-01-01')
+    helper._prices = rng.uniform(0, 20, 365*24)
+    hours = pd.date_range(helper._start, periods=len(helper._prices), freq='h').to_pydatetime()
+    helper._clearing_prices = {hour: (price,) for hour, price in zip(hours, helper._prices.tolist())}
+
+
+def bench_vectorized(service, df_1m, previous_event_end):
+    start = time.time()
+    event_starts, event_ends = service.event_bounds(df_1m.Request.values)
+    performance_results = service.perf_metrics(df_1m, event_starts, event_ends)
+    service.event_value(
+        Event_Start_Time=performance_results['Event_Start_Time'],
+        Event_End_Time=performance_results['Event_End_Time'],
+        Previous_Event_End_Time=[previous_event_end] + list(performance_results['Event_End_Time'][:-1]),
+        Requested_MW=performance_results['Requested_MW'],
+        Responded_MW_at_10minOrEnd=performance_results['Responded_MW_at_10minOrEnd'],
+        Responded_MW_After10minToEndOr30min=performance_results['Responded_MW_After10minToEndOr30min'],
+        Shortfall_Ratio=performance_results['Shortfall_Ratio'])
+    return time.time() - start, len(event_starts)
+
+
+def bench_event_by_event(service, df_1m, previous_event_end):
+    # The data frame of each event and the price lookups of each event value, as request_loop did them
+    start = time.time()
+    clearing_prices = service._clearing_price_helper.clearing_prices
+    event_indices = np.where(df_1m.Request > 0.)[0]
+    for event_indices in np.split(event_indices, np.where(np.insert(np.diff(event_indices), 0, 1) > 1)[0]):
+        event = df_1m.loc[np.concatenate([[event_indices[0] - 1], event_indices, [event_indices[-1] + 1]]), :]
+        event.index = np.arange(-1, event.shape[0] - 1, 1.)
+        event_start, event_end = pd.Timestamp(event.Date_Time[0]), pd.Timestamp(event.Date_Time.max())
+        event.loc[:1, :].Response.min(), event.loc[event.Request > 0, 'Request'].mean()
+        event.loc[9:11, :].Response.max(), event.loc[11:, :].Response.mean(), event.loc[11:30, :].Response.min()
+        np.mean([clearing_prices[x][0] for x in clearing_prices.keys() if x.date() == event_start.date()])
+        np.mean([clearing_prices[x][0] for x in clearing_prices.keys()
+                 if (x >= previous_event_end.replace(minute=0)) & (x <= event_start.replace(minute=0))])
+        previous_event_end = event_end
+    return time.time() - start
+
+
+def bench_events_workbook(cached):
+    cache_file = file_cache.cache_base(EVENTS_WORKBOOK) + '.npy'
+    if not cached and exists(cache_file):
+        remove(cache_file)
+    start = time.time()
+    HistoricalSignalHelper().read_and_store_historical_signals(EVENTS_WORKBOOK)
+    return time.time() - start
+
+
+if __name__ == '__main__':
+    service = ReserveService()
+    set_prices(service)
+    df_1m = synthetic_year()
+    previous_event_end = pd.Timestamp('2016-12-31')
+
+    t_vectorized, num_events = bench_vectorized(service, df_1m, previous_event_end)
+    t_loop = bench_event_by_event(service, df_1m, previous_event_end)
+    print('One year, %i minutes, %i events' % (len(df_1m), num_events))
+    print('  event by event:            %8.3f s' % t_loop)
+    print('  whole period (vectorized): %8.3f s' % t_vectorized)
+    print('Events workbook: %.2f s from Excel, %.4f s from the binary copy'
+          % (bench_events_workbook(False), bench_events_workbook(True)))
@@ -5,142 +5,79 @@ Created on Mon Dec  3 13:26:26 2018
 @author: rahosbach
 """
 
+import sys
+import logging
+from os.path import dirname, abspath, join
 import pandas as pd
 import numpy as np
 
+sys.path.insert(0, dirname(dirname(dirname(abspath(__file__)))))
+
+import file_cache
+
+logger = logging.getLogger('services.reserve_service')
+
 def historic_events(interval_mins=1, year_min=2015, year_max=2017,
-                    input_file_dir='C:\\Users\\rahosbach\\Downloads\\historical-spin-events.xls',
-                    output_file_dir='C:\\Users\\rahosbach\\Documents\\GMLC_1.4.2\\'):
-    print('Reading in raw events data.')
+                    input_file_dir=join(dirname(abspath(__file__)), 'historical-spin-events.xls'),
+                    output_file_dir=dirname(abspath(__file__))):
+    # Name of the output file of each year
+    output_files = {current_year: join(output_file_dir, 'gmlc_events_' + str(current_year) + '_' +
+                                       str(interval_mins) + 'min.xlsx')
+                    for current_year in np.arange(year_min, year_max+1, 1)}
+    # The output files are only written again if the raw events data changed since they were written
+    output_files = {current_year: output_file for current_year, output_file in output_files.items()
+                    if not file_cache.is_fresh(output_file, input_file_dir)}
+    if not output_files:
+        logger.info('Events files are up to date.')
+        return
+
+    logger.info('Reading in raw events data.')
     raw_data = pd.read_excel(input_file_dir,
                              sheet_name='Events',
                              skiprows=4)
     # Parse out specific variables from the date
-    raw_data['year'] = raw_data['Event Start'].apply(lambda x: x.year)
-    raw_data['month'] = raw_data['Event Start'].apply(lambda x: x.month)
-    raw_data['day_start'] = raw_data['Event Start'].apply(lambda x: x.day)
-    raw_data['day_end'] = raw_data['Event End'].apply(lambda x: x.day)
-    # Print the date as a string in YYYYMMDD format
-    raw_data['monthdaydate'] = raw_data.apply(
-            lambda row: (str(row.year) + ('0' if row.month < 10 else '') +
-                         str(row.month) + ('0' if row.day_start < 10 else '') +
-                         str(row.day_start)),
-            axis=1)
+    raw_data['year'] = raw_data['Event Start'].dt.year
     # Calculate start and end minutes (0-1440, based on entire day)
-    raw_data['Minutes_Start'] = raw_data['Event Start'].apply(
-            lambda x: x.hour * 60 + x.minute)
-    raw_data['Minutes_End'] = raw_data['Event End'].apply(
-            lambda x: x.hour * 60 + x.minute)
-    
-    # Confirm that there are no events that start on one day and end on 
+    raw_data['Minutes_Start'] = raw_data['Event Start'].dt.hour * 60 + raw_data['Event Start'].dt.minute
+    raw_data['Minutes_End'] = raw_data['Event End'].dt.hour * 60 + raw_data['Event End'].dt.minute
+
+    # Confirm that there are no events that start on one day and end on
     # the next
-    print('Ensuring no events span multiple days.')
-    try:
-        raw_data.loc[raw_data.day_start != raw_data.day_end].shape[0] == 0
-    except ValueError:
-        print('Multi-day events are not properly being accounted for.')
-        
+    logger.info('Ensuring no events span multiple days.')
+    if (raw_data['Event Start'].dt.date != raw_data['Event End'].dt.date).any():
+        logger.warning('Multi-day events are not properly being accounted for.')
+
     # Create list of minute intervals, starting at 0, ending at end of day
     minute_intervals = np.arange(start=0,
                                  stop=24*60,
                                  step=interval_mins,
                                  dtype='int')
-      
-    print('Creating empty results dataframe.')
-    result_df = pd.DataFrame({
-            'Minutes': minute_intervals})
-    # add date columns that are filled with zero
-    datecols = dict.fromkeys(
-            pd.date_range('1/1/2017','12/31/2017').strftime('%m/%d/%Y'), 0)
-    result_df = result_df.assign(**datecols)
-    # Melt the date columns into rows (wide-to-long transformation)
-    # This makes merging easier
-    result_df_melted = pd.melt(
-            result_df,
-            id_vars=['Minutes'],
-            var_name = 'Date',
-            value_name = 'Value')
-    
-    for current_year in np.arange(year_min, year_max+1, 1):
-    
-        # Filter raw_data down to current_year and reset index after filtering
+    # The results have one column per day of 2017 and one row per interval
+    dates = pd.date_range('1/1/2017', '12/31/2017')
+
+    for current_year, output_file in output_files.items():
+
+        # Filter raw_data down to current_year
         raw_data_ready = raw_data.loc[(raw_data.year == current_year)]
-        raw_data_ready.reset_index(drop=True,
-                                   inplace=True)
-        
-        print('Readying event data for merging into results dataframe.')
-        data_df = pd.DataFrame(columns=['Date', 'Minutes'])
-        for row in np.arange(raw_data_ready.shape[0]):
-            # Make all the dates have a year of 2017 and then print the dates
-            # as strings
-            ready_date = raw_data_ready.loc[row,
-                                            'Event Start'].strftime('%m/%d/%Y')
-            # Don't add one to the end of the range because the events end
-            # right at the start of the second (meaning we don't need to
-            # include the "Event End" second)
-            minute_range = np.arange(raw_data_ready.loc[row, 'Minutes_Start'],
-                                 raw_data_ready.loc[row, 'Minutes_End'])
-            # np.digitize bins data based on bins you specify
-            valid_intervals_indices = set(np.digitize(minute_range,
-                                                      bins=minute_intervals,
-                                                      right=False) - 1)
-            # Get actual minute interval based on digitized indices
-            minutes_ready = [minute_intervals[x] for x in \
-                             valid_intervals_indices]
-            # Create dataframe and add to data_df by row
-            newdf = pd.DataFrame({
-                    'Date': [ready_date] * len(minutes_ready),
-                    'Minutes': minutes_ready})
-            data_df = pd.concat([data_df, newdf], axis=0)
-        data_df['Value'] = 1
-        # Make sure minutes are integers for proper merging with
-        # result_df_melted
-        data_df.Minutes = data_df.Minutes.astype('int32')
-        # Drop duplicate rows prior to merging, as they aren't needed and they
-        # will cause issues
-        data_df['CheckDups'] = data_df.apply(
-                lambda row: str(row.Date) + str(row.Minutes),
-                axis=1)
-        data_df.drop_duplicates(subset='CheckDups',
-                                keep='first',
-                                inplace=True)
-        data_df.drop('CheckDups',
-                     axis=1,
-                     inplace=True)
-        
-        print('Merging event data into results dataframe on time and date.')
-        result_df_final = pd.merge(
-                left = result_df_melted,
-                right = data_df,
-                how = 'left',
-                left_on = ['Minutes', 'Date'],
-                right_on = ['Minutes', 'Date'])
-        print('Pivoting results dataframe from long to wide format.')
-        result_df_final = result_df_final.pivot(
-                index='Minutes',
-                columns='Date',
-                values='Value_y')
-        print('Cleaning up results dataframe.')
-        result_df_final.reset_index(level=0, inplace=True)
-        result_df_final.Minutes = pd.to_datetime(
-                result_df_final.Minutes,
-                unit='m').dt.strftime('%H:%M:%S')
-        result_df_final.fillna(0, inplace=True)
-        result_df_final.rename(columns={'Minutes': ''},
-                               inplace=True)
-        print('Saving results dataframe to Excel file.')
-        result_df_final.to_excel((output_file_dir +
-                                 'gmlc_events_' +
-                                 str(current_year) +
-                                 '_' +
-                                 str(interval_mins) +
-                                 'min.xlsx'),
-                                 index=False)
-    
-        
-    
-    
-        
-    
-        
-    
+
+        logger.info('Placing event data into results array on time and date.')
+        # Make all the dates have a year of 2017 (February 29 has no day in the results and is left out)
+        event_dates = pd.to_datetime({'year': 2017,
+                                      'month': raw_data_ready['Event Start'].dt.month,
+                                      'day': raw_data_ready['Event Start'].dt.day}, errors='coerce')
+        raw_data_ready = raw_data_ready.loc[event_dates.notna()]
+        day_index = (event_dates.dropna() - dates[0]).dt.days.values
+        # Don't add one to the end of the range because the events end
+        # right at the start of the second (meaning we don't need to
+        # include the "Event End" second)
+        starts = raw_data_ready['Minutes_Start'].values
+        lengths = np.maximum(raw_data_ready['Minutes_End'].values - starts, 0)
+        event_minutes = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        result = np.zeros((len(minute_intervals), len(dates)), dtype='int')
+        # Each minute of an event marks the interval it is in
+        result[event_minutes // interval_mins, np.repeat(day_index, lengths)] = 1
+
+        logger.info('Saving results dataframe to Excel file.')
+        result_df_final = pd.DataFrame(result, columns=dates.strftime('%m/%d/%Y'))
+        result_df_final.insert(0, '', pd.to_datetime(minute_intervals, unit='m').strftime('%H:%M:%S'))
+        result_df_final.to_excel(output_file, index=False)
@@ -1,45 +1,71 @@
 import pandas as pd
 import numpy as np
-from dateutil import parser
+import file_cache
 
 from pdb import set_trace as bp
 
 class ClearingPriceHelper(object):
 
-    # This method returns a Dictionary containing a month-worth of hourly SRMCP price data indexed by datetime.
+    # Subzone whose prices are used for the reserve service.
+    zone = 'PJM Mid Atlantic Dominion (MAD)'
+
+    # This method stores a month-worth of hourly SRMCP price data of the subzone, indexed by the start of the hour.
     def read_and_store_clearing_prices(self, input_data_file_path, start_time):
-        # Read file.
-        excel_data = pd.read_csv(input_data_file_path, skiprows=2)
-        # Get only the data whose 'Subzone' column is 'PJM Mid Atlantic Dominion (MAD)':
-        reserve_prices_data_frame = excel_data[excel_data['Subzone'] == 'PJM Mid Atlantic Dominion (MAD)']
-        # Get only the columns we need and rename the price column:
-        reserve_prices_data_frame = reserve_prices_data_frame[['EPT Hour Ending', 'SRMCP ($/MWh)']]
-        # Split the 'EPT Hour Ending' time into date and hour ending columns
-        reserve_prices_data_frame['Date'], reserve_prices_data_frame['Hour_End'] = reserve_prices_data_frame['EPT Hour Ending'].str.split(' ', 1).str
+        zones, start, prices = self._load_clearing_prices(input_data_file_path)
+        self._start = start
+        self._prices = prices[list(zones).index(self.zone)]
 
-        # Calculate the start of the hour from the ending of the hour.
-        reserve_prices_data_frame['Hour_Start_Int'] = reserve_prices_data_frame['Hour_End'].map(int) - 1
-        # TODO: what does "<10" do?
-        reserve_prices_data_frame['Hour_Start'] = np.where(reserve_prices_data_frame['Hour_Start_Int'] < 10,
-            '0' + reserve_prices_data_frame['Hour_Start_Int'].astype(str),
-            reserve_prices_data_frame['Hour_Start_Int'].astype(str))
-        # Create a new column 'LOCAL_DAY_HOUR':
-        reserve_prices_data_frame['LOCAL_DAY_HOUR'] = reserve_prices_data_frame[
-            'Date'] + " " + reserve_prices_data_frame['Hour_Start'].map(str) + ":00:00"
-        # Convert the type of column 'LOCAL_DAY_HOUR' to datetime and move time to start of the hour.
-        # Inside apply, parser.parse() converts string to datetime:
-        reserve_prices_data_frame['LOCAL_DAY_HOUR'] = reserve_prices_data_frame[
-            'LOCAL_DAY_HOUR'].apply(lambda x: parser.parse(x))
-        # Get only the columns we need (get rid of columns generated during intermediate steps):
-        reserve_prices_data_frame = reserve_prices_data_frame[['LOCAL_DAY_HOUR', 'SRMCP ($/MWh)']]
-        reserve_prices_data_frame = reserve_prices_data_frame.set_index('LOCAL_DAY_HOUR')
-        # Generate Dictionary. Index becomes key of Dictionary and the rest is put in tuple:
-        # TODO: can you explain a little more why we need tuple here? I thought there's only one column left "SRMCP" other than the index column.
-        reserve_prices_data_frame = reserve_prices_data_frame.T.apply(tuple).to_dict()
-        self._clearing_prices = reserve_prices_data_frame
+        # Generate Dictionary keyed by the start of the hour, with the price in a tuple.
+        # Hours without a price (e.g. when daylight saving time starts) are left out.
+        hours = pd.date_range(start, periods=len(self._prices), freq='h')
+        available = ~np.isnan(self._prices)
+        self._clearing_prices = {hour: (price,) for hour, price in zip(hours[available].to_pydatetime(),
+                                                                       self._prices[available].tolist())}
 
     # Allow method "clearing_prices" be used as an attribute.
     @property
     def clearing_prices(self):
         return self._clearing_prices
 
+    # Hourly prices of the month, in an array indexed by hour_index(). Hours without a price are NaN.
+    @property
+    def prices(self):
+        return self._prices
+
+    # Returns the position in "prices" of the hour containing "time".
+    def hour_index(self, time):
+        return (pd.to_datetime(time).floor('h') - self._start) // pd.Timedelta(hours=1)
+
+    def _load_clearing_prices(self, input_data_file_path):
+        # Returns the subzones, the start of the first hour and the SRMCP of each subzone and hour.
+        # They are cached (see file_cache), and read from the cache as long as it is newer than the file.
+        return file_cache.load(input_data_file_path, ('.npz',), self._parse_clearing_prices,
+                               self._write_clearing_prices, self._read_clearing_prices)
+
+    def _write_clearing_prices(self, base, loaded):
+        zones, start, prices = loaded
+        np.savez(base + '.npz', zones=zones, start=np.datetime64(start, 'h'), prices=prices)
+
+    def _read_clearing_prices(self, base):
+        with np.load(base + '.npz') as cache:
+            return cache['zones'], pd.Timestamp(cache['start'][()]), cache['prices']
+
+    def _parse_clearing_prices(self, input_data_file_path):
+        # Read file.
+        data = pd.read_csv(input_data_file_path, skiprows=2, usecols=['EPT Hour Ending', 'Subzone', 'SRMCP ($/MWh)'])
+        # Drop the "End of Report" line.
+        data = data.dropna(subset=['Subzone'])
+        # 'EPT Hour Ending' is "mm/dd/yyyy HH", with the hour ending HH from 01 to 24
+        # (and e.g. 02* for the repeated hour when daylight saving time ends).
+        hour_ending = data['EPT Hour Ending'].str.rstrip('*')
+        # Calculate the start of the hour from the ending of the hour.
+        hour_start = (pd.to_datetime(hour_ending.str[:10], format='%m/%d/%Y') +
+                      pd.to_timedelta(hour_ending.str[11:13].astype(int) - 1, unit='h'))
+
+        start = hour_start.min()
+        index = ((hour_start - start) // pd.Timedelta(hours=1)).values
+        zones, zone_index = np.unique(data['Subzone'].to_numpy(dtype=str), return_inverse=True)
+        prices = np.full((len(zones), index.max() + 1), np.nan)
+        prices[zone_index, index] = data['SRMCP ($/MWh)'].to_numpy(dtype=float)
+
+        return zones, start, prices
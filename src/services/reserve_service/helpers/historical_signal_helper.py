@@ -1,88 +1,69 @@
+import json
+import datetime
 import numpy as np
 import pandas as pd
-import datetime
+import file_cache
 from services.exceptions.datetime_validation_exception import DatetimeValidationException
 
 from pdb import set_trace as bp
 
 class HistoricalSignalHelper(object):
 
+    # Time step of the historical event signals.
+    step = datetime.timedelta(minutes=1)
+
     # TODO: (minor) if later sheet_name is not used, remove it.
     def read_and_store_historical_signals(self, input_data_file_path, sheet_name='Sheet1'):
         """
-        This method reads a given Excel file.
-        Thus, this method is meant to be called only once reading Excel file takes
-        a long time and we don't want to do it for getting every single value.
+        This method reads a given Excel file of events, with one column per day and one row per minute.
+        Reading the Excel file takes a long time, so it is converted once into a binary series on a regular
+        1-minute grid, saved as a .npy file with the time of its first value in a .json file (see file_cache).
+        These are read instead of the Excel file as long as they are newer.
         """
-
-        excel_data = pd.read_excel(input_data_file_path, sheet_name = sheet_name, index_col = 0)
-        # TODO: (minor) remove the block below if not used later.
-        # # For now, drop the last row.
-        # # Convert the index to multiple indices with hour, minute, and second.
-        # # Or convert to Pandas.TimeDelta.
-        # # Note: It turned out that the first row value of the next column is
-        # #       same as the last row value of the given column.
-        # #       Thus, when stacking all the columns, the last row values must be removed.
-        # excel_data = excel_data.drop(excel_data.index[len(excel_data.index) - 1])
-        excel_data.columns = pd.to_datetime(excel_data.columns)
-        excel_data.index = pd.to_datetime(excel_data.index).time
-        # Replace zeroes in the signal data with NaN
-        self._signals = excel_data.replace([0], [None])
+        self._start, self._values = file_cache.load(
+            input_data_file_path, ('.json', '.npy'), lambda path: self._convert_signal_file(path, sheet_name),
+            self._write_series, self._read_series)
 
     def signals_in_range(self, start_time, end_time):
         self._validate_date_range(start_time, end_time)
-
-        if start_time.date() == end_time.date():
-            return self._signals_in_range_within_the_same_day(start_time, end_time)
-        else:
-            return self._signals_in_range_encompassing_multiple_days(start_time, end_time)
-
-    # TODO: (minor) remove the block below if not used later.
-    # def get_input_filename(self, start_time):
-    #     timestamp = pd.Timestamp(start_time)
-    #     return timestamp.strftime("%m %Y.xlsx")
+        first = -(-(pd.Timestamp(start_time) - self._start) // self.step)
+        last = (pd.Timestamp(end_time) - self._start) // self.step
+        values = self._values[first:last + 1]
+        times = pd.date_range(self._start + first * self.step, periods=len(values), freq=self.step).to_pydatetime()
+        # Minutes without an event are None.
+        return dict(zip(times, [None if np.isnan(value) else value for value in values.tolist()]))
 
     # Use "dependency injection" to allow method "signals" be used as an attribute.
     @property
     def signals(self):
-        return self._signals
+        return pd.Series(self._values, index=pd.date_range(self._start, periods=len(self._values), freq=self.step))
+
+    def _write_series(self, base, series):
+        start, values = series
+        with open(base + '.json', 'w') as f:
+            json.dump({'start': start.isoformat(), 'step_seconds': self.step.total_seconds()}, f)
+        np.save(base + '.npy', values)
 
-    def _signals_in_range_within_the_same_day(self, start_time, end_time):
-        beginning_of_the_day = pd.Timestamp(
-            f"{start_time.year}-{start_time.month}-{start_time.day}")
-        series_for_day = self._signals[beginning_of_the_day]
-        # Get the data in the given range:
-        series_in_range = series_for_day[datetime.time(start_time.hour, start_time.minute,
-                start_time.second):datetime.time(end_time.hour, end_time.minute, end_time.second)]
-        series_in_range_with_datetime_index = self._convert_index_to_datetime(
-                                                        series_in_range, start_time)
-        return series_in_range_with_datetime_index.to_dict()
+    def _read_series(self, base):
+        with open(base + '.json') as f:
+            start = pd.Timestamp(json.load(f)['start'])
+        return start, np.load(base + '.npy')
 
-    def _signals_in_range_encompassing_multiple_days(self, start_time, end_time):
-        # Prepare the data to be stacked by trasposing it:
-        transposed_signals = self._signals.T
-        # Stack the data:
-        stacked_signals = transposed_signals.stack(dropna=False).reset_index()
-        # Rename the columns with arbitrary name to meaningful name:
-        stacked_signals.rename(columns = { stacked_signals.columns[0]: 'date',
-                                            stacked_signals.columns[1]: 'time' }, inplace = True)
-        # Create datetime from 'date' and 'time' and assign it in 'timestamp' column:
-        stacked_signals['timestamp'] = stacked_signals.apply(
-                            lambda row: pd.datetime.combine(row['date'], row['time']), 1)
-        stacked_signals.set_index('timestamp', inplace = True)
-        stacked_signals.drop(['date', 'time'], axis = 1, inplace = True)
-        # Use squeeze() to convert DataFrame to Series in order to get expected dictionary format:
-        signals_in_range = stacked_signals[start_time:end_time].squeeze()
-        # When to_dict is called, Series converts Timestamp to datatime while DataFrame doesn't.
-        return signals_in_range.to_dict()
+    def _convert_signal_file(self, input_data_file_path, sheet_name):
+        excel_data = pd.read_excel(input_data_file_path, sheet_name = sheet_name, index_col = 0)
+        days = pd.to_datetime(excel_data.columns, format='%m/%d/%Y').values
+        times = pd.to_timedelta(excel_data.index.astype(str)).values
+        timestamps = (days[:, np.newaxis] + times[np.newaxis, :]).ravel()
+        values = excel_data.values.T.ravel().astype(float)
+        # Replace zeroes in the signal data with NaN
+        values[values == 0] = np.nan
 
-    def _convert_index_to_datetime(self, series, start_time):
-        index_list = series.index.tolist()
-        # Create a list with the values with datetime format:
-        datetime_index_list = [datetime.datetime.combine(start_time, index) for index in index_list]
-        # Make the list with the values with datetime format as index:
-        series.index = datetime_index_list
-        return series
+        # Place the values on a regular grid, starting at the first timestamp of the file.
+        start = timestamps.min()
+        index = (timestamps - start) // np.timedelta64(self.step)
+        grid = np.full(index.max() + 1, np.nan)
+        grid[index] = values
+        return pd.Timestamp(start), grid
 
     def _validate_date_range(self, start_time, end_time):
         if start_time > end_time:
@@ -91,12 +72,8 @@ class HistoricalSignalHelper(object):
                                                                         start_time, end_time))
 
         # Check if the start_time and end_time are within the given data (from input Excel file):
-        first_day_in_data = self._signals.columns[0]
-        last_day_in_data = self._signals.columns[len(self._signals.columns) - 1]
-        start_time_in_data = self._signals.index[0]
-        end_time_in_data = self._signals.index[len(self._signals.index) - 1]
-        first_timestamp_in_data = pd.datetime.combine(first_day_in_data, start_time_in_data)
-        last_timestamp_in_data = pd.datetime.combine(last_day_in_data, end_time_in_data)
+        first_timestamp_in_data = self._start
+        last_timestamp_in_data = self._start + (len(self._values) - 1) * self.step
         if start_time < first_timestamp_in_data or end_time < first_timestamp_in_data:
             raise DatetimeValidationException("Start time: year = {} month = {}, End time: year = {} month = {}. Start time and end time must be within the date range of given data: between {} and {}.".format(start_time.year, start_time.month, end_time.year, end_time.month, first_timestamp_in_data, last_timestamp_in_data))
         if start_time > last_timestamp_in_data or end_time > last_timestamp_in_data:
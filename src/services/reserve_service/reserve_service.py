@@ -5,6 +5,7 @@
 
 # Import Python packages
 import sys
+import logging
 from dateutil import parser
 from datetime import datetime, timedelta
 from os.path import dirname, abspath, join
@@ -17,12 +18,15 @@ import matplotlib.pyplot as plt
 from fleet_request import FleetRequest
 from fleet_config import FleetConfig
 from utils import ensure_ddir
+import output_policy
 
 from pdb import set_trace as bp
 
 from services.reserve_service.helpers.historical_signal_helper import HistoricalSignalHelper
 from services.reserve_service.helpers.clearing_price_helper import ClearingPriceHelper
 
+logger = logging.getLogger('services.reserve_service')
+
 
 # Class for synchronized reserve service.
 class ReserveService():
@@ -31,6 +35,21 @@ class ReserveService():
     """
     _fleet = None
 
+    # Columns of the event results returned by request_loop
+    results_columns = ['Event_Start_Time', 'Event_End_Time',
+                       'Response_to_Request_Ratio', 'Response_MeetReqOrMax_Index_number',
+                       'Event_Duration_mins', 'Response_After10minToEndOr30min_To_First10min_Ratio',
+                       'Requested_MW', 'Responded_MW_at_10minOrEnd',
+                       'Responded_MW_After10minToEndOr30min', 'Shortfall_Ratio',
+                       'Response_0min_Min_MW', 'Response_10minOrEnd_Max_MW',
+                       'Response_After10minToEnd_MW', 'Avg_Ramp_Rate', 'Best_Ramp_Rate',
+                       'SRMCP_DollarsperMWh_DuringEvent',
+                       'SRMCP_DollarsperMWh_SinceLastEvent',
+                       'Service_Value_NotInclShortfall_dollars',
+                       'Service_Value_InclShortfall_dollars',
+                       'Period_from_Last_Event_Hours',
+                       'Period_from_Last_Event_Days']
+
     def __init__(self, *args, **kwargs):
         self._historial_signal_helper = HistoricalSignalHelper()
         self._clearing_price_helper = ClearingPriceHelper()
@@ -93,36 +112,7 @@ class ReserveService():
             plot_filename = datetime.now().strftime('%Y%m%d') + '_all_' + start_time.strftime(
                 '%B') + '_events_' + fleet_name + '.png'
 
-            plt.figure(1)
-            plt.figure(figsize=(15, 8))
-            plt.subplot(311)
-            if not (all(pd.isnull(df_1m['Request']))):
-                plt.plot(df_1m.Date_Time, df_1m.Request, label='P_Request', linestyle='-')
-            if not (all(pd.isnull(df_1m['Response']))):
-                plt.plot(df_1m.Date_Time, df_1m.Response, label='P_Response', linestyle='--')
-            plt.ylabel('Power (MW)')
-            plt.legend()
-
-            plt.subplot(312)
-            if not (all(pd.isnull(df_1m['P_base']))):
-                plt.plot(df_1m.Date_Time, df_1m.P_base + df_1m.Request, label='P_base + P_Request', linestyle='-')
-            if not (all(pd.isnull(df_1m['P_togrid']))):
-                plt.plot(df_1m.Date_Time, df_1m.P_togrid, label='P_togrid', linestyle='--')
-            if not (all(pd.isnull(df_1m['P_base']))):
-                plt.plot(df_1m.Date_Time, df_1m.P_base, label='P_base', linestyle='-.')
-            plt.ylabel('Power (MW)')
-            plt.legend()
-            if 'battery' is not fleet_name.lower():
-                plt.xlabel('Time')
-
-            if 'battery' in fleet_name.lower():
-                if not (all(pd.isnull(df_1m['SoC']))):
-                    plt.subplot(313)
-                    plt.plot(df_1m.Date_Time, df_1m.SoC, label='SoC', linestyle='-')
-                    plt.ylabel('SoC (%)')
-                    plt.xlabel('Time')
-            plt.savefig(join(plot_dir, plot_filename), bbox_inches='tight')
-            plt.close()
+            output_policy.plot(plot_results, df_1m, fleet_name, join(plot_dir, plot_filename))
 
         else:  # Do this if we're running the 4-scenario tests
             df_1m = pd.read_excel(
@@ -132,158 +122,46 @@ class ReserveService():
             if 'battery' in fleet_name.lower():
                 df_1m['SoC'] = 1.
 
-        # Create empty data frame to store results in
-        results_df = pd.DataFrame(columns=['Event_Start_Time', 'Event_End_Time',
-                                           'Response_to_Request_Ratio', 'Response_MeetReqOrMax_Index_number',
-                                           'Event_Duration_mins', 'Response_After10minToEndOr30min_To_First10min_Ratio',
-                                           'Requested_MW', 'Responded_MW_at_10minOrEnd',
-                                           'Responded_MW_After10minToEndOr30min', 'Shortfall_Ratio',
-                                           'Response_0min_Min_MW', 'Response_10minOrEnd_Max_MW',
-                                           'Response_After10minToEnd_MW', 'Avg_Ramp_Rate', 'Best_Ramp_Rate',
-                                           'SRMCP_DollarsperMWh_DuringEvent',
-                                           'SRMCP_DollarsperMWh_SinceLastEvent',
-                                           'Service_Value_NotInclShortfall_dollars',
-                                           'Service_Value_InclShortfall_dollars',
-                                           'Period_from_Last_Event_Hours',
-                                           'Period_from_Last_Event_Days'])
-
         # Ensure that at least one event occurs within the specified time frame
         if df_1m.Request.sum() == 0:
-            print('There are no events in the time frame you specified.')
-            return [results_df, df_1m]
+            logger.info('There are no events in the time frame you specified.')
+            return [pd.DataFrame(columns=self.results_columns), df_1m]
         else:
-            # We can then do the following to break out the indices corresponding to events:
-            # 1) np.where will return the dataframe indices where the request value is greater than 0
-            # 2) np.split will split the array of indices from (1) into multiple arrays, each corresponding
-            #    to a single event.  Here, we split the array from (1) based on where the difference between
-            #    indices is greater than 1 (we assume that continuous indices correspond to the same event).
-            event_indices = np.where(df_1m.Request > 0.)[0]
-            event_indices_split = np.split(event_indices, np.where(np.insert(np.diff(event_indices), 0, 1) > 1)[0])
-
-            # Then, we can take everything event-by-event.  "event_indices" contains the list of
-            # df_1m indices corresponding to a single event.
-            for event_indices in event_indices_split:
-
-                time_stamps_per_minute = 1  # each time stamp corresponds to a minute
-
-                # Check if event is at least 11 minutes; if shorter, we'll need to add indices for
-                # an extra minute at the end of the event
-                shorter_than_11_min = ((df_1m.Date_Time[event_indices[len(event_indices) - 1]] - df_1m.Date_Time[
-                    event_indices[0]]).total_seconds() / 60.) < 11.
-
-                # Create list of indices to add to start of event_indices representing the minute prior to the event starting
-                # The np.arange call here creates a descending list of numbers, starting from the first index in event_indices
-                # These numbers correspond to the extra indices we need to include for the -1 minute
-                event_indices_prior_minute = [event_indices[0] - x for x in np.arange(time_stamps_per_minute, 0, -1)]
-                # Add the indices for the event prior to the event starting to the start of the event_indices list
-                # np.insert will insert numbers into an array at the point you specify:
-                # here, we want the number(s) to go at the start, signified by [0]*len(event_indices_prior_minute)
-                event_indices_ready = np.insert(
-                    event_indices,
-                    [0] * len(event_indices_prior_minute),
-                    event_indices_prior_minute)
-                # If the event is shorter than 11 minutes, we want to account for an extra minute at the end
-                if shorter_than_11_min:
-                    # Now generate a list of indices to add to the end of event_indices_ready representing an extra minute
-                    event_indices_after_minute = [event_indices[len(event_indices) - 1] + x for x in
-                                                  np.arange(1, time_stamps_per_minute + 1)]
-                    # Append that extra minute's worth of indices to the end of event_indices_ready
-                    event_indices_ready = np.append(event_indices_ready, event_indices_after_minute)
-
-                # Filter the original dataframe down to just this event, including the minute prior to the event starting
-                # and the minute after the event ends (if the event is shorter than 11 minutes)
-                event = df_1m.loc[event_indices_ready, :]
-
-                # Reset the event indices according to:
-                # The negative first minute starts at index -1.0
-                # The event's first minute starts at index 0.0
-                event.index = np.arange(-time_stamps_per_minute, event.shape[0] - time_stamps_per_minute,
-                                        1 / time_stamps_per_minute)
-
-                # Call the perf_metrics() method to obtain key event metrics
-                performance_results = self.perf_metrics(event, shorter_than_11_min)
-
-                # Call the event_value() method to calculate the event's value
-                value_results = self.event_value(
-                    Event_Start_Time=performance_results['Event_Start_Time'],
-                    Event_End_Time=performance_results['Event_End_Time'],
-                    Previous_Event_End_Time=previous_event_end,
-                    Requested_MW=performance_results['Requested_MW'],
-                    Responded_MW_at_10minOrEnd=performance_results['Responded_MW_at_10minOrEnd'],
-                    Responded_MW_After10minToEndOr30min=performance_results['Responded_MW_After10minToEndOr30min'],
-                    Shortfall_Ratio=performance_results['Shortfall_Ratio'])
-
-                # Create temporary dataframe to contain the results
-                event_results_df = pd.DataFrame({
-                    'Event_Start_Time': performance_results['Event_Start_Time'],
-                    'Event_End_Time': performance_results['Event_End_Time'],
-                    'Response_to_Request_Ratio': performance_results['Response_to_Request_Ratio'],
-                    'Response_MeetReqOrMax_Index_number': performance_results['Response_MeetReqOrMax_Index_number'],
-                    'Event_Duration_mins': performance_results['Event_Duration_mins'],
-                    'Response_After10minToEndOr30min_To_First10min_Ratio': performance_results[
-                        'Response_After10minToEndOr30min_To_First10min_Ratio'],
-                    'Requested_MW': performance_results['Requested_MW'],
-                    'Responded_MW_at_10minOrEnd': performance_results['Responded_MW_at_10minOrEnd'],
-                    'Responded_MW_After10minToEndOr30min': performance_results['Responded_MW_After10minToEndOr30min'],
-                    'Shortfall_Ratio': performance_results['Shortfall_Ratio'],
-                    'Response_0min_Min_MW': performance_results['Response_0min_Min_MW'],
-                    'Response_10minOrEnd_Max_MW': performance_results['Response_10minOrEnd_Max_MW'],
-                    'Response_After10minToEnd_MW': performance_results['Response_After10minToEnd_MW'],
-                    'Avg_Ramp_Rate': performance_results['Avg_Ramp_Rate'],
-                    'Best_Ramp_Rate': performance_results['Best_Ramp_Rate'],
-                    'SRMCP_DollarsperMWh_DuringEvent': value_results['SRMCP_DollarsperMWh_DuringEvent'],
-                    'SRMCP_DollarsperMWh_SinceLastEvent': value_results['SRMCP_DollarsperMWh_SinceLastEvent'],
-                    'Service_Value_NotInclShortfall_dollars': value_results['Service_Value_NotInclShortfall_dollars'],
-                    'Service_Value_InclShortfall_dollars': value_results['Service_Value_InclShortfall_dollars'],
-                    'Period_from_Last_Event_Hours': value_results['Period_from_Last_Event_Hours'],
-                    'Period_from_Last_Event_Days': value_results['Period_from_Last_Event_Days']},
-                    index=[performance_results['Event_Start_Time']])
-
-                # Append the temporary dataframe into the results_df
-                results_df = pd.concat([results_df, event_results_df])
+            # Find the first and last index of each event, i.e. of each run of consecutive minutes with a request,
+            # and calculate the performance metrics and the value of all the events at once.
+            event_starts, event_ends = self.event_bounds(df_1m.Request.values)
+            performance_results = self.perf_metrics(df_1m, event_starts, event_ends)
+            # The previous event of each event is the one before it, or the one ending before the time frame
+            previous_event_ends = [previous_event_end] + list(performance_results['Event_End_Time'][:-1])
+            value_results = self.event_value(
+                Event_Start_Time=performance_results['Event_Start_Time'],
+                Event_End_Time=performance_results['Event_End_Time'],
+                Previous_Event_End_Time=previous_event_ends,
+                Requested_MW=performance_results['Requested_MW'],
+                Responded_MW_at_10minOrEnd=performance_results['Responded_MW_at_10minOrEnd'],
+                Responded_MW_After10minToEndOr30min=performance_results['Responded_MW_After10minToEndOr30min'],
+                Shortfall_Ratio=performance_results['Shortfall_Ratio'])
+
+            # Create data frame with the results of each event
+            results = dict(performance_results, **value_results)
+            results_df = pd.DataFrame({name: results[name] for name in self.results_columns},
+                                      index=performance_results['Event_Start_Time'],
+                                      columns=self.results_columns)
+
+            if output_policy.get_policy().plots == output_policy.OFF:
+                return [results_df, df_1m]
+            for k, event in enumerate(results_df.itertuples()):
                 # Plot event-specific results and save plot to file
                 # We want the plot to start from the end of the previous event
                 # and go until 10 minutes past the end of the current event
-                plot_start = previous_event_end
-                plot_end = performance_results['Event_End_Time'] + timedelta(minutes=10)
+                plot_start = previous_event_ends[k]
+                plot_end = event.Event_End_Time + timedelta(minutes=10)
                 plot_df = df_1m.loc[(df_1m.Date_Time >= plot_start) & (df_1m.Date_Time <= plot_end), :]
                 plot_dir = join(dirname(dirname(dirname(abspath(__file__)))), 'integration_test', 'reserve_service')
-                plot_filename = datetime.now().strftime('%Y%m%d') + '_event_starting_' + performance_results[
-                    'Event_Start_Time'].strftime('%Y%m%d-%H-%M') + '_' + fleet_name + '.png'
-
-                plt.figure(1)
-                plt.figure(figsize=(15, 8))
-                plt.subplot(311)
-                if not (all(pd.isnull(plot_df['Request']))):
-                    plt.plot(plot_df.Date_Time, plot_df.Request, label='P_Request', linestyle='-')
-                if not (all(pd.isnull(plot_df['Response']))):
-                    plt.plot(plot_df.Date_Time, plot_df.Response, label='P_Response', linestyle='--')
-                plt.ylabel('Power (MW)')
-                plt.legend()
-
-                plt.subplot(312)
-                if not (all(pd.isnull(plot_df['P_base']))):
-                    plt.plot(plot_df.Date_Time, plot_df.P_base + plot_df.Request, label='P_base + P_Request', linestyle='-')
-                if not (all(pd.isnull(plot_df['P_togrid']))):
-                    plt.plot(plot_df.Date_Time, plot_df.P_togrid, label='P_togrid', linestyle='--')
-                if not (all(pd.isnull(plot_df['P_base']))):
-                    plt.plot(plot_df.Date_Time, plot_df.P_base, label='P_base', linestyle='-.')
-                plt.ylabel('Power (MW)')
-                plt.legend()
-                if 'battery' is not fleet_name.lower():
-                    plt.xlabel('Time')
-
-                if 'battery' in fleet_name.lower():
-                    if not (all(pd.isnull(plot_df['SoC']))):
-                        plt.subplot(313)
-                        plt.plot(plot_df.Date_Time, plot_df.SoC, label='SoC', linestyle='-')
-                        plt.ylabel('SoC (%)')
-                        plt.xlabel('Time')
-                plt.savefig(join(plot_dir, plot_filename), bbox_inches='tight')
-                plt.close()
-
-                # Reset previous_end_end to be the end of this event before moving on to the next event
-                previous_event_end = performance_results['Event_End_Time']
+                plot_filename = datetime.now().strftime('%Y%m%d') + '_event_starting_' + event.Event_Start_Time.strftime(
+                    '%Y%m%d-%H-%M') + '_' + fleet_name + '.png'
+
+                output_policy.plot(plot_results, plot_df, fleet_name, join(plot_dir, plot_filename))
 
             return [results_df, df_1m]
 
@@ -323,99 +201,109 @@ class ReserveService():
         # print(fleet_response.P_service)
         return fleet_request, fleet_response
 
-    def perf_metrics(self, event, shorter_than_11_min):
+    # Returns the indices of the first and last minute of each event, an event being a run of consecutive
+    # minutes with a positive request.
+    def event_bounds(self, request):
+        is_event = np.concatenate([[False], np.asarray(request, dtype=float) > 0., [False]])
+        changes = np.diff(is_event.astype(int))
+        return np.flatnonzero(changes == 1), np.flatnonzero(changes == -1) - 1
+
+    def perf_metrics(self, df_1m, event_starts, event_ends):
         '''
+        Calculate the performance metrics of the events starting and ending at the indices event_starts and
+        event_ends of df_1m. The minute before each event is included in its analysis (minute -1), and so is
+        the minute after the event if the event is shorter than 11 minutes. Each metric is an array with one
+        value per event, obtained by reductions over the minutes of each event (df_1m has one row per minute).
         '''
-        # Obtain the start and end time stamps of the event
-        Event_Start_Time = pd.Timestamp(event.Date_Time[0])
-        Event_End_Time = pd.Timestamp(event.Date_Time.max())
-        # Remove extra minute we added to the end if the original event was less than 11 minutes
-        if shorter_than_11_min:
-            Event_End_Time = Event_End_Time - timedelta(minutes=1)
+        last_index = len(df_1m) - 1
+        date_time = df_1m.Date_Time.values.astype('datetime64[ns]')
+        request = df_1m.Request.values.astype(float)
+        response = df_1m.Response.values.astype(float)
+        one_minute = np.timedelta64(1, 'm')
+
+        # Check if each event is at least 11 minutes; if shorter, an extra minute is added at the end of the event
+        shorter_than_11_min = (date_time[event_ends] - date_time[event_starts]) / one_minute < 11.
+        # Index of the last minute analysed for each event, and of the minute prior to each event
+        last = np.minimum(event_ends + shorter_than_11_min, last_index)
+        prior = np.maximum(event_starts - 1, 0)
+
+        # Obtain the start and end time stamps of the events
+        # (removing the extra minute we added to the end if the original event was less than 11 minutes)
+        Event_Start_Time = date_time[event_starts]
+        Event_End_Time = date_time[last] - shorter_than_11_min * one_minute
         # Calculate the event duration
-        Event_Duration_mins = (Event_End_Time - Event_Start_Time).total_seconds() / 60.
+        Event_Duration_mins = (Event_End_Time - Event_Start_Time) / one_minute
 
         # Calculate event response at the start, which is the minimum response value
-        # at the start, +/- 1 minute.  We already added in an extra minute before the event
-        # started, so now we just take the minimum response
-        # of the first three minutes of our data frame (minutes -1, 0, and 1).
-        event_start_df = event.loc[:1, :]
-        Response_0min_Min_MW = event_start_df.Response.min()
+        # at the start, +/- 1 minute (minutes -1, 0, and 1).
+        Response_0min_Min_MW = self._reduce_windows(np.fmin, response, prior,
+                                                   np.minimum(event_starts + 1, last))
 
         # Calculate the requested MW for the event, which will be used in shortfall calculations
-        # The requested value should be constant over the whole event, so the mean() call here shouldn't really matter
-        Requested_MW = event.loc[event.Request > 0, 'Request'].mean()
-
-        # Now calculate other metrics
-        if not (shorter_than_11_min):
-            # Calculate event response at the 10-minute mark, which is the maximum
-            # response value from minutes 9, 10, and 11.
-            event_end_10min_df = event.loc[9:11, :]
-            Response_10minOrEnd_Max_MW = event_end_10min_df.Response.max()
-
-            # Calculated responded MW
-            Responded_MW_at_10minOrEnd = Response_10minOrEnd_Max_MW - Response_0min_Min_MW
-
-            # Now calculate the response for the after 11-minute mark
-            # This is the average response from 11 minutes on
-            event_response_after11min_df = event.loc[11:, :]
-            Response_After10minToEnd_MW = event_response_after11min_df.Response.mean()
-            # Calculate ratio of response after 10 minutes to response at 10 minutes
-            if Event_Duration_mins > 30:
-                Responded_MW_After10minToEndOr30min = event.loc[11:30, :].Response.min() - Response_0min_Min_MW
-                Response_After10minToEndOr30min_To_First10min_Ratio = event.loc[11:30,
-                                                                      :].Response.min() / Response_10minOrEnd_Max_MW
-            else:
-                Responded_MW_After10minToEndOr30min = event.loc[11:, :].Response.min() - Response_0min_Min_MW
-                Response_After10minToEndOr30min_To_First10min_Ratio = event.loc[11:,
-                                                                      :].Response.min() / Response_10minOrEnd_Max_MW
-
-                # Calculate shortfall ratio
-            Shortfall_Ratio = min(Responded_MW_at_10minOrEnd, Responded_MW_After10minToEndOr30min) / Requested_MW
-
-        else:
-            # Calculate the event response over the last 3 minutes of the event (including the additional
-            # minute we already added on)
-            event_end_df = event.iloc[-3:, :]
-            Response_10minOrEnd_Max_MW = event_end_df.Response.max()
-
-            # The event is shorter than 11 minutes, so return NaN for these two metrics
-            Response_After10minToEnd_MW = np.nan
-            Response_After10minToEndOr30min_To_First10min_Ratio = np.nan
-
-            # Calculate the response ratio for the event
-            # Calculate responded MW at 10 min mark or end of event
-            Responded_MW_at_10minOrEnd = Response_10minOrEnd_Max_MW - Response_0min_Min_MW
-            Responded_MW_After10minToEndOr30min = np.nan
-
-            # Calculate shortfall ratio
-            Shortfall_Ratio = Responded_MW_at_10minOrEnd / Requested_MW
+        # The requested value should be constant over the whole event, so the mean shouldn't really matter
+        Requested_MW = self._mean_windows(request, event_starts, event_ends)
+
+        # Now calculate other metrics. The windows of the events shorter than 11 minutes are replaced by
+        # their last 3 minutes (including the additional minute) and the metrics after 10 minutes are NaN.
+        longer = ~shorter_than_11_min
+        start_10min = np.where(longer, event_starts + 9, np.maximum(last - 2, prior))
+        end_10min = np.where(longer, event_starts + 11, last)
+        start_after_10min = np.where(longer, event_starts + 11, last)
+        end_after_10min_or_30min = np.where(longer & (Event_Duration_mins > 30), event_starts + 30, last)
+
+        # Calculate event response at the 10-minute mark, which is the maximum response value from
+        # minutes 9, 10, and 11, or over the last 3 minutes of the events shorter than 11 minutes
+        Response_10minOrEnd_Max_MW = self._reduce_windows(np.fmax, response, start_10min, end_10min)
+        # Calculated responded MW
+        Responded_MW_at_10minOrEnd = Response_10minOrEnd_Max_MW - Response_0min_Min_MW
+
+        # Now calculate the response for the after 11-minute mark
+        # This is the average response from 11 minutes on
+        Response_After10minToEnd_MW = np.where(
+            longer, self._mean_windows(response, start_after_10min, last), np.nan)
+        # Calculate ratio of response after 10 minutes (up to 30 minutes) to response at 10 minutes
+        Response_After10minToEndOr30min_Min_MW = self._reduce_windows(np.fmin, response, start_after_10min,
+                                                                      end_after_10min_or_30min)
+        Responded_MW_After10minToEndOr30min = np.where(
+            longer, Response_After10minToEndOr30min_Min_MW - Response_0min_Min_MW, np.nan)
+        Response_After10minToEndOr30min_To_First10min_Ratio = np.where(
+            longer, Response_After10minToEndOr30min_Min_MW / Response_10minOrEnd_Max_MW, np.nan)
+
+        # Calculate shortfall ratio
+        Shortfall_Ratio = np.where(
+            longer,
+            self._first_of_min(Responded_MW_at_10minOrEnd, Responded_MW_After10minToEndOr30min) / Requested_MW,
+            Responded_MW_at_10minOrEnd / Requested_MW)
 
         # Calculate response:request ratio
         Response_to_Request_Ratio = Responded_MW_at_10minOrEnd / Requested_MW
 
-        # Calculate average ramp rate
-        Avg_Ramp_Rate = Responded_MW_at_10minOrEnd / min(10, Event_Duration_mins)
-
-        # Calculate best ramp rate
-        if Response_to_Request_Ratio >= 1:
-            try:
-                # This will try to grab the event dataframe's index of the first time where the response matches (or exceeds) the request.
-                # If no such index exists, skip down to the "except" call where the time to the max response will be
-                # returned instead
-                Response_MeetReqOrMax_Index_number = event.loc[(event.Date_Time >= Event_Start_Time) & (
-                            event.Response >= Requested_MW + Response_0min_Min_MW), :].index[0]
-            except:
-                Response_Max_MW = event.loc[event.Date_Time >= Event_Start_Time, 'Response'].max()
-                Response_MeetReqOrMax_Index_number = event.loc[event.Response == Response_Max_MW, :].index[0]
-            Best_Ramp_Rate = Requested_MW / Response_MeetReqOrMax_Index_number
-        else:
-            Response_MeetReqOrMax_Index_number = min(10, Event_Duration_mins)
-            Best_Ramp_Rate = Avg_Ramp_Rate
+        # Calculate average ramp rate (infinite for events of a single minute)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            Avg_Ramp_Rate = Responded_MW_at_10minOrEnd / np.minimum(10, Event_Duration_mins)
+
+        # Calculate best ramp rate from the first minute (from minute 0) where the response matches
+        # (or exceeds) the request. If there is no such minute, the first minute of the maximum response is used.
+        rows, events = self._windows(event_starts, last)
+        meets_request = self._first_in_windows(
+            response[rows] >= (Requested_MW + Response_0min_Min_MW)[events], events, len(event_starts))
+        Response_Max_MW = self._reduce_windows(np.fmax, response, event_starts, last)
+        rows_with_prior, events_with_prior = self._windows(prior, last)
+        maximum_response = self._first_in_windows(
+            response[rows_with_prior] == Response_Max_MW[events_with_prior], events_with_prior, len(event_starts))
+        first_index = np.where(meets_request >= 0, event_starts + meets_request, prior + maximum_response)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            Response_MeetReqOrMax_Index_number = np.where(Response_to_Request_Ratio >= 1,
+                                                          first_index - event_starts,
+                                                          np.minimum(10, Event_Duration_mins))
+            Best_Ramp_Rate = np.where(Response_to_Request_Ratio >= 1,
+                                      Requested_MW / Response_MeetReqOrMax_Index_number,
+                                      Avg_Ramp_Rate)
 
         return dict({
-            'Event_Start_Time': Event_Start_Time,
-            'Event_End_Time': Event_End_Time,
+            'Event_Start_Time': pd.DatetimeIndex(Event_Start_Time),
+            'Event_End_Time': pd.DatetimeIndex(Event_End_Time),
             'Response_to_Request_Ratio': Response_to_Request_Ratio,
             'Response_MeetReqOrMax_Index_number': Response_MeetReqOrMax_Index_number,
             'Event_Duration_mins': Event_Duration_mins,
@@ -435,53 +323,52 @@ class ReserveService():
                     Responded_MW_After10minToEndOr30min, Shortfall_Ratio,
                     hours_assigned_per_event_day=5, days_apart_each_assignment=5,
                     hours_assigned_on_each_bw_day=3):
-        ''' Method to calculate an event's value, which is based on the requested MW for the event, the event duration,
+        ''' Method to calculate the events' value, which is based on the requested MW for the event, the event duration,
         the event's shortfall (in MW), the time between the current event's end and the previous event's end, and
-        the hourly price.
+        the hourly price. The arguments are arrays with one value per event, and so are the results.
         '''
+        Event_Start_Time = pd.DatetimeIndex(Event_Start_Time)
+        Event_End_Time = pd.DatetimeIndex(Event_End_Time)
+        Previous_Event_End_Time = pd.DatetimeIndex(Previous_Event_End_Time)
+        Requested_MW = np.asarray(Requested_MW, dtype=float)
+        Responded_MW_at_10minOrEnd = np.asarray(Responded_MW_at_10minOrEnd, dtype=float)
+        Responded_MW_After10minToEndOr30min = np.asarray(Responded_MW_After10minToEndOr30min, dtype=float)
+        Shortfall_Ratio = np.asarray(Shortfall_Ratio, dtype=float)
+
         # If event happens within a given day, the price is the average price over all hours of that day.
         # Otherwise, calculate weighted price based on the last half of the day the event started and
         # the first half of the day the event ended
-        if Event_Start_Time.day == Event_End_Time.day:
-            # get hourly keys for the day from the clearing prices dict
-            hourly_price_keys_during_event = [x for x in self._clearing_price_helper.clearing_prices.keys() if
-                                              x.date() == Event_Start_Time.date()]
-        else:
-            # get hourly keys for the last half of the start day and the first half of the end day from the clearing prices dict
-            hourly_price_keys_during_event = [x for x in self._clearing_price_helper.clearing_prices.keys() if
-                                              (x >= Event_Start_Time.replace(hour=12).replace(minute=0)) & (
-                                                          x <= Event_End_Time.replace(hour=12).replace(minute=0))]
-        hourly_price_values_during_event = [self._clearing_price_helper.clearing_prices[x][0] for x in
-                                            hourly_price_keys_during_event]
-        SRMCP_DollarsperMWh_DuringEvent = np.mean(hourly_price_values_during_event)
+        SRMCP_DollarsperMWh_DuringEvent = np.where(
+            Event_Start_Time.day == Event_End_Time.day,
+            self._mean_price(Event_Start_Time.normalize(),
+                             Event_Start_Time.normalize() + timedelta(hours=23)),
+            self._mean_price(Event_Start_Time.normalize() + timedelta(hours=12),
+                             Event_End_Time.normalize() + timedelta(hours=12)))
 
         # Now calculate SRMCP since last event
-        hourly_price_keys_sincelastevent = [x for x in self._clearing_price_helper.clearing_prices.keys() if
-                                            (x >= Previous_Event_End_Time.replace(minute=0)) & (
-                                                        x <= Event_Start_Time.replace(minute=0))]
-        hourly_price_values_sincelastevent = [self._clearing_price_helper.clearing_prices[x][0] for x in
-                                              hourly_price_keys_sincelastevent]
-        SRMCP_DollarsperMWh_SinceLastEvent = np.mean(hourly_price_values_sincelastevent)
+        SRMCP_DollarsperMWh_SinceLastEvent = self._mean_price(Previous_Event_End_Time.floor('h'),
+                                                              Event_Start_Time.floor('h'))
 
         # Calculate the time between this event's end and the previous event's end (in hours)
         # This will be used to calculate the shortfall, if necessary
-        Period_from_Last_Event_Hours = (Event_End_Time - Previous_Event_End_Time).total_seconds() / 3600.
+        Period_from_Last_Event_Hours = np.asarray((Event_End_Time - Previous_Event_End_Time).total_seconds()) / 3600.
         Period_from_Last_Event_Days = Period_from_Last_Event_Hours / 24.
 
         # Calculate value of event
         # Note in these calculations that Responded_MW_After10minToEndOr30min can be NaN.
-        # Therefore, when we call the min() function for these equations, the first value
-        # in the min() call must be Responded_MW_at_10minOrEnd, which will never be NaN
+        # Therefore, when we take the minimum for these equations, Responded_MW_at_10minOrEnd, which
+        # will never be NaN, must be kept unless the other value is smaller
         # (otherwise, NaN could be returned for events shorter than 10 minutes).
-        Service_Value_NotInclShortfall_dollars = (SRMCP_DollarsperMWh_DuringEvent *
-                                                  min(Responded_MW_at_10minOrEnd, Responded_MW_After10minToEndOr30min) *
+        Responded_MW = self._first_of_min(Responded_MW_at_10minOrEnd, Responded_MW_After10minToEndOr30min)
+        Service_Value_NotInclShortfall_dollars = (SRMCP_DollarsperMWh_DuringEvent * Responded_MW *
                                                   hours_assigned_per_event_day)
-        if Shortfall_Ratio >= 1:
-            Service_Value_InclShortfall_dollars = Service_Value_NotInclShortfall_dollars
-        else:
-            Shortfall_MW = Requested_MW - min(Responded_MW_at_10minOrEnd, Responded_MW_After10minToEndOr30min)
-            Service_Value_InclShortfall_dollars = Service_Value_NotInclShortfall_dollars - (
-                        SRMCP_DollarsperMWh_SinceLastEvent * Shortfall_MW * Period_from_Last_Event_Hours / 24. / days_apart_each_assignment * hours_assigned_on_each_bw_day)
+        Shortfall_MW = Requested_MW - Responded_MW
+        Service_Value_InclShortfall_dollars = np.where(
+            Shortfall_Ratio >= 1,
+            Service_Value_NotInclShortfall_dollars,
+            Service_Value_NotInclShortfall_dollars - (
+                SRMCP_DollarsperMWh_SinceLastEvent * Shortfall_MW * Period_from_Last_Event_Hours / 24. /
+                days_apart_each_assignment * hours_assigned_on_each_bw_day))
         return dict({
             'SRMCP_DollarsperMWh_DuringEvent': SRMCP_DollarsperMWh_DuringEvent,
             'SRMCP_DollarsperMWh_SinceLastEvent': SRMCP_DollarsperMWh_SinceLastEvent,
@@ -490,6 +377,79 @@ class ReserveService():
             'Period_from_Last_Event_Hours': Period_from_Last_Event_Hours,
             'Period_from_Last_Event_Days': Period_from_Last_Event_Days})
 
+    # Returns the row numbers of the windows first[k]..last[k] of all the events one after the other,
+    # and the event of each row.
+    def _windows(self, first, last):
+        lengths = last - first + 1
+        offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        rows = np.repeat(first - offsets, lengths) + np.arange(lengths.sum())
+        return rows, np.repeat(np.arange(len(first)), lengths)
+
+    # Reduces values[first[k]:last[k] + 1] of each event k with a ufunc (np.fmin and np.fmax skip NaN).
+    def _reduce_windows(self, ufunc, values, first, last):
+        if len(first) == 0:
+            return np.array([])
+        lengths = last - first + 1
+        offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        return ufunc.reduceat(values[self._windows(first, last)[0]], offsets)
+
+    # Mean of values[first[k]:last[k] + 1] of each event k, skipping NaN.
+    def _mean_windows(self, values, first, last):
+        available = ~np.isnan(values)
+        with np.errstate(invalid='ignore'):
+            return (self._reduce_windows(np.add, np.where(available, values, 0.), first, last) /
+                    self._reduce_windows(np.add, available.astype(float), first, last))
+
+    # Returns the position in its window of the first true value of "condition" for each event (-1 if none).
+    def _first_in_windows(self, condition, events, num_events):
+        window_starts = np.searchsorted(events, np.arange(num_events))
+        hits = np.flatnonzero(condition)
+        first = np.full(num_events, -1)
+        hit_events, first_hits = np.unique(events[hits], return_index=True)
+        first[hit_events] = hits[first_hits] - window_starts[hit_events]
+        return first
+
+    # The minimum of a and b as Python's min(a, b) computes it: b only if b < a (a NaN b is ignored).
+    def _first_of_min(self, a, b):
+        return np.where(b < a, b, a)
+
+    # Mean SRMCP of the hours between first_hour and last_hour (both included) in the stored month of prices.
+    def _mean_price(self, first_hour, last_hour):
+        prices = self._clearing_price_helper.prices
+        available = ~np.isnan(prices)
+        cumulated_prices = np.concatenate([[0.], np.cumsum(np.where(available, prices, 0.))])
+        cumulated_hours = np.concatenate([[0], np.cumsum(available)])
+
+        first = np.clip(np.asarray(self._clearing_price_helper.hour_index(first_hour)), 0, len(prices))
+        last = np.clip(np.asarray(self._clearing_price_helper.hour_index(last_hour)) + 1, first, len(prices))
+        with np.errstate(invalid='ignore'):
+            return (cumulated_prices[last] - cumulated_prices[first]) / (cumulated_hours[last] - cumulated_hours[first])
+
+    # Recalculate the value of the first event in "results_df" (as returned by request_loop) with the end of the
+    # previous event. This is for periods simulated separately (e.g. months run in parallel), whose request loop
+    # did not know when the last event of the previous period ended.
+    def relink_first_event(self, results_df, start_time, clearing_price_filename, previous_event_end):
+        if len(results_df) == 0:
+            return results_df
+
+        clearing_price_filename = join(dirname(abspath(__file__)), clearing_price_filename)
+        self._clearing_price_helper.read_and_store_clearing_prices(clearing_price_filename, start_time)
+
+        first_event = results_df.iloc[:1]
+        value_results = self.event_value(
+            Event_Start_Time=first_event['Event_Start_Time'],
+            Event_End_Time=first_event['Event_End_Time'],
+            Previous_Event_End_Time=[previous_event_end],
+            Requested_MW=first_event['Requested_MW'],
+            Responded_MW_at_10minOrEnd=first_event['Responded_MW_at_10minOrEnd'],
+            Responded_MW_After10minToEndOr30min=first_event['Responded_MW_After10minToEndOr30min'],
+            Shortfall_Ratio=first_event['Shortfall_Ratio'])
+
+        results_df = results_df.copy()
+        for name, value in value_results.items():
+            results_df.iloc[0, results_df.columns.get_loc(name)] = value[0]
+        return results_df
+
     # Use "dependency injection" to allow method "fleet" be used as an attribute.
     @property
     def fleet(self):
@@ -498,3 +458,35 @@ class ReserveService():
     @fleet.setter
     def fleet(self, value):
         self._fleet = value
+
+
+def plot_results(df, fleet_name, filename):
+    # Requests and responses of the time frame or of an event, and the SoC of battery fleets
+    plt.figure(figsize=(15, 8))
+    plt.subplot(311)
+    if not (all(pd.isnull(df['Request']))):
+        plt.plot(df.Date_Time, df.Request, label='P_Request', linestyle='-')
+    if not (all(pd.isnull(df['Response']))):
+        plt.plot(df.Date_Time, df.Response, label='P_Response', linestyle='--')
+    plt.ylabel('Power (MW)')
+    plt.legend()
+
+    plt.subplot(312)
+    if not (all(pd.isnull(df['P_base']))):
+        plt.plot(df.Date_Time, df.P_base + df.Request, label='P_base + P_Request', linestyle='-')
+    if not (all(pd.isnull(df['P_togrid']))):
+        plt.plot(df.Date_Time, df.P_togrid, label='P_togrid', linestyle='--')
+    if not (all(pd.isnull(df['P_base']))):
+        plt.plot(df.Date_Time, df.P_base, label='P_base', linestyle='-.')
+    plt.ylabel('Power (MW)')
+    plt.legend()
+    if 'battery' is not fleet_name.lower():
+        plt.xlabel('Time')
+
+    if 'battery' in fleet_name.lower():
+        if not (all(pd.isnull(df['SoC']))):
+            plt.subplot(313)
+            plt.plot(df.Date_Time, df.SoC, label='SoC', linestyle='-')
+            plt.ylabel('SoC (%)')
+            plt.xlabel('Time')
+    output_policy.save(filename)
@@ -4,40 +4,40 @@
 # }}}
 
 import sys
+import random
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from dateutil import parser
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
 from os.path import dirname, abspath, join
 sys.path.insert(0, dirname(dirname(dirname(abspath(__file__)))))
 
+import output_policy
 from fleet_factory import create_fleet
 from service_factory import create_service
 
 
-def integration_test(service_name, fleet_name, service_type='Traditional', **kwargs):
+def integration_test(service_name, fleet_name, service_type='Traditional', processes=1, seed=0, output=None,
+                     **kwargs):
+    # With processes > 1, the months of the Regulation and Reserve runs are spread across a process pool.
+    # Each month then starts from a new fleet, see run_period().
+    # "output" is the OutputPolicy of the run (plots and logging of the services), see output_policy.py.
+    if output is not None:
+        output_policy.set_policy(output)
     start_time = kwargs['start_time']
     sim_step = dynamic_time_step(service_name, fleet_name)
     kwargs['sim_step'] = sim_step
-    
-    # Create test service
-    service = create_service(service_name, **kwargs)
-    if service is None:
-        raise 'Could not create service with name ' + service_name
-
-    grid_type = 1
-    if service_name == 'ArtificialInertia':
-        grid_type = 2
-        
-    # Create test fleet
-    fleet = create_fleet(fleet_name, grid_type, **kwargs)
-    if fleet is None:
-        raise 'Could not create fleet with name ' + fleet_name
 
-    # Assign test fleet to test service to use
-    service.fleet = fleet
-    assigned_fleet_name = service.fleet.__class__.__name__
+    pool = processes > 1 and service_name in ['Regulation', 'Reserve']
+    if pool:
+        # The fleets are created by the worker processes, the service is only used to merge their results
+        service = create_service(service_name, **kwargs)
+    else:
+        service = create_test_service(service_name, fleet_name, **kwargs)
+        assigned_fleet_name = service.fleet.__class__.__name__
 
     # Run test
     if service_name == 'Regulation':
@@ -59,17 +59,18 @@ def integration_test(service_name, fleet_name, service_type='Traditional', **kwa
         all_results = pd.DataFrame(columns=['performance_score', 'hourly_integrated_MW',
                                         'mileage_ratio', 'Regulation_Market_Clearing_Price(RMCP)',
                                         'Reg_Clearing_Price_Credit'])
-        for month in monthtimes.keys():
-            print('Starting ' + str(month) + ' ' + service_type + ' at ' + datetime.now().strftime('%H:%M:%S'))
-            fleet_response = service.request_loop(service_type=service_type,
-                                                    start_time=parser.parse(monthtimes[month][0]),
-                                                    end_time=parser.parse(monthtimes[month][1]),
-                                                    sim_step=sim_step,
-                                                    clearing_price_filename='historical-ancillary-service-data-2017.xls',
-                                                    fleet_name=assigned_fleet_name)
-            month_results = pd.DataFrame.from_dict(fleet_response, orient='index')
-            all_results = pd.concat([all_results, month_results])
-            print('     Finished ' + str(month) + ' ' + service_type)
+        if pool:
+            fleet_responses, assigned_fleet_name = run_periods(service_name, fleet_name, service_type, monthtimes,
+                                                               processes, seed, **kwargs)
+        else:
+            fleet_responses = []
+            for month in monthtimes.keys():
+                print('Starting ' + str(month) + ' ' + service_type + ' at ' + datetime.now().strftime('%H:%M:%S'))
+                fleet_responses.append(request_period(service, service_name, service_type, monthtimes[month],
+                                                      sim_step))
+                print('     Finished ' + str(month) + ' ' + service_type)
+        month_results = [pd.DataFrame.from_dict(fleet_response, orient='index') for fleet_response in fleet_responses]
+        all_results = pd.concat([all_results] + month_results)
         # Fix formatting of all_results dataframe to remove tuples
         all_results[['Perf_score', 'Delay_score', 'Corr_score', 'Prec_score']] = all_results['performance_score'].apply(
             pd.Series)
@@ -116,32 +117,33 @@ def integration_test(service_name, fleet_name, service_type='Traditional', **kwa
                                             'Service_Value_InclShortfall_dollars',
                                             'Period_from_Last_Event_Hours',
                                             'Period_from_Last_Event_Days'])
+        previous_event_end = pd.Timestamp('05/01/2017 00:00:00')
+        if pool:
+            fleet_responses, assigned_fleet_name = run_periods(service_name, fleet_name, service_type, monthtimes,
+                                                               processes, seed, previous_event_end, **kwargs)
+            relink_periods(service, monthtimes, fleet_responses, previous_event_end)
+        else:
+            fleet_responses = []
+            for month in monthtimes.keys():
+                print('Starting ' + str(month) + ' at ' + datetime.now().strftime('%H:%M:%S'))
+                fleet_response = request_period(service, service_name, service_type, monthtimes[month], sim_step,
+                                                previous_event_end)
+                try:
+                    previous_event_end = fleet_response[0].Event_End_Time[-1]
+                except:
+                    # If the dataframe in fleet_response[0] has no entries, then attempting
+                    # to index the Event_End_Time column will throw an error.  This allows
+                    # for skipping past that error.
+                    pass
+                fleet_responses.append(fleet_response)
+
         if 'battery' in assigned_fleet_name.lower():
             annual_signals = pd.DataFrame(columns=['Date_Time', 'Request', 'Response', 'SoC'])
         else:
             annual_signals = pd.DataFrame(columns=['Date_Time', 'Request', 'Response'])
-
-        previous_event_end = pd.Timestamp('05/01/2017 00:00:00')
-        for month in monthtimes.keys():
-            print('Starting ' + str(month) + ' at ' + datetime.now().strftime('%H:%M:%S'))
-            start_time = parser.parse(monthtimes[month][0])
-            fleet_response = service.request_loop(start_time=start_time,
-                                                  end_time=parser.parse(monthtimes[month][1]),
-                                                  sim_step=sim_step,
-                                                  clearing_price_filename=start_time.strftime('%Y%m') + '.csv',
-                                                  previous_event_end=previous_event_end,
-                                                  four_scenario_testing=False,
-                                                  fleet_name=assigned_fleet_name)
-            try:
-                previous_event_end = fleet_response[0].Event_End_Time[-1]
-            except:
-                # If the dataframe in fleet_response[0] has no entries, then attempting
-                # to index the Event_End_Time column will throw an error.  This allows
-                # for skipping past that error.
-                pass
-
-            all_results = pd.concat([all_results, fleet_response[0]], sort=True)
-            annual_signals = pd.concat([annual_signals, fleet_response[1]], sort=True)
+        all_results = pd.concat([all_results] + [fleet_response[0] for fleet_response in fleet_responses], sort=True)
+        annual_signals = pd.concat([annual_signals] + [fleet_response[1] for fleet_response in fleet_responses],
+                                   sort=True)
         print('Writing event results .csv')
         file_dir = join(dirname(abspath(__file__)), 'integration_test', 'reserve_service')
         all_results.to_csv(join(file_dir,
@@ -179,6 +181,98 @@ def integration_test(service_name, fleet_name, service_type='Traditional', **kwa
     else:
         raise 'Could not recognize service with name ' + service_name
 
+    # Draw the figures deferred to the end of the run
+    output_policy.finish()
+
+
+def create_test_service(service_name, fleet_name, **kwargs):
+    # Create test service
+    service = create_service(service_name, **kwargs)
+    if service is None:
+        raise 'Could not create service with name ' + service_name
+
+    grid_type = 1
+    if service_name == 'ArtificialInertia':
+        grid_type = 2
+
+    # Create test fleet
+    fleet = create_fleet(fleet_name, grid_type, **kwargs)
+    if fleet is None:
+        raise 'Could not create fleet with name ' + fleet_name
+
+    # Assign test fleet to test service to use
+    service.fleet = fleet
+    return service
+
+
+def request_period(service, service_name, service_type, period, sim_step,
+                   previous_event_end=pd.Timestamp('05/01/2017 00:00:00')):
+    # Run the request loop of a Regulation or Reserve service between the start and end times of "period"
+    start_time = parser.parse(period[0])
+    end_time = parser.parse(period[1])
+    fleet_name = service.fleet.__class__.__name__
+    if service_name == 'Regulation':
+        return service.request_loop(service_type=service_type,
+                                    start_time=start_time,
+                                    end_time=end_time,
+                                    sim_step=sim_step,
+                                    clearing_price_filename='historical-ancillary-service-data-2017.xls',
+                                    fleet_name=fleet_name)
+    else:
+        return service.request_loop(start_time=start_time,
+                                    end_time=end_time,
+                                    sim_step=sim_step,
+                                    clearing_price_filename=start_time.strftime('%Y%m') + '.csv',
+                                    previous_event_end=previous_event_end,
+                                    four_scenario_testing=False,
+                                    fleet_name=fleet_name)
+
+
+def run_period(service_name, fleet_name, service_type, period, seed, previous_event_end, policy, kwargs):
+    # Run one period in a worker process, with its own service and fleet created at the start of
+    # the period, and the random number generators seeded for the period so that runs are repeatable
+    output_policy.set_policy(policy)
+    random.seed(seed)
+    np.random.seed(seed)
+    kwargs = dict(kwargs, start_time=parser.parse(period[0]))
+    service = create_test_service(service_name, fleet_name, **kwargs)
+    print('Starting ' + period[0] + ' ' + service_type + ' at ' + datetime.now().strftime('%H:%M:%S'))
+    fleet_response = request_period(service, service_name, service_type, period, kwargs['sim_step'],
+                                    previous_event_end)
+    # The figures of the period are drawn by the worker, before it returns
+    output_policy.finish()
+    print('     Finished ' + period[0] + ' ' + service_type)
+    return fleet_response, service.fleet.__class__.__name__
+
+
+def run_periods(service_name, fleet_name, service_type, periods, processes, seed=0,
+                previous_event_end=pd.Timestamp('05/01/2017 00:00:00'), **kwargs):
+    # Run the periods (e.g. months) of a Regulation or Reserve test in a pool of "processes" worker processes,
+    # or one after the other in this process if processes is 1.
+    # The periods are independent: the fleet is not carried from one period to the next.
+    # Returns the request loop results in the order of "periods", and the class name of the fleet.
+    names = list(periods.keys())
+    args = [(service_name, fleet_name, service_type, periods[name], seed + k, previous_event_end,
+             output_policy.get_policy(), kwargs) for k, name in enumerate(names)]
+    if processes > 1:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [executor.submit(run_period, *a) for a in args]
+            results = [future.result() for future in futures]
+    else:
+        results = [run_period(*a) for a in args]
+    return [fleet_response for fleet_response, assigned_fleet_name in results], results[0][1]
+
+
+def relink_periods(service, periods, fleet_responses, previous_event_end):
+    # The periods of a Reserve test run by run_periods() were simulated without the end of the last event
+    # of the period before, so the value of the first event of each period is computed again here.
+    for name, fleet_response in zip(periods.keys(), fleet_responses):
+        start_time = parser.parse(periods[name][0])
+        fleet_response[0] = service.relink_first_event(fleet_response[0], start_time,
+                                                       start_time.strftime('%Y%m') + '.csv', previous_event_end)
+        if len(fleet_response[0]) > 0:
+            previous_event_end = fleet_response[0].Event_End_Time.iloc[-1]
+
 
 def dynamic_time_step(service_name, fleet_name):
     # Set simulation time step based on the default of the service and the limits of the device fleet
@@ -261,6 +355,12 @@ if __name__ == '__main__':
         'service_weight': 0.35
     }
     service_types = []
+    # Number of worker processes for the months of Regulation and Reserve tests (1 runs them in sequence)
+    processes = 1
+    # Plots and output of the services and fleets; output_policy.silent() for batch runs on servers,
+    # output_policy.verbose() to log every time step,
+    # OutputPolicy(plots=output_policy.DEFERRED, background=True) to draw the figures after the run
+    output = output_policy.OutputPolicy()
 
     for service in services:
         # Service-specific configuration
@@ -272,8 +372,8 @@ if __name__ == '__main__':
         # Integration test
         for fleet in fleets:
             if len(service_types) == 0:
-                integration_test(service, fleet, **kwargs)
+                integration_test(service, fleet, processes=processes, output=output, **kwargs)
             else:
                 for service_type in service_types:
-                    integration_test(service, fleet, service_type, **kwargs)
+                    integration_test(service, fleet, service_type, processes=processes, output=output, **kwargs)
                     
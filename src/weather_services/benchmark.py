@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+Runtime of Tmy3WeatherService.get_data, CsvWeatherService queries and interpolation
+
+Tmy3WeatherService: times a week and a year of 1-minute weather data (dry bulb, dew point and
+relative humidity, and all the points) of each of the 4 TMY3 files, served
+as get_data did it before (zip code looked up in tmy3.db, the file read line
+by line into EpwRecords, interpolated one value at a time and converted to
+JSON and back) and as get_data and get_frame do it now, from the file loaded
+in the process. The parsing of the file and its loading from the .npz cache
+are timed separately. The old way is only timed on the week, a year takes
+about a minute per file.
+
+CsvWeatherService: writes CSV weather files of 1, 5 and 10 years at 5 minutes
+(temperature and relative humidity), and times the queries of a day, a week,
+a month and a year of one point, as get_data did it before (the whole file
+read with csv.DictReader and dateutil, then filtered in Python) and as
+get_data and get_arrays do it now, from the table loaded in the process (the
+mean of 20 queries at random times). The loading of the table is timed
+separately. The old way is only timed on the 1-year file, its time grows
+with the file.
+
+Interpolation: upsamples the hourly records (29 values) of the Pasco TMY3 file
+to 1 minute for a year and to 1 second for a day and a week, pair of records
+by pair of records with lin_interpolate as it was before (a loop per time and
+per value), with lin_interpolate now (a tuple per time, from arrays), and all
+at once with interpolate(). A year at 1 second is only upsampled by
+interpolate(), for the dry bulb temperature.
+
+Usage: python benchmark.py
+"""
+import sys
+import os
+import csv
+import json
+import sqlite3
+import tempfile
+from os.path import dirname, abspath, join
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+import time
+from datetime import datetime, timedelta
+from dateutil import parser
+import numpy as np
+import pandas as pd
+
+import file_cache
+from weather_services import epw_file, csv_weather_service
+from weather_services.epw_record import EpwRecord
+from weather_services.points import PointEnum
+from weather_services.weather_service import WeatherService, interpolate
+from weather_services.tmy3_weather_service import Tmy3WeatherService, TMY3_DIR
+from weather_services.csv_weather_service import CsvWeatherService
+
+ZIP_CODES = ['99352', '99163', '98108', '98158']
+POINTS = [PointEnum.dry_bulb, PointEnum.dew_point, PointEnum.relative_humidity]
+CSV_STEP = timedelta(minutes=5)
+CSV_QUERIES = 20
+
+
+def old_tmy3_get_data(zip_code, points, start_time, end_time, resolution):
+    con = sqlite3.connect(join(TMY3_DIR, 'tmy3.db'))
+    with con:
+        cur = con.cursor()
+        cur.execute("SELECT Weather_File_Name FROM tmy3 WHERE Zip_Code={zip_code}".format(zip_code=zip_code))
+        weather_file_name = cur.fetchall()[0][0]
+    tmy_data = []
+    with open(join(TMY3_DIR, weather_file_name), 'r') as f:
+        lines = f.readlines()
+        for i in range(len(lines)):
+            if i > 7:
+                epw_rec = EpwRecord(lines[i].split(','))
+                if epw_rec.ts < datetime(epw_rec.year, start_time.month, start_time.day,
+                                         start_time.hour, start_time.minute):
+                    continue
+                if epw_rec.ts > datetime(epw_rec.year, end_time.month, end_time.day, end_time.hour, end_time.minute):
+                    break
+                tmy_data.append(epw_rec)
+    interpolated_data = []
+    for i in range(len(tmy_data) - 1):
+        interpolated = OldWeatherService().lin_interpolate(tmy_data[i].ts, tmy_data[i + 1].ts,
+                                                           tmy_data[i].to_array_for_calculation(),
+                                                           tmy_data[i + 1].to_array_for_calculation(), resolution)
+        interpolated_data.extend(interpolated[:-1] if i < len(tmy_data) - 2 else interpolated)
+    result = []
+    for item in interpolated_data:
+        values = [item[0].year, item[0].month, item[0].day, item[0].hour + 1, item[0].minute, tmy_data[0].data_source]
+        values.extend(item[1])
+        json_obj = json.loads(EpwRecord(values).to_json())
+        json_obj[PointEnum.ts] = parser.parse(json_obj[PointEnum.ts])
+        if len(points) == 0:
+            result.append(json_obj)
+        else:
+            result.append(dict([(PointEnum.ts, json_obj[PointEnum.ts])] + [(point, json_obj[point]) for point in points]))
+    return result
+
+
+class OldWeatherService(WeatherService):
+
+    def lin_interpolate(self, start_time, end_time, start_values, end_values, resolution):
+        result = [(start_time, start_values)]
+        num_steps = int((end_time - start_time) / resolution)
+        cur_step = 1
+        t = start_time + resolution
+        while cur_step < num_steps:
+            values = []
+            for i in range(len(start_values)):
+                values.append(start_values[i] + (end_values[i] - start_values[i]) * cur_step / num_steps)
+            result.append((t, values))
+            t += resolution
+            cur_step += 1
+        result.append((end_time, end_values))
+        return result
+
+
+def write_csv_weather_file(path, years, seed=0):
+    rng = np.random.RandomState(seed)
+    ts = pd.date_range('2010-01-01', periods=int(years * timedelta(days=365) / CSV_STEP), freq=CSV_STEP)
+    day = ts.hour.to_numpy() / 24.
+    pd.DataFrame({'Timestamp': ts.strftime('%Y-%m-%d %H:%M:%S'),
+                  'Temp[F]': np.round(60 + 15 * np.sin(2 * np.pi * day) + rng.normal(0, 2, len(ts)), 1),
+                  'RH[%]': np.round(50 + 20 * np.cos(2 * np.pi * day) + rng.normal(0, 5, len(ts)), 1)}
+                 ).to_csv(path, index=False)
+    return ts
+
+
+def old_csv_get_data(path, points, start_time, end_time):
+    result = []
+    for row in csv.DictReader(open(path)):
+        item = {
+            PointEnum.ts: parser.parse(row['Timestamp']),
+            PointEnum.temperature: row['Temp[F]'],
+            PointEnum.relative_humidity: row['RH[%]']
+        }
+        if start_time <= item[PointEnum.ts] <= end_time:
+            result.append(dict([(PointEnum.ts, item[PointEnum.ts])] + [(point, item[point]) for point in points]))
+    return result
+
+
+def mean_time(function, path, starts, duration):
+    start = time.time()
+    for start_time in starts:
+        function(path, [PointEnum.temperature], start_time, start_time + duration)
+    return (time.time() - start) / len(starts)
+
+
+def upsample_pairs(weather_service, records, resolution):
+    result = []
+    for k in range(len(records) - 1):
+        interpolated = weather_service.lin_interpolate(records[k][0], records[k + 1][0], records[k][1],
+                                                       records[k + 1][1], resolution)
+        result.extend(interpolated[:-1] if k < len(records) - 2 else interpolated)
+    return result
+
+
+def timed(function, *args):
+    start = time.time()
+    result = function(*args)
+    return time.time() - start, result
+
+
+if __name__ == '__main__':
+    resolution = timedelta(minutes=1)
+    periods = (('week', datetime(2018, 5, 1), datetime(2018, 5, 8)),
+               ('year', datetime(2018, 1, 1), datetime(2018, 12, 31, 23)))
+    service = Tmy3WeatherService()
+
+    print('%7s %10s %9s %7s %7s %9s %10s %14s %15s' % ('zip', 'parse (s)', 'npz (s)', 'period', 'points', 'rows',
+                                                      'old (s)', 'get_data (s)', 'get_frame (s)'))
+    for zip_code in ZIP_CODES:
+        path = join(TMY3_DIR, service.get_weather_file_name(zip_code))
+        cache_file = file_cache.cache_base(path) + '.npz'
+        if os.path.exists(cache_file):
+            os.remove(cache_file)
+        t_parse = timed(epw_file.load, path)[0]
+        epw_file._files.clear()
+        t_npz = timed(epw_file.load, path)[0]
+        for period, start_time, end_time in periods:
+            for points_name, points in (('3', POINTS), ('all', [])):
+                t_old = '-'
+                if period == 'week':
+                    t_old = '%.3f' % timed(old_tmy3_get_data, zip_code, points, start_time, end_time, resolution)[0]
+                t_data, data = timed(service.get_data, zip_code, points, start_time, end_time, resolution)
+                t_frame = timed(service.get_frame, zip_code, points, start_time, end_time, resolution)[0]
+                print('%7s %10.3f %9.3f %7s %7s %9i %10s %14.3f %15.3f' % (zip_code, t_parse, t_npz, period,
+                                                                          points_name, len(data), t_old, t_data, t_frame))
+        os.remove(cache_file)
+
+    print()
+    rng = np.random.RandomState(1)
+    durations = (('day', timedelta(days=1)), ('week', timedelta(days=7)), ('month', timedelta(days=30)),
+                 ('year', timedelta(days=365)))
+
+    print('%6s %9s %10s %7s %10s %15s %16s' % ('years', 'rows', 'load (s)', 'query', 'old (s)', 'get_data (ms)',
+                                              'get_arrays (ms)'))
+    with tempfile.TemporaryDirectory() as directory:
+        for years in (1, 5, 10):
+            path = join(directory, 'weather_%i.csv' % years)
+            ts = write_csv_weather_file(path, years)
+            service = CsvWeatherService(weather_file_path=path)
+            start = time.time()
+            csv_weather_service.load_table(path)
+            t_load = time.time() - start
+
+            for name, duration in durations:
+                starts = [ts[0].to_pydatetime() + timedelta(days=int(day))
+                          for day in rng.randint(0, max(365 * years - duration.days, 1), CSV_QUERIES)]
+                t_old = '-'
+                if years == 1:
+                    t_old = '%.3f' % mean_time(old_csv_get_data, path, starts[:1], duration)
+                t_data = mean_time(lambda path, *args: service.get_data(None, *args, resolution=CSV_STEP),
+                                   path, starts, duration)
+                t_arrays = mean_time(lambda path, *args: service.get_arrays(None, *args, resolution=CSV_STEP),
+                                     path, starts, duration)
+                print('%6i %9i %10.3f %7s %10s %15.3f %16.3f' % (years, len(ts), t_load, name, t_old, 1e3 * t_data,
+                                                                 1e3 * t_arrays))
+
+    print()
+    path = join(TMY3_DIR, Tmy3WeatherService().get_weather_file_name('99352'))
+    weather_file = epw_file.EpwFile.read(path)
+    times = (np.datetime64('%i-01-01' % epw_file.REFERENCE_YEAR, 'us') +
+             weather_file.times.astype('timedelta64[us]'))
+    records = list(zip(times.astype(object).tolist(), weather_file.values.tolist()))
+
+    print('%11s %7s %7s %10s %10s %18s %16s' % ('resolution', 'period', 'values', 'rows', 'old (s)',
+                                               'lin_interpolate (s)', 'interpolate (s)'))
+    for resolution, period, hours, columns in ((timedelta(minutes=1), 'year', len(records), None),
+                                               (timedelta(seconds=1), 'day', 25, None),
+                                               (timedelta(seconds=1), 'week', 169, None),
+                                               (timedelta(seconds=1), 'year', len(records), [0])):
+        t_old = t_pairs = '-'
+        if columns is None:
+            t_old = '%.3f' % timed(upsample_pairs, OldWeatherService(), records[:hours], resolution)[0]
+            t_pairs, pairs = timed(upsample_pairs, WeatherService(), records[:hours], resolution)
+            t_pairs = '%.3f' % t_pairs
+        values = weather_file.values[:hours] if columns is None else weather_file.values[:hours, columns]
+        t_arrays, (ts, rows, values) = timed(interpolate, times[:hours], values, times[0], times[hours - 1], resolution)
+        print('%11s %7s %7i %10i %10s %18s %16.3f' % (resolution, period, values.shape[1], len(ts), t_old, t_pairs,
+                                                      t_arrays))
+        del ts, rows, values
@@ -6,22 +6,56 @@
 from __future__ import absolute_import
 
 import os
-import json
-import csv
 from datetime import datetime, timedelta
 from dateutil import parser
+import numpy as np
+import pandas as pd
 
 import utils
 from weather_services.weather_service import WeatherService
 from weather_services.points import PointEnum
 
 
+CSV_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'csv_weather')
+
+# Points of the columns of the CSV file, the other columns keep their names
+COLUMN_POINTS = {
+    'Temp[F]': PointEnum.temperature,
+    'RH[%]': PointEnum.relative_humidity
+}
+
+_tables = {}
+
+
+def load_table(path):
+    """
+    Columns of a CSV weather file, parsed once per process (again when the file changes)
+
+    :return ts, columns: the times of the rows (datetime64, sorted) and a dictionary of
+        the values of each point: float arrays, object arrays for the text columns
+    """
+    mtime = os.path.getmtime(path)
+    if path not in _tables or _tables[path][0] != mtime:
+        rows = pd.read_csv(path)
+        ts = pd.to_datetime(rows.pop('Timestamp')).to_numpy(dtype='datetime64[us]')
+        order = np.argsort(ts, kind='stable')
+        columns = dict((COLUMN_POINTS.get(name, name),
+                        rows[name].to_numpy(dtype=float if pd.api.types.is_numeric_dtype(rows[name]) else object)[order])
+                       for name in rows.columns)
+        _tables[path] = (mtime, (ts[order], columns))
+    return _tables[path][1]
+
+
 class CsvWeatherService(WeatherService):
     """
     This class provides an example of pulling weather data from a CSV file
     """
 
     def __init__(self, *args, **kwargs):
+        """
+        :param weather_file_path: CSV file of the weather data, csv_weather/test_csv_weather.csv by default
+        """
+        self.weather_file_path = kwargs.pop('weather_file_path', os.path.join(CSV_DIR, 'test_csv_weather.csv'))
         super(CsvWeatherService, self).__init__(*args, **kwargs)
 
     def get_data(self, zip_code, points, start_time, end_time, resolution):
@@ -33,32 +67,29 @@ class CsvWeatherService(WeatherService):
         :param end_time: datetime object
         :param resolution:
         :return: an array of dictionary. For example:
-            [{'ts': datetime.datetime(2018, 1, 1, 8, 0), 'temperature': '72', 'relative_humidity': '50'},
-            {'ts': datetime.datetime(2018, 1, 1, 9, 0), 'temperature': '73', 'relative_humidity': '49']
+            [{'ts': datetime.datetime(2018, 1, 1, 8, 0), 'temperature': 72.0, 'relative_humidity': 50.0},
+            {'ts': datetime.datetime(2018, 1, 1, 9, 0), 'temperature': 73.0, 'relative_humidity': 49.0}]
+        """
+        arrays = self.get_arrays(zip_code, points, start_time, end_time, resolution)
+        columns = [arrays[PointEnum.ts].astype(object).tolist()] + [arrays[point].tolist() for point in list(arrays)[1:]]
+        return [dict(zip(arrays, row)) for row in zip(*columns)]
+
+    def get_arrays(self, zip_code, points, start_time, end_time, resolution):
+        """
+        Same as get_data, as arrays instead of a dictionary per row
+
+        The rows are those of the file from start_time to end_time, at the resolution of the file.
+        :return: a dictionary of arrays: the times of the rows (datetime64) and the values of each point
         """
-        result = []
-        weather_file_name = 'test_csv_weather.csv'
-        weather_file_path = './csv_weather/' + weather_file_name
-
-        reader = csv.DictReader(open(weather_file_path))
-
-        # Let's reformat output to a standard format so others can use this csv service the same way as
-        # other services (e.g., tmy3_weather_service)
-        for row in reader:
-            # Convert csv weather format to the standard format
-            item = {
-                PointEnum.ts: parser.parse(row['Timestamp']),
-                PointEnum.temperature: row['Temp[F]'],
-                PointEnum.relative_humidity: row['RH[%]']
-            }
-
-            # Push the converted item to the output list
-            result.append(item)
-
-        # NOTE: The 2 features below can be added later (similar to what has been done in tmy3_weather_service)
+        ts, columns = load_table(self.weather_file_path)
         # Slice data for interested time frame
-        # Filter data for interested points
+        first = np.searchsorted(ts, np.datetime64(start_time, 'us'), side='left')
+        last = np.searchsorted(ts, np.datetime64(end_time, 'us'), side='right')
 
+        # Filter data for interested points, no point = all points
+        result = {PointEnum.ts: ts[first:last]}
+        for point in (points if len(points) > 0 else columns):
+            result[point] = columns[point][first:last]
         return result
 
     @classmethod
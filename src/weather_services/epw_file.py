@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*- {{{
+#
+# Your license here
+# }}}
+"""
+TMY3 weather files (.epw) parsed once into arrays
+
+A TMY3 file has a record per hour of a typical year, each month taken from a
+different calendar year. The records are kept as arrays: the date columns as
+integers, the data source as strings and the 29 values as a float matrix (a
+column per field of FIELDS). The times are kept as the time of the year of
+each record, counted in REFERENCE_YEAR (not a leap year, like the files), so
+that the records of months taken from different years follow each other.
+
+load() parses each file once per process, and caches the arrays in a .npz
+file (see file_cache), read as long as it is newer than the .epw file.
+"""
+
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+import file_cache
+from weather_services.weather_service import interpolate
+
+# Values of a record, in the order of EpwRecord.to_array_for_calculation()
+FIELDS = ('dry_bulb', 'dew_point', 'relative_humidity', 'pressure',
+          'horizontal_radiation', 'normal_radiation', 'sky_radiation',
+          'global_horizontal_radiation', 'direct_normal_radiation', 'diffuse_horizontal_radiation',
+          'global_horizontal_illumination', 'direct_normal_illumination',
+          'diffuse_horizontal_illumination', 'zenith_illumination',
+          'wind_direction', 'wind_speed',
+          'total_sky_cover', 'opaque_sky_cover',
+          'visibility', 'ceil_height',
+          'weather_observation', 'weather_codes',
+          'precipitation_water', 'aerosol_optical_depth',
+          'snow_depth', 'days_last_snow', 'albedo',
+          'rain', 'rain_quantity')
+DATES = ('year', 'month', 'day', 'hour', 'minute')
+HEADER_LINES = 8
+REFERENCE_YEAR = 2001
+MICROSECOND = timedelta(microseconds=1)
+
+_files = {}
+
+
+def time_of_year(time):
+    """
+    :param time: datetime, its year is ignored
+    :return: microseconds since the start of the year (int), in REFERENCE_YEAR
+    """
+    return (datetime(REFERENCE_YEAR, time.month, time.day, time.hour, time.minute, time.second,
+                     time.microsecond) - datetime(REFERENCE_YEAR, 1, 1)) // MICROSECOND
+
+
+class EpwFile:
+    """
+    Records of a TMY3 weather file, as arrays
+    """
+
+    def __init__(self, dates, data_source, values):
+        """
+        :param dates: integer array with a row per record: year, month, day, hour (1 to 24), minute
+        :param data_source: data source of each record
+        :param values: float array with a row per record and a column per field of FIELDS
+        """
+        self.dates = dates
+        self.data_source = data_source
+        self.values = values
+        # The record of hour h (1 to 24) starts at h - 1, as in EpwRecord
+        self.starts = self.__starts(dates[:, 0]).to_numpy(dtype='datetime64[us]')
+        self.times = ((self.__starts(REFERENCE_YEAR) - pd.Timestamp(REFERENCE_YEAR, 1, 1)) //
+                      pd.Timedelta(microseconds=1)).to_numpy(dtype='int64')
+
+    def __starts(self, year):
+        return pd.to_datetime(pd.DataFrame({'year': year, 'month': self.dates[:, 1], 'day': self.dates[:, 2],
+                                            'hour': self.dates[:, 3] - 1, 'minute': self.dates[:, 4]}))
+
+    @classmethod
+    def read(cls, path):
+        """
+        Parse an .epw file
+        """
+        records = pd.read_csv(path, skiprows=HEADER_LINES, header=None, usecols=range(len(DATES) + 1 + len(FIELDS)),
+                              float_precision='round_trip')
+        return cls(records.iloc[:, :len(DATES)].to_numpy(dtype='int64'),
+                   records.iloc[:, len(DATES)].to_numpy(dtype=str),
+                   records.iloc[:, len(DATES) + 1:].to_numpy(dtype=float))
+
+    def interpolate(self, start, stop, step):
+        """
+        Records at regular times, linearly interpolated between the hourly records
+
+        :param start: time of the year of the first time (see time_of_year)
+        :param stop: time of the year after which there are no times
+        :param step: microseconds between two times
+        :return ts, rows, values: each time (datetime64, in the year of its record), row of the
+            record at or before it, and the interpolated values (a row per time, a column per
+            field of FIELDS). The times outside of the records of the file are left out.
+        """
+        ts, rows, values = interpolate(self.times, self.values, start, stop, step)
+        return self.starts[rows] + (ts.view('int64') - self.times[rows]).astype('timedelta64[us]'), rows, values
+
+    def save(self, filename):
+        np.savez(filename, dates=self.dates, data_source=self.data_source, values=self.values)
+
+    @classmethod
+    def load_saved(cls, filename):
+        """
+        Records saved by save()
+        """
+        with np.load(filename) as saved:
+            return cls(saved['dates'], saved['data_source'], saved['values'])
+
+
+def load(path):
+    """
+    Records of an .epw file, parsed once per process and cached in a .npz file (see file_cache)
+    """
+    if path not in _files:
+        _files[path] = file_cache.load(path, ('.npz',), EpwFile.read,
+                                       lambda base, epw_file: epw_file.save(base + '.npz'),
+                                       lambda base: EpwFile.load_saved(base + '.npz'))
+    return _files[path]
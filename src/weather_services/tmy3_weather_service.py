@@ -8,11 +8,20 @@ import json
 import sqlite3
 from datetime import datetime, timedelta
 from dateutil import parser
+import numpy as np
+import pandas as pd
 
 import utils
+from weather_services import epw_file
 from weather_services.weather_service import WeatherService
 from weather_services.points import PointEnum
-from weather_services.epw_record import EpwRecord
+
+TMY3_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tmy3')
+
+# The points of an EpwRecord, in the same order
+COLUMNS = list(epw_file.DATES) + ['data_source'] + list(epw_file.FIELDS) + [PointEnum.ts]
+
+_weather_file_names = None
 
 
 class Tmy3WeatherService(WeatherService):
@@ -38,108 +47,59 @@ class Tmy3WeatherService(WeatherService):
         Note:
             - start_time and end_time has to be in the same year
         """
-        result = []
+        frame = self.get_frame(zip_code, points, start_time, end_time, resolution)
+        columns = [frame[name].tolist() for name in frame.columns]
+        columns[frame.columns.get_loc(PointEnum.ts)] = frame[PointEnum.ts].to_numpy().astype(object).tolist()
+        return [dict(zip(frame.columns, row)) for row in zip(*columns)]
+
+    def get_frame(self, zip_code, points, start_time, end_time, resolution):
+        """
+        Same as get_data, as a DataFrame with a column per point and a row per time
+
+        The records of the weather file are linearly interpolated at start_time, start_time +
+        resolution, ... up to end_time. Each time is in the year of its record: the months of a
+        TMY3 file are taken from different years.
+        """
         weather_file_name = self.get_weather_file_name(zip_code)
-        weather_file_path = './tmy3/' + weather_file_name
-
-        # Extract tmy3 data to result
-        if end_time > start_time and weather_file is not None:
-            tmy_data = []
-            # Extract data from weather file
-            tmy_start_time = None
-            tmy_end_time = None
-            with open(weather_file_path, 'r') as f:
-                lines = f.readlines()
-                for i in range(len(lines)):
-                    if i > 7:
-                        values = lines[i].split(',')
-                        epw_rec = EpwRecord(values)
-                        # Filter out records outside of interested time range
-                        tmy_start_time = datetime(epw_rec.year, start_time.month, start_time.day,
-                                                  start_time.hour, start_time.minute)
-                        tmy_end_time = datetime(epw_rec.year, end_time.month, end_time.day,
-                                                end_time.hour, end_time.minute)
-
-                        # Ignore if the record is before start time
-                        if epw_rec.ts < tmy_start_time:
-                            continue
-
-                        # Break if the record is after end time (it's because tmy3 files are sorted by datetime)
-                        if epw_rec.ts > tmy_end_time:
-                            break
-
-                        tmy_data.append(epw_rec)
-
-            # Return if no data
-            if len(tmy_data) == 0:
-                return result
-
-            # Interpolate if needed
-            # Example: temp & rel_hum
-            # start_values = [82, 20]
-            # end_values = [84, 25]
-            interpolated_data = []
-            if resolution < timedelta(hours=1):
-                for i in range(len(tmy_data)-1):
-                    interpolated = self.lin_interpolate(tmy_data[i].ts,
-                                                        tmy_data[i+1].ts,
-                                                        tmy_data[i].to_array_for_calculation(),
-                                                        tmy_data[i+1].to_array_for_calculation(),
-                                                        resolution)
-                    # Interpolation result includes start & end
-                    # Discard the last interpolated item if this is not the last tmy_data item
-                    if i < len(tmy_data)-2:
-                        interpolated_data.extend(interpolated[:-1])
-
-                    # Include the last interpolated imte if this is the last tmy_data item
-                    else:
-                        interpolated_data.extend(interpolated)
-
-            # Convert interpolated_data to tmy3_epw
-            tmy3_epw_data = []
-            for item in interpolated_data:
-                values = [item[0].year, item[0].month, item[0].day, item[0].hour+1, item[0].minute,
-                          tmy_data[0].data_source]
-                values.extend(item[1])
-                epw_rec = EpwRecord(values)
-                tmy3_epw_data.append(epw_rec)
-
-            # Filtered out unnecessary points and reformat final result
-            for rec in tmy3_epw_data:
-                # No point = all points
-                if len(points) == 0:
-                    json_obj = self.json_2_obj(rec)
-                    result.append(json_obj)
-
-                # Just select interested point
-                else:
-                    json_obj = self.json_2_obj(rec)
-                    item = {
-                        PointEnum.ts: json_obj[PointEnum.ts]
-                    }
-                    for point in points:
-                        item[point] = json_obj[point]
-                    result.append(item)
-
-        return result
+        if end_time > start_time and weather_file_name is not None:
+            frame = self.__interpolate(epw_file.load(os.path.join(TMY3_DIR, weather_file_name)),
+                                       start_time, end_time, resolution)
+        else:
+            frame = pd.DataFrame(columns=COLUMNS)
+
+        # No point = all points
+        if len(points) == 0:
+            return frame
+        return frame[[PointEnum.ts] + list(points)]
+
+    def __interpolate(self, weather_file, start_time, end_time, resolution):
+        ts, rows, values = weather_file.interpolate(epw_file.time_of_year(start_time),
+                                                    epw_file.time_of_year(end_time),
+                                                    resolution // epw_file.MICROSECOND)
+        dates = weather_file.dates[rows]
+        frame = pd.DataFrame({PointEnum.year: dates[:, 0], PointEnum.month: dates[:, 1],
+                              PointEnum.day: dates[:, 2], PointEnum.hour: dates[:, 3],
+                              PointEnum.minute: (ts - ts.astype('datetime64[h]')) // np.timedelta64(1, 'm'),
+                              'data_source': weather_file.data_source[rows]})
+        for k, field in enumerate(epw_file.FIELDS):
+            frame[field] = values[:, k]
+        frame[PointEnum.ts] = ts
+        return frame
 
     def get_weather_file_name(self, zip_code):
-        weather_file = None
-
-        # Query weather file from weather info database
-        con = sqlite3.connect('./tmy3/tmy3.db')
-        with con:
-            # Query based on zip_code
-            cur = con.cursor()
-            cur.execute("SELECT Weather_File_Name FROM tmy3 WHERE Zip_Code={zip_code}".format(zip_code=zip_code))
-
-            # Get the 1st weather file
-            data = cur.fetchall()
-            for rec in data:
-                weather_file = rec[0]
-                break
-
-        return weather_file
+        # Weather file of each zip code, read from the weather info database once per process
+        global _weather_file_names
+        if _weather_file_names is None:
+            con = sqlite3.connect(os.path.join(TMY3_DIR, 'tmy3.db'))
+            with con:
+                weather_file_names = {}
+                # Keep the 1st weather file of a zip code
+                for zip_code_, weather_file in con.execute("SELECT Zip_Code, Weather_File_Name FROM tmy3"):
+                    weather_file_names.setdefault(zip_code_, weather_file)
+            con.close()
+            _weather_file_names = weather_file_names
+
+        return _weather_file_names.get(str(zip_code))
 
     def json_2_obj(cls, epw_record):
         json_str = epw_record.to_json()
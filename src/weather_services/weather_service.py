@@ -4,6 +4,39 @@
 # }}}
 
 from datetime import datetime, timedelta
+import numpy as np
+
+MICROSECOND = timedelta(microseconds=1)
+
+def interpolate(times, values, start_time, end_time, resolution):
+    """
+    Linear interpolation of records at regular times, all the values of all the times at once
+    :param times: times of the records, increasing (datetime64 or datetime, or integer microseconds)
+    :param values: an array with a row per record and a column per value
+    :param start_time: first time
+    :param end_time: time after which there are no times
+    :param resolution: time between two times (timedelta, or integer microseconds)
+    :return ts, rows, values: the times from start_time to end_time every resolution within the
+        records (datetime64), the row of the record at or before each time, and the interpolated
+        values (an array with a row per time)
+    """
+    times = np.asarray(times).astype('datetime64[us]').view('int64')
+    values = np.asarray(values, dtype=float)
+    start = np.datetime64(start_time, 'us').astype('int64')
+    stop = min(np.datetime64(end_time, 'us').astype('int64'), times[-1])
+    step = np.timedelta64(resolution, 'us').astype('int64')
+    if start < times[0]:
+        start += -((start - times[0]) // step) * step
+
+    ts = np.arange(start, stop + 1, step, dtype='int64')
+    rows = np.searchsorted(times, ts, side='right') - 1
+    after = np.minimum(rows + 1, len(times) - 1)
+    offset = ts - times[rows]
+    span = np.maximum(times[after] - times[rows], 1)
+    # In steps, as lin_interpolate: step k of n is (end - start) * k / n from the start
+    steps = np.gcd(np.gcd(offset, span), step)
+    delta = (values[after] - values[rows]) * (offset // steps)[:, np.newaxis] / (span // steps)[:, np.newaxis]
+    return ts.view('datetime64[us]'), rows, values[rows] + delta
 
 
 class WeatherService():
@@ -36,23 +69,18 @@ class WeatherService():
         :param resolution: timedelta
         :return: an array of [(time1, [values1]), (time2, values2)] tuples including start_time to end_time values
 
-        Note: this is default implementation. Derived classes may want to override this
+        Note: this is default implementation. Derived classes may want to override this.
+        interpolate() returns the same as arrays, for any number of records
         """
 
+        # A thin adapter of interpolate(), on the microseconds since start_time (which may have a time
+        # zone), without the end_time (the values may not be floats)
+        duration = (end_time - start_time) // MICROSECOND
+        ts, rows, values = interpolate([0, duration], [start_values, end_values], 0, duration - 1,
+                                       resolution // MICROSECOND)
         result = [(start_time, start_values)]
-        num_steps = (end_time - start_time)/resolution
-        num_steps = int(num_steps)
-        cur_step = 1
-        t = start_time + resolution
-        while cur_step < num_steps:
-            values = []
-            for i in range(len(start_values)):
-                delta = (end_values[i] - start_values[i]) * cur_step / num_steps
-                values.append(start_values[i] + delta)
-            result.append((t, values))
-            t += resolution
-            cur_step += 1
-
+        result.extend((start_time + offset * MICROSECOND, row) for offset, row in zip(ts[1:].view('int64').tolist(),
+                                                                                       values[1:].tolist()))
         result.append((end_time, end_values))
 
         return result
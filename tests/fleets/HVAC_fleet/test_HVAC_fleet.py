@@ -0,0 +1,327 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from os.path import dirname, join
+from types import SimpleNamespace
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import file_cache
+from fleets.HVAC_fleet import HVAC_fleet
+from fleets.HVAC_fleet.HVAC_fleet import HVACFleet
+from fleets.HVAC_fleet.build_model import BuildingFleetModel, AC, c, Capacity, EIR, SHR
+from fleet_request import FleetRequest
+
+
+def in_order_allocation(P_req, IsAvailableAdd, IsAvailableShed, Eservice):
+    # Allocation of HVACFleet.run before the request was ranked: the HVACs are called in index order
+    # and the service of each one is subtracted from the request
+    called = np.zeros(len(Eservice), dtype=bool)
+    for number in range(len(Eservice)):
+        if (P_req <= 0 and IsAvailableAdd[number] > 0) or (P_req > 0 and IsAvailableShed[number] > 0):
+            called[number] = True
+            P_req = P_req - Eservice[number]
+    return called
+
+
+class TestAllocateRequest(unittest.TestCase):
+
+    def fleet(self, Tin, Tset):
+        # Only the states read by allocate_request are needed
+        fleet = HVACFleet.__new__(HVACFleet)
+        fleet.hvac_model = SimpleNamespace(Tdeadband=1, state={'Tin': np.asarray(Tin, dtype=float),
+                                                               'Tset': np.asarray(Tset, dtype=float)})
+        return fleet
+
+    def test_locked_out_units_are_skipped(self):
+        fleet = self.fleet([22.5, 22.2, 23.0, 22.6], [23.0]*4)
+        available = np.ones(4, dtype=bool)
+        # Units 1 and 3 have the most headroom but their power would not change (short cycle lockout)
+        Eservice = np.array([1.0, 0.0, 1.0, 0.0])
+
+        called = fleet.allocate_request(10.0, available, Eservice)
+
+        np.testing.assert_array_equal(called, [True, False, True, False])
+
+    def test_unavailable_units_are_skipped(self):
+        fleet = self.fleet([22.5, 22.2, 23.0, 22.6], [23.0]*4)
+        available = np.array([True, False, True, True])
+
+        called = fleet.allocate_request(10.0, available, np.ones(4))
+
+        np.testing.assert_array_equal(called, [True, False, True, True])
+
+    def test_ranking_order(self):
+        fleet = self.fleet([23.8, 22.2, 23.0, 22.6], [23.0]*4)
+        available = np.ones(4, dtype=bool)
+
+        # Shed: the coolest houses are furthest from the top of the dead band
+        called = fleet.allocate_request(2.0, available, np.ones(4))
+        np.testing.assert_array_equal(called, [False, True, False, True])
+
+        # Add: the warmest houses are furthest from the bottom of the dead band
+        called = fleet.allocate_request(-2.0, available, -np.ones(4))
+        np.testing.assert_array_equal(called, [True, False, True, False])
+
+    def test_cumulative_service_covers_request(self):
+        rng = np.random.RandomState(0)
+        n = 40
+        Tin, Tset = rng.normal(23.0, 0.6, n), rng.normal(23.0, 0.3, n)
+        fleet = self.fleet(Tin, Tset)
+        for k in range(50):
+            P_req = rng.choice([-1, 1])*rng.uniform(1, 60)
+            available = rng.rand(n) > 0.3
+            Eservice = np.sign(P_req)*np.where(rng.rand(n) > 0.2, rng.uniform(0.5, 3.5, n), 0.0)
+
+            called = fleet.allocate_request(P_req, available, Eservice)
+
+            self.assertFalse(np.any(called & ~available))
+            self.assertFalse(np.any(called & (Eservice == 0)))
+            provided = np.sum(Eservice[called])
+            total = np.sum(Eservice[available])
+            if abs(total) >= abs(P_req):
+                # Enough units are called, and without the last one (least headroom) it would not be enough
+                self.assertGreaterEqual(abs(provided), abs(P_req))
+                headroom = np.where(P_req > 0, Tset + 1 - Tin, Tin - (Tset - 1))
+                last = np.flatnonzero(called)[np.argmin(headroom[called])]
+                self.assertLess(abs(provided - Eservice[last]), abs(P_req))
+            else:
+                self.assertAlmostEqual(provided, total)
+
+    def test_several_requests_at_once(self):
+        rng = np.random.RandomState(1)
+        n = 20
+        fleet = self.fleet(rng.normal(23.0, 0.6, n), rng.normal(23.0, 0.3, n))
+        P_req = np.array([5.0, -8.0, 20.0])
+        available = rng.rand(3, n) > 0.3
+        Eservice = np.sign(P_req)[:, None]*rng.uniform(0.5, 3.5, (3, n))
+
+        called = fleet.allocate_request(P_req, available, Eservice)
+
+        for k in range(3):
+            np.testing.assert_array_equal(called[k], fleet.allocate_request(P_req[k], available[k], Eservice[k]))
+
+    def test_no_worse_than_in_order_loop(self):
+        rng = np.random.RandomState(0)
+        n = 100
+        fleet = self.fleet(rng.normal(23.67, 0.3, n), rng.normal(23.0, 1, n))
+        gap_ranked, gap_in_order = [], []
+        for k in range(200):
+            P_req = rng.uniform(-100, 100)
+            IsAvailableAdd = rng.randint(2, size=n)
+            IsAvailableShed = rng.randint(2, size=n)
+            Eservice = np.sign(P_req)*np.where(rng.rand(n) > 0.2, rng.uniform(0.5, 3.5, n), 0.0)
+            available = (IsAvailableShed > 0) if P_req > 0 else (IsAvailableAdd > 0)
+
+            called = fleet.allocate_request(P_req, available, Eservice)
+            gap_ranked.append(abs(P_req - np.sum(Eservice[called])))
+            called = in_order_allocation(P_req, IsAvailableAdd, IsAvailableShed, Eservice)
+            gap_in_order.append(abs(P_req - np.sum(Eservice[called])))
+
+        self.assertLessEqual(np.mean(gap_ranked), np.mean(gap_in_order))
+        self.assertLessEqual(np.max(gap_ranked), np.max(gap_in_order))
+
+
+class TestForecast(unittest.TestCase):
+
+    def setUp(self):
+        # HVACFleet with the arrays used by run and forecast, without reading the weather files
+        rng = np.random.RandomState(0)
+        n = 30
+        self.steps = 40
+        fleet = HVACFleet.__new__(HVACFleet)
+        fleet.numHVAC = n
+        fleet.hvac_model = BuildingFleetModel(rng.choice([0.00852, 0.00639, 0.01065], n),
+                                              rng.choice([0.03441, 0.0258075, 0.0430125], n),
+                                              rng.choice([29999127.91, 37498909.89, 44998691.87], n),
+                                              *[rng.normal(23.67, 0.3, n) for x in range(8)], rng.normal(23.0, 1, n),
+                                              rng.randint(2, size=n), rng.randint(2, size=n),
+                                              [61]*n, [181]*n, [61]*n, [181]*n)
+        fleet.location_index = np.zeros(n, dtype=int)
+        fleet.IsAvailableAdd = rng.randint(2, size=n)
+        fleet.IsAvailableShed = rng.randint(2, size=n)
+        fleet.step = 3
+        fleet.Tamb = 32 + 6*rng.rand(1, self.steps)
+        fleet.Tsol_W = fleet.Tamb + 5*rng.rand(1, self.steps)
+        fleet.Tsol_R = fleet.Tamb + 20*rng.rand(1, self.steps)
+        fleet.QIHL_i = 400*rng.rand(1, self.steps)
+        fleet.QIHL_mass = 30*rng.rand(1, self.steps)
+        fleet.Qsolar_i = 300*rng.rand(self.steps)
+        fleet.Qsolar_mass = 20*rng.rand(self.steps)
+        fleet.IHL_fleet_ave = 400*rng.rand(self.steps)
+        self.fleet = fleet
+
+        t0 = datetime(2017, 8, 1, 15)
+        self.trajectories = [[FleetRequest(t0 + timedelta(seconds=10*k), timedelta(seconds=10), t0, p)
+                              for k, p in enumerate(rng.choice([-1, 1])*rng.uniform(0, 40, 20))]
+                             for j in range(3)]
+
+    def snapshot(self):
+        return ({name: value.copy() for name, value in self.fleet.hvac_model.state.items()},
+                self.fleet.IsAvailableAdd.copy(), self.fleet.IsAvailableShed.copy(), self.fleet.step)
+
+    def assertSnapshotEqual(self, expected):
+        state, IsAvailableAdd, IsAvailableShed, step = self.snapshot()
+        self.assertEqual(state.keys(), expected[0].keys())
+        for name in state:
+            np.testing.assert_array_equal(state[name], expected[0][name], err_msg=name)
+        np.testing.assert_array_equal(IsAvailableAdd, expected[1])
+        np.testing.assert_array_equal(IsAvailableShed, expected[2])
+        self.assertEqual(step, expected[3])
+
+    def test_forecast_does_not_change_the_fleet(self):
+        expected = self.snapshot()
+
+        self.fleet.forecast(self.trajectories[0])
+        self.assertSnapshotEqual(expected)
+
+        self.fleet.forecast(self.trajectories)
+        self.assertSnapshotEqual(expected)
+
+    def test_dispatch_step_does_not_change_the_fleet(self):
+        expected = self.snapshot()
+
+        self.fleet.dispatch_step(25.0, 10, self.fleet.step, self.fleet.hvac_model.state,
+                                 self.fleet.IsAvailableAdd, self.fleet.IsAvailableShed)
+        self.assertSnapshotEqual(expected)
+
+    def test_several_trajectories(self):
+        responses = self.fleet.forecast(self.trajectories)
+
+        self.assertEqual(len(responses), len(self.trajectories))
+        for trajectory, trajectory_responses in zip(self.trajectories, responses):
+            alone = self.fleet.forecast(trajectory)
+            self.assertEqual(len(trajectory_responses), len(alone))
+            for resp, expected in zip(trajectory_responses, alone):
+                self.assertEqual(resp.ts, expected.ts)
+                for name in ('P_togrid', 'P_service', 'P_base', 'P_service_max', 'P_service_min'):
+                    self.assertAlmostEqual(getattr(resp, name), getattr(expected, name), places=9, msg=name)
+
+    def test_trajectories_of_different_lengths(self):
+        with self.assertRaises(ValueError):
+            self.fleet.forecast([self.trajectories[0], self.trajectories[1][:-1]])
+
+
+def scalar_baseline(num_homes, sim_step, Tset, deadband, shortcycle_ts):
+    # Replay of the baseline loop before it ran on arrays: one home and one time step at a time
+    data_file = join(dirname(HVAC_fleet.__file__), 'data_file')
+    inputs = pd.read_csv(join(data_file, 'LasVegas_HighCDD.csv'))[:-48]
+    inputs[c.COL_DATETIME] = pd.to_datetime(inputs[c.COL_DATETIME], format='%m/%d/%y %H:%M')
+    inputs = inputs.set_index(c.COL_DATETIME).resample('%is' % sim_step).interpolate()
+    inputs['Tsolw'] = inputs[c.COL_TOUT] + inputs[c.COL_RADW]*0.3/inputs[c.COL_H]
+    inputs['Tsolr'] = inputs[c.COL_TOUT] + inputs[c.COL_RADR]*0.8/inputs[c.COL_H]
+    df_bldg = pd.read_excel(join(data_file, 'normal_building_para.xlsx'))
+    # Default values of the parameters that are not in the building file
+    defaults = dict(Rwin=0.00702, SHGC=0.4, Qrated=14600, EIRrated=0.31019, TinWB=16.666667, Initial_On=0)
+
+    num_steps = int(1440*60/sim_step)
+    Power, Tin_trace, cycles = np.zeros((3, num_steps, num_homes))
+    for j in range(num_homes):
+        b = dict(defaults, **df_bldg.iloc[j].to_dict())
+        ac = type(AC)(b['Qrated'], b['EIRrated'])
+        Tin, Tmass, Twall, Tattic = b['T_in'], b['T_mass'], b['T_wall'], b['T_attic']
+        status = []
+        for i in range(num_steps):
+            Tout, QIHL, Radwin = inputs[c.COL_TOUT].iloc[i], inputs[c.COL_QIHL].iloc[i], inputs[c.COL_RADWIN].iloc[i]
+            ACstatus = status[-1] if i > 0 else b['Initial_On']
+            if Tin >= Tset+deadband and sum(status[max(i-shortcycle_ts, 0):i]) == 0:
+                ACstatus = 1.0
+            if Tin <= Tset-deadband:
+                ACstatus = 0.0
+            if i > 0 and status[-1] == 1.0 and ACstatus == 0.0:
+                cycles[i, j] = 1.0
+            status.append(ACstatus)
+
+            Power[i, j] = ACstatus*Capacity(ac, Tout, b['TinWB'])*EIR(ac, Tout, b['TinWB'])
+            Tin_trace[i, j] = Tin
+
+            Qac = ACstatus*Capacity(ac, Tout, b['TinWB'])*SHR(Tout, Tin, b['TinWB'])*b['C2']
+            dTin = sim_step/b['Cin']*((Twall-Tin)*2.0/b['Rwall'] + (Tattic-Tin)/b['Rattic']
+                                      + (Tmass-Tin)/b['Rmass'] + QIHL*b['C1']*b['Sp1']
+                                      + Radwin*b['SHGC']*25.76*b['C3']*b['Sp3'] - Qac*b['Sp2']
+                                      + (Tout-Tin)/b['Rwin'])
+            dTmass = sim_step/b['Cmass']*((Tin-Tmass)/b['Rmass'] + QIHL*b['C1']*(1-b['Sp1'])
+                                          + Radwin*b['SHGC']*25.76*b['C3']*(1-b['Sp3']) - Qac*(1-b['Sp2']))
+            dTwall = sim_step/b['Cwall']*((inputs['Tsolw'].iloc[i]-Twall)*2.0/b['Rwall'] + (Tin-Twall)*2.0/b['Rwall'])
+            dTattic = sim_step/b['Cattic']*((inputs['Tsolr'].iloc[i]-Tattic)/b['Rroof'] + (Tin-Tattic)/b['Rattic'])
+            Tin, Tmass, Twall, Tattic = Tin+dTin, Tmass+dTmass, Twall+dTwall, Tattic+dTattic
+    return Power, Tin_trace, cycles
+
+
+class TestBaseline(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_dir = file_cache.get_cache_dir()
+        file_cache.set_cache_dir(self.directory)
+
+    def tearDown(self):
+        plt.close('all')
+        file_cache.set_cache_dir(self.cache_dir)
+        shutil.rmtree(self.directory)
+
+    def fleet(self, num_homes):
+        # Only the configuration read by the baseline simulation is needed
+        fleet = HVACFleet.__new__(HVACFleet)
+        fleet.numHVAC = num_homes
+        fleet.sim_step = 60
+        fleet.Tset = 23.0
+        fleet.deadband = 2
+        fleet.shortcycle_ts = 3
+        return fleet
+
+    def test_parity_with_scalar_replay(self):
+        num_homes = 4
+        fleet = self.fleet(num_homes)
+        # A narrow dead band, so that the units cycle during the day
+        fleet.Tset, fleet.deadband = 21.0, 0.5
+
+        soc, std_soc, power, cycles, Tin, std_Tin, Tin_max, Tin_min = fleet.run_baseline_right_away(1, 24*3600)
+
+        Power_s, Tin_s, cycles_s = scalar_baseline(num_homes, fleet.sim_step, fleet.Tset, fleet.deadband,
+                                                   fleet.shortcycle_ts)
+        SOC_s = (fleet.Tset + fleet.deadband - Tin_s)/(2*fleet.deadband)
+        self.assertGreater(np.sum(cycles_s), 0)
+        np.testing.assert_allclose(power, Power_s.sum(axis=1), rtol=1e-9)
+        np.testing.assert_array_equal(cycles, cycles_s.sum(axis=1))
+        np.testing.assert_allclose(Tin, Tin_s.mean(axis=1), rtol=1e-9)
+        np.testing.assert_allclose(std_Tin, Tin_s.std(axis=1, ddof=1), rtol=1e-6)
+        np.testing.assert_allclose(Tin_max, Tin_s.max(axis=1), rtol=1e-9)
+        np.testing.assert_allclose(Tin_min, Tin_s.min(axis=1), rtol=1e-9)
+        np.testing.assert_allclose(soc, SOC_s.mean(axis=1), rtol=1e-9, atol=1e-12)
+        np.testing.assert_allclose(std_soc, SOC_s.std(axis=1, ddof=1), rtol=1e-6)
+
+        # The per-home traces are written in the cache directory
+        traces = os.listdir(join(self.directory, 'HVAC_baseline'))
+        trace = [name for name in traces if name.startswith('Tin_base_')]
+        self.assertEqual(len(trace), 1)
+        np.testing.assert_allclose(np.load(join(self.directory, 'HVAC_baseline', trace[0])), Tin_s, rtol=1e-9)
+
+    def test_cache_hit(self):
+        fleet = self.fleet(3)
+        first = fleet.run_baseline_right_away(1, 24*3600)
+
+        save_dir = join(self.directory, 'HVAC_baseline')
+        cache_files = [name for name in os.listdir(save_dir) if name.startswith('baseline_')]
+        self.assertEqual(len(cache_files), 1)
+        cache_file = join(save_dir, cache_files[0])
+        cached = np.load(cache_file)
+        for name, value in zip(('soc', 'std_soc', 'power', 'cycles', 'Tin', 'std_Tin', 'Tin_max', 'Tin_min'), first):
+            np.testing.assert_array_equal(cached[name], value)
+
+        # A second run with the same configuration reads the cache back
+        np.savez(cache_file, **{name: np.full(3, 7.0) for name in cached.files})
+        for value in fleet.run_baseline_right_away(1, 24*3600):
+            np.testing.assert_array_equal(value, np.full(3, 7.0))
+
+        # Another configuration is simulated
+        fleet.Tset = 24.0
+        second = fleet.run_baseline_right_away(1, 24*3600)
+        self.assertEqual(len(second[2]), len(first[2]))
+        self.assertEqual(len([name for name in os.listdir(save_dir) if name.startswith('baseline_')]), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+import numpy as np
+from fleets.HVAC_fleet.build_model import BuildingModel, BuildingFleetModel
+
+class TestBuildingFleetModel(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.n = 50
+        self.steps = 720
+        self.timestep = 10
+
+        # Envelope mix and initial states sampled the same way as HVACFleet
+        self.Rwall = rng.choice([0.00852, 0.00639, 0.01065], self.n)
+        self.Rattic = rng.choice([0.03441, 0.0258075, 0.0430125], self.n)
+        self.Cmass = rng.choice([29999127.91, 37498909.89, 44998691.87], self.n)
+        self.temperatures = [rng.normal(23.67, 0.3, self.n) for x in range(8)]
+        self.Tset = rng.normal(23.0, 1, self.n)
+        self.Element_onB = rng.randint(2, size=self.n)
+        self.Element_on = rng.randint(2, size=self.n)
+
+        # Hot afternoon disturbances, one value per house and step
+        self.Tamb = 32 + 6*rng.rand(self.steps, self.n)
+        self.Tsol_w = self.Tamb + 5*rng.rand(self.steps, self.n)
+        self.Tsol_r = self.Tamb + 20*rng.rand(self.steps, self.n)
+        self.QIHL_i = 400*rng.rand(self.steps, self.n)
+        self.QIHL_mass = 30*rng.rand(self.steps, self.n)
+        self.Qsolar_i = 300*rng.rand(self.steps)
+        self.Qsolar_mass = 20*rng.rand(self.steps)
+        self.forecast_IHL = 400*rng.rand(self.steps)
+        self.signal = rng.choice([-50.0, 0.0, 50.0], (self.steps, self.n))
+
+    def test_parity_with_building_model(self):
+        model = BuildingFleetModel(self.Rwall, self.Rattic, self.Cmass, *self.temperatures, self.Tset,
+                                   self.Element_onB, self.Element_on, [61]*self.n, [181]*self.n, [61]*self.n, [181]*self.n)
+
+        houses = [BuildingModel() for x in range(self.n)]
+        state = [list(t) for t in self.temperatures] + [list(self.Tset), list(self.Element_onB), list(self.Element_on),
+                                                         [61]*self.n, [181]*self.n, [61]*self.n, [181]*self.n,
+                                                         [0]*self.n, [0]*self.n, [0]*self.n, [0]*self.n]
+        fields = ('TinB', 'TwallB', 'TmassB', 'TatticB', 'Tin', 'Twall', 'Tmass', 'Tattic', 'Tset',
+                  'ElementOnB', 'ElementOn', 'lockonB', 'lockoffB', 'lockon', 'lockoff',
+                  'cycle_off_base', 'cycle_on_base', 'cycle_off_grid', 'cycle_on_grid')
+        outputs = ('Eused', 'Pbase', 'Eservice', 'SOC', 'SOC_b', 'AvailableCapacityAdd', 'AvailableCapacityShed',
+                   'IsAvailableAdd', 'IsAvailableShed')
+
+        for k in range(self.steps):
+            response = model.HVAC(self.Tamb[k], self.Tsol_w[k], self.QIHL_i[k], self.Qsolar_i[k], self.Tsol_r[k],
+                                  self.QIHL_mass[k], self.Qsolar_mass[k], self.signal[k], self.timestep,
+                                  self.forecast_IHL[k])
+            model.update(response)
+
+            for i, house in enumerate(houses):
+                s = [v[i] for v in state]
+                expected = house.HVAC(s[0], s[1], s[2], s[3], s[4], s[5], s[6], s[7], s[8], self.Tamb[k][i],
+                                      self.Tsol_w[k][i], self.QIHL_i[k][i], self.Qsolar_i[k], self.Tsol_r[k][i],
+                                      self.QIHL_mass[k][i], self.Qsolar_mass[k], self.Rwall[i], self.Rattic[i],
+                                      self.Cmass[i], self.signal[k][i], self.timestep, self.forecast_IHL[k],
+                                      s[9], s[10], s[11], s[12], s[13], s[14], s[15], s[16], s[17], s[18])
+                for j, name in enumerate(fields):
+                    state[j][i] = getattr(expected, name)
+                for name in outputs:
+                    self.assertAlmostEqual(getattr(response, name)[i], getattr(expected, name), places=9)
+
+            for j, name in enumerate(fields):
+                np.testing.assert_allclose(model.state[name], state[j], rtol=1e-12, atol=1e-9)
+
+    def test_batched_states(self):
+        model = BuildingFleetModel(self.Rwall, self.Rattic, self.Cmass, *self.temperatures, self.Tset,
+                                   self.Element_onB, self.Element_on, [61]*self.n, [181]*self.n, [61]*self.n, [181]*self.n)
+        initial = model.get_state()
+        batch = {name: np.stack([value, value]) for name, value in initial.items()}
+        signals = np.stack([np.full(self.n, 50.0), np.full(self.n, -50.0)])
+
+        response = model.HVAC(self.Tamb[0], self.Tsol_w[0], self.QIHL_i[0], self.Qsolar_i[0], self.Tsol_r[0],
+                              self.QIHL_mass[0], self.Qsolar_mass[0], signals, self.timestep, self.forecast_IHL[0],
+                              state=batch)
+        for row, signal in enumerate(signals):
+            single = model.HVAC(self.Tamb[0], self.Tsol_w[0], self.QIHL_i[0], self.Qsolar_i[0], self.Tsol_r[0],
+                                self.QIHL_mass[0], self.Qsolar_mass[0], signal, self.timestep, self.forecast_IHL[0])
+            np.testing.assert_array_equal(response.Tin[row], single.Tin)
+            np.testing.assert_array_equal(response.Eservice[row], single.Eservice)
+
+        # Evaluating a step must not modify the model
+        for name in model.STATES:
+            np.testing.assert_array_equal(model.state[name], initial[name])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import file_cache
+from fleets.Refridge_fleet import fridge_Fleet
+from fleets.Refridge_fleet.fridge_Fleet import RFFleet
+from fleets.Refridge_fleet.case_model import CaseModel, CaseFleetModel
+from fleet_request import FleetRequest
+
+class TestRFFleet(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_dir = file_cache.get_cache_dir()
+        file_cache.set_cache_dir(self.directory)
+        self.ts = datetime(2017, 8, 1, 16)
+        self.sim_step = timedelta(seconds=10)
+        self.fleet = RFFleet(None, self.ts, self.sim_step)
+
+    def tearDown(self):
+        file_cache.set_cache_dir(self.cache_dir)
+        shutil.rmtree(self.directory)
+
+    def request(self, k, p):
+        return FleetRequest(self.ts + k*self.sim_step, self.sim_step, self.ts, p)
+
+    def test_step(self):
+        fleet = self.fleet
+        state = fleet.rf_model.get_state()
+        available = fleet.IsAvailableShed > 0
+
+        resp = fleet.process_request(self.request(0, 20.0))
+
+        self.assertEqual(fleet.step, 1)
+        self.assertEqual(fleet.ts, self.ts + self.sim_step)
+        self.assertEqual(fleet.time, 16*3600 + 10)
+        # The request is met by the units available for shedding, one unit at most above it
+        self.assertGreaterEqual(resp.P_service, 20.0)
+        self.assertLess(resp.P_service - np.max(fleet.ServiceProvided), 20.0)
+        self.assertTrue(np.all(fleet.ServiceProvided[~available] == 0))
+        # The fleet totals are consistent, and the states of the units moved on
+        self.assertAlmostEqual(resp.P_togrid - resp.P_base, resp.P_service, places=6)
+        self.assertAlmostEqual(np.sum(fleet.ServiceProvided), resp.P_service, places=9)
+        self.assertFalse(np.array_equal(fleet.rf_model.state['Tair'], state['Tair']))
+        self.assertIs(fleet.TairInitial, fleet.rf_model.state['Tair'])
+
+    def test_step_without_request(self):
+        resp = self.fleet.process_request(self.request(0, None))
+
+        self.assertEqual(resp.P_service, 0)
+        self.assertEqual(resp.P_togrid, resp.P_base)
+
+    def test_forecast_then_run(self):
+        fleet = self.fleet
+        requests = [self.request(k, p) for k, p in enumerate([20.0, -15.0, 0.0, 30.0, -30.0])]
+        state = fleet.rf_model.get_state()
+        SOC = fleet.SOC.copy()
+
+        forecast = fleet.forecast(requests)
+
+        # The forecast leaves the fleet as it was, so running the requests gives the same responses
+        self.assertEqual(fleet.step, 0)
+        self.assertEqual(fleet.ts, self.ts)
+        np.testing.assert_array_equal(fleet.SOC, SOC)
+        for name, value in state.items():
+            np.testing.assert_array_equal(fleet.rf_model.state[name], value, err_msg=name)
+        for req, expected in zip(requests, forecast):
+            resp = fleet.process_request(req)
+            for name in ('P_togrid', 'P_service', 'P_base', 'P_service_max', 'P_service_min'):
+                self.assertEqual(getattr(resp, name), getattr(expected, name), msg=name)
+
+
+class TestCaseFleetModel(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.n = 36
+        self.steps = 60
+        self.timestep = 10
+
+        # Case mix and initial states sampled the same way as RFFleet
+        self.params = [rng.choice(values, self.n) for values in (
+            [0.044077, 0.035262, 0.052892], [0.004614, 0.003691, 0.005538], [0.008341, 0.006673, 0.010009],
+            [10200510, 8160408, 12240162], [2844769, 2275815, 3413722], [111053, 88842, 133263])]
+        self.temperatures = [rng.normal(mean, 2, self.n) for mean in (5.5, 6.11, 3.5)*2]
+        self.Tset = rng.normal(6, 1, self.n)
+        self.Element_on = [rng.randint(2, size=self.n) for _ in range(2)]
+        # Lockout timers anywhere from expired to just started
+        self.locks = [rng.randint(0, 240, self.n).astype(float) for _ in range(4)]
+
+        # Ambient temperatures on both sides of the compressor model breakpoints, and random control signals
+        self.Tamb = 30*rng.rand(self.steps, self.n)
+        self.signal = rng.choice([-5.0, 0.0, 5.0], (self.steps, self.n))*rng.rand(self.steps, self.n)
+
+    def test_parity_with_case_model(self):
+        model = CaseFleetModel(*self.params, *self.temperatures, self.Tset, *self.Element_on, *self.locks)
+        case = CaseModel()
+        state = {name: list(value) for name, value in model.get_state().items()}
+
+        for k in range(self.steps):
+            response = model.FRIDGE(self.Tamb[k], self.signal[k], self.timestep)
+            model.update(response)
+
+            expected = []
+            for i in range(self.n):
+                s = {name: value[i] for name, value in state.items()}
+                expected.append(case.FRIDGE(
+                    s['TairB'], s['TfoodB'], s['TcaseB'], s['Tair'], s['Tfood'], s['Tcase'], s['Tset'],
+                    self.Tamb[k][i], *[p[i] for p in self.params], self.signal[k][i], self.timestep,
+                    s['ElementOnB'], s['ElementOn'], s['lockonB'], s['lockoffB'], s['lockon'], s['lockoff'],
+                    s['cycle_off_base'], s['cycle_on_base'], s['cycle_off_grid'], s['cycle_on_grid']))
+            for name in CaseFleetModel.STATES:
+                state[name] = [getattr(e, name) for e in expected]
+            for name in ('Tair', 'TairB', 'ElementOn', 'ElementOnB', 'lockon', 'lockoff', 'lockonB', 'lockoffB',
+                         'Eused', 'cycle_off_base', 'cycle_on_base', 'cycle_off_grid', 'cycle_on_grid'):
+                np.testing.assert_array_equal(getattr(response, name), [getattr(e, name) for e in expected],
+                                              err_msg='%s at step %i' % (name, k))
+
+
+class TestLoadWorkbook(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_dir = file_cache.get_cache_dir()
+        file_cache.set_cache_dir(os.path.join(self.directory, 'cache'))
+        self.file = os.path.join(self.directory, 'Tout.xlsx')
+        pd.DataFrame({'Miami': [30.0, 31.5], 'Phoenix': [38.0, 40.25]}).to_excel(self.file, index=False)
+
+    def tearDown(self):
+        fridge_Fleet._workbooks.pop(self.file, None)
+        file_cache.set_cache_dir(self.cache_dir)
+        shutil.rmtree(self.directory)
+
+    def test_cache_reuse(self):
+        values = fridge_Fleet.load_workbook(self.file)
+        np.testing.assert_array_equal(values, [[30.0, 38.0], [31.5, 40.25]])
+        # The same array is returned while the module is loaded
+        self.assertIs(fridge_Fleet.load_workbook(self.file), values)
+
+        # After that, the binary copy is read instead of the workbook
+        copy = file_cache.cache_base(self.file) + '.npy'
+        self.assertTrue(os.path.exists(copy))
+        np.save(copy, np.zeros((2, 2)))
+        fridge_Fleet._workbooks.pop(self.file)
+        np.testing.assert_array_equal(fridge_Fleet.load_workbook(self.file), np.zeros((2, 2)))
+
+        # Unless the workbook changed
+        os.utime(copy, (0, 0))
+        fridge_Fleet._workbooks.pop(self.file)
+        np.testing.assert_array_equal(fridge_Fleet.load_workbook(self.file), values)
+
+if __name__ == '__main__':
+    unittest.main()
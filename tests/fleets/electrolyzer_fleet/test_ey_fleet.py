@@ -0,0 +1,93 @@
+import unittest
+from datetime import datetime, timedelta
+import numpy as np
+from fleet_request import FleetRequest
+from grid_info_artificial_inertia import GridInfo
+from fleets.electrolyzer_fleet.ey_fleet import ElectrolyzerFleet
+
+class TestOperatingPoints(unittest.TestCase):
+
+    def setUp(self):
+        self.fleet = ElectrolyzerFleet(GridInfo())
+        self.p_stack = np.linspace(self.fleet.ey_Pmin_fleet, self.fleet.ey_Pmax_fleet,
+                                   1001)*1e3/self.fleet.ey_Ne
+
+    def test_table_within_tolerance_of_fsolve(self):
+        for p in self.p_stack:
+            V, Ir = self.fleet.vi_calc(p)
+            V_fsolve, Ir_fsolve = self.fleet.vi_solve(p)
+
+            self.assertLess(abs(Ir/Ir_fsolve - 1), 2*self.fleet.ey_table_tol)
+            self.assertLess(abs(V/V_fsolve - 1), 2*self.fleet.ey_table_tol)
+
+    def test_fsolve_outside_of_table(self):
+        p = 2*self.p_stack[-1]
+
+        self.assertEqual(self.fleet.vi_calc(p), self.fleet.vi_solve(p))
+
+class TestBasePower(unittest.TestCase):
+
+    def setUp(self):
+        self.fleet = ElectrolyzerFleet(GridInfo())
+        ts = datetime(2019, 1, 1)
+        dt = timedelta(seconds=1)
+        self.requests = [FleetRequest(ts=ts + i*dt, sim_step=dt, start_time=ts, p=0., q=0.) for i in range(10)]
+
+    def test_base_power_of_the_fit(self):
+        p = self.fleet.p
+        for inc in range(0, 86400, 997):
+            p_base = sum([p[j]*(inc + 1)**(21 - j) for j in range(22)])
+
+            self.assertAlmostEqual(self.fleet._ElectrolyzerFleet__base_power(inc)/p_base, 1, places=5)
+
+    def test_base_power_across_profiles(self):
+        self.fleet._ElectrolyzerFleet__base_power.steps = 3
+        forecast = self.fleet.forecast(self.requests)
+        responses = [self.fleet.process_request(request) for request in self.requests]
+
+        self.assertEqual([r.P_base for r in forecast], [r.P_base for r in responses])
+
+class TestForecast(unittest.TestCase):
+
+    def setUp(self):
+        self.fleet = ElectrolyzerFleet(GridInfo())
+        ts = datetime(2019, 1, 1)
+        dt = timedelta(seconds=1)
+        p = np.random.RandomState(0).uniform(-60, 60, 140)
+        self.requests = [FleetRequest(ts=ts + i*dt, sim_step=dt, start_time=ts, p=None if i % 7 == 0 else p[i], q=0.)
+                         for i in range(len(p))]
+
+    def state(self, fleet):
+        return (fleet.moles, fleet.moles_age, fleet.lka_h2, fleet.soc, fleet.soc_age, fleet.P_tank,
+                fleet.process_request(self.requests[0]).P_togrid)
+
+    def assertForecast(self):
+        forecast = self.fleet.forecast(self.requests)
+        responses = [self.fleet.process_request(request) for request in self.requests]
+
+        for name in ('P_togrid', 'P_service', 'P_base', 'P_service_max', 'P_service_min', 'E', 'Eff_charge',
+                     'dmdot', 'moles', 'P_tank'):
+            np.testing.assert_allclose([getattr(r, name) for r in forecast], [getattr(r, name) for r in responses],
+                                       rtol=1e-12, err_msg=name)
+        self.assertEqual([r.ts for r in forecast], [r.ts for r in responses])
+
+    def test_forecast_leaves_fleet_untouched(self):
+        fleet = ElectrolyzerFleet(GridInfo())
+        self.fleet.forecast(self.requests)
+
+        self.assertEqual(self.state(self.fleet), self.state(fleet))
+
+    def test_forecast_of_process_request(self):
+        self.assertForecast()
+
+    def test_forecast_with_frequency_watt(self):
+        self.fleet.FW21_Enabled = self.fleet.is_autonomous = True
+        self.assertForecast()
+
+    def test_forecast_until_full_tanks(self):
+        self.fleet.moles = (self.fleet.max_charge*self.fleet.ey_V_tank*self.fleet.ey_Nt/self.fleet.ey_R /
+                            (self.fleet.ey_T + 273.15) - 10)
+        self.assertForecast()
+
+if __name__ == '__main__':
+    unittest.main()
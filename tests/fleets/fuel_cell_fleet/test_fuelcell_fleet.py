@@ -0,0 +1,89 @@
+import unittest
+from datetime import datetime, timedelta
+import numpy as np
+from fleet_request import FleetRequest
+from grid_info_artificial_inertia import GridInfo
+from fleets.fuel_cell_fleet.fuelcell_fleet import FuelCellFleet
+
+class TestOperatingPoints(unittest.TestCase):
+
+    def setUp(self):
+        self.fleet = FuelCellFleet(GridInfo())
+        self.p_cell = np.linspace(self.fleet.fc_Pmin_fleet, self.fleet.fc_Pmax_fleet,
+                                  1001)*1e3/self.fleet.fc_Nfc/self.fleet.fc_Nc
+
+    def test_table_within_tolerance_of_fsolve(self):
+        for p in self.p_cell:
+            Vi, Ir = self.fleet.vi_calc(p)
+            Vi_fsolve, Ir_fsolve = self.fleet.vi_solve(p)
+
+            self.assertLess(abs(Ir/Ir_fsolve - 1), 2*self.fleet.fc_table_tol)
+            self.assertLess(abs(Vi/Vi_fsolve - 1), 2*self.fleet.fc_table_tol)
+
+    def test_current_increasing_with_power(self):
+        Ir = np.array([self.fleet.vi_calc(p)[1] for p in self.p_cell])
+
+        self.assertTrue(np.all(np.diff(Ir) > 0))
+
+    def test_fsolve_outside_of_table(self):
+        # Just below the min. power of the fleet, where fsolve converges
+        p = 0.99*self.p_cell[0]
+        Vi, Ir = self.fleet.vi_calc(p)
+
+        self.assertEqual((Vi, Ir), self.fleet.vi_solve(p))
+        # An operating point of the cell at that power, next to the first one of the table
+        self.assertAlmostEqual(Vi*Ir, p, places=9)
+        self.assertAlmostEqual(Ir/self.fleet.vi_calc(self.p_cell[0])[1], 0.99, places=2)
+
+class TestForecast(unittest.TestCase):
+
+    def setUp(self):
+        self.fleet = FuelCellFleet(GridInfo())
+        ts = datetime(2019, 1, 1)
+        dt = timedelta(seconds=1)
+        p = np.random.RandomState(0).uniform(-150, 150, 140)
+        self.requests = [FleetRequest(ts=ts + i*dt, sim_step=dt, start_time=ts, p=None if i % 7 == 0 else p[i], q=0.)
+                         for i in range(len(p))]
+
+    def state(self):
+        return (self.fleet.moles_ideal, self.fleet.moles_age, self.fleet.lka_h2, self.fleet.soc_ideal,
+                self.fleet.soc_age, self.fleet.P_tank_ideal, self.fleet.process_request(self.requests[0]).P_togrid)
+
+    def assertForecast(self):
+        forecast = self.fleet.forecast(self.requests)
+        responses = [self.fleet.process_request(request) for request in self.requests]
+
+        for name in ('P_togrid', 'P_service', 'P_base', 'P_service_max', 'P_service_min', 'E', 'Eff_discharge'):
+            np.testing.assert_allclose([getattr(r, name) for r in forecast], [getattr(r, name) for r in responses],
+                                       rtol=1e-12, err_msg=name)
+        self.assertEqual([r.ts for r in forecast], [r.ts for r in responses])
+
+    def test_forecast_leaves_fleet_untouched(self):
+        fleet = FuelCellFleet(GridInfo())
+        self.fleet.forecast(self.requests)
+
+        self.assertEqual(self.state(), (fleet.moles_ideal, fleet.moles_age, fleet.lka_h2, fleet.soc_ideal,
+                                        fleet.soc_age, fleet.P_tank_ideal, fleet.process_request(self.requests[0]).P_togrid))
+
+    def test_forecast_of_process_request(self):
+        self.assertForecast()
+
+    def test_forecast_with_frequency_watt(self):
+        self.fleet.FW21_Enabled = self.fleet.is_autonomous = True
+        self.assertForecast()
+
+    def test_forecast_until_empty_tank(self):
+        self.fleet.moles_ideal = (self.fleet.min_charge*self.fleet.fc_V_tank*self.fleet.fc_Nt/self.fleet.fc_R /
+                                  (self.fleet.fc_Ts + 273.15) + 10)
+        self.fleet.P_tank_ideal = self.fleet.moles_ideal/self.fleet.fc_Nt*self.fleet.fc_R*(self.fleet.fc_Ts + 273.15) / \
+            self.fleet.fc_V_tank
+        self.assertForecast()
+
+    def test_frame(self):
+        frame = self.fleet.forecast_frame(self.requests)
+
+        self.assertEqual(len(frame), len(self.requests))
+        self.assertTrue(np.all(frame['P_service'] == frame['P_togrid'] - frame['P_base']))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+from datetime import datetime, timedelta
+import numpy as np
+from fleet_interface import FleetInterface
+from grid_info_artificial_inertia import GridInfo
+from services.artificial_inertia_service.artificial_inertia_service import ArtificialInertiaService
+
+class TestArtificialInertiaService(unittest.TestCase):
+
+    def setUp(self):
+        self.service = ArtificialInertiaService()
+        self.start_time = datetime(2017, 8, 1)
+        # Responses every 0.5 s for 10 s, with the service power ramping up and a constant base power
+        self.t = [self.start_time + k * timedelta(seconds=0.5) for k in range(21)]
+        self.p_service = [10.0 * k for k in range(21)]
+        self.p_base = [100.0] * 21
+
+    def test_energies(self):
+        service_energy, base_energy = self.service.energies(self.t, self.p_service, self.p_base)
+
+        self.assertAlmostEqual(service_energy, 0.5 * 200 * 10)
+        self.assertAlmostEqual(base_energy, 100 * 10)
+
+    def test_energies_in_metrics_timeframe(self):
+        # From the response at 2 s to the last response before 6.2 s, i.e. the one at 6 s
+        service_energy, base_energy = self.service.energies(self.t, self.p_service, self.p_base,
+                                                            self.start_time + timedelta(seconds=1.8),
+                                                            self.start_time + timedelta(seconds=6.2))
+
+        self.assertAlmostEqual(service_energy, 0.5 * (40 + 120) * 4)
+        self.assertAlmostEqual(base_energy, 100 * 4)
+
+    def test_energies_of_single_response(self):
+        self.assertEqual(self.service.energies(self.t[:1], self.p_service[:1], self.p_base[:1]), (0.0, 0.0))
+
+    def test_grid_of_fleet(self):
+        fleet = FleetInterface()
+        fleet.grid = GridInfo('Grid_Info_data_artificial_inertia.csv')
+        self.service.fleet = fleet
+
+        self.assertIs(self.service.grid, fleet.grid)
+        np.testing.assert_array_equal(
+            self.service.grid.get_frequencies(self.t, 0, self.start_time),
+            [fleet.grid.get_frequency(ts, 0, self.start_time) for ts in self.t])
+
+if __name__ == '__main__':
+    unittest.main()
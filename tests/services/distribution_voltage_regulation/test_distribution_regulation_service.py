@@ -0,0 +1,29 @@
+import unittest
+import numpy as np
+from services.distribution_voltage_regulation.distribution_regulation_service import DistributionVoltageService
+
+class TestDistributionVoltageService(unittest.TestCase):
+
+    def setUp(self):
+        self.service = DistributionVoltageService()
+
+    def test_calculation_arrays(self):
+        Preq = [0, 100., -100., 50., 0]
+        Qreq = [0, 20., 0, -40., 10.]
+        Pach = [0., 90., -80., 45., 0.]
+        Qach = [None, 18., 'n/a', -30., 10.]
+        expected = [self.service.calculation(Prequest=Preq[k], Qrequest=Qreq[k], P0=Pach[k], Q0=Qach[k], price_P=1,
+                                             price_Q=2) for k in range(5)]
+
+        metrics = self.service.calculation_arrays(Prequest=Preq, Qrequest=Qreq, P0=Pach, Q0=Qach, price_P=1, price_Q=2)
+
+        self.assertEqual([metric.tolist() for metric in metrics], [list(values) for values in zip(*expected)])
+
+    def test_calculation_arrays_no_requested_value(self):
+        service_efficacy, value_provided, value_efficacy = self.service.calculation_arrays(
+            Prequest=[100.], Qrequest=[-50.], P0=[90.], Q0=[-40.], price_P=1, price_Q=2)
+
+        self.assertTrue(np.isinf(value_efficacy[0]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+from os.path import join
+import numpy as np
+from services.energy_market_service.energy_market_service import EnergyMarketService
+from services.energy_market_service.benchmark import brute_force_cycle, day_values
+
+class TestEnergyMarketService(unittest.TestCase):
+
+    def setUp(self):
+        self.energy_market = EnergyMarketService()
+        # Value of charging at i and discharging at j, with no losses and no strike price
+        self.price = np.array([5., 1., 2., 8., 3., 9., 4., 6.])
+        self.value = self.price[np.newaxis, :] - self.price[:, np.newaxis]
+
+    def test_cycle_values(self):
+        cycle_value = self.energy_market.cycle_values(self.value, 2, 0, 8)
+
+        self.assertEqual(cycle_value.shape, (7, 7))
+        self.assertEqual(cycle_value[1, 4], self.value[1, 4] + self.value[2, 5])
+
+    def test_one_cycle_discharged_at_start(self):
+        chargeMax, dischargeMax, maxValue = self.energy_market.best_cycles(self.value, 1, 0, 8, 500, 0)
+
+        self.assertEqual((chargeMax, dischargeMax, maxValue), ([1], [5], 8.))
+
+    def test_one_cycle_charged_at_start(self):
+        chargeMax, dischargeMax, maxValue = self.energy_market.best_cycles(self.value, 1, 0, 8, 500, 1)
+
+        # Discharging at 3 and charging at 4 is worth as much as discharging at 5 and charging at 6
+        self.assertEqual((chargeMax, dischargeMax, maxValue), ([4], [3], 5.))
+
+    def test_two_cycles(self):
+        chargeMax, dischargeMax, maxValue = self.energy_market.best_cycles(self.value, 1, 0, 8, 500, 0, nCycles=2)
+
+        self.assertEqual((chargeMax, dischargeMax, maxValue), ([1, 4], [3, 5], 13.))
+
+    def test_charge_before_tFull(self):
+        chargeMax, dischargeMax, maxValue = self.energy_market.best_cycles(self.value, 1, 0, 8, 4, 0)
+
+        self.assertEqual((chargeMax, dischargeMax, maxValue), ([1], [3], 7.))
+
+    def test_no_room_for_cycles(self):
+        with self.assertRaises(ValueError):
+            self.energy_market.best_cycles(self.value, 2, 0, 8, 500, 0, nCycles=3)
+
+class TestCAISOPrices(unittest.TestCase):
+
+    def setUp(self):
+        self.energy_market = EnergyMarketService()
+        price = np.genfromtxt(join(self.energy_market.base_path, 'CAISOApr2016Hourly.csv'), delimiter=',')[:24]
+        # Values of the CAISO day as dispatch_algorithm builds them, for random efficiencies and strike prices
+        self.values = []
+        for seed in range(3):
+            eff, strike = day_values(price, seed)
+            self.values.append((-price[:, np.newaxis] + eff*price[np.newaxis, :]) - strike)
+
+    def test_same_cycle_as_brute_force(self):
+        # Full day and half days, as dispatch_algorithm, both charge states and several tFull
+        for value in self.values:
+            for startT, stopT in ((0, 23), (0, 11), (12, 23)):
+                for nChg in (2, 3, 4):
+                    for tFull in (500, 8, 4):
+                        for charged in (0, 1):
+                            expected = brute_force_cycle(value, nChg, startT, stopT, tFull, charged)
+                            args = (value, nChg, startT, stopT, tFull, charged)
+                            if expected[0] is None:
+                                with self.assertRaises(ValueError, msg=args[1:]):
+                                    self.energy_market.best_cycles(*args)
+                                continue
+                            chargeMax, dischargeMax, maxValue = self.energy_market.best_cycles(*args)
+
+                            self.assertEqual((chargeMax[0], dischargeMax[0], maxValue), expected, msg=args[1:])
+
+if __name__ == '__main__':
+    unittest.main()
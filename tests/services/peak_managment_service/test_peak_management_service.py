@@ -0,0 +1,73 @@
+import unittest
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+from fleet_interface import FleetInterface
+from fleet_response import FleetResponse
+from services.peak_managment_service.peak_management_service import PeakManagementService
+
+class LimitedFleet(FleetInterface):
+    # Fleet providing the requested power up to a limit, and counting its forecasts.
+
+    def __init__(self, limit):
+        FleetInterface.__init__(self)
+        self.limit = limit
+        self.forecasts = 0
+
+    def process_request(self, fleet_request):
+        fleet_response = FleetResponse()
+        fleet_response.ts = fleet_request.ts_req
+        if fleet_request.P_req is not None:
+            fleet_response.P_service = min(fleet_request.P_req, self.limit)
+        return fleet_response
+
+    def forecast(self, fleet_requests):
+        self.forecasts += 1
+        return [self.process_request(fleet_request) for fleet_request in fleet_requests]
+
+class TestPeakManagementService(unittest.TestCase):
+
+    def setUp(self):
+        self.service = PeakManagementService(sim_step=timedelta(minutes=30))
+        self.service.mw_target = 0.9 * max(self.service.drive_cycle.load_forecast_mw)
+        self.dt_day = pd.Series(pd.date_range('2010-07-18', periods=24, freq='h'))
+
+    def test_peak_shaving_plan(self):
+        plan = self.service.peak_shaving_plan()
+        load = self.service.drive_cycle.load_forecast_mw.values
+
+        self.assertEqual(plan.shape, (len(load) // 24, 24))
+        above_target = load[:plan.size] > self.service.mw_target
+        np.testing.assert_array_equal(~np.isnan(plan.ravel()), above_target)
+        np.testing.assert_allclose(plan.ravel()[above_target], load[:plan.size][above_target] - self.service.mw_target)
+
+    def test_plan_day_within_forecast(self):
+        self.service.fleet = LimitedFleet(limit=1000.)
+        p_needed = [None] * 16 + [50., 80., None] + [None] * 5
+
+        day_requests = self.service.plan_day(self.dt_day, p_needed, self.dt_day[0])
+
+        self.assertEqual(self.service.fleet.forecasts, 1)
+        # Two requests per hour, each with the power needed in its hour
+        self.assertEqual(len(day_requests), 48)
+        self.assertEqual(day_requests[33].ts_req, pd.Timestamp('2010-07-18 16:30'))
+        self.assertEqual([r.P_req for r in day_requests[32:38]], [50., 50., 80., 80., None, None])
+
+    def test_plan_day_reduced_to_forecast(self):
+        self.service.fleet = LimitedFleet(limit=60.)
+        p_needed = [None] * 16 + [50., 80., None] + [None] * 5
+
+        day_requests = self.service.plan_day(self.dt_day, p_needed, self.dt_day[0])
+
+        self.assertEqual([r.P_req for r in day_requests[32:38]], [50., 50., 60., 60., None, None])
+
+    def test_plan_day_without_need(self):
+        self.service.fleet = LimitedFleet(limit=60.)
+
+        day_requests = self.service.plan_day(self.dt_day, [None] * 24, self.dt_day[0])
+
+        self.assertEqual(self.service.fleet.forecasts, 0)
+        self.assertTrue(all(r.P_req is None for r in day_requests))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import numpy as np
+from services.reg_service.reg_service import RegService
+
+def loop_perf_score(request_array, response_array):
+    # perf_score as it was computed before, one 5-min window and one delay at a time
+    max_corr_array, max_index_array, prec_score_array = [], [], []
+    for i in range(12):
+        x = request_array[30 * i:30 * (i + 1)]
+        y = response_array[30 * i:30 * (i + 1)]
+        if np.std(x) < 0.01:
+            axis = np.arange(30.)
+            slope_x = np.polyfit(axis, x, 1)[0]
+            slope_y = np.polyfit(axis, y, 1)[0]
+            max_index_array.append(0)
+            max_corr_array.append(max(0, 1 - abs(slope_x - slope_y)))
+        else:
+            corr_score = []
+            for j in range(31):
+                y_ = response_array[30 * i + j:30 * (i + 1) + j]
+                corr_score.append(0 if np.std(y_) < 0.00001 else np.corrcoef(x, y_)[0, 1])
+            max_index = 30 if sum(corr_score) == 0 else corr_score.index(max(corr_score))
+            max_index_array.append(max_index)
+            max_corr_array.append(corr_score[max_index])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            error = np.absolute(y - x) / (np.absolute(x).mean())
+        prec_score_array.append(max(0, 1 - 1 / 30 * error.sum()))
+    delay_score = np.absolute((10 * np.array(max_index_array) - 5 * 60) / (5 * 60)).mean()
+    corr_score = np.mean(max_corr_array)
+    prec_score = np.mean(prec_score_array)
+    return (delay_score + corr_score + prec_score) / 3, delay_score, corr_score, prec_score
+
+class TestPerfScore(unittest.TestCase):
+
+    def setUp(self):
+        self.reg_service = RegService()
+        rng = np.random.RandomState(0)
+        # 65 min of 10s request data (391 values)
+        self.request = np.cumsum(rng.normal(0, 1, 391))
+
+    def test_perfect_response(self):
+        scores = self.reg_service.perf_score(self.request, self.request.copy())
+
+        np.testing.assert_allclose(scores, (1, 1, 1, 1))
+
+    def test_delayed_response(self):
+        # Response delayed by 20s: max correlation at the second 10s step of every 5-min window
+        response = np.concatenate((self.request[:2], self.request[:-2]))
+
+        (perf, delay, corr, prec) = self.reg_service.perf_score(self.request, response)
+
+        self.assertAlmostEqual(delay, (300 - 20) / 300)
+        self.assertAlmostEqual(corr, 1)
+        self.assertLess(prec, 1)
+        self.assertAlmostEqual(perf, (delay + corr + prec) / 3)
+
+    def test_constant_response_to_varying_request(self):
+        (perf, delay, corr, prec) = self.reg_service.perf_score(self.request, np.full(391, 2.0))
+
+        self.assertEqual(delay, 0)
+        self.assertEqual(corr, 0)
+
+    def test_constant_request_uses_slopes(self):
+        # Nearly constant request: correlation score from the slopes of the request and response
+        request = np.full(391, 0.5)
+        response = 0.5 + 0.01 * np.arange(391)
+
+        (perf, delay, corr, prec) = self.reg_service.perf_score(request, response)
+
+        self.assertAlmostEqual(corr, 1 - 0.01)
+        self.assertEqual(delay, 1)
+
+class TestPerfScoreAgainstLoop(unittest.TestCase):
+
+    def setUp(self):
+        self.reg_service = RegService()
+        self.rng = np.random.RandomState(1)
+
+    def assertSameScores(self, request, response):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = self.reg_service.perf_score(request, response)
+
+        np.testing.assert_allclose(scores, loop_perf_score(request, response), rtol=1e-9, atol=1e-12)
+
+    def test_window_without_request_nor_response(self):
+        request = np.cumsum(self.rng.normal(0, 1, 391))
+        response = request + self.rng.normal(0, 0.2, 391)
+        request[60:90] = response[60:90] = 0
+
+        self.assertSameScores(request, response)
+        self.assertFalse(np.isnan(self.reg_service.perf_score(request, response)).any())
+
+    def test_random_hours(self):
+        for hour in range(6):
+            request = np.cumsum(self.rng.normal(0, 1, 391))
+            delay = self.rng.randint(0, 40)
+            response = np.concatenate((request[:delay], request[:391 - delay])) + self.rng.normal(0, 0.3, 391)
+            # A constant request window, a constant response window and a window without signal
+            k = self.rng.choice(12, 3, replace=False) * 30
+            request[k[0]:k[0] + 30] = request[k[0]]
+            response[k[1]:k[1] + 60] = response[k[1]]
+            request[k[2]:k[2] + 30] = response[k[2]:k[2] + 30] = 0
+
+            self.assertSameScores(request, response)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import os
+import shutil
+import tempfile
+import datetime
+import numpy as np
+import file_cache
+from services.reserve_service.helpers.clearing_price_helper import ClearingPriceHelper
+
+class TestClearingPriceHelper(unittest.TestCase):
+
+    def setUp(self):
+        self.clearing_price_helper = ClearingPriceHelper()
+        self.directory = tempfile.mkdtemp()
+        self.cache_dir = file_cache.get_cache_dir()
+        file_cache.set_cache_dir(os.path.join(self.directory, 'cache'))
+        # Monthly SRMCP summaries of the reserve service
+        for filename in ('201703.csv', '201711.csv'):
+            shutil.copy(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', 'src', 'services',
+                                     'reserve_service', filename), self.directory)
+
+    def tearDown(self):
+        file_cache.set_cache_dir(self.cache_dir)
+        shutil.rmtree(self.directory)
+
+    def test_read_clearing_prices(self):
+        self.clearing_price_helper.read_and_store_clearing_prices(os.path.join(self.directory, '201711.csv'),
+                                                                  datetime.datetime(2017, 11, 1))
+        clearing_prices = self.clearing_price_helper.clearing_prices
+
+        # Hour ending 01/11/2017 01 of the MAD subzone
+        self.assertEqual(clearing_prices[datetime.datetime(2017, 11, 1, 0)], (0.0,))
+        self.assertEqual(len(clearing_prices), 720)
+        self.assertTrue(os.path.exists(file_cache.cache_base(os.path.join(self.directory, '201711.csv')) + '.npz'))
+
+    def test_hour_missing_when_daylight_saving_time_starts(self):
+        self.clearing_price_helper.read_and_store_clearing_prices(os.path.join(self.directory, '201703.csv'),
+                                                                  datetime.datetime(2017, 3, 1))
+        clearing_prices = self.clearing_price_helper.clearing_prices
+
+        self.assertNotIn(datetime.datetime(2017, 3, 12, 2), clearing_prices)
+        self.assertEqual(len(clearing_prices), 31 * 24 - 1)
+        self.assertTrue(np.isnan(self.clearing_price_helper.prices[
+                                     self.clearing_price_helper.hour_index(datetime.datetime(2017, 3, 12, 2, 30))]))
+
+    def test_lookup_by_hour_index(self):
+        self.clearing_price_helper.read_and_store_clearing_prices(os.path.join(self.directory, '201703.csv'),
+                                                                  datetime.datetime(2017, 3, 1))
+        prices = self.clearing_price_helper.prices
+
+        for hour, price in self.clearing_price_helper.clearing_prices.items():
+            self.assertEqual(prices[self.clearing_price_helper.hour_index(hour)], price[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import numpy as np
+import pandas as pd
+from services.reserve_service.reserve_service import ReserveService
+
+class TestReserveService(unittest.TestCase):
+
+    def setUp(self):
+        self.reserve_service = ReserveService()
+
+    def events(self):
+        # 40 minutes with an event of 15 minutes (minutes 5 to 19) and an event of 4 minutes (minutes 30 to 33)
+        request = np.zeros(40)
+        request[5:20] = 1.0
+        request[30:34] = 2.0
+        response = np.zeros(40)
+        response[5:20] = np.minimum(0.25 * np.arange(15), 1.2)
+        response[30:35] = [0.0, 0.5, 1.0, 1.5, 1.5]
+        return pd.DataFrame({'Date_Time': pd.date_range('2017-03-02 10:00', periods=40, freq='min'),
+                             'Request': request, 'Response': response})
+
+    def set_prices(self):
+        # The price of each hour of March 2017 is the number of the hour in the month.
+        helper = self.reserve_service._clearing_price_helper
+        helper._start = pd.Timestamp('2017-03-01')
+        helper._prices = np.arange(31 * 24, dtype=float)
+
+    def test_event_bounds(self):
+        event_starts, event_ends = self.reserve_service.event_bounds([1, 1, 0, 0, np.nan, 2, 0, 3])
+
+        np.testing.assert_array_equal(event_starts, [0, 5, 7])
+        np.testing.assert_array_equal(event_ends, [1, 5, 7])
+
+    def test_perf_metrics_of_event_of_at_least_11_minutes(self):
+        df_1m = self.events()
+        results = self.reserve_service.perf_metrics(df_1m, *self.reserve_service.event_bounds(df_1m.Request.values))
+
+        self.assertEqual(results['Event_Start_Time'][0], pd.Timestamp('2017-03-02 10:05'))
+        self.assertEqual(results['Event_End_Time'][0], pd.Timestamp('2017-03-02 10:19'))
+        self.assertEqual(results['Event_Duration_mins'][0], 14)
+        self.assertEqual(results['Requested_MW'][0], 1.0)
+        self.assertEqual(results['Response_0min_Min_MW'][0], 0.0)
+        self.assertEqual(results['Response_10minOrEnd_Max_MW'][0], 1.2)
+        self.assertEqual(results['Responded_MW_After10minToEndOr30min'][0], 1.2)
+        self.assertEqual(results['Response_After10minToEndOr30min_To_First10min_Ratio'][0], 1.0)
+        self.assertAlmostEqual(results['Shortfall_Ratio'][0], 1.2)
+        self.assertAlmostEqual(results['Avg_Ramp_Rate'][0], 0.12)
+        # The response meets the request 4 minutes into the event
+        self.assertEqual(results['Response_MeetReqOrMax_Index_number'][0], 4)
+        self.assertEqual(results['Best_Ramp_Rate'][0], 0.25)
+
+    def test_perf_metrics_of_event_shorter_than_11_minutes(self):
+        df_1m = self.events()
+        results = self.reserve_service.perf_metrics(df_1m, *self.reserve_service.event_bounds(df_1m.Request.values))
+
+        # The minute after the event is included in the response, but not in the event
+        self.assertEqual(results['Event_End_Time'][1], pd.Timestamp('2017-03-02 10:33'))
+        self.assertEqual(results['Event_Duration_mins'][1], 3)
+        self.assertEqual(results['Response_10minOrEnd_Max_MW'][1], 1.5)
+        self.assertTrue(np.isnan(results['Response_After10minToEnd_MW'][1]))
+        self.assertTrue(np.isnan(results['Responded_MW_After10minToEndOr30min'][1]))
+        self.assertEqual(results['Shortfall_Ratio'][1], 0.75)
+        self.assertEqual(results['Avg_Ramp_Rate'][1], 0.5)
+        # The request is not met, so the best ramp rate is the average ramp rate
+        self.assertEqual(results['Response_MeetReqOrMax_Index_number'][1], 3)
+        self.assertEqual(results['Best_Ramp_Rate'][1], 0.5)
+
+    def test_event_value(self):
+        self.set_prices()
+        results = self.reserve_service.event_value(
+            Event_Start_Time=[pd.Timestamp('2017-03-02 10:00'), pd.Timestamp('2017-03-02 23:50')],
+            Event_End_Time=[pd.Timestamp('2017-03-02 10:20'), pd.Timestamp('2017-03-03 00:10')],
+            Previous_Event_End_Time=[pd.Timestamp('2017-03-01 20:30'), pd.Timestamp('2017-03-02 10:20')],
+            Requested_MW=[1.0, 1.0],
+            Responded_MW_at_10minOrEnd=[1.0, 1.0],
+            Responded_MW_After10minToEndOr30min=[0.8, np.nan],
+            Shortfall_Ratio=[0.8, 1.0])
+
+        # Event within a day: average of the 24 hours of the day
+        self.assertEqual(results['SRMCP_DollarsperMWh_DuringEvent'][0], 35.5)
+        # Event over two days: average from noon of the first day to noon of the second day
+        self.assertEqual(results['SRMCP_DollarsperMWh_DuringEvent'][1], 48.0)
+        # Average from the hour the previous event ended to the hour this event started
+        self.assertEqual(results['SRMCP_DollarsperMWh_SinceLastEvent'][0], 27.0)
+        self.assertAlmostEqual(results['Period_from_Last_Event_Hours'][0], 13 + 50 / 60.)
+        self.assertAlmostEqual(results['Service_Value_NotInclShortfall_dollars'][0], 35.5 * 0.8 * 5)
+        self.assertAlmostEqual(results['Service_Value_InclShortfall_dollars'][0],
+                               35.5 * 0.8 * 5 - 27.0 * 0.2 * (13 + 50 / 60.) / 24. / 5 * 3)
+        # Without a response after 10 minutes, the response at 10 minutes is valued
+        self.assertEqual(results['Service_Value_NotInclShortfall_dollars'][1], 48.0 * 1.0 * 5)
+        self.assertEqual(results['Service_Value_InclShortfall_dollars'][1], 48.0 * 1.0 * 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,31 +1,80 @@
 import unittest
 import os
+import shutil
+import tempfile
+import datetime
 from dateutil import parser
-from services.trad_reg_service.helpers.clearing_price_helper import ClearingPriceHelper
+import numpy as np
+import pandas as pd
+import file_cache
+from services.reg_service.helpers.clearing_price_helper import ClearingPriceHelper
 
-class TestClearingPriceHelper(unittest.TestCase):
+class TestClearingPriceCache(unittest.TestCase):
 
     def setUp(self):
         self.clearing_price_helper = ClearingPriceHelper()
+        self.directory = tempfile.mkdtemp()
+        self.cache_dir = file_cache.get_cache_dir()
+        file_cache.set_cache_dir(os.path.join(self.directory, 'cache'))
+        self.input_data_file_path = os.path.join(self.directory, 'historical-ancillary-service-data-2017.xlsx')
 
-    def test_read_clearing_price_from_sheet(self):
+        # Two monthly tabs laid out like the PJM workbook, with the regulation prices
+        # among the prices of other services.
+        rng = np.random.RandomState(0)
+        with pd.ExcelWriter(self.input_data_file_path) as writer:
+            for month in ('2017-07', '2017-08'):
+                rows = [(day.strftime('%d-%b-%Y').upper(), hour, service, rng.uniform(0, 40), rng.uniform(0, 10),
+                         rng.uniform(0, 5))
+                        for day in pd.date_range(month + '-01', periods=pd.Period(month).days_in_month)
+                        for hour in range(24) for service in ('REG', 'SR')]
+                pd.DataFrame(rows, columns=['LOCALDAY', 'LOCALHOUR', 'SERVICE', 'MCP', 'REG_CCP', 'REG_PCP']).to_excel(
+                    writer, sheet_name=pd.Timestamp(month).strftime('%B_%Y'), index=False)
+        self.rows = pd.concat(pd.read_excel(self.input_data_file_path, sheet_name=None).values())
+
+    def tearDown(self):
+        file_cache.set_cache_dir(self.cache_dir)
+        shutil.rmtree(self.directory)
 
-        #local_day = "01-AUG-2017"
-        #local_hour = "00"
-        start_time = parser.parse("2017-08-01 16:00:00")
-        #sheet_name = "August_2017"
+    def test_prices_of_the_month(self):
+        self.clearing_price_helper.read_and_store_clearing_prices(self.input_data_file_path,
+                                                                  parser.parse('2017-08-01 16:00:00'))
+        actual_clearing_prices = self.clearing_price_helper.clearing_prices
 
-        input_data_file_path = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "fixtures/files/historical-ancillary-service-data-2017.xls"))
+        self.assertEqual(len(actual_clearing_prices), 31 * 24)
+        expected = self.rows[(self.rows.LOCALDAY == '01-AUG-2017') & (self.rows.LOCALHOUR == 16) &
+                             (self.rows.SERVICE == 'REG')]
+        self.assertEqual(actual_clearing_prices[datetime.datetime(2017, 8, 1, 16)],
+                         tuple(expected[['MCP', 'REG_CCP', 'REG_PCP']].values[0]))
 
-        self.clearing_price_helper.read_and_store_clearing_prices(input_data_file_path, start_time)
+    def test_read_clearing_price_from_sheet(self):
+        # The prices of the whole month are read, including the hours before start_time
+        self.clearing_price_helper.read_and_store_clearing_prices(self.input_data_file_path,
+                                                                  parser.parse('2017-08-01 16:00:00'))
         actual_clearing_prices = self.clearing_price_helper.clearing_prices
 
-        #print("actual_clearing_prices: ", actual_clearing_prices)
+        expected = self.rows[(self.rows.LOCALDAY == '01-AUG-2017') & (self.rows.LOCALHOUR == 0) &
+                             (self.rows.SERVICE == 'REG')]
+        expected_clearing_price_for_first_hour = tuple(expected[['MCP', 'REG_CCP', 'REG_PCP']].values[0])
+        self.assertEqual(actual_clearing_prices[parser.parse('2017-08-01 00:00:00')],
+                         expected_clearing_price_for_first_hour)
+
+    def test_prices_are_cached_and_indexed_by_hour(self):
+        self.clearing_price_helper.read_and_store_clearing_prices(self.input_data_file_path,
+                                                                  parser.parse('2017-07-01 00:00:00'))
+        self.assertTrue(os.path.exists(file_cache.cache_base(self.input_data_file_path) + '.npz'))
 
-        #expected_clearing_prices = {"MCP": 9.870000000000001, "REG_CCP": 2.84, "REG_PCP": 7.03}
-        expected_clearing_price_for_first_hour = (9.870000000000001, 2.84, 7.03)
+        # The cache is used as long as it is newer than the workbook
+        open(self.input_data_file_path, 'w').close()
+        os.utime(self.input_data_file_path, (0, 0))
+        self.clearing_price_helper.read_and_store_clearing_prices(self.input_data_file_path,
+                                                                  parser.parse('2017-08-01 00:00:00'))
 
-        self.assertEqual(actual_clearing_prices[parser.parse('2017-08-01 00:00:00')], expected_clearing_price_for_first_hour)
+        prices = self.clearing_price_helper.prices
+        self.assertEqual(prices.shape, (62 * 24, 3))
+        hour = self.clearing_price_helper.hour_index(parser.parse('2017-08-02 05:30:00'))
+        self.assertEqual(hour, 32 * 24 + 5)
+        self.assertEqual(tuple(prices[hour]),
+                         self.clearing_price_helper.clearing_prices[datetime.datetime(2017, 8, 2, 5)])
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,101 +1,94 @@
 import unittest
 import os
+import shutil
+import tempfile
 from dateutil import parser
 import datetime
-from services.trad_reg_service.helpers.historical_signal_helper import HistoricalSignalHelper
+import numpy as np
+import pandas as pd
+import file_cache
+from services.reg_service.helpers.historical_signal_helper import HistoricalSignalHelper
 from services.exceptions.datetime_validation_exception import DatetimeValidationException
 
 class TestHistoricalSignalHelper(unittest.TestCase):
 
+    @classmethod
+    def setUpClass(cls):
+        # The first 10 days of the August 2017 signal file, with random signals: one column per day,
+        # one row per 2 s of the day, and a last row repeating the first value of the next day.
+        cls.directory = tempfile.mkdtemp()
+        times = [str(datetime.timedelta(seconds=s)).rjust(8, '0') for s in range(0, 86400, 2)] + ['24:00:00']
+        days = pd.date_range('2017-08-01', periods=10)
+        cls.signals = pd.DataFrame(np.random.RandomState(8).uniform(-1, 1, (len(times), len(days))),
+                                   index=times, columns=days.strftime('%Y-%m-%d'))
+        cls.input_data_file_path = os.path.join(cls.directory, '08 2017 Traditional.csv')
+        cls.signals.to_csv(cls.input_data_file_path)
+        cls.signals = pd.read_csv(cls.input_data_file_path, index_col=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
     def setUp(self):
         self.historial_signal_helper = HistoricalSignalHelper()
+        self.cache_dir = file_cache.get_cache_dir()
+        file_cache.set_cache_dir(os.path.join(self.directory, 'cache'))
+
+    def tearDown(self):
+        file_cache.set_cache_dir(self.cache_dir)
 
     def test_get_historial_signal_in_range_within_the_same_day(self):
 
-        sheet_name = "Traditional"
         start_time = parser.parse("2017-08-02 00:00:00")
         end_time = parser.parse("2017-08-02 00:00:10")
 
-        input_data_file_path = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "fixtures/files/08_2017_reduced_size.xlsx"))
-
-        self.historial_signal_helper.read_and_store_historical_signals(input_data_file_path, sheet_name)
+        self.historial_signal_helper.read_and_store_historical_signals(self.input_data_file_path)
         actual_signals = self.historial_signal_helper.signals_in_range(start_time, end_time)
 
-        #print("actual_signals: ", actual_signals)
-
-        # expected_signals = np.array(['-0.49734288814011735', '-0.4978015549937998',
-        #                              '-0.498587711999932', '-0.49966560301435453',
-        #                              '-0.48042063823334713', '-0.4735139582609288'])
-        #expected_signals = np.array([-0.497343, -0.497802, -0.498588, -0.499666, -0.480421, -0.473514])
-        expected_signals = {datetime.datetime(2017, 8, 2, 0, 0): -0.49734288814011735,
-                            datetime.datetime(2017, 8, 2, 0, 0, 2): -0.4978015549937998,
-                            datetime.datetime(2017, 8, 2, 0, 0, 4): -0.498587711999932,
-                            datetime.datetime(2017, 8, 2, 0, 0, 6): -0.49966560301435453,
-                            datetime.datetime(2017, 8, 2, 0, 0, 8): -0.48042063823334713,
-                            datetime.datetime(2017, 8, 2, 0, 0, 10): -0.4735139582609288}
-
-        #np.testing.assert_array_equal(actual_signals, expected_signals)
-        #np.testing.assert_allclose(actual_signals, expected_signals, rtol = 1e-6, atol = 0)
+        day = self.signals['2017-08-02']
+        expected_signals = {datetime.datetime(2017, 8, 2, 0, 0): day.iloc[0],
+                            datetime.datetime(2017, 8, 2, 0, 0, 2): day.iloc[1],
+                            datetime.datetime(2017, 8, 2, 0, 0, 4): day.iloc[2],
+                            datetime.datetime(2017, 8, 2, 0, 0, 6): day.iloc[3],
+                            datetime.datetime(2017, 8, 2, 0, 0, 8): day.iloc[4],
+                            datetime.datetime(2017, 8, 2, 0, 0, 10): day.iloc[5]}
+
         self.assertEqual(actual_signals, expected_signals)
 
     def test_get_historial_signal_in_range_encompassing_multiple_days(self):
 
-        sheet_name = "Traditional"
         start_time = parser.parse("2017-08-03 23:59:54")
         end_time = parser.parse("2017-08-04 00:00:02")
 
-        input_data_file_path = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "fixtures/files/08_2017_reduced_size.xlsx"))
-
-        self.historial_signal_helper.read_and_store_historical_signals(input_data_file_path, sheet_name)
+        self.historial_signal_helper.read_and_store_historical_signals(self.input_data_file_path)
         actual_signals = self.historial_signal_helper.signals_in_range(start_time, end_time)
 
-        expected_signals = {datetime.datetime(2017, 8, 3, 23, 59, 54): 0.2383686104732162,
-                            datetime.datetime(2017, 8, 3, 23, 59, 56): 0.2371792581707951,
-                            datetime.datetime(2017, 8, 3, 23, 59, 58): 0.23626120505479414,
-                            datetime.datetime(2017, 8, 4, 0, 0, 0): 0.23557409084697634,
-                            datetime.datetime(2017, 8, 4, 0, 0, 2): 0.23508375252473068}
+        expected_signals = {datetime.datetime(2017, 8, 3, 23, 59, 54): self.signals['2017-08-03'].iloc[-4],
+                            datetime.datetime(2017, 8, 3, 23, 59, 56): self.signals['2017-08-03'].iloc[-3],
+                            datetime.datetime(2017, 8, 3, 23, 59, 58): self.signals['2017-08-03'].iloc[-2],
+                            datetime.datetime(2017, 8, 4, 0, 0, 0): self.signals['2017-08-04'].iloc[0],
+                            datetime.datetime(2017, 8, 4, 0, 0, 2): self.signals['2017-08-04'].iloc[1]}
 
         self.assertEqual(actual_signals, expected_signals)
 
     def test_start_time_after_end_time_should_raise_exception(self):
 
-        sheet_name = "Traditional"
         start_time = parser.parse("2017-08-01 04:00:00")
         end_time = parser.parse("2017-08-01 00:00:00")
 
-        input_data_file_path = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "fixtures/files/08_2017_reduced_size.xlsx"))
-
-        self.historial_signal_helper.read_and_store_historical_signals(input_data_file_path, sheet_name)
+        self.historial_signal_helper.read_and_store_historical_signals(self.input_data_file_path)
 
         with self.assertRaises(DatetimeValidationException) as context:
             self.historial_signal_helper.signals_in_range(start_time, end_time)
 
         self.assertTrue("Start time: 2017-08-01 04:00:00, End time: 2017-08-01 00:00:00. Start time must not be after end time." in str(context.exception))
 
-    # def test_stat_time_and_end_time_not_in_same_month_should_raise_exception(self):
-    #
-    #     sheet_name = "Traditional"
-    #     start_time = parser.parse("2017-08-31 23:00:00")
-    #     end_time = parser.parse("2017-09-01 00:00:00")
-    #
-    #     input_data_file_path = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "fixtures/files/08_2017_reduced_size.xlsx"))
-    #
-    #     self.historial_signal_helper.read_and_store_historical_signals(input_data_file_path, sheet_name)
-    #
-    #     with self.assertRaises(DatetimeValidationException) as context:
-    #         self.historial_signal_helper.signals_in_range(start_time, end_time)
-    #
-    #     self.assertTrue("Start time: year = 2017 month = 8, End time: year = 2017 month = 9. Start date and end date must be in the same month. Currently, range in multiple months is not supported." in str(context.exception))
-
     def test_start_time_and_end_time_in_previous_month_should_raise_exception(self):
 
-        sheet_name = "Traditional"
         start_time = parser.parse("2017-07-01 00:00:00")
         end_time = parser.parse("2017-07-01 04:00:00")
 
-        input_data_file_path = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "fixtures/files/08_2017_reduced_size.xlsx"))
-
-        self.historial_signal_helper.read_and_store_historical_signals(input_data_file_path, sheet_name)
+        self.historial_signal_helper.read_and_store_historical_signals(self.input_data_file_path)
 
         with self.assertRaises(DatetimeValidationException) as context:
             self.historial_signal_helper.signals_in_range(start_time, end_time)
@@ -104,13 +97,10 @@ class TestHistoricalSignalHelper(unittest.TestCase):
 
     def test_start_time_and_end_time_in_next_month_should_raise_exception(self):
 
-        sheet_name = "Traditional"
         start_time = parser.parse("2017-09-01 00:00:00")
         end_time = parser.parse("2017-09-01 04:00:00")
 
-        input_data_file_path = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "fixtures/files/08_2017_reduced_size.xlsx"))
-
-        self.historial_signal_helper.read_and_store_historical_signals(input_data_file_path, sheet_name)
+        self.historial_signal_helper.read_and_store_historical_signals(self.input_data_file_path)
 
         with self.assertRaises(DatetimeValidationException) as context:
             self.historial_signal_helper.signals_in_range(start_time, end_time)
@@ -119,14 +109,114 @@ class TestHistoricalSignalHelper(unittest.TestCase):
 
     def test_infer_filename_from_datatime(self):
 
-        sheet_name = "Traditional"
         start_time = parser.parse("2017-08-01 00:00:00")
 
-        actual_filename = self.historial_signal_helper.get_input_filename(start_time)
+        actual_filename = self.historial_signal_helper.get_input_filename(start_time, "Traditional")
 
-        expected_filename = '08 2017.xlsx'
+        expected_filename = '08 2017 Traditional.csv'
 
         self.assertEqual(actual_filename, expected_filename)
 
+
+class TestHistoricalSignalStore(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # Monthly signal files laid out like "%m %Y Traditional.csv": one column per day,
+        # one row per 2 s of the day, and a last row repeating the first value of the next day.
+        cls.source_directory = tempfile.mkdtemp()
+        times = [str(datetime.timedelta(seconds=s)).rjust(8, '0') for s in range(0, 86400, 2)] + ['24:00:00']
+        for month in (1, 2):
+            days = pd.date_range('2017-%02i-01' % month, periods=pd.Period('2017-%02i' % month).days_in_month)
+            signals = pd.DataFrame(np.random.RandomState(month).uniform(-1, 1, (len(times), len(days))),
+                                   index=times, columns=days.strftime('%Y-%m-%d'))
+            signals.to_csv(os.path.join(cls.source_directory, '%02i 2017 Traditional.csv' % month))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.source_directory)
+
+    def setUp(self):
+        self.historial_signal_helper = HistoricalSignalHelper()
+        self.directory = tempfile.mkdtemp()
+        self.cache_dir = file_cache.get_cache_dir()
+        file_cache.set_cache_dir(os.path.join(self.directory, 'cache'))
+        self.months = []
+        self.input_data_file_paths = []
+        for month in (1, 2):
+            input_data_file_path = shutil.copy(os.path.join(self.source_directory, '%02i 2017 Traditional.csv' % month),
+                                               self.directory)
+            self.months.append(pd.read_csv(input_data_file_path, index_col=0))
+            self.input_data_file_paths.append(input_data_file_path)
+
+    def tearDown(self):
+        file_cache.set_cache_dir(self.cache_dir)
+        shutil.rmtree(self.directory)
+
+    def test_signal_file_is_converted_once(self):
+        self.historial_signal_helper.read_and_store_historical_signals(self.input_data_file_paths[0])
+
+        cache_base = file_cache.cache_base(self.input_data_file_paths[0])
+        self.assertTrue(os.path.exists(cache_base + '.npy'))
+        self.assertTrue(os.path.exists(cache_base + '.json'))
+
+        # The binary copy is used as long as it is newer than the signal file
+        os.remove(self.input_data_file_paths[0])
+        open(self.input_data_file_paths[0], 'w').close()
+        os.utime(self.input_data_file_paths[0], (0, 0))
+        self.historial_signal_helper.read_and_store_historical_signals(self.input_data_file_paths[0])
+        self.assertEqual(self.historial_signal_helper.signals.index[0], pd.Timestamp('2017-01-01 00:00:00'))
+        self.assertEqual(len(self.historial_signal_helper.signals), 31 * 43200)
+
+    def test_get_historial_signal_in_range_encompassing_multiple_days(self):
+        start_time = parser.parse("2017-01-03 23:59:55")
+        end_time = parser.parse("2017-01-04 00:00:02")
+
+        self.historial_signal_helper.read_and_store_historical_signals(self.input_data_file_paths[0])
+        actual_signals = self.historial_signal_helper.signals_in_range(start_time, end_time)
+
+        signals = self.months[0]
+        expected_signals = {datetime.datetime(2017, 1, 3, 23, 59, 56): signals['2017-01-03'].iloc[-3],
+                            datetime.datetime(2017, 1, 3, 23, 59, 58): signals['2017-01-03'].iloc[-2],
+                            datetime.datetime(2017, 1, 4, 0, 0, 0): signals['2017-01-04'].iloc[0],
+                            datetime.datetime(2017, 1, 4, 0, 0, 2): signals['2017-01-04'].iloc[1]}
+        self.assertEqual(actual_signals, expected_signals)
+
+    def test_signal_array_is_a_view_of_the_store(self):
+        self.historial_signal_helper.read_and_store_historical_signals(self.input_data_file_paths[0])
+        first_time, values = self.historial_signal_helper.signal_array_in_range(parser.parse("2017-01-02 10:00:01"),
+                                                                              parser.parse("2017-01-02 11:00:00"))
+
+        self.assertEqual(first_time, datetime.datetime(2017, 1, 2, 10, 0, 2))
+        np.testing.assert_array_equal(values, self.months[0]['2017-01-02'].values[18001:18001 + 1800])
+        # Slices of the memory mapped binary copy, nothing is read or copied beforehand
+        self.assertIsInstance(values, np.memmap)
+
+    def test_range_over_several_months(self):
+        self.historial_signal_helper.read_and_store_historical_signals(self.input_data_file_paths)
+        first_time, values = self.historial_signal_helper.signal_array_in_range(parser.parse("2017-01-01 00:00:00"),
+                                                                              parser.parse("2017-02-28 23:59:58"))
+
+        expected = np.concatenate([signals.values[:-1].T.ravel() for signals in self.months])
+        self.assertEqual(first_time, datetime.datetime(2017, 1, 1))
+        np.testing.assert_array_equal(values, expected)
+
+        with self.assertRaises(DatetimeValidationException) as context:
+            self.historial_signal_helper.signals_in_range(parser.parse("2017-02-28 23:00:00"),
+                                                          parser.parse("2017-03-01 00:00:00"))
+        self.assertTrue("between 2017-01-01 00:00:00 and 2017-02-28 23:59:58." in str(context.exception))
+
+    def test_missing_values_are_skipped(self):
+        signals = self.months[0]
+        signals.iloc[5, 0] = np.nan
+        signals.to_csv(self.input_data_file_paths[0])
+
+        self.historial_signal_helper.read_and_store_historical_signals(self.input_data_file_paths[0])
+        actual_signals = self.historial_signal_helper.signals_in_range(parser.parse("2017-01-01 00:00:08"),
+                                                                       parser.parse("2017-01-01 00:00:12"))
+
+        self.assertEqual(list(actual_signals.keys()), [datetime.datetime(2017, 1, 1, 0, 0, 8),
+                                                       datetime.datetime(2017, 1, 1, 0, 0, 12)])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import file_cache
+
+class TestFileCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_dir = file_cache.get_cache_dir()
+        file_cache.set_cache_dir(os.path.join(self.directory, 'cache'))
+        self.path = os.path.join(self.directory, 'values.txt')
+        with open(self.path, 'w') as f:
+            f.write('1 2 3')
+        self.parsed = []
+
+    def tearDown(self):
+        file_cache.set_cache_dir(self.cache_dir)
+        shutil.rmtree(self.directory)
+
+    def parse(self, path):
+        self.parsed.append(path)
+        return np.loadtxt(path)
+
+    def load(self, path=None):
+        return file_cache.load(path or self.path, ('.npy',), self.parse,
+                               lambda base, values: np.save(base + '.npy', values),
+                               lambda base: np.load(base + '.npy'))
+
+    def test_parsed_once(self):
+        np.testing.assert_array_equal(self.load(), [1, 2, 3])
+        np.testing.assert_array_equal(self.load(), [1, 2, 3])
+
+        self.assertEqual(self.parsed, [self.path])
+        # The copy is in the cache directory, not next to the file
+        self.assertEqual(os.listdir(os.path.join(self.directory, 'cache')),
+                         [os.path.basename(file_cache.cache_base(self.path)) + '.npy'])
+        self.assertEqual(sorted(os.listdir(self.directory)), ['cache', 'values.txt'])
+
+    def test_parsed_again_when_the_file_changes(self):
+        self.load()
+        with open(self.path, 'w') as f:
+            f.write('4 5')
+        cache_file = file_cache.cache_base(self.path) + '.npy'
+        os.utime(cache_file, (0, 0))
+
+        np.testing.assert_array_equal(self.load(), [4, 5])
+        self.assertEqual(len(self.parsed), 2)
+
+    def test_files_of_the_same_name(self):
+        os.mkdir(os.path.join(self.directory, 'other'))
+        other = shutil.copy(self.path, os.path.join(self.directory, 'other'))
+
+        self.assertNotEqual(file_cache.cache_base(self.path), file_cache.cache_base(other))
+
+    def test_parsed_without_cache_when_it_cannot_be_written(self):
+        # A cache directory that cannot be created, as in a read-only tree
+        not_a_directory = os.path.join(self.directory, 'file')
+        open(not_a_directory, 'w').close()
+        file_cache.set_cache_dir(os.path.join(not_a_directory, 'cache'))
+
+        np.testing.assert_array_equal(self.load(), [1, 2, 3])
+        np.testing.assert_array_equal(self.load(), [1, 2, 3])
+        self.assertEqual(len(self.parsed), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import warnings
+import numpy as np
+from scipy.optimize import fsolve
+from fleet_tables import OperatingPoints, BasePower
+
+class TestOperatingPoints(unittest.TestCase):
+
+    def setUp(self):
+        self.solved = []
+        self.p = np.linspace(2.0, 30.0, 501)
+
+    def volt(self, i):
+        return 1.2 - 0.002*i - 0.05*np.log(i + 1)
+
+    def solve(self, Pr, n_cells=1):
+        self.solved.append(Pr)
+        V, Ir = fsolve(lambda x: [x[0] - self.volt(x[1]), n_cells*x[0]*x[1] - Pr], [1.0, 10.0])
+        return V, Ir
+
+    def test_table_within_tolerance_of_fsolve(self):
+        points = OperatingPoints(self.volt, self.solve, self.p[0], self.p[-1], 1e-6)
+        del self.solved[:]
+
+        for p in self.p:
+            V, Ir = points(p)
+            V_fsolve, Ir_fsolve = self.solve(p)
+
+            self.assertLess(abs(Ir/Ir_fsolve - 1), 2e-6)
+            self.assertLess(abs(V/V_fsolve - 1), 2e-6)
+        # Only the fsolve calls of the test
+        self.assertEqual(len(self.solved), len(self.p))
+
+    def test_array_as_scalars(self):
+        points = OperatingPoints(self.volt, self.solve, self.p[0], self.p[-1], 1e-6)
+        p = np.concatenate([self.p, [0.5*self.p[0], 1.1*self.p[-1]]])
+
+        V, Ir = points.array(p)
+
+        np.testing.assert_array_equal(V, [points(x)[0] for x in p])
+        np.testing.assert_array_equal(Ir, [points(x)[1] for x in p])
+
+    def test_fsolve_outside_of_table(self):
+        points = OperatingPoints(self.volt, self.solve, self.p[0], self.p[-1], 1e-6)
+        del self.solved[:]
+
+        self.assertEqual(points(0.5*self.p[0]), self.solve(0.5*self.p[0]))
+        self.assertEqual(len(self.solved), 2)
+
+    def test_no_table(self):
+        points = OperatingPoints(self.volt, self.solve, self.p[0], self.p[-1], 0)
+        V, Ir = points.array(self.p[:5])
+
+        self.assertIsNone(points.table)
+        self.assertEqual((V[2], Ir[2]), self.solve(self.p[2]))
+
+    def test_cells_of_a_stack(self):
+        solve = lambda Pr: self.solve(Pr, n_cells=10)
+        points = OperatingPoints(self.volt, solve, 10*self.p[0], 10*self.p[-1], 1e-6, n_cells=10)
+
+        V, Ir = points(10*self.p[100])
+        V_cell, Ir_cell = self.solve(self.p[100])
+
+        self.assertLess(abs(Ir/Ir_cell - 1), 2e-6)
+        self.assertLess(abs(V/V_cell - 1), 2e-6)
+
+    def test_power_not_increasing(self):
+        # Past the max. power of the cell
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            points = OperatingPoints(lambda i: 1.0 - 0.1*i, lambda Pr: (0.5, 5.0) if Pr > 2 else (0.9, 1.0),
+                                     0.9, 2.5, 1e-6)
+
+        self.assertIsNone(points.table)
+        self.assertEqual(len(caught), 1)
+
+class TestBasePower(unittest.TestCase):
+
+    def setUp(self):
+        self.p = np.array([-1e-9, 2e-5, 0.1, 30.0])
+
+    def test_profile_of_the_polynomial(self):
+        base_power = BasePower(self.p, 7)
+        inc = np.arange(0, 40)
+
+        np.testing.assert_array_equal([base_power(k) for k in inc], np.polyval(self.p, inc + 1.0))
+        np.testing.assert_array_equal(base_power.array(inc), np.polyval(self.p, inc + 1.0))
+
+    def test_across_profiles(self):
+        base_power = BasePower(self.p, 3)
+
+        # Back and forth, and past the end of the last profile
+        for k in [5, 2, 3, 9, 100, 101]:
+            self.assertEqual(base_power(k), np.polyval(self.p, k + 1.0))
+
+    def test_constant(self):
+        base_power = BasePower(25, 3)
+
+        self.assertEqual(base_power(10), 25)
+        np.testing.assert_array_equal(base_power.array(np.arange(3)), [25.0, 25.0, 25.0])
+
+if __name__ == '__main__':
+    unittest.main()
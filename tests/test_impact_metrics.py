@@ -0,0 +1,56 @@
+import io
+import os
+import csv
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+import numpy as np
+from impact_metrics import ImpactMetrics
+
+class TestImpactMetrics(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        start = datetime(2019, 1, 1)
+        self.columns = ['ts', 'V', 'soc', 'f']
+        self.rows = [[start + timedelta(seconds=0.5*k), rng.rand(), np.float64(rng.rand()), None if k % 3 else 60.0]
+                     for k in range(10)]
+        self.metrics = ImpactMetrics(self.columns, chunk=4)
+        for row in self.rows:
+            self.metrics.append(*row)
+
+    def test_rows_in_chunks(self):
+        ts, values = self.metrics.arrays()
+
+        self.assertEqual(len(self.metrics), 10)
+        self.assertEqual(ts.astype(object).tolist(), [row[0] for row in self.rows])
+        self.assertTrue(np.array_equal(values, np.array([row[1:] for row in self.rows], dtype=float),
+                                       equal_nan=True))
+
+    def test_csv_as_str(self):
+        out = io.StringIO(newline='')
+        self.metrics.write_csv(out)
+
+        expected = io.StringIO(newline='')
+        csv.writer(expected).writerows([self.columns] + [[str(v) for v in row] for row in self.rows])
+        self.assertEqual(out.getvalue(), expected.getvalue())
+
+    def test_empty(self):
+        metrics = ImpactMetrics(self.columns)
+        out = io.StringIO(newline='')
+        metrics.write_csv(out)
+
+        self.assertEqual(len(metrics), 0)
+        self.assertEqual(out.getvalue(), 'ts,V,soc,f\r\n')
+
+    def test_save(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'metrics.npz')
+            self.metrics.save(filename)
+            with np.load(filename) as saved:
+                self.assertEqual(saved.files, self.columns)
+                self.assertTrue(np.array_equal(saved['ts'], self.metrics.arrays()[0]))
+                self.assertTrue(np.array_equal(saved['f'], self.metrics.arrays()[1][:, 2], equal_nan=True))
+
+if __name__ == '__main__':
+    unittest.main()
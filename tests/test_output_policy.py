@@ -0,0 +1,118 @@
+import os
+import logging
+import tempfile
+import unittest
+import matplotlib.pyplot as plt
+import output_policy
+from output_policy import OutputPolicy
+
+drawn = []
+
+def draw(label):
+    drawn.append(label)
+
+class Records(logging.Handler):
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+def draw_line(filename):
+    plt.figure()
+    plt.plot([0, 1], [1, 0])
+    output_policy.save(filename)
+
+class TestOutputPolicy(unittest.TestCase):
+
+    def setUp(self):
+        del drawn[:]
+
+    def tearDown(self):
+        output_policy.set_policy(OutputPolicy())
+
+    def test_plots_now(self):
+        output_policy.set_policy(OutputPolicy())
+        output_policy.plot(draw, 'a')
+
+        self.assertEqual(drawn, ['a'])
+
+    def test_plots_off(self):
+        output_policy.set_policy(output_policy.silent())
+        output_policy.plot(draw, 'a')
+        output_policy.finish()
+
+        self.assertEqual(drawn, [])
+
+    def test_plots_deferred_to_finish(self):
+        output_policy.set_policy(OutputPolicy(plots=output_policy.DEFERRED))
+        output_policy.plot(draw, 'a')
+        output_policy.plot(draw, label='b')
+        self.assertEqual(drawn, [])
+
+        output_policy.finish()
+        self.assertEqual(drawn, ['a', 'b'])
+
+    def test_plots_in_background(self):
+        output_policy.set_policy(OutputPolicy(background=True))
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'line.png')
+            output_policy.plot(draw_line, filename)
+            output_policy.finish()
+
+            self.assertTrue(os.path.getsize(filename) > 0)
+        self.assertEqual(plt.get_fignums(), [])
+
+    def test_level(self):
+        output_policy.set_policy(output_policy.silent())
+        logger = logging.getLogger('services.reserve_service')
+
+        self.assertFalse(logger.isEnabledFor(logging.INFO))
+        self.assertTrue(logger.isEnabledFor(logging.WARNING))
+
+    def test_component_levels(self):
+        output_policy.set_policy(OutputPolicy(level=logging.WARNING, levels={'services.reg_service': logging.DEBUG,
+                                                                             'fleets': logging.ERROR}))
+        self.assertTrue(logging.getLogger('services.reg_service').isEnabledFor(logging.DEBUG))
+        self.assertFalse(logging.getLogger('services.reserve_service').isEnabledFor(logging.INFO))
+        self.assertFalse(logging.getLogger('fleets.fuel_cell_fleet').isEnabledFor(logging.WARNING))
+
+        # The levels of the components go back to the level of the run with the next policy
+        output_policy.set_policy(output_policy.silent())
+        self.assertFalse(logging.getLogger('services.reg_service').isEnabledFor(logging.INFO))
+        self.assertTrue(logging.getLogger('fleets.fuel_cell_fleet').isEnabledFor(logging.WARNING))
+
+    def test_progress(self):
+        logger = logging.getLogger('services.test_progress')
+        records = Records()
+        logger.addHandler(records)
+        try:
+            for policy, messages in ((output_policy.verbose(), ['0', '1', '2']),
+                                     (OutputPolicy(progress=3600.), ['0']),
+                                     (output_policy.silent(), [])):
+                output_policy.set_policy(policy)
+                del records.messages[:]
+                progress = output_policy.Progress(logger)
+                for k in range(3):
+                    progress.step('%i', k)
+
+                self.assertEqual(records.messages, messages)
+                self.assertEqual(progress.steps, 3)
+
+            output_policy.set_policy(OutputPolicy())
+            del records.messages[:]
+            progress = output_policy.Progress(logger, interval=0.)
+            for k in range(3):
+                progress.step('%i', k)
+            self.assertEqual(records.messages, ['0', '1', '2'])
+        finally:
+            logger.removeHandler(records)
+
+    def test_unknown_plots(self):
+        with self.assertRaises(ValueError):
+            OutputPolicy(plots='later')
+
+if __name__ == '__main__':
+    unittest.main()
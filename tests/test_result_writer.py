@@ -0,0 +1,69 @@
+import io
+import os
+import csv
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+import numpy as np
+from result_writer import ResultWriter, read_results
+
+class TestResultWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'results')
+        self.columns = ['Time', 'a', 'b']
+        start = datetime(2017, 8, 1, 16)
+        self.ts = [start + k * timedelta(seconds=30) for k in range(25)]
+        self.a = np.linspace(0, 1, 25)
+        self.b = np.arange(25) * 0.1
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def read(self):
+        with open(self.filename, newline='') as f:
+            return f.read()
+
+    def test_csv_as_csv_writer(self):
+        with ResultWriter(self.filename, block=10) as results:
+            results.write_row(*self.columns)
+            results.write_rows(self.ts, self.a, self.b)
+
+        expected = io.StringIO(newline='')
+        csv.writer(expected).writerows([self.columns] + list(zip(self.ts, self.a.tolist(), self.b.tolist())))
+        self.assertEqual(self.read(), expected.getvalue())
+
+    def test_written_in_blocks(self):
+        results = ResultWriter(self.filename, block=10)
+        for row in zip(self.ts, self.a, self.b):
+            results.write_row(*row)
+
+        self.assertEqual(len(self.read().splitlines()), 20)
+        results.close()
+        self.assertEqual(len(self.read().splitlines()), 25)
+
+    def test_written_when_the_run_fails(self):
+        with self.assertRaises(ZeroDivisionError):
+            with ResultWriter(self.filename) as results:
+                results.write_row('before', 1.0)
+                1 / 0
+
+        self.assertEqual(self.read(), 'before,1.0\r\n')
+
+    def test_binary(self):
+        with ResultWriter(self.filename, columns=self.columns, block=10, binary=True) as results:
+            results.write_row(self.ts[0], self.a[0], self.b[0])
+            results.write_rows(self.ts[1:], self.a[1:], self.b[1:])
+
+        records = read_results(self.filename, self.columns)
+        self.assertEqual(records['Time'].astype(object).tolist(), self.ts)
+        self.assertEqual(records['a'].tolist(), self.a.tolist())
+        self.assertEqual(records['b'].tolist(), self.b.tolist())
+
+    def test_binary_needs_columns(self):
+        with self.assertRaises(ValueError):
+            ResultWriter(self.filename, binary=True)
+
+if __name__ == '__main__':
+    unittest.main()
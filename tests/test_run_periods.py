@@ -0,0 +1,47 @@
+import unittest
+from datetime import datetime, timedelta
+import pandas as pd
+import output_policy
+import test
+from service_factory import create_service
+
+class TestRunPeriods(unittest.TestCase):
+
+    def setUp(self):
+        self.policy = output_policy.get_policy()
+        output_policy.set_policy(output_policy.silent())
+        # Two short periods of a Reserve test, with spinning reserve events in both
+        self.periods = {'Night': ['2017-06-07 00:00:00', '2017-06-07 05:59:59'],
+                        'Morning': ['2017-06-07 06:00:00', '2017-06-07 11:59:59']}
+        self.kwargs = {'start_time': datetime(2017, 6, 7), 'sim_step': timedelta(minutes=1), 'service_weight': 0.35}
+        self.previous_event_end = pd.Timestamp('2017-06-01 00:00:00')
+
+    def tearDown(self):
+        output_policy.set_policy(self.policy)
+
+    def run_reserve(self, processes):
+        fleet_responses, fleet_name = test.run_periods('Reserve', 'FuelCell', 'Traditional', self.periods, processes,
+                                                       0, self.previous_event_end, **self.kwargs)
+        test.relink_periods(create_service('Reserve'), self.periods, fleet_responses, self.previous_event_end)
+        return fleet_responses, fleet_name
+
+    def test_pool_and_sequence_give_the_same_results(self):
+        pooled, pooled_fleet_name = self.run_reserve(processes=2)
+        in_sequence, fleet_name = self.run_reserve(processes=1)
+
+        self.assertEqual(pooled_fleet_name, 'FuelCellFleet')
+        self.assertEqual(fleet_name, 'FuelCellFleet')
+        self.assertEqual(len(pooled), 2)
+        for k in range(2):
+            self.assertGreater(len(pooled[k][0]), 0)
+        pd.testing.assert_frame_equal(pd.concat([r[0] for r in pooled]), pd.concat([r[0] for r in in_sequence]))
+        pd.testing.assert_frame_equal(pd.concat([r[1] for r in pooled]), pd.concat([r[1] for r in in_sequence]))
+
+        # The first event of the second period follows the last event of the first one
+        last_event_end = pooled[0][0].Event_End_Time.iloc[-1]
+        first_event = pooled[1][0].iloc[0]
+        self.assertAlmostEqual(first_event.Period_from_Last_Event_Hours,
+                               (first_event.Event_End_Time - last_event_end).total_seconds()/3600)
+
+if __name__ == '__main__':
+    unittest.main()
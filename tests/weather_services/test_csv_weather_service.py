@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+import numpy as np
+from weather_services import csv_weather_service
+from weather_services.points import PointEnum
+from weather_services.csv_weather_service import CsvWeatherService
+
+class TestCsvWeatherService(unittest.TestCase):
+
+    def setUp(self):
+        self.service = CsvWeatherService()
+
+    def test_get_data(self):
+        data = self.service.get_data('99352', [], datetime(2018, 1, 1, 8), datetime(2018, 1, 1, 9),
+                                     timedelta(minutes=15))
+
+        self.assertEqual(data, [{'ts': datetime(2018, 1, 1, 8), 'temperature': 72.0, 'relative_humidity': 50.0},
+                                {'ts': datetime(2018, 1, 1, 9), 'temperature': 73.0, 'relative_humidity': 49.0}])
+
+    def test_get_arrays(self):
+        arrays = self.service.get_arrays('99352', [PointEnum.relative_humidity], datetime(2018, 1, 1, 8, 30),
+                                         datetime(2018, 1, 2), timedelta(minutes=15))
+
+        self.assertEqual(list(arrays), [PointEnum.ts, PointEnum.relative_humidity])
+        self.assertEqual(arrays[PointEnum.ts].astype(object).tolist(), [datetime(2018, 1, 1, 9), datetime(2018, 1, 1, 10)])
+        self.assertEqual(arrays[PointEnum.relative_humidity].tolist(), [49.0, 48.0])
+
+    def test_out_of_range(self):
+        self.assertEqual(self.service.get_data('99352', [], datetime(2018, 1, 2), datetime(2018, 1, 3),
+                                               timedelta(minutes=15)), [])
+
+    def test_unsorted_file_reloaded_when_changed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'weather.csv')
+            with open(path, 'w') as f:
+                f.write('Timestamp,Temp[F],RH[%],Wind\n2018-01-01 09:00:00,73,49,2\n2018-01-01 08:00:00,72,50,1\n')
+            service = CsvWeatherService(weather_file_path=path)
+            arrays = service.get_arrays(None, [], datetime(2018, 1, 1), datetime(2018, 1, 2), None)
+
+            self.assertEqual(list(arrays), [PointEnum.ts, PointEnum.temperature, PointEnum.relative_humidity, 'Wind'])
+            self.assertEqual(arrays[PointEnum.temperature].tolist(), [72.0, 73.0])
+            self.assertEqual(arrays['Wind'].tolist(), [1.0, 2.0])
+
+            with open(path, 'a') as f:
+                f.write('2018-01-01 10:00:00,74,48,3\n')
+            os.utime(path, (0, os.path.getmtime(path) + 1))
+            arrays = service.get_arrays(None, [PointEnum.temperature], datetime(2018, 1, 1), datetime(2018, 1, 2), None)
+
+            self.assertEqual(arrays[PointEnum.temperature].tolist(), [72.0, 73.0, 74.0])
+            del csv_weather_service._tables[path]
+
+    def test_text_column(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'weather.csv')
+            with open(path, 'w') as f:
+                f.write('Timestamp,Temp[F],Sky,RH[%]\n2018-01-01 09:00:00,73,Cloudy,49\n'
+                        '2018-01-01 08:00:00,72,Clear,50\n')
+            service = CsvWeatherService(weather_file_path=path)
+            arrays = service.get_arrays(None, [PointEnum.temperature], datetime(2018, 1, 1), datetime(2018, 1, 2), None)
+
+            self.assertEqual(arrays[PointEnum.temperature].dtype, float)
+            self.assertEqual(arrays[PointEnum.temperature].tolist(), [72.0, 73.0])
+
+            data = service.get_data(None, [], datetime(2018, 1, 1), datetime(2018, 1, 2), None)
+
+            self.assertEqual(data, [{'ts': datetime(2018, 1, 1, 8), 'temperature': 72.0, 'Sky': 'Clear',
+                                     'relative_humidity': 50.0},
+                                    {'ts': datetime(2018, 1, 1, 9), 'temperature': 73.0, 'Sky': 'Cloudy',
+                                     'relative_humidity': 49.0}])
+            del csv_weather_service._tables[path]
+
+if __name__ == '__main__':
+    unittest.main()
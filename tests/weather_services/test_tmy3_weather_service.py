@@ -0,0 +1,113 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+import file_cache
+from weather_services import epw_file
+from weather_services.epw_record import EpwRecord
+from weather_services.points import PointEnum
+from weather_services.tmy3_weather_service import Tmy3WeatherService, TMY3_DIR
+
+PASCO = os.path.join(TMY3_DIR, 'USA_WA_Pasco-Tri.Cities.AP.727845_TMY3.epw')
+
+def epw_records(path):
+    with open(path) as f:
+        return [EpwRecord(line.split(',')) for line in f.readlines()[8:]]
+
+class TestTmy3WeatherService(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cache_dir = file_cache.get_cache_dir()
+        cls.directory = tempfile.mkdtemp()
+        file_cache.set_cache_dir(cls.directory)
+        cls.records = epw_records(PASCO)
+
+    @classmethod
+    def tearDownClass(cls):
+        file_cache.set_cache_dir(cls.cache_dir)
+        shutil.rmtree(cls.directory)
+
+    def setUp(self):
+        self.service = Tmy3WeatherService()
+
+    def test_weather_file_name(self):
+        self.assertEqual(self.service.get_weather_file_name('99352'), os.path.basename(PASCO))
+        self.assertEqual(self.service.get_weather_file_name(99352), os.path.basename(PASCO))
+        self.assertEqual(self.service.get_weather_file_name('01001'), 'USA_CT_Hartford-Bradley.Intl.AP.725080_TMY3.epw')
+        self.assertIsNone(self.service.get_weather_file_name('00000'))
+
+    def test_hourly_records(self):
+        data = self.service.get_data('99352', [], datetime(2000, 5, 1, 12), datetime(2000, 5, 2, 12),
+                                     timedelta(hours=1))
+        records = [record.__dict__ for record in self.records if datetime(1995, 5, 1, 12) <= record.ts <=
+                   datetime(1995, 5, 2, 12)]
+
+        self.assertEqual(len(records), 25)
+        self.assertEqual(data, records)
+
+    def test_interpolated(self):
+        points = [PointEnum.dry_bulb, PointEnum.relative_humidity]
+        data = self.service.get_data('99352', points, datetime(2000, 5, 1, 12), datetime(2000, 5, 1, 14),
+                                     timedelta(minutes=15))
+        first, second, third = [record for record in self.records if datetime(1995, 5, 1, 12) <= record.ts <=
+                                datetime(1995, 5, 1, 14)]
+
+        self.assertEqual([item[PointEnum.ts] for item in data],
+                         [datetime(1995, 5, 1, 12) + k * timedelta(minutes=15) for k in range(9)])
+        self.assertEqual(list(data[0]), [PointEnum.ts] + points)
+        self.assertEqual(data[0][PointEnum.dry_bulb], first.dry_bulb)
+        self.assertEqual(data[1][PointEnum.dry_bulb], first.dry_bulb + (second.dry_bulb - first.dry_bulb) * 1 / 4)
+        self.assertEqual(data[6][PointEnum.relative_humidity],
+                         second.relative_humidity + (third.relative_humidity - second.relative_humidity) * 2 / 4)
+        self.assertEqual(data[8][PointEnum.dry_bulb], third.dry_bulb)
+
+    def test_across_months(self):
+        # The months of the file are from different years
+        data = self.service.get_data('99352', [PointEnum.dry_bulb], datetime(2000, 4, 30, 23), datetime(2000, 5, 1),
+                                     timedelta(minutes=30))
+        april, may = [record for record in self.records if (record.month, record.day, record.hour) in
+                      [(4, 30, 24), (5, 1, 1)]]
+
+        self.assertEqual([item[PointEnum.ts] for item in data],
+                         [datetime(2000, 4, 30, 23), datetime(2000, 4, 30, 23, 30), datetime(1995, 5, 1)])
+        self.assertAlmostEqual(data[1][PointEnum.dry_bulb], (april.dry_bulb + may.dry_bulb) / 2)
+
+    def test_no_data(self):
+        self.assertEqual(self.service.get_data('00000', [], datetime(2000, 5, 1), datetime(2000, 5, 2),
+                                               timedelta(hours=1)), [])
+        self.assertEqual(self.service.get_data('99352', [], datetime(2000, 5, 2), datetime(2000, 5, 1),
+                                               timedelta(hours=1)), [])
+
+    def test_frame(self):
+        frame = self.service.get_frame('99352', [PointEnum.dry_bulb], datetime(2000, 1, 1), datetime(2000, 12, 31, 23),
+                                       timedelta(minutes=1))
+
+        self.assertEqual(len(frame), 8759 * 60 + 1)
+        self.assertEqual(frame[PointEnum.dry_bulb].iloc[::60].tolist(), [record.dry_bulb for record in self.records])
+
+class TestEpwFile(unittest.TestCase):
+
+    def test_npz_cache(self):
+        cache_dir = file_cache.get_cache_dir()
+        with tempfile.TemporaryDirectory() as directory:
+            file_cache.set_cache_dir(os.path.join(directory, 'cache'))
+            path = os.path.join(directory, os.path.basename(PASCO))
+            shutil.copy(PASCO, path)
+            try:
+                parsed = epw_file.load(path)
+                del epw_file._files[path]
+                cached = epw_file.load(path)
+
+                self.assertTrue(os.path.exists(file_cache.cache_base(path) + '.npz'))
+                self.assertIs(epw_file.load(path), cached)
+            finally:
+                del epw_file._files[path]
+                file_cache.set_cache_dir(cache_dir)
+        self.assertEqual(cached.values.tolist(), parsed.values.tolist())
+        self.assertEqual(cached.data_source.tolist(), parsed.data_source.tolist())
+        self.assertEqual(cached.starts.tolist(), parsed.starts.tolist())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+from datetime import datetime, timedelta
+import numpy as np
+from weather_services.weather_service import WeatherService, interpolate
+
+class TestInterpolate(unittest.TestCase):
+
+    def setUp(self):
+        self.times = np.array(['2018-05-01T12', '2018-05-01T13', '2018-05-01T15'], dtype='datetime64[h]')
+        self.values = np.array([[82., 20.], [84., 26.], [80., 30.]])
+
+    def test_records(self):
+        ts, rows, values = interpolate(self.times, self.values, datetime(2018, 5, 1, 11), datetime(2018, 5, 1, 16),
+                                       timedelta(minutes=30))
+
+        # The times outside of the records are left out
+        self.assertEqual(ts.astype(object).tolist(), [datetime(2018, 5, 1, 12) + k * timedelta(minutes=30)
+                                                      for k in range(7)])
+        self.assertEqual(rows.tolist(), [0, 0, 1, 1, 1, 1, 2])
+        self.assertEqual(values.tolist(), [[82., 20.], [83., 23.], [84., 26.], [83., 27.], [82., 28.], [81., 29.],
+                                           [80., 30.]])
+
+    def test_same_as_lin_interpolate(self):
+        start_values = [1.1, 0.3, 2.7]
+        end_values = [4.9, -0.8, 2.2]
+        resolution = timedelta(minutes=5)
+        expected = WeatherService().lin_interpolate(datetime(2018, 5, 1, 12), datetime(2018, 5, 1, 13),
+                                                    start_values, end_values, resolution)
+        ts, rows, values = interpolate([datetime(2018, 5, 1, 12), datetime(2018, 5, 1, 13)],
+                                       [start_values, end_values], datetime(2018, 5, 1, 12), datetime(2018, 5, 1, 13),
+                                       resolution)
+
+        self.assertEqual(list(zip(ts.astype(object).tolist(), values.tolist())), expected)
+        for k, (t, row) in enumerate(expected[1:-1], 1):
+            self.assertEqual(row, [s + (e - s) * k / 12 for s, e in zip(start_values, end_values)])
+
+if __name__ == '__main__':
+    unittest.main()